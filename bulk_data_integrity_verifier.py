@@ -4,6 +4,9 @@
 全面数据完整性验证器
 检查所有本地数据的时间范围、质量和完整性
 生成详细的数据完整性报告
+
+每个文件在进程池中完整流式读取一遍, 同时计算内容哈希、行数、日期覆盖范围和表结构;
+结果按 (路径, 大小, 修改时间) 缓存, 再次运行只验证发生变化的文件。
 """
 
 import sys
@@ -17,14 +20,194 @@ import os
 import glob
 from collections import defaultdict, Counter
 import re
+import csv
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 warnings.filterwarnings('ignore')
 
+CACHE_VERSION = 1
+SERIOUS_ISSUES = ['读取失败', '文件为空', '结束时间过早', '截断', '解析失败']
+
+
+def _last_line_incomplete(raw, expected_fields, tail_bytes=1 << 16):
+    """
+    检查无换行结尾的文件末行: 无法解析或字段数与表头不一致时视为截断
+    
+    很多导出工具不写末尾换行, 只看最后一个字节会误报。
+    """
+    size = raw.seek(0, os.SEEK_END)
+    raw.seek(max(0, size - tail_bytes))
+    line = raw.read().rsplit(b'\n', 1)[-1].rstrip(b'\r')
+    try:
+        fields = next(csv.reader([line.decode('utf-8')], strict=True))
+    except (csv.Error, UnicodeDecodeError, StopIteration):
+        return True
+    return bool(expected_fields) and len(fields) != expected_fields
+
+
+class _HashingReader:
+    """读取时同步计算哈希的文件包装, 使哈希与CSV解析共用一次磁盘读取"""
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.hasher = hashlib.blake2b(digest_size=20)
+        self.last_byte = b''
+    
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        if data:
+            self.hasher.update(data)
+            self.last_byte = data[-1:]
+        return data
+    
+    def drain(self):
+        """读完剩余内容(解析提前结束时仍需完整哈希)"""
+        while self.read(1 << 20):
+            pass
+
+
+def scan_data_file(file_path, category, chunk_size=200000):
+    """
+    完整扫描单个数据文件(可在子进程中运行)
+    
+    Args:
+        file_path: 文件路径
+        category: 数据类别
+        chunk_size: CSV分块行数
+        
+    Returns:
+        dict: 验证结果, 含内容哈希、行数、日期范围、列结构和问题列表
+    """
+    file_path = Path(file_path)
+    file_result = {
+        'file_name': file_path.name,
+        'file_path': str(file_path),
+        'size_mb': 0,
+        'is_valid': False,
+        'row_count': 0,
+        'column_count': 0,
+        'columns': [],
+        'content_hash': None,
+        'date_range': {
+            'start_date': None,
+            'end_date': None,
+            'date_column': None
+        },
+        'issues': []
+    }
+    
+    try:
+        # 获取文件大小
+        file_result['size_mb'] = file_path.stat().st_size / (1024 * 1024)
+        
+        start_date, end_date = None, None
+        if file_path.suffix == '.csv':
+            with open(file_path, 'rb') as raw:
+                reader = _HashingReader(raw)
+                date_column = None
+                try:
+                    for chunk in pd.read_csv(reader, chunksize=chunk_size, low_memory=False):
+                        if date_column is None and not file_result['columns']:
+                            file_result['columns'] = [str(col) for col in chunk.columns]
+                            date_columns = [col for col in chunk.columns
+                                            if any(date_word in str(col).lower() for date_word in ['date', 'time', '日期'])]
+                            date_column = date_columns[0] if date_columns else None
+                            file_result['date_range']['date_column'] = date_column
+                        file_result['row_count'] += len(chunk)
+                        if date_column is not None:
+                            dates = pd.to_datetime(chunk[date_column], errors='coerce')
+                            if dates.notna().any():
+                                start_date = dates.min() if start_date is None else min(start_date, dates.min())
+                                end_date = dates.max() if end_date is None else max(end_date, dates.max())
+                except pd.errors.EmptyDataError:
+                    pass
+                except pd.errors.ParserError as e:
+                    file_result['issues'].append(f"CSV解析失败: {str(e)}")
+                reader.drain()
+                file_result['content_hash'] = reader.hasher.hexdigest()
+                if reader.last_byte not in (b'', b'\n') and \
+                        _last_line_incomplete(raw, len(file_result['columns'])):
+                    file_result['issues'].append("文件末行不完整(可能被截断)")
+            if date_column is not None and file_result['row_count'] and start_date is None:
+                file_result['issues'].append(f"日期解析失败: {date_column}")
+        elif file_path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+            hasher = hashlib.blake2b(digest_size=20)
+            with open(file_path, 'rb') as raw:
+                for block in iter(lambda: raw.read(1 << 20), b''):
+                    hasher.update(block)
+            file_result['content_hash'] = hasher.hexdigest()
+            parquet_file = pq.ParquetFile(file_path)
+            file_result['columns'] = parquet_file.schema_arrow.names
+            file_result['row_count'] = parquet_file.metadata.num_rows
+            date_columns = [col for col in file_result['columns']
+                            if any(date_word in col.lower() for date_word in ['date', 'time', '日期'])]
+            if date_columns:
+                date_column = date_columns[0]
+                file_result['date_range']['date_column'] = date_column
+                dates = pd.to_datetime(parquet_file.read(columns=[date_column]).column(0).to_pandas(), errors='coerce')
+                if dates.notna().any():
+                    start_date, end_date = dates.min(), dates.max()
+        elif file_path.suffix == '.json':
+            with open(file_path, 'rb') as raw:
+                content = raw.read()
+            file_result['content_hash'] = hashlib.blake2b(content, digest_size=20).hexdigest()
+            try:
+                json.loads(content.decode('utf-8'))
+                file_result['is_valid'] = True
+            except ValueError as e:
+                file_result['issues'].append(f"JSON解析失败: {str(e)}")
+            return file_result
+        else:
+            file_result['issues'].append(f"不支持的文件类型: {file_path.suffix}")
+            return file_result
+        
+        if file_result['row_count'] == 0:
+            file_result['issues'].append("文件为空")
+            return file_result
+        
+        file_result['column_count'] = len(file_result['columns'])
+        file_result['date_range']['start_date'] = start_date.strftime('%Y-%m-%d') if start_date is not None else None
+        file_result['date_range']['end_date'] = end_date.strftime('%Y-%m-%d') if end_date is not None else None
+        
+        # 验证时间范围
+        if end_date is not None and category in ['股票日线数据', '股票周线数据', '股票月线数据']:
+            if end_date < pd.Timestamp('2024-01-01'):
+                file_result['issues'].append(f"结束时间过早: {end_date.date()}")
+        
+        # 如果没有严重问题，标记为有效
+        serious_issues = [issue for issue in file_result['issues'] if any(serious in issue for serious in SERIOUS_ISSUES)]
+        file_result['is_valid'] = len(serious_issues) == 0
+        
+    except Exception as e:
+        file_result['issues'].append(f"验证过程异常: {str(e)}")
+    
+    return file_result
+
+
 class BulkDataIntegrityVerifier:
     """全面数据完整性验证器"""
     
-    def __init__(self):
-        """初始化验证器"""
-        self.base_path = Path("/Users/jackstudio/QuantTrade/data")
+    def __init__(self, base_path="/Users/jackstudio/QuantTrade/data",
+                 cache_file="data_integrity_cache.json", max_workers=None,
+                 chunk_size=200000, full_rescan=False):
+        """
+        初始化验证器
+        
+        Args:
+            base_path: 数据根目录
+            cache_file: 验证结果缓存文件(不要放在数据目录内)
+            max_workers: 进程数, 默认CPU核数
+            chunk_size: CSV分块行数
+            full_rescan: 忽略缓存, 全量重新验证
+        """
+        self.base_path = Path(base_path)
+        self.cache_file = Path(cache_file)
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.full_rescan = full_rescan
+        self.cache = {} if full_rescan else self.load_cache()
+        self.cache_hits = 0
         self.target_start = pd.Timestamp('2000-01-01')
         self.target_end = pd.Timestamp('2025-08-31')
         self.verification_results = {}
@@ -42,6 +225,7 @@ class BulkDataIntegrityVerifier:
         print(f"🔍 数据完整性验证器")
         print(f"📁 检查路径: {self.base_path}")
         print(f"📅 目标时间范围: {self.target_start.date()} - {self.target_end.date()}")
+        print(f"🗃️ 验证缓存: {self.cache_file} ({len(self.cache)} 个文件)")
         print("=" * 80)
     
     def discover_all_data_directories(self):
@@ -159,74 +343,80 @@ class BulkDataIntegrityVerifier:
             return '其他数据'
     
     def verify_single_file(self, file_path, category):
-        """验证单个文件"""
-        file_result = {
-            'file_name': file_path.name,
-            'file_path': str(file_path),
-            'size_mb': 0,
-            'is_valid': False,
-            'row_count': 0,
-            'column_count': 0,
-            'date_range': {
-                'start_date': None,
-                'end_date': None,
-                'date_column': None
-            },
-            'issues': []
-        }
+        """验证单个文件(流式读取全文件)"""
+        return scan_data_file(file_path, category, self.chunk_size)
+    
+    def load_cache(self):
+        """加载验证结果缓存: 路径 -> {size, mtime_ns, result}"""
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                if cache.get('version') == CACHE_VERSION:
+                    return cache['files']
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ 验证缓存不可用，将全量验证: {e}")
+        return {}
+    
+    def save_cache(self):
+        """原子写入验证结果缓存"""
+        tmp_file = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.cache}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_file, self.cache_file)
+    
+    def verify_files(self, tasks):
+        """
+        批量验证文件, 只重新验证 (路径, 大小, 修改时间) 发生变化的文件
         
-        try:
-            # 获取文件大小
-            file_result['size_mb'] = file_path.stat().st_size / (1024 * 1024)
+        Args:
+            tasks: [(文件路径, 类别)]
             
-            # 根据文件类型读取
-            if file_path.suffix == '.csv':
-                df = pd.read_csv(file_path, nrows=100)  # 只读前100行进行验证
-            elif file_path.suffix == '.json':
-                file_result['is_valid'] = True
-                return file_result
+        Returns:
+            dict: 文件路径 -> 验证结果
+        """
+        results = {}
+        pending = []
+        for file_path, category in tasks:
+            key = str(file_path)
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            entry = self.cache.get(key)
+            if (not self.full_rescan and entry and entry['size'] == stat.st_size
+                    and entry['mtime_ns'] == stat.st_mtime_ns and entry['category'] == category):
+                results[key] = entry['result']
+                self.cache_hits += 1
             else:
-                file_result['issues'].append(f"不支持的文件类型: {file_path.suffix}")
-                return file_result
-            
-            if df is None or len(df) == 0:
-                file_result['issues'].append("文件为空")
-                return file_result
-            
-            file_result['row_count'] = len(df)
-            file_result['column_count'] = len(df.columns)
-            
-            # 检查日期列
-            date_columns = [col for col in df.columns if any(date_word in col.lower() for date_word in ['date', 'time', '日期'])]
-            
-            if date_columns:
-                date_column = date_columns[0]
-                file_result['date_range']['date_column'] = date_column
-                
-                try:
-                    df[date_column] = pd.to_datetime(df[date_column])
-                    start_date = df[date_column].min()
-                    end_date = df[date_column].max()
-                    
-                    file_result['date_range']['start_date'] = start_date.strftime('%Y-%m-%d') if pd.notna(start_date) else None
-                    file_result['date_range']['end_date'] = end_date.strftime('%Y-%m-%d') if pd.notna(end_date) else None
-                    
-                    # 验证时间范围
-                    if category in ['股票日线数据', '股票周线数据', '股票月线数据']:
-                        if end_date < pd.Timestamp('2024-01-01'):
-                            file_result['issues'].append(f"结束时间过早: {end_date.date()}")
-                    
-                except Exception as e:
-                    file_result['issues'].append(f"日期解析失败: {str(e)}")
-            
-            # 如果没有严重问题，标记为有效
-            serious_issues = [issue for issue in file_result['issues'] if any(serious in issue for serious in ['读取失败', '文件为空', '结束时间过早'])]
-            file_result['is_valid'] = len(serious_issues) == 0
-            
-        except Exception as e:
-            file_result['issues'].append(f"验证过程异常: {str(e)}")
-        
-        return file_result
+                pending.append((key, category, stat.st_size, stat.st_mtime_ns))
+        
+        if pending:
+            print(f"   🔄 需要验证 {len(pending)} 个文件 (缓存命中 {len(results)} 个)")
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                # 大文件优先提交, 避免最后只剩一个大文件在跑
+                pending.sort(key=lambda item: item[2], reverse=True)
+                futures = {
+                    executor.submit(scan_data_file, Path(key), category, self.chunk_size): (key, category, size, mtime_ns)
+                    for key, category, size, mtime_ns in pending
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    key, category, size, mtime_ns = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'file_name': Path(key).name, 'file_path': key, 'size_mb': size / (1024 * 1024),
+                                  'is_valid': False, 'row_count': 0, 'column_count': 0,
+                                  'date_range': {'start_date': None, 'end_date': None, 'date_column': None},
+                                  'issues': [f"验证过程异常: {str(e)}"]}
+                    results[key] = result
+                    self.cache[key] = {'size': size, 'mtime_ns': mtime_ns, 'category': category, 'result': result}
+                    if done % 1000 == 0:
+                        print(f"      ⏳ 已验证 {done}/{len(pending)}")
+                        self.save_cache()
+            self.save_cache()
+        
+        return results
     
     def generate_comprehensive_report(self):
         """生成全面的完整性报告"""
@@ -235,10 +425,21 @@ class BulkDataIntegrityVerifier:
         # 收集所有目录的数据
         data_directories = self.discover_all_data_directories()
         
-        # 验证每个类别
+        # 全部文件一次性并行验证(未变化的文件直接使用缓存)
+        tasks = [
+            (dir_info['path'] / file_name, category)
+            for category, directories in data_directories.items()
+            for dir_info in directories
+            for file_name in dir_info['files']
+        ]
+        print(f"\n🔍 验证 {len(tasks)} 个文件 (进程数: {self.max_workers or os.cpu_count()})...")
+        file_results = self.verify_files(tasks)
+        print(f"   ✅ 验证完成, 缓存命中 {self.cache_hits} 个文件")
+        
+        # 按类别汇总
         for category, directories in data_directories.items():
             if directories:
-                print(f"\n🔍 验证 {category}...")
+                print(f"\n🔍 汇总 {category}...")
                 category_results = {
                     'category': category,
                     'directories': [],
@@ -250,20 +451,22 @@ class BulkDataIntegrityVerifier:
                 
                 for dir_info in directories:
                     dir_path = dir_info['path']
-                    print(f"   📂 检查: {dir_info['relative_path']}")
                     
-                    # 检查目录中的文件 (限制前5个文件)
                     valid_files_in_dir = 0
                     dir_size = 0
+                    invalid_files = []
                     sample_files = []
                     
-                    for file_name in dir_info['files'][:5]:
-                        file_path = dir_path / file_name
-                        if file_path.exists():
-                            file_result = self.verify_single_file(file_path, category)
-                            if file_result['is_valid']:
-                                valid_files_in_dir += 1
-                            dir_size += file_result['size_mb']
+                    for file_name in dir_info['files']:
+                        file_result = file_results.get(str(dir_path / file_name))
+                        if file_result is None:
+                            continue
+                        if file_result['is_valid']:
+                            valid_files_in_dir += 1
+                        else:
+                            invalid_files.append(file_result)
+                        dir_size += file_result['size_mb']
+                        if len(sample_files) < 2:
                             sample_files.append(file_result)
                     
                     dir_summary = {
@@ -271,14 +474,16 @@ class BulkDataIntegrityVerifier:
                         'relative_path': dir_info['relative_path'],
                         'total_files': len(dir_info['files']),
                         'valid_files': valid_files_in_dir,
-                        'size_mb': dir_size
+                        'size_mb': dir_size,
+                        'invalid_files': [f['file_name'] for f in invalid_files]
                     }
                     
                     category_results['directories'].append(dir_summary)
                     category_results['total_files'] += len(dir_info['files'])
                     category_results['valid_files'] += valid_files_in_dir
                     category_results['total_size_mb'] += dir_size
-                    category_results['sample_files'].extend(sample_files[:2])  # 每个目录取2个样本
+                    # 无效文件优先作为样本展示
+                    category_results['sample_files'].extend((invalid_files + sample_files)[:2])
                 
                 self.verification_results[category] = category_results
                 print(f"      📊 {category}: {category_results['valid_files']}/{category_results['total_files']} 有效")
@@ -394,7 +599,7 @@ def main():
     print("📋 验证目标: 检查所有本地数据的完整性和时间范围")
     print("📅 时间要求: 2000年1月1日 - 2025年8月31日")
     
-    verifier = BulkDataIntegrityVerifier()
+    verifier = BulkDataIntegrityVerifier(full_rescan='--full' in sys.argv)
     report, readable_report = verifier.generate_comprehensive_report()
     
     print("\n" + "=" * 100)
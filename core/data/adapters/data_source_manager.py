@@ -20,8 +20,20 @@ from .tushare_adapter import TushareAdapter
 from .yahoo_adapter import YahooFinanceAdapter
 from .akshare_adapter import AKShareAdapter
 
+try:
+    from ..storage.schema_registry import get_schema_registry
+except ImportError:
+    get_schema_registry = None
+
 logger = logging.getLogger(__name__)
 
+# 适配器方法 -> 标准化输出的结构名(见 schema_registry.API_SCHEMAS)
+METHOD_SCHEMAS = {
+    'get_price_data': 'price',
+    'get_stock_list': 'stock_list',
+    'get_financial_data': 'financial',
+}
+
 class DataSourceManager:
     """数据源管理器
     
@@ -219,6 +231,10 @@ class DataSourceManager:
                 if isinstance(result, pd.DataFrame) and not result.empty:
                     logger.info(f"✅ 使用{source_name}成功获取数据，共{len(result)}条记录")
                     
+                    # 统一为紧凑数据类型
+                    if get_schema_registry is not None:
+                        result = get_schema_registry().coerce(result, METHOD_SCHEMAS.get(method_name))
+                    
                     # 重置错误计数
                     self.source_status[source_name]['error_count'] = 0
                     return result
@@ -331,7 +347,10 @@ class DataSourceManager:
         
         # 合并结果
         if all_results:
-            combined = pd.concat(all_results, ignore_index=True)
+            if get_schema_registry is not None:
+                combined = get_schema_registry().concat(all_results)
+            else:
+                combined = pd.concat(all_results, ignore_index=True)
             logger.info(f"✅ 并行获取完成，共{len(combined)}条记录")
             return combined
         else:
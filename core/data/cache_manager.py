@@ -5,6 +5,50 @@
 =============
 
 高性能、分层的数据缓存系统
+
+序列化:
+- DataFrame 使用 Arrow IPC(Feather V2), 磁盘层内存映射读取, 可按列加载
+- 默认返回可写的DataFrame副本; arrow_zero_copy=True 时数值列直接引用映射缓冲区(只读, 不占进程私有内存)
+- 其他对象使用pickle; 压缩层使用 zstd/lz4 (无pyarrow时为gzip)
+
+多进程共享(process_safe):
+- 数据与元数据文件均先写临时文件再原子重命名
+- SQLite(WAL模式)索引记录每个键所在的层
+- 按键分条的文件锁保护读写; get_or_compute 保证同一键并发未命中时只计算一次
+
+写入策略:
+- 每次写入只序列化一次
+- 按数据大小和类型选择唯一的持久化层(磁盘/压缩/SQLite), 小数据另在内存中保留一份
+- 持久化写入由后台线程异步完成(write-behind), 调用方不等待磁盘
+- 按访问频率在压缩层与磁盘层之间提升/降级
+
+元数据索引:
+- 所有持久化条目登记在 cache_index(层、大小、过期时间、访问统计), 标签登记在 cache_tags
+- 过期清理、按标签失效、冷数据降级均为索引查询, 不再逐个解析 .meta 文件
+- 各层条目数与字节数由触发器增量维护, 统计不再遍历目录
+- 命中时的访问统计先在内存中累积, 批量写回索引
+
+数据依赖:
+- put/get_or_compute 可声明输入数据集(数据目录中的 "<category>/<api>" 或文件路径)
+- 条目记录依赖的版本(size + mtime 或内容哈希), 读取时与当前版本比对, 不一致即失效
+- 声明了依赖且未指定过期时间的条目不按时间过期
+
+监控指标:
+- 按 data_type 统计命中/未命中、读写字节数与淘汰数
+- 按层统计 get/put/落盘 延迟直方图
+- get_metrics_snapshot() 返回字典, export_prometheus() 输出 Prometheus 文本格式(可写文件或启动HTTP端点)
+
+共享内存层(shared_memory_tier, 默认关闭):
+- 大型DataFrame的Arrow数据在 /dev/shm 共享区只存一份, 本机各工作进程内存映射读取
+- 配合 arrow_zero_copy=True 时各进程零拷贝引用共享页(返回只读DataFrame), 否则读取时复制
+- 读取方持有的DataFrame存活期间段被引用, 不会被淘汰; 共享区总字节数受 shared_memory_max_size
+  与 /dev/shm 可用空间限制; 过期段由 cleanup_expired 清除, 最后一个进程 close() 时清空共享区
+- 写入时发布到共享区, 其他进程从磁盘/压缩层读到的大数据也会发布
+
+访问日志:
+- 开启 access_log 后(默认关闭), 每次 get 记录 (时间, data_type, params, 大小, 是否命中),
+  批量写入 access_log 表; params 在后台写回时才序列化, 不占用读取路径
+- 供 CacheWarmer 按时段统计热点键并在开盘前预热(prefetch)
 """
 
 import os
@@ -14,16 +58,117 @@ import hashlib
 import gzip
 import shutil
 from typing import Dict, List, Optional, Union, Any, Callable
+from collections import OrderedDict
+from contextlib import contextmanager
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 import sqlite3
 
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    PYARROW_AVAILABLE = False
+
+try:
+    from .storage.data_catalog import file_version
+except ImportError:
+    file_version = None
+
+from .shared_arena import SharedArena, default_arena_dir
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 无 fcntl, 文件锁退化为进程内锁
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# 元数据索引结构版本(PRAGMA user_version), 升级时从缓存文件重建索引
+INDEX_VERSION = 2
+
+# 声明了数据依赖的条目默认不按时间过期
+NO_EXPIRY = datetime(9999, 12, 31)
+
+# 持久化层
+PERSISTENT_TIERS = ('disk', 'compressed', 'sqlite')
+
+# 压缩编码 -> 文件扩展名
+CODEC_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'lz4': '.lz4'}
+
+
+# 延迟直方图桶上界(毫秒)
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+# 按 data_type 统计的计数器
+NAMESPACE_COUNTERS = ('hits', 'misses', 'bytes_read', 'bytes_written', 'puts', 'evictions', 'invalidations')
+
+
+class LatencyHistogram:
+    """累积延迟直方图(Prometheus histogram 语义: 每个桶计数包含所有更小的观测值)"""
+    
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+    
+    def observe(self, elapsed_ms: float):
+        """记录一次观测"""
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶上界估计分位数(毫秒)"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets_ms + (float('inf'),), self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """导出为字典, buckets 为累积计数"""
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets_ms + (float('inf'),), self.counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+        return {
+            'count': self.count,
+            'sum_ms': self.sum_ms,
+            'mean_ms': self.sum_ms / self.count if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p99_ms': self.quantile(0.99),
+            'buckets': buckets
+        }
+
+
+def _default_codec() -> str:
+    """可用的最快压缩编码"""
+    if PYARROW_AVAILABLE:
+        for codec in ('zstd', 'lz4'):
+            if pa.Codec.is_available(codec):
+                return codec
+    return 'gzip'
+
+
 class SmartCacheManager:
     """智能缓存管理器
     
@@ -32,6 +177,8 @@ class SmartCacheManager:
     - 磁盘缓存 (持久化)
     - 压缩缓存 (节省空间)
     - SQLite缓存 (结构化数据)
+    
+    每个键只持久化在其中一层
     """
     
     def __init__(self, config: Optional[Dict] = None):
@@ -50,6 +197,46 @@ class SmartCacheManager:
         self.compression_enabled = self.config.get('compression_enabled', True)
         self.cleanup_interval_hours = self.config.get('cleanup_interval_hours', 6)
         
+        # 分层策略配置
+        self.memory_item_max_size = self.config.get('memory_item_max_size', 1024 * 1024)        # 1MB以下保留内存副本
+        self.disk_item_max_size = self.config.get('disk_item_max_size', 10 * 1024 * 1024)       # 10MB以上使用压缩层
+        self.sqlite_item_max_size = self.config.get('sqlite_item_max_size', 256 * 1024)         # 小型dict/list使用SQLite
+        self.write_behind = self.config.get('write_behind', True)
+        self.max_pending_bytes = self.config.get('max_pending_bytes', 256 * 1024 * 1024)  # 超过后同步写入
+        self.promote_after_hits = self.config.get('promote_after_hits', 3)
+        self.demote_after_hours = self.config.get('demote_after_hours', 72)
+        
+        # 序列化配置
+        self.dataframe_format = self.config.get('dataframe_format', 'arrow' if PYARROW_AVAILABLE else 'pickle')
+        if self.dataframe_format == 'arrow' and not PYARROW_AVAILABLE:
+            self.dataframe_format = 'pickle'
+        self.compression_codec = self.config.get('compression_codec', _default_codec())
+        if self.compression_codec in ('zstd', 'lz4') and not PYARROW_AVAILABLE:
+            self.compression_codec = 'gzip'
+        # 零拷贝读取返回只读DataFrame, 需调用方显式开启
+        self.arrow_zero_copy = self.config.get('arrow_zero_copy', False)
+        
+        # 多进程共享配置
+        self.process_safe = self.config.get('process_safe', False)
+        self.lock_stripes = self.config.get('lock_stripes', 256)
+        self.compute_lock_timeout = self.config.get('compute_lock_timeout', None)
+        self.access_flush_size = self.config.get('access_flush_size', 256)
+        self.access_log_enabled = self.config.get('access_log', False)
+        self.access_log_days = self.config.get('access_log_days', 14)
+        
+        # 共享内存层: 多个工作进程共享大型DataFrame, 降低总内存占用
+        self.shared_item_min_size = self.config.get('shared_item_min_size', self.memory_item_max_size)
+        self.shared_arena: Optional[SharedArena] = None
+        
+        # 数据依赖版本解析: version_resolver(依赖列表) -> {依赖: 版本}, 或提供数据目录 catalog
+        self.version_resolver = self.config.get('version_resolver')
+        if self.version_resolver is None and self.config.get('catalog') is not None:
+            self.version_resolver = self.config['catalog'].resolve_versions
+        # 读取时校验依赖版本的最小间隔(秒): 间隔内复用上次解析结果, 避免每次命中都解析
+        self.dependency_check_seconds = self.config.get('dependency_check_seconds', 1.0)
+        self._version_cache: Dict[str, tuple] = {}
+        self._version_lock = threading.Lock()
+        
         # 创建缓存目录
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
@@ -58,20 +245,62 @@ class SmartCacheManager:
         self.disk_cache_dir = self.cache_dir / 'disk'
         self.compressed_cache_dir = self.cache_dir / 'compressed'
         self.sqlite_cache_dir = self.cache_dir / 'sqlite'
+        self.lock_dir = self.cache_dir / 'locks'
         
         for dir_path in [self.memory_cache_dir, self.disk_cache_dir, 
-                        self.compressed_cache_dir, self.sqlite_cache_dir]:
+                        self.compressed_cache_dir, self.sqlite_cache_dir, self.lock_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
         
-        # 内存缓存
-        self._memory_cache: Dict[str, Dict] = {}
+        if self.config.get('shared_memory_tier', False) and self.dataframe_format == 'arrow':
+            arena = SharedArena(
+                self.config.get('shared_memory_dir') or default_arena_dir(self.cache_dir),
+                max_bytes=self.config.get('shared_memory_max_size', 2 * 1024 * 1024 * 1024),
+                metadata_hook=self._datetime_parser,
+                is_expired=lambda metadata: datetime.now() > metadata.get('expire_time', NO_EXPIRY)
+            )
+            if arena.available:
+                self.shared_arena = arena
+                logger.info(f"🧠 共享内存层已启用: {arena.root}")
+            else:
+                logger.warning("⚠️ 当前平台不支持共享内存层, 已忽略 shared_memory_tier")
+        
+        # 内存缓存: 按访问顺序排列的LRU队列, 配合近期访问频率做接纳判断
+        self._memory_cache: 'OrderedDict[str, Dict]' = OrderedDict()
         self._memory_usage = 0
+        self._access_freq: Dict[str, int] = {}
+        self._freq_ops = 0
+        self._freq_window = 1000
         self._cache_lock = threading.RLock()
         
+        # 命中时的访问统计缓冲: key -> [次数, 最后访问时间]
+        self._access_buffer: Dict[str, List] = {}
+        self._access_log: List[tuple] = []
+        self._access_lock = threading.Lock()
+        
         # SQLite数据库连接
         self.db_path = self.sqlite_cache_dir / 'cache.db'
         self._init_sqlite_db()
         
+        # 异步写入: 单线程按提交顺序落盘, 待写数据可直接被读取
+        self._pending_writes: Dict[str, Dict] = {}
+        self._pending_bytes = 0
+        self._pending_lock = threading.Lock()
+        self._write_seq = 0
+        self._migrating = set()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-writer')
+        
+        # 单飞加载: 进程内同一键的计算互斥(条目带引用计数, 最后一个持有方释放时删除)
+        self._inflight: Dict[str, list] = {}
+        self._inflight_guard = threading.Lock()
+        self._held_compute_stripes = threading.local()
+        
+        # 持久化层读取顺序
+        self._tier_readers = {
+            'disk': self._get_from_disk,
+            'compressed': self._get_from_compressed,
+            'sqlite': self._get_from_sqlite
+        }
+        
         # 缓存统计
         self.stats = {
             'hits': 0,
@@ -79,9 +308,23 @@ class SmartCacheManager:
             'memory_hits': 0,
             'disk_hits': 0,
             'compressed_hits': 0,
-            'sqlite_hits': 0
+            'sqlite_hits': 0,
+            'pending_hits': 0,
+            'shared_hits': 0,
+            'memory_rejections': 0,
+            'computes': 0,
+            'compute_waits': 0,
+            'stale_invalidations': 0,
+            'sync_writes': 0
         }
         
+        # 细分指标: data_type -> 计数器; (操作, 层) -> 延迟直方图
+        self._namespace_stats: Dict[str, Dict[str, int]] = {}
+        self._latency: Dict[tuple, LatencyHistogram] = {}
+        self._metrics_lock = threading.Lock()
+        self.prometheus_file = self.config.get('prometheus_file')
+        self._metrics_server = None
+        
         # 启动清理线程
         self._cleanup_thread = None
         self._start_cleanup_thread()
@@ -91,7 +334,9 @@ class SmartCacheManager:
     def _init_sqlite_db(self):
         """初始化SQLite数据库"""
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
+            with self._connect() as conn:
+                # WAL: 多进程读写互不阻塞
+                conn.execute('PRAGMA journal_mode=WAL')
                 conn.execute('''
                     CREATE TABLE IF NOT EXISTS cache_data (
                         key TEXT PRIMARY KEY,
@@ -109,13 +354,334 @@ class SmartCacheManager:
                 conn.execute('''
                     CREATE INDEX IF NOT EXISTS idx_last_access ON cache_data(last_access)
                 ''')
+                # 访问日志: 按时段统计热点键(预热)
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS access_log (
+                        ts REAL NOT NULL,
+                        day TEXT NOT NULL,
+                        minute INTEGER NOT NULL,
+                        key TEXT NOT NULL,
+                        data_type TEXT NOT NULL,
+                        params TEXT,
+                        size_bytes INTEGER DEFAULT 0,
+                        hit INTEGER NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_access_log_minute ON access_log(minute, ts)
+                ''')
                 conn.commit()
                 
+                # 元数据索引
+                rebuild = conn.execute('PRAGMA user_version').fetchone()[0] < INDEX_VERSION
+                if rebuild:
+                    conn.executescript('''
+                        DROP TABLE IF EXISTS cache_index;
+                        DROP TABLE IF EXISTS cache_tags;
+                        DROP TABLE IF EXISTS cache_totals;
+                    ''')
+                self._create_index_tables(conn)
+            
+            if rebuild:
+                self.rebuild_index()
+                with self._connect() as conn:
+                    conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+                
             logger.info("✅ SQLite缓存数据库初始化完成")
             
         except Exception as e:
             logger.error(f"❌ SQLite数据库初始化失败: {str(e)}")
     
+    @staticmethod
+    def _create_index_tables(conn: sqlite3.Connection):
+        """创建元数据索引表"""
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cache_index (
+                key TEXT PRIMARY KEY,
+                tier TEXT NOT NULL,
+                format TEXT,
+                codec TEXT,
+                size_bytes INTEGER DEFAULT 0,
+                stored_bytes INTEGER DEFAULT 0,
+                created_time TIMESTAMP,
+                expire_time TIMESTAMP,
+                access_count INTEGER DEFAULT 0,
+                last_access TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_index_expire ON cache_index(expire_time);
+            CREATE INDEX IF NOT EXISTS idx_index_tier_access ON cache_index(tier, last_access);
+            
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_tags_key ON cache_tags(key);
+            
+            -- 各层条目数/字节数, 由触发器随索引增量维护
+            CREATE TABLE IF NOT EXISTS cache_totals (
+                tier TEXT PRIMARY KEY,
+                items INTEGER NOT NULL DEFAULT 0,
+                bytes INTEGER NOT NULL DEFAULT 0
+            );
+            INSERT OR IGNORE INTO cache_totals (tier) VALUES ('disk'), ('compressed'), ('sqlite');
+            
+            CREATE TRIGGER IF NOT EXISTS trg_index_insert AFTER INSERT ON cache_index
+            BEGIN
+                UPDATE cache_totals SET items = items + 1, bytes = bytes + NEW.stored_bytes
+                WHERE tier = NEW.tier;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_index_delete AFTER DELETE ON cache_index
+            BEGIN
+                UPDATE cache_totals SET items = items - 1, bytes = bytes - OLD.stored_bytes
+                WHERE tier = OLD.tier;
+                DELETE FROM cache_tags WHERE key = OLD.key;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_index_update AFTER UPDATE OF tier, stored_bytes ON cache_index
+            BEGIN
+                UPDATE cache_totals SET items = items - 1, bytes = bytes - OLD.stored_bytes
+                WHERE tier = OLD.tier;
+                UPDATE cache_totals SET items = items + 1, bytes = bytes + NEW.stored_bytes
+                WHERE tier = NEW.tier;
+            END;
+        ''')
+    
+    def _connect(self) -> sqlite3.Connection:
+        """打开SQLite连接(多进程并发时等待锁而不是立即报错)"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.execute('PRAGMA busy_timeout=30000')
+        return conn
+    
+    # ---------- 锁 ----------
+    
+    @contextmanager
+    def _file_lock(self, lock_file: Path, exclusive: bool = True):
+        """基于 flock 的跨进程文件锁"""
+        with open(lock_file, 'a+') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _key_lock(self, cache_key: str, exclusive: bool = True):
+        """键的数据读写锁(按哈希分条, 锁文件数量固定); 仅在 process_safe 模式下生效"""
+        if not self.process_safe:
+            yield
+            return
+        stripe = int(hashlib.md5(cache_key.encode()).hexdigest()[:8], 16) % self.lock_stripes
+        with self._file_lock(self.lock_dir / f"data_{stripe:04d}.lock", exclusive):
+            yield
+    
+    @contextmanager
+    def _compute_lock(self, cache_key: str):
+        """键的计算锁: 进程内用按键的线程锁, process_safe 模式下再加分条文件锁(锁文件数量固定)"""
+        with self._inflight_guard:
+            entry = self._inflight.setdefault(cache_key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if not self.process_safe:
+                    yield
+                    return
+                stripe = int(hashlib.md5(cache_key.encode()).hexdigest()[:8], 16) % self.lock_stripes
+                held = self._held_compute_stripes.__dict__.setdefault('stripes', set())
+                if stripe in held:
+                    # 同一线程嵌套计算落在同一分条: 外层已持有跨进程互斥, 再次flock会自锁
+                    yield
+                    return
+                with self._file_lock(self.lock_dir / f"compute_{stripe:04d}.lock"):
+                    held.add(stripe)
+                    try:
+                        yield
+                    finally:
+                        held.discard(stripe)
+        finally:
+            with self._inflight_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._inflight[cache_key]
+    
+    # ---------- 元数据索引 ----------
+    
+    def _index_upsert(self, cache_key: str, metadata: Dict, conn: Optional[sqlite3.Connection] = None):
+        """登记键所在的层与标签(已有记录保留访问统计)"""
+        row = (cache_key, metadata.get('tier'), metadata.get('format', 'pickle'), metadata.get('codec'),
+               metadata.get('size_bytes', 0), metadata.get('stored_bytes', metadata.get('size_bytes', 0)),
+               metadata['created_time'], metadata['expire_time'],
+               metadata.get('access_count', 0), metadata.get('last_access', metadata['created_time']))
+        tags = [(tag, cache_key) for tag in dict.fromkeys(metadata.get('tags') or [])]
+        
+        def write(conn):
+            conn.execute('''
+                INSERT INTO cache_index
+                (key, tier, format, codec, size_bytes, stored_bytes, created_time, expire_time,
+                 access_count, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    tier = excluded.tier, format = excluded.format, codec = excluded.codec,
+                    size_bytes = excluded.size_bytes, stored_bytes = excluded.stored_bytes,
+                    created_time = excluded.created_time, expire_time = excluded.expire_time
+            ''', row)
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (cache_key,))
+            conn.executemany('INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)', tags)
+        
+        if conn is not None:
+            write(conn)
+            return
+        with self._connect() as conn:
+            write(conn)
+            conn.commit()
+    
+    def _index_lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """查询键的索引记录(所在层、访问次数), 未登记时返回None"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT tier, access_count FROM cache_index WHERE key = ?', (cache_key,)
+                ).fetchone()
+            return {'tier': row[0], 'access_count': row[1]} if row else None
+        except sqlite3.Error as e:
+            logger.debug(f"查询缓存索引失败: {e}")
+            return None
+    
+    def _index_query(self,
+                     tier: Optional[str] = None,
+                     tags: Optional[List[str]] = None,
+                     expired_before: Optional[datetime] = None) -> List[tuple]:
+        """按层/标签/过期时间查询索引, 返回 [(key, tier)]"""
+        sql = 'SELECT DISTINCT i.key, i.tier FROM cache_index i'
+        conditions, args = [], []
+        if tags:
+            sql += ' JOIN cache_tags t ON t.key = i.key'
+            conditions.append(f"t.tag IN ({','.join('?' * len(tags))})")
+            args.extend(tags)
+        if tier is not None:
+            conditions.append('i.tier = ?')
+            args.append(tier)
+        if expired_before is not None:
+            conditions.append('i.expire_time < ?')
+            args.append(expired_before)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        with self._connect() as conn:
+            return conn.execute(sql, args).fetchall()
+    
+    def _delete_entries(self, entries: List[tuple]):
+        """删除索引查询到的持久化条目(数据文件/SQLite行与索引记录)"""
+        if not entries:
+            return
+        tier_dirs = {'disk': self.disk_cache_dir, 'compressed': self.compressed_cache_dir}
+        for cache_key, tier in entries:
+            if tier in tier_dirs:
+                with self._key_lock(cache_key):
+                    self._unlink_entry(tier_dirs[tier], cache_key)
+        keys = [(cache_key,) for cache_key, _ in entries]
+        if self.shared_arena is not None:
+            self.shared_arena.remove_many([cache_key for cache_key, _ in entries])
+        with self._connect() as conn:
+            conn.executemany('DELETE FROM cache_data WHERE key = ?',
+                             [(cache_key,) for cache_key, tier in entries if tier == 'sqlite'])
+            conn.executemany('DELETE FROM cache_index WHERE key = ?', keys)
+            conn.commit()
+    
+    def _record_hit(self, cache_key: str) -> int:
+        """缓冲一次持久化层命中, 返回尚未写回索引的命中次数"""
+        with self._access_lock:
+            entry = self._access_buffer.setdefault(cache_key, [0, None])
+            entry[0] += 1
+            entry[1] = datetime.now()
+            hits = entry[0]
+            should_flush = len(self._access_buffer) >= self.access_flush_size
+        if should_flush:
+            try:
+                self._writer.submit(self._flush_access_stats)
+            except RuntimeError:
+                # 写入线程已关闭
+                self._flush_access_stats()
+        return hits
+    
+    def _log_access(self, cache_key: str, data_type: str, params: Dict[str, Any],
+                    size_bytes: int, hit: bool):
+        """缓冲一条访问日志"""
+        if not self.access_log_enabled:
+            return
+        now = datetime.now()
+        # params 写回时再序列化, 这里只做浅拷贝
+        record = (now.timestamp(), now.strftime('%Y-%m-%d'), now.hour * 60 + now.minute, cache_key,
+                  data_type, dict(params), size_bytes, int(hit))
+        with self._access_lock:
+            self._access_log.append(record)
+            should_flush = len(self._access_log) >= self.access_flush_size
+        if should_flush:
+            try:
+                self._writer.submit(self._flush_access_stats)
+            except RuntimeError:
+                self._flush_access_stats()
+    
+    def _flush_access_stats(self):
+        """把缓冲的访问统计与访问日志批量写回SQLite"""
+        with self._access_lock:
+            buffered, self._access_buffer = self._access_buffer, {}
+            access_log, self._access_log = self._access_log, []
+        if not buffered and not access_log:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany('''
+                    UPDATE cache_index SET access_count = access_count + ?, last_access = ?
+                    WHERE key = ?
+                ''', [(count, last_access, key) for key, (count, last_access) in buffered.items()])
+                conn.executemany('''
+                    INSERT INTO access_log (ts, day, minute, key, data_type, params, size_bytes, hit)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [record[:5] + (json.dumps(record[5], sort_keys=True, default=str),) + record[6:]
+                      for record in access_log])
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 写回访问统计失败: {str(e)}")
+    
+    def rebuild_index(self):
+        """从缓存文件与SQLite缓存表重建元数据索引
+        
+        用于索引结构升级, 或进程异常退出后索引与文件不一致时;
+        元数据损坏或数据文件缺失的条目同时被删除。
+        """
+        entries = []
+        for tier, cache_dir in (('disk', self.disk_cache_dir), ('compressed', self.compressed_cache_dir)):
+            for meta_file in cache_dir.glob("*.meta"):
+                cache_key = meta_file.stem
+                try:
+                    with open(meta_file, 'r', encoding='utf-8') as f:
+                        metadata = json.load(f, object_hook=self._datetime_parser)
+                    cache_file = cache_dir / self._data_file_name(cache_key, tier, metadata)
+                    metadata['tier'] = tier
+                    metadata['stored_bytes'] = cache_file.stat().st_size
+                    entries.append((cache_key, metadata))
+                except Exception:
+                    self._unlink_entry(cache_dir, cache_key)
+        
+        with self._connect() as conn:
+            for cache_key, metadata_str, data_size in conn.execute(
+                    'SELECT key, metadata, LENGTH(data) FROM cache_data').fetchall():
+                try:
+                    metadata = json.loads(metadata_str, object_hook=self._datetime_parser)
+                    metadata['tier'] = 'sqlite'
+                    metadata['stored_bytes'] = data_size or 0
+                    entries.append((cache_key, metadata))
+                except Exception:
+                    conn.execute('DELETE FROM cache_data WHERE key = ?', (cache_key,))
+            
+            conn.execute('DELETE FROM cache_index')
+            for cache_key, metadata in entries:
+                self._index_upsert(cache_key, metadata, conn)
+            conn.commit()
+        
+        logger.info(f"✅ 缓存索引重建完成: {len(entries)} 条")
+    
     def _generate_cache_key(self, 
                            data_type: str,
                            params: Dict[str, Any]) -> str:
@@ -152,379 +718,1029 @@ class SmartCacheManager:
             'last_access': datetime.now()
         }
     
-    def _serialize_data(self, data: Any) -> bytes:
-        """序列化数据"""
-        if isinstance(data, pd.DataFrame):
-            # DataFrame使用pickle序列化
-            return pickle.dumps(data)
-        else:
-            # 其他数据类型使用pickle
-            return pickle.dumps(data)
+    def _serialize_data(self, data: Any):
+        """序列化数据
+        
+        DataFrame 使用 Arrow IPC(Feather V2)格式, 读取时可内存映射并按列加载;
+        其他数据类型(及Arrow无法表示的DataFrame)使用pickle。
+        
+        Returns:
+            (序列化结果, 格式 'arrow'/'pickle')
+        """
+        if isinstance(data, pd.DataFrame) and self.dataframe_format == 'arrow':
+            try:
+                table = pa.Table.from_pandas(data, preserve_index=None)
+                sink = pa.BufferOutputStream()
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                return sink.getvalue(), 'arrow'
+            except (pa.ArrowException, TypeError, ValueError) as e:
+                logger.debug(f"DataFrame无法转换为Arrow, 使用pickle: {e}")
+        return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 'pickle'
     
-    def _deserialize_data(self, data_bytes: bytes) -> Any:
+    def _deserialize_data(self, data_bytes, fmt: str = 'pickle',
+                          columns: Optional[List[str]] = None) -> Any:
         """反序列化数据"""
-        return pickle.loads(data_bytes)
+        if fmt == 'arrow':
+            table = pa.ipc.open_file(pa.BufferReader(data_bytes)).read_all()
+            return self._arrow_to_pandas(table, columns)
+        data = pickle.loads(data_bytes)
+        return self._select_columns(data, columns)
+    
+    @staticmethod
+    def _select_columns(data: Any, columns: Optional[List[str]]) -> Any:
+        """按列筛选DataFrame"""
+        if columns and isinstance(data, pd.DataFrame):
+            return data[[col for col in columns if col in data.columns]]
+        return data
     
-    def _compress_data(self, data_bytes: bytes) -> bytes:
-        """压缩数据"""
-        if self.compression_enabled:
-            return gzip.compress(data_bytes)
-        return data_bytes
+    def _arrow_to_pandas(self, table, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Arrow表转为DataFrame; 指定列时只转换这些列(及索引列)"""
+        if columns:
+            pandas_meta = table.schema.pandas_metadata or {}
+            index_cols = [col for col in pandas_meta.get('index_columns', []) if isinstance(col, str)]
+            selected = [col for col in columns if col in table.column_names]
+            table = table.select(selected + [col for col in index_cols if col not in selected])
+        if self.arrow_zero_copy:
+            # 按列拆分块, 数值列直接引用Arrow(内存映射)缓冲区; 返回的数组为只读
+            return table.to_pandas(split_blocks=True)
+        return table.to_pandas()
     
-    def _decompress_data(self, compressed_bytes: bytes) -> bytes:
+    def _read_arrow_file(self, cache_file: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """内存映射读取Arrow文件, 未选中的列不会被读入内存"""
+        table = pa.ipc.open_file(pa.memory_map(str(cache_file), 'r')).read_all()
+        return self._arrow_to_pandas(table, columns)
+    
+    def _compress_data(self, data_bytes):
+        """压缩数据
+        
+        Returns:
+            (压缩结果, 编码 'zstd'/'lz4'/'gzip')
+        """
+        if self.compression_codec in ('zstd', 'lz4'):
+            return pa.compress(data_bytes, codec=self.compression_codec, asbytes=True), self.compression_codec
+        return gzip.compress(data_bytes), 'gzip'
+    
+    def _decompress_data(self, compressed_bytes: bytes, codec: str = 'gzip',
+                         raw_size: Optional[int] = None) -> bytes:
         """解压缩数据"""
-        if self.compression_enabled:
-            try:
-                return gzip.decompress(compressed_bytes)
-            except:
-                # 如果解压失败，可能是未压缩的数据
-                return compressed_bytes
-        return compressed_bytes
+        if codec in ('zstd', 'lz4'):
+            return pa.decompress(compressed_bytes, decompressed_size=raw_size, codec=codec, asbytes=True)
+        try:
+            return gzip.decompress(compressed_bytes)
+        except:
+            # 如果解压失败，可能是未压缩的数据
+            return compressed_bytes
     
-    def get(self, 
+    @staticmethod
+    def _data_file_name(cache_key: str, tier: str, metadata: Dict) -> str:
+        """数据文件名: 扩展名反映序列化格式与压缩编码(兼容旧的 .pkl / .pkl.gz)"""
+        name = f"{cache_key}.arrow" if metadata.get('format') == 'arrow' else f"{cache_key}.pkl"
+        if tier == 'compressed':
+            name += CODEC_SUFFIXES.get(metadata.get('codec', 'gzip'), '.gz')
+        return name
+    
+    @staticmethod
+    def _unlink_entry(cache_dir: Path, cache_key: str):
+        """删除一个键在某层目录中的全部文件"""
+        for path in cache_dir.glob(f"{cache_key}.*"):
+            path.unlink(missing_ok=True)
+
+    def _select_tier(self, data: Any, data_size: int) -> str:
+        """选择唯一的持久化层
+        
+        - 小型结构化数据(dict/list) -> SQLite
+        - 中小数据 -> 磁盘(原始序列化字节, 读取最快)
+        - 大数据 -> 压缩(节省空间)
+        """
+        if isinstance(data, (dict, list)) and data_size < self.sqlite_item_max_size:
+            return 'sqlite'
+        if data_size < self.disk_item_max_size or not self.compression_enabled:
+            return 'disk'
+        return 'compressed'
+    
+    def get(self,
            data_type: str,
            params: Dict[str, Any],
-           default: Any = None) -> Any:
+           default: Any = None,
+           columns: Optional[List[str]] = None) -> Any:
         """获取缓存数据
         
         Args:
             data_type: 数据类型
             params: 参数字典
             default: 默认值
-            
+            columns: 只返回DataFrame的这些列; Arrow格式的磁盘层只读取这些列
+        
         Returns:
-            Any: 缓存的数据，如果不存在返回default
+            Any: 缓存的数据，如果不存在返回default; 依赖的数据已变化的条目视为不存在
         """
+        return self._lookup(data_type, params, default, columns, record=True)
+    
+    def _lookup(self, data_type: str, params: Dict[str, Any], default: Any = None,
+                columns: Optional[List[str]] = None, record: bool = True) -> Any:
+        """逐层查找; record=False 时不计入命中/未命中统计、延迟直方图与访问日志(内部复查用)"""
         cache_key = self._generate_cache_key(data_type, params)
+        started = time.perf_counter()
         
         try:
             # 1. 尝试内存缓存
-            result = self._get_from_memory(cache_key)
-            if result is not None:
-                self.stats['hits'] += 1
-                self.stats['memory_hits'] += 1
+            found = self._get_from_memory(cache_key)
+            if found is not None and self._dependencies_changed(found[1]):
+                self._invalidate(cache_key)
+                found = None
+            if found is not None:
+                result = found[0]
+                if record:
+                    self.stats['hits'] += 1
+                    self.stats['memory_hits'] += 1
+                    self._count(data_type, 'hits')
+                    self._count(data_type, 'bytes_read', found[1].get('size_bytes', 0))
+                    self._observe('get', 'memory', started)
+                    self._log_access(cache_key, data_type, params, found[1].get('size_bytes', 0), True)
                 logger.debug(f"✅ 内存缓存命中: {cache_key}")
-                return result
+                return self._select_columns(result, columns)
             
-            # 2. 尝试磁盘缓存
-            result = self._get_from_disk(cache_key)
-            if result is not None:
-                # 将数据加载到内存缓存
-                self._put_to_memory(cache_key, result)
-                self.stats['hits'] += 1
-                self.stats['disk_hits'] += 1
-                logger.debug(f"✅ 磁盘缓存命中: {cache_key}")
-                return result
+            # 2. 尚未落盘的写入
+            found = self._get_from_pending(cache_key, columns)
+            tier = 'pending'
             
-            # 3. 尝试压缩缓存
-            result = self._get_from_compressed(cache_key)
-            if result is not None:
-                # 将数据加载到内存和磁盘缓存
-                self._put_to_memory(cache_key, result)
-                self._put_to_disk(cache_key, result)
-                self.stats['hits'] += 1
-                self.stats['compressed_hits'] += 1
-                logger.debug(f"✅ 压缩缓存命中: {cache_key}")
-                return result
+            # 3. 共享内存层(其他进程已加载的大数据)
+            if found is None and self.shared_arena is not None:
+                found = self._get_from_shared(cache_key, columns)
+                tier = 'shared'
+                if found is not None:
+                    self._record_hit(cache_key)
             
-            # 4. 尝试SQLite缓存
-            result = self._get_from_sqlite(cache_key)
-            if result is not None:
-                # 将数据加载到上层缓存
-                self._put_to_memory(cache_key, result)
-                self._put_to_disk(cache_key, result)
-                self.stats['hits'] += 1
-                self.stats['sqlite_hits'] += 1
-                logger.debug(f"✅ SQLite缓存命中: {cache_key}")
+            # 4. 持久化层(每个键只存在于其中一层, 由索引定位)
+            if found is None:
+                indexed = self._index_lookup(cache_key)
+                if indexed is not None and indexed['tier'] in self._tier_readers:
+                    tier = indexed['tier']
+                    found = self._tier_readers[tier](cache_key, columns)
+                    if found is not None:
+                        found[1]['access_count'] = indexed['access_count'] + self._record_hit(cache_key)
+                        self._maybe_publish_shared(cache_key, tier, found[1])
+            
+            if found is not None and self._dependencies_changed(found[1]):
+                self._invalidate(cache_key)
+                found = None
+            
+            if found is not None:
+                result, metadata = found
+                # 热数据加载到内存缓存(按列读取的部分数据与共享内存层数据不进入内存层)
+                if not columns and tier != 'shared' and metadata.get('size_bytes', 0) < self.memory_item_max_size:
+                    self._put_to_memory(cache_key, result, metadata)
+                if tier == 'compressed':
+                    self._maybe_promote(cache_key, metadata)
+                if record:
+                    self.stats['hits'] += 1
+                    self.stats[f'{tier}_hits'] = self.stats.get(f'{tier}_hits', 0) + 1
+                    self._count(data_type, 'hits')
+                    self._count(data_type, 'bytes_read', metadata.get('size_bytes', 0))
+                    self._observe('get', tier, started)
+                    self._log_access(cache_key, data_type, params, metadata.get('size_bytes', 0), True)
+                logger.debug(f"✅ {tier}缓存命中: {cache_key}")
                 return result
             
             # 所有缓存都未命中
-            self.stats['misses'] += 1
+            if record:
+                self.stats['misses'] += 1
+                self._count(data_type, 'misses')
+                self._observe('get', 'miss', started)
+                self._log_access(cache_key, data_type, params, 0, False)
             logger.debug(f"❌ 缓存未命中: {cache_key}")
             return default
-            
+        
         except Exception as e:
             logger.error(f"❌ 获取缓存失败: {str(e)}")
             return default
     
-    def put(self, 
+    def put(self,
            data_type: str,
            params: Dict[str, Any],
            data: Any,
            expire_hours: Optional[int] = None,
-           tags: Optional[List[str]] = None):
+           tags: Optional[List[str]] = None,
+           depends_on: Optional[Union[List[str], Dict[str, Optional[str]]]] = None):
         """存储数据到缓存
         
+        数据只序列化一次, 按大小和类型写入唯一的持久化层;
+        小数据同时保留在内存中, 持久化写入由后台线程异步完成。
+        
         Args:
             data_type: 数据类型
             params: 参数字典
             data: 要缓存的数据
-            expire_hours: 过期小时数
+            expire_hours: 过期小时数; 声明了依赖且未指定时不按时间过期
             tags: 标签列表
+            depends_on: 输入数据集列表(此时解析当前版本), 或读取输入前解析好的 {依赖: 版本}
         """
         cache_key = self._generate_cache_key(data_type, params)
+        started = time.perf_counter()
+        versions = self._resolve_dependencies(depends_on)
+        if versions:
+            # 依赖标签: clear_cache(tags=['dep:<依赖>']) 可按数据集失效
+            tags = list(tags or []) + [f"dep:{name}" for name in versions]
         metadata = self._get_cache_metadata(expire_hours, tags)
+        if versions:
+            metadata['depends_on'] = versions
+            if expire_hours is None and all(v is not None for v in versions.values()):
+                metadata['expire_time'] = NO_EXPIRY
         
         try:
-            # 计算数据大小
-            serialized_data = self._serialize_data(data)
-            data_size = len(serialized_data)
+            # 唯一一次序列化
+            payload, metadata['format'] = self._serialize_data(data)
+            data_size = len(payload)
             metadata['size_bytes'] = data_size
+            metadata['tier'] = self._select_tier(data, data_size)
             
-            # 分层存储策略
-            if data_size < 1024 * 1024:  # 小于1MB，存储到内存缓存
+            if data_size < self.memory_item_max_size:
                 self._put_to_memory(cache_key, data, metadata)
-                
-            if data_size < 10 * 1024 * 1024:  # 小于10MB，存储到磁盘缓存
-                self._put_to_disk(cache_key, data, metadata)
             else:
-                # 大数据使用压缩缓存
-                self._put_to_compressed(cache_key, data, metadata)
+                self._remove_from_memory(cache_key)
             
-            # 结构化数据存储到SQLite
-            if isinstance(data, (pd.DataFrame, dict, list)):
-                self._put_to_sqlite(cache_key, data, metadata)
+            if self.shared_arena is not None:
+                if metadata['format'] == 'arrow' and data_size >= self.shared_item_min_size:
+                    self.shared_arena.put(cache_key, payload, metadata)
+                else:
+                    self.shared_arena.remove(cache_key)
             
-            logger.debug(f"✅ 数据已缓存: {cache_key} ({data_size} bytes)")
+            self._submit_write(cache_key, metadata['tier'], payload, metadata)
+            self._count(data_type, 'puts')
+            self._count(data_type, 'bytes_written', data_size)
+            self._observe('put', metadata['tier'], started)
             
+            logger.debug(f"✅ 数据已缓存: {cache_key} ({data_size} bytes, {metadata['tier']})")
+        
         except Exception as e:
             logger.error(f"❌ 缓存存储失败: {str(e)}")
     
-    def _get_from_memory(self, cache_key: str) -> Any:
-        """从内存缓存获取数据"""
+    def get_or_compute(self,
+                       data_type: str,
+                       params: Dict[str, Any],
+                       compute_fn: Callable[[], Any],
+                       expire_hours: Optional[int] = None,
+                       tags: Optional[List[str]] = None,
+                       depends_on: Optional[List[str]] = None) -> Any:
+        """获取缓存数据, 未命中时计算并缓存(单飞)
+        
+        同一键的并发未命中(同进程的多个线程, process_safe 模式下包括多个进程)
+        只有一个调用方执行 compute_fn, 其余调用方等待后直接读取其结果。
+        
+        Args:
+            data_type: 数据类型
+            params: 参数字典
+            compute_fn: 无参计算函数, 返回None时不缓存
+            expire_hours: 过期小时数
+            tags: 标签列表
+            depends_on: compute_fn 读取的数据集; 版本在计算前解析, 计算期间数据变化会在下次读取时失效
+        
+        Returns:
+            Any: 缓存或新计算的数据
+        """
+        result = self.get(data_type, params)
+        if result is not None:
+            return result
+        
+        cache_key = self._generate_cache_key(data_type, params)
+        with self._compute_lock(cache_key):
+            # 等锁期间可能已由其他调用方算好; 首次查找已计入统计, 复查不再计数
+            result = self._lookup(data_type, params, record=False)
+            if result is not None:
+                self.stats['compute_waits'] += 1
+                return result
+            
+            versions = self._resolve_dependencies(depends_on)
+            result = compute_fn()
+            self.stats['computes'] += 1
+            if result is not None:
+                self.put(data_type, params, result, expire_hours=expire_hours, tags=tags,
+                         depends_on=versions)
+                # 释放计算锁前落盘, 其他进程醒来即可读到
+                if self.process_safe:
+                    self._write_now(cache_key)
+            return result
+    
+    # ---------- 监控指标 ----------
+    
+    @staticmethod
+    def _namespace_of(cache_key: str) -> str:
+        """缓存键对应的 data_type(键格式为 <data_type>_<md5>)"""
+        return cache_key.rsplit('_', 1)[0]
+    
+    def _count(self, namespace: str, counter: str, amount: int = 1):
+        """累加 data_type 计数器"""
+        with self._metrics_lock:
+            counters = self._namespace_stats.get(namespace)
+            if counters is None:
+                counters = self._namespace_stats[namespace] = dict.fromkeys(NAMESPACE_COUNTERS, 0)
+            counters[counter] += amount
+    
+    def _observe(self, operation: str, tier: str, started: float):
+        """记录一次操作的延迟(started 为 time.perf_counter() 起点)"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._metrics_lock:
+            histogram = self._latency.get((operation, tier))
+            if histogram is None:
+                histogram = self._latency[(operation, tier)] = LatencyHistogram()
+            histogram.observe(elapsed_ms)
+    
+    def get_metrics_snapshot(self) -> Dict[str, Any]:
+        """
+        细分指标快照
+        
+        Returns:
+            {'namespaces': {data_type: 计数器与命中率},
+             'latency': {操作: {层: 直方图}}, 'tiers': 各层条目数/字节数}
+        """
+        with self._metrics_lock:
+            namespaces = {}
+            for namespace, counters in self._namespace_stats.items():
+                lookups = counters['hits'] + counters['misses']
+                namespaces[namespace] = dict(counters, hit_rate=counters['hits'] / lookups if lookups else 0)
+            latency: Dict[str, Dict[str, Any]] = {}
+            for (operation, tier), histogram in self._latency.items():
+                latency.setdefault(operation, {})[tier] = histogram.snapshot()
+        
+        tiers = {'memory': {'items': len(self._memory_cache), 'bytes': self._memory_usage}}
+        if self.shared_arena is not None:
+            usage = self.shared_arena.usage()
+            tiers['shared'] = {'items': usage['items'], 'bytes': usage['bytes']}
+        try:
+            with self._connect() as conn:
+                for tier, items, size in conn.execute('SELECT tier, items, bytes FROM cache_totals'):
+                    tiers[tier] = {'items': items, 'bytes': size}
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 读取缓存统计失败: {str(e)}")
+        
+        return {'namespaces': namespaces, 'latency': latency, 'tiers': tiers}
+    
+    def export_prometheus(self, path: Optional[Union[str, Path]] = None) -> str:
+        """
+        以 Prometheus 文本格式导出指标
+        
+        Args:
+            path: 输出文件(如 node_exporter textfile 目录下的 .prom 文件), 原子写入
+        
+        Returns:
+            str: 指标文本
+        """
+        snapshot = self.get_metrics_snapshot()
+        lines = []
+        
+        def label(value: str) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"')
+        
+        for counter in NAMESPACE_COUNTERS:
+            name = f"quant_cache_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for namespace, counters in sorted(snapshot['namespaces'].items()):
+                lines.append(f'{name}{{data_type="{label(namespace)}"}} {counters[counter]}')
+        
+        lines.append("# TYPE quant_cache_tier_items gauge")
+        for tier, totals in snapshot['tiers'].items():
+            lines.append(f'quant_cache_tier_items{{tier="{tier}"}} {totals["items"]}')
+        lines.append("# TYPE quant_cache_tier_bytes gauge")
+        for tier, totals in snapshot['tiers'].items():
+            lines.append(f'quant_cache_tier_bytes{{tier="{tier}"}} {totals["bytes"]}')
+        
+        lines.append("# TYPE quant_cache_latency_seconds histogram")
+        for operation, by_tier in sorted(snapshot['latency'].items()):
+            for tier, histogram in sorted(by_tier.items()):
+                labels = f'op="{operation}",tier="{tier}"'
+                for bound, cumulative in histogram['buckets'].items():
+                    le = bound if bound == '+Inf' else repr(float(bound) / 1000)
+                    lines.append(f'quant_cache_latency_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'quant_cache_latency_seconds_sum{{{labels}}} {histogram["sum_ms"] / 1000}')
+                lines.append(f'quant_cache_latency_seconds_count{{{labels}}} {histogram["count"]}')
+        
+        text = '\n'.join(lines) + '\n'
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_file.write_text(text, encoding='utf-8')
+            os.replace(tmp_file, path)
+        return text
+    
+    def start_metrics_server(self, port: int = 9108, host: str = '127.0.0.1'):
+        """在后台线程启动 Prometheus 抓取端点(GET /metrics)"""
+        if self._metrics_server is not None:
+            return self._metrics_server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        manager = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = manager.export_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+        
+        self._metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._metrics_server.serve_forever, name='cache-metrics', daemon=True).start()
+        logger.info(f"✅ 缓存指标端点已启动: http://{host}:{self._metrics_server.server_port}/metrics")
+        return self._metrics_server
+    
+    # ---------- 数据依赖 ----------
+    
+    def _resolve_dependencies(self, depends_on, max_age: float = 0) -> Dict[str, Optional[str]]:
+        """解析依赖的当前版本; 已是 {依赖: 版本} 时原样返回
+        
+        Args:
+            depends_on: 依赖列表或 {依赖: 版本}
+            max_age: 可复用的已解析版本的最大时长(秒), 0 表示全部重新解析
+        """
+        if not depends_on:
+            return {}
+        if isinstance(depends_on, dict):
+            return dict(depends_on)
+        
+        now = time.monotonic()
+        versions: Dict[str, Optional[str]] = {}
+        if max_age > 0:
+            with self._version_lock:
+                for name in depends_on:
+                    cached = self._version_cache.get(name)
+                    if cached is not None and now - cached[0] <= max_age:
+                        versions[name] = cached[1]
+        
+        pending = [name for name in depends_on if name not in versions]
+        if pending:
+            if self.version_resolver is not None:
+                resolved = dict(self.version_resolver(pending))
+            else:
+                resolved = {name: file_version(name) if file_version else None for name in pending}
+            with self._version_lock:
+                for name, version in resolved.items():
+                    self._version_cache[name] = (now, version)
+            versions.update(resolved)
+            unresolved = [name for name, version in resolved.items() if version is None]
+            if unresolved:
+                logger.warning(f"⚠️ 无法解析数据依赖版本(按过期时间失效): {unresolved}")
+        return {name: versions.get(name) for name in depends_on}
+    
+    def _dependencies_changed(self, metadata: Dict) -> bool:
+        """条目记录的依赖版本是否与当前版本不一致(dependency_check_seconds 内复用解析结果)"""
+        recorded = metadata.get('depends_on')
+        if not recorded:
+            return False
+        return self._resolve_dependencies(list(recorded), self.dependency_check_seconds) != recorded
+    
+    def _invalidate(self, cache_key: str):
+        """删除依赖已变化的条目(内存、待写与持久化层)"""
+        self.stats['stale_invalidations'] += 1
+        self._count(self._namespace_of(cache_key), 'invalidations')
+        self._remove_from_memory(cache_key)
+        with self._pending_lock:
+            self._pop_pending(cache_key)
+        if self.shared_arena is not None:
+            self.shared_arena.remove(cache_key)
+        indexed = self._index_lookup(cache_key)
+        if indexed is not None:
+            self._delete_entries([(cache_key, indexed['tier'])])
+        logger.debug(f"🔄 数据依赖已变化, 缓存失效: {cache_key}")
+    
+    def prefetch(self, data_type: str, params: Dict[str, Any], tier: str = 'memory') -> bool:
+        """
+        预热一个已缓存的条目(不计入命中统计与访问日志)
+        
+        Args:
+            data_type: 数据类型
+            params: 参数字典
+            tier: 'memory' 加载到内存层(跳过接纳判断); 'disk' 保证不在压缩层(免解压)
+        
+        Returns:
+            bool: 条目是否存在且有效
+        """
+        cache_key = self._generate_cache_key(data_type, params)
         with self._cache_lock:
             if cache_key in self._memory_cache:
-                cache_item = self._memory_cache[cache_key]
-                
-                # 检查是否过期
-                if datetime.now() > cache_item['metadata']['expire_time']:
-                    del self._memory_cache[cache_key]
-                    return None
-                
-                # 更新访问统计
-                cache_item['metadata']['access_count'] += 1
-                cache_item['metadata']['last_access'] = datetime.now()
-                
-                return cache_item['data']
-            
+                return True
+        with self._pending_lock:
+            if cache_key in self._pending_writes:
+                return True
+        
+        indexed = self._index_lookup(cache_key)
+        if indexed is None or indexed['tier'] not in self._tier_readers:
+            return False
+        
+        if tier == 'disk':
+            if indexed['tier'] == 'compressed':
+                self._move_tier(cache_key, 'compressed', 'disk')
+            return True
+        
+        found = self._tier_readers[indexed['tier']](cache_key, None)
+        if found is None:
+            return False
+        if self._dependencies_changed(found[1]):
+            self._invalidate(cache_key)
+            return False
+        self._put_to_memory(cache_key, found[0], found[1], force=True)
+        return True
+    
+    # ---------- 异步写入 ----------
+    
+    def _pop_pending(self, cache_key: str) -> Optional[Dict]:
+        """移除一条待写数据并扣减待写字节数(调用方持有 _pending_lock)"""
+        entry = self._pending_writes.pop(cache_key, None)
+        if entry is not None:
+            self._pending_bytes -= len(entry['payload'])
+        return entry
+    
+    def _submit_write(self, cache_key: str, tier: str, payload: bytes, metadata: Dict):
+        """登记待写入数据并提交给写入线程; 同一键的旧写入会被新写入取代
+        
+        待写数据总量超过 max_pending_bytes 时在调用线程同步写入, 写入跟不上时内存不会无限增长。
+        """
+        with self._pending_lock:
+            self._write_seq += 1
+            seq = self._write_seq
+            self._pop_pending(cache_key)
+            self._pending_writes[cache_key] = {
+                'seq': seq, 'tier': tier, 'payload': payload, 'metadata': metadata
+            }
+            self._pending_bytes += len(payload)
+            over_limit = self._pending_bytes > self.max_pending_bytes
+        
+        if self.write_behind and not over_limit:
+            self._writer.submit(self._flush_write, cache_key, seq)
+        else:
+            if self.write_behind:
+                self.stats['sync_writes'] += 1
+            self._flush_write(cache_key, seq)
+    
+    def _flush_write(self, cache_key: str, seq: int):
+        """写入一条待写数据(在写入线程中执行)"""
+        with self._pending_lock:
+            entry = self._pending_writes.get(cache_key)
+        if entry is None or entry['seq'] != seq:
+            return
+        
+        started = time.perf_counter()
+        try:
+            with self._key_lock(cache_key):
+                self._write_tier(entry['tier'], cache_key, entry['payload'], entry['metadata'])
+                self._remove_from_tiers(cache_key, exclude=entry['tier'])
+                self._index_upsert(cache_key, entry['metadata'])
+            self._observe('write', entry['tier'], started)
+        except Exception as e:
+            logger.error(f"❌ {entry['tier']}缓存写入失败: {str(e)}")
+        finally:
+            with self._pending_lock:
+                if self._pending_writes.get(cache_key) is entry:
+                    self._pop_pending(cache_key)
+    
+    def _write_now(self, cache_key: str):
+        """在当前线程立即落盘某个键的待写数据(写入线程中的同一任务随后跳过)"""
+        with self._pending_lock:
+            entry = self._pending_writes.get(cache_key)
+        if entry is not None:
+            self._flush_write(cache_key, entry['seq'])
+    
+    def _get_from_pending(self, cache_key: str, columns: Optional[List[str]] = None):
+        """读取尚未落盘的数据"""
+        with self._pending_lock:
+            entry = self._pending_writes.get(cache_key)
+        if entry is None:
+            return None
+        if datetime.now() > entry['metadata']['expire_time']:
             return None
+        metadata = entry['metadata']
+        return self._deserialize_data(entry['payload'], metadata.get('format', 'pickle'), columns), metadata
+    
+    # ---------- 共享内存层 ----------
+    
+    def _get_from_shared(self, cache_key: str, columns: Optional[List[str]] = None):
+        """从共享内存层映射数据, 返回 (数据, 元数据)
+        
+        arrow_zero_copy 时返回的DataFrame引用共享页(只读), 存活期间该段不会被淘汰;
+        否则返回副本, 转换完成即释放引用。
+        """
+        attached = self.shared_arena.attach(cache_key)
+        if attached is None:
+            return None
+        table, metadata, handle = attached
+        try:
+            if datetime.now() > metadata['expire_time']:
+                os.close(handle)
+                self.shared_arena.remove(cache_key)
+                return None
+            data = self._arrow_to_pandas(table, columns)
+        except Exception as e:
+            os.close(handle)
+            logger.warning(f"⚠️ 读取共享内存层失败 {cache_key}: {str(e)}")
+            return None
+        if self.arrow_zero_copy:
+            self.shared_arena.hold(data, handle)
+        else:
+            os.close(handle)
+        return data, metadata
+    
+    def _maybe_publish_shared(self, cache_key: str, tier: str, metadata: Dict):
+        """从文件层读到的大型Arrow数据在写入线程中发布到共享内存层"""
+        if (self.shared_arena is None or tier not in ('disk', 'compressed')
+                or metadata.get('format') != 'arrow'
+                or metadata.get('size_bytes', 0) < self.shared_item_min_size):
+            return
+        try:
+            self._writer.submit(self._publish_shared, cache_key, tier, metadata)
+        except RuntimeError:
+            # 写入线程已关闭
+            pass
+    
+    def _publish_shared(self, cache_key: str, tier: str, metadata: Dict):
+        """读取文件层的Arrow数据写入共享内存层(在写入线程中执行)"""
+        cache_dir = self.disk_cache_dir if tier == 'disk' else self.compressed_cache_dir
+        try:
+            with self._key_lock(cache_key, exclusive=False):
+                with open(cache_dir / self._data_file_name(cache_key, tier, metadata), 'rb') as f:
+                    payload = f.read()
+            if tier == 'compressed':
+                payload = self._decompress_data(payload, metadata.get('codec', 'gzip'),
+                                                metadata.get('size_bytes'))
+            self.shared_arena.put(cache_key, payload, metadata)
+        except FileNotFoundError:
+            # 并发迁移/覆盖导致文件消失
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ 发布到共享内存层失败 {cache_key}: {str(e)}")
+    
+    def flush(self, timeout: Optional[float] = None):
+        """等待所有待写入数据落盘"""
+        if self.write_behind:
+            # 写入线程只有一个, 按提交顺序执行
+            self._writer.submit(self._flush_access_stats).result(timeout=timeout)
+        else:
+            self._flush_access_stats()
+    
+    def close(self):
+        """落盘所有待写数据并停止写入线程"""
+        self.flush()
+        self._writer.shutdown(wait=True)
+        if self.shared_arena is not None:
+            # 最后一个使用共享区的进程关闭时清空 /dev/shm 中的段
+            self.shared_arena.close()
+        if self.prometheus_file:
+            self.export_prometheus(self.prometheus_file)
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server = None
+    
+    # ---------- 层间迁移 ----------
+    
+    def _maybe_promote(self, cache_key: str, metadata: Dict):
+        """压缩层数据访问次数达到阈值时提升到磁盘层(免解压)"""
+        if metadata.get('access_count', 0) < self.promote_after_hits:
+            return
+        with self._pending_lock:
+            if cache_key in self._migrating:
+                return
+            self._migrating.add(cache_key)
+        self._writer.submit(self._move_tier, cache_key, 'compressed', 'disk')
+    
+    def _move_tier(self, cache_key: str, source: str, target: str):
+        """在磁盘层与压缩层之间迁移一条数据"""
+        with self._pending_lock:
+            if cache_key in self._pending_writes:
+                return
+        source_dir = self.compressed_cache_dir if source == 'compressed' else self.disk_cache_dir
+        metadata_file = source_dir / f"{cache_key}.meta"
+        try:
+            with self._key_lock(cache_key):
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f, object_hook=self._datetime_parser)
+                cache_file = source_dir / self._data_file_name(cache_key, source, metadata)
+                with open(cache_file, 'rb') as f:
+                    payload = f.read()
+                if source == 'compressed':
+                    payload = self._decompress_data(payload, metadata.get('codec', 'gzip'), metadata.get('size_bytes'))
+                metadata['tier'] = target
+                self._write_tier(target, cache_key, payload, metadata)
+                self._index_upsert(cache_key, metadata)
+                cache_file.unlink(missing_ok=True)
+                metadata_file.unlink(missing_ok=True)
+            logger.debug(f"🔀 缓存迁移 {source} -> {target}: {cache_key}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存迁移失败 {cache_key}: {str(e)}")
+        finally:
+            with self._pending_lock:
+                self._migrating.discard(cache_key)
+    
+    def _demote_cold_entries(self):
+        """长时间未访问的较大磁盘层数据降级到压缩层"""
+        if not self.compression_enabled:
+            return
+        cutoff = datetime.now() - timedelta(hours=self.demote_after_hours)
+        with self._connect() as conn:
+            cold_keys = [row[0] for row in conn.execute('''
+                SELECT key FROM cache_index
+                WHERE tier = 'disk' AND last_access < ? AND size_bytes >= ?
+            ''', (cutoff, self.memory_item_max_size))]
+        for cache_key in cold_keys:
+            with self._pending_lock:
+                if cache_key in self._migrating:
+                    continue
+                self._migrating.add(cache_key)
+            self._writer.submit(self._move_tier, cache_key, 'disk', 'compressed')
+    
+    # ---------- 内存层 ----------
+    
+    def _record_access(self, cache_key: str) -> int:
+        """记录一次访问并返回近期访问频率
+        
+        频率计数定期减半(老化), 使频率反映近期热度; 减半的开销均摊到每次访问上为O(1)。
+        """
+        freq = self._access_freq.get(cache_key, 0) + 1
+        self._access_freq[cache_key] = freq
+        self._freq_ops += 1
+        if self._freq_ops >= self._freq_window:
+            self._access_freq = {key: count // 2 for key, count in self._access_freq.items() if count > 1}
+            self._freq_ops = 0
+            self._freq_window = max(1000, 10 * len(self._memory_cache))
+        return freq
+    
+    @staticmethod
+    def _estimate_memory_size(data: Any, serialized_size: int) -> int:
+        """估算对象实际占用的内存字节数"""
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            try:
+                usage = data.memory_usage(deep=True, index=True)
+                return int(usage.sum() if isinstance(data, pd.DataFrame) else usage)
+            except Exception:
+                pass
+        return serialized_size
+    
+    def _get_from_memory(self, cache_key: str):
+        """从内存缓存获取数据, 返回 (数据, 元数据)"""
+        with self._cache_lock:
+            cache_item = self._memory_cache.get(cache_key)
+            if cache_item is None:
+                return None
+            
+            # 检查是否过期
+            if datetime.now() > cache_item['metadata']['expire_time']:
+                self._memory_cache.pop(cache_key)
+                self._memory_usage -= cache_item['size']
+                return None
+            
+            # 更新访问统计, 移到LRU队尾
+            self._record_access(cache_key)
+            self._memory_cache.move_to_end(cache_key)
+            cache_item['metadata']['access_count'] += 1
+            cache_item['metadata']['last_access'] = datetime.now()
+            
+            return cache_item['data'], cache_item['metadata']
     
-    def _put_to_memory(self, 
-                      cache_key: str, 
+    def _put_to_memory(self,
+                      cache_key: str,
                       data: Any,
-                      metadata: Optional[Dict] = None):
-        """存储数据到内存缓存"""
+                      metadata: Optional[Dict] = None,
+                      force: bool = False) -> bool:
+        """存储数据到内存缓存
+        
+        Args:
+            force: 跳过频率接纳判断(预热), 内存不足时仍按LRU淘汰
+        
+        Returns:
+            bool: 是否被内存层接纳
+        """
         if metadata is None:
             metadata = self._get_cache_metadata()
         
+        data_size = self._estimate_memory_size(data, metadata.get('size_bytes', 0))
+        
         with self._cache_lock:
-            # 检查内存使用量
-            data_size = metadata.get('size_bytes', 0)
-            if self._memory_usage + data_size > self.max_memory_size:
-                self._evict_memory_cache(data_size)
+            freq = self._record_access(cache_key)
+            
+            # 覆盖已有数据时先扣除旧数据占用
+            previous = self._memory_cache.pop(cache_key, None)
+            if previous is not None:
+                self._memory_usage -= previous['size']
+            
+            if data_size > self.max_memory_size:
+                return False
+            
+            # 内存不足时, 只有新数据的近期频率不低于将被淘汰的数据时才接纳
+            required_size = self._memory_usage + data_size - self.max_memory_size
+            if required_size > 0:
+                if not force and not self._admit(freq, required_size):
+                    self.stats['memory_rejections'] += 1
+                    logger.debug(f"⏭️ 内存缓存拒绝接纳: {cache_key} ({data_size} bytes)")
+                    return False
+                self._evict_memory_cache(required_size)
             
             self._memory_cache[cache_key] = {
                 'data': data,
-                'metadata': metadata
+                'metadata': metadata,
+                'size': data_size
             }
             self._memory_usage += data_size
+            return True
+    
+    def _remove_from_memory(self, cache_key: str):
+        """删除内存副本"""
+        with self._cache_lock:
+            item = self._memory_cache.pop(cache_key, None)
+            if item is not None:
+                self._memory_usage -= item['size']
+    
+    def _admit(self, candidate_freq: int, required_size: int) -> bool:
+        """TinyLFU式接纳判断: 与为腾出空间需要淘汰的LRU数据比较近期频率
+        
+        避免低频的大DataFrame把大量高频小数据挤出内存。
+        """
+        freed_size = 0
+        for cache_key, cache_item in self._memory_cache.items():
+            if freed_size >= required_size:
+                break
+            if self._access_freq.get(cache_key, 0) > candidate_freq:
+                return False
+            freed_size += cache_item['size']
+        return True
     
     def _evict_memory_cache(self, required_size: int):
-        """内存缓存淘汰算法 (LRU)"""
+        """内存缓存淘汰算法 (LRU)
+        
+        OrderedDict按访问顺序排列, 从队首逐个淘汰, 每次淘汰O(1);
+        持久化层始终保留一份数据, 淘汰只需丢弃内存副本。
+        """
         with self._cache_lock:
-            # 按最后访问时间排序
-            items = list(self._memory_cache.items())
-            items.sort(key=lambda x: x[1]['metadata']['last_access'])
-            
             freed_size = 0
-            for cache_key, cache_item in items:
-                if freed_size >= required_size:
-                    break
-                
-                item_size = cache_item['metadata'].get('size_bytes', 0)
-                del self._memory_cache[cache_key]
-                self._memory_usage -= item_size
-                freed_size += item_size
+            while self._memory_cache and freed_size < required_size:
+                cache_key, cache_item = self._memory_cache.popitem(last=False)
+                self._memory_usage -= cache_item['size']
+                freed_size += cache_item['size']
+                self._count(self._namespace_of(cache_key), 'evictions')
                 
                 logger.debug(f"🗑️ 从内存缓存淘汰: {cache_key}")
+
+    # ---------- 持久化层 ----------
     
-    def _get_from_disk(self, cache_key: str) -> Any:
-        """从磁盘缓存获取数据"""
-        cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-        metadata_file = self.disk_cache_dir / f"{cache_key}.meta"
-        
-        if cache_file.exists() and metadata_file.exists():
-            try:
-                # 读取元数据
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f, object_hook=self._datetime_parser)
-                
-                # 检查是否过期
-                if datetime.now() > metadata['expire_time']:
-                    cache_file.unlink(missing_ok=True)
-                    metadata_file.unlink(missing_ok=True)
-                    return None
-                
-                # 读取数据
-                with open(cache_file, 'rb') as f:
-                    data = pickle.load(f)
-                
-                # 更新访问统计
-                metadata['access_count'] += 1
-                metadata['last_access'] = datetime.now()
-                
-                with open(metadata_file, 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, default=str, indent=2)
-                
-                return data
-                
-            except Exception as e:
-                logger.warning(f"⚠️ 读取磁盘缓存失败: {str(e)}")
-                cache_file.unlink(missing_ok=True)
-                metadata_file.unlink(missing_ok=True)
-        
-        return None
+    def _write_tier(self, tier: str, cache_key: str, payload: bytes, metadata: Dict):
+        """将已序列化的数据写入指定层"""
+        if tier == 'sqlite':
+            metadata['stored_bytes'] = len(payload)
+            self._put_to_sqlite(cache_key, payload, metadata)
+        elif tier == 'compressed':
+            compressed, metadata['codec'] = self._compress_data(payload)
+            metadata['stored_bytes'] = len(compressed)
+            self._write_file(self.compressed_cache_dir, self._data_file_name(cache_key, tier, metadata),
+                             cache_key, compressed, metadata)
+        else:
+            metadata.pop('codec', None)
+            metadata['stored_bytes'] = len(payload)
+            self._write_file(self.disk_cache_dir, self._data_file_name(cache_key, tier, metadata),
+                             cache_key, payload, metadata)
     
-    def _put_to_disk(self, 
-                    cache_key: str,
-                    data: Any,
-                    metadata: Optional[Dict] = None):
-        """存储数据到磁盘缓存"""
-        if metadata is None:
-            metadata = self._get_cache_metadata()
-        
-        cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-        metadata_file = self.disk_cache_dir / f"{cache_key}.meta"
-        
+    def _write_file(self, cache_dir: Path, file_name: str, cache_key: str,
+                    payload: bytes, metadata: Dict):
+        """原子写入数据文件与元数据文件"""
+        cache_file = cache_dir / file_name
+        metadata_file = cache_dir / f"{cache_key}.meta"
+        tmp_file = cache_dir / f"{file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            # 写入数据
-            with open(cache_file, 'wb') as f:
-                pickle.dump(data, f)
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_file, cache_file)
             
-            # 写入元数据
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, default=str, indent=2)
-                
-        except Exception as e:
-            logger.error(f"❌ 磁盘缓存写入失败: {str(e)}")
+            self._write_metadata_file(metadata_file, metadata)
+            
+            # 同一键旧格式的数据文件
+            for path in cache_dir.glob(f"{cache_key}.*"):
+                if path not in (cache_file, metadata_file) and not path.name.endswith('.tmp'):
+                    path.unlink(missing_ok=True)
+        except Exception:
+            tmp_file.unlink(missing_ok=True)
             cache_file.unlink(missing_ok=True)
             metadata_file.unlink(missing_ok=True)
+            raise
     
-    def _get_from_compressed(self, cache_key: str) -> Any:
-        """从压缩缓存获取数据"""
-        cache_file = self.compressed_cache_dir / f"{cache_key}.pkl.gz"
-        metadata_file = self.compressed_cache_dir / f"{cache_key}.meta"
+    @staticmethod
+    def _write_metadata_file(metadata_file: Path, metadata: Dict):
+        """原子写入元数据文件(读者不会读到写了一半的JSON)"""
+        tmp_file = metadata_file.with_name(f"{metadata_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, default=str, indent=2)
+        os.replace(tmp_file, metadata_file)
+    
+    def _remove_from_tiers(self, cache_key: str, exclude: Optional[str] = None):
+        """删除键在其他持久化层中的旧副本"""
+        if exclude != 'disk':
+            self._unlink_entry(self.disk_cache_dir, cache_key)
+        if exclude != 'compressed':
+            self._unlink_entry(self.compressed_cache_dir, cache_key)
+        if exclude != 'sqlite':
+            with self._connect() as conn:
+                conn.execute('DELETE FROM cache_data WHERE key = ?', (cache_key,))
+                conn.commit()
+    
+    def _read_file(self, cache_dir: Path, cache_key: str, tier: str,
+                   columns: Optional[List[str]] = None):
+        """读取文件层数据, 返回 (数据, 元数据)"""
+        metadata_file = cache_dir / f"{cache_key}.meta"
+        cache_file = None
         
-        if cache_file.exists() and metadata_file.exists():
+        if metadata_file.exists():
             try:
                 # 读取元数据
                 with open(metadata_file, 'r', encoding='utf-8') as f:
                     metadata = json.load(f, object_hook=self._datetime_parser)
+                cache_file = cache_dir / self._data_file_name(cache_key, tier, metadata)
                 
                 # 检查是否过期
                 if datetime.now() > metadata['expire_time']:
-                    cache_file.unlink(missing_ok=True)
-                    metadata_file.unlink(missing_ok=True)
+                    self._unlink_entry(cache_dir, cache_key)
                     return None
                 
-                # 读取并解压数据
-                with gzip.open(cache_file, 'rb') as f:
-                    data = pickle.load(f)
-                
-                return data
+                # 读取数据: Arrow磁盘文件直接内存映射
+                fmt = metadata.get('format', 'pickle')
+                if tier == 'disk' and fmt == 'arrow':
+                    data = self._read_arrow_file(cache_file, columns)
+                else:
+                    with open(cache_file, 'rb') as f:
+                        payload = f.read()
+                    if tier == 'compressed':
+                        payload = self._decompress_data(payload, metadata.get('codec', 'gzip'),
+                                                        metadata.get('size_bytes'))
+                    data = self._deserialize_data(payload, fmt, columns)
                 
+                # 访问统计记录在索引中, 命中时不再改写元数据文件
+                return data, metadata
+            
+            except FileNotFoundError:
+                # 并发迁移/覆盖导致文件消失
+                return None
             except Exception as e:
-                logger.warning(f"⚠️ 读取压缩缓存失败: {str(e)}")
-                cache_file.unlink(missing_ok=True)
-                metadata_file.unlink(missing_ok=True)
+                logger.warning(f"⚠️ 读取缓存文件失败 {cache_file or metadata_file}: {str(e)}")
+                self._unlink_entry(cache_dir, cache_key)
         
         return None
     
-    def _put_to_compressed(self, 
-                          cache_key: str,
-                          data: Any,
-                          metadata: Optional[Dict] = None):
-        """存储数据到压缩缓存"""
-        if metadata is None:
-            metadata = self._get_cache_metadata()
-        
-        cache_file = self.compressed_cache_dir / f"{cache_key}.pkl.gz"
-        metadata_file = self.compressed_cache_dir / f"{cache_key}.meta"
-        
-        try:
-            # 写入压缩数据
-            with gzip.open(cache_file, 'wb') as f:
-                pickle.dump(data, f)
-            
-            # 写入元数据
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, default=str, indent=2)
-                
-        except Exception as e:
-            logger.error(f"❌ 压缩缓存写入失败: {str(e)}")
-            cache_file.unlink(missing_ok=True)
-            metadata_file.unlink(missing_ok=True)
+    def _get_from_disk(self, cache_key: str, columns: Optional[List[str]] = None):
+        """从磁盘缓存获取数据"""
+        with self._key_lock(cache_key, exclusive=False):
+            return self._read_file(self.disk_cache_dir, cache_key, 'disk', columns)
+    
+    def _get_from_compressed(self, cache_key: str, columns: Optional[List[str]] = None):
+        """从压缩缓存获取数据"""
+        with self._key_lock(cache_key, exclusive=False):
+            return self._read_file(self.compressed_cache_dir, cache_key, 'compressed', columns)
     
-    def _get_from_sqlite(self, cache_key: str) -> Any:
+    def _get_from_sqlite(self, cache_key: str, columns: Optional[List[str]] = None):
         """从SQLite缓存获取数据"""
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
+            with self._connect() as conn:
                 cursor = conn.execute('''
-                    SELECT data, metadata, expire_time, access_count 
-                    FROM cache_data 
+                    SELECT data, metadata
+                    FROM cache_data
                     WHERE key = ? AND expire_time > ?
                 ''', (cache_key, datetime.now()))
                 
                 row = cursor.fetchone()
                 if row:
-                    data_bytes, metadata_str, expire_time, access_count = row
+                    data_bytes, metadata_str = row
                     
                     # 反序列化数据
-                    data = pickle.loads(data_bytes)
-                    
-                    # 更新访问统计
-                    conn.execute('''
-                        UPDATE cache_data 
-                        SET access_count = access_count + 1, last_access = ?
-                        WHERE key = ?
-                    ''', (datetime.now(), cache_key))
-                    
-                    conn.commit()
-                    return data
-                    
+                    metadata = json.loads(metadata_str, object_hook=self._datetime_parser)
+                    data = self._deserialize_data(data_bytes, metadata.get('format', 'pickle'), columns)
+                    return data, metadata
+        
         except Exception as e:
             logger.warning(f"⚠️ 读取SQLite缓存失败: {str(e)}")
         
         return None
     
-    def _put_to_sqlite(self, 
+    def _put_to_sqlite(self,
                       cache_key: str,
-                      data: Any,
-                      metadata: Optional[Dict] = None):
-        """存储数据到SQLite缓存"""
-        if metadata is None:
-            metadata = self._get_cache_metadata()
+                      data_bytes: bytes,
+                      metadata: Dict):
+        """存储已序列化的数据到SQLite缓存"""
+        metadata_str = json.dumps(metadata, default=str)
         
-        try:
-            # 序列化数据
-            data_bytes = pickle.dumps(data)
-            metadata_str = json.dumps(metadata, default=str)
-            
-            with sqlite3.connect(str(self.db_path)) as conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO cache_data
-                    (key, data, metadata, created_time, expire_time, access_count, last_access)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    cache_key, data_bytes, metadata_str,
-                    metadata['created_time'], metadata['expire_time'],
-                    0, datetime.now()
-                ))
-                conn.commit()
-                
-        except Exception as e:
-            logger.error(f"❌ SQLite缓存写入失败: {str(e)}")
-    
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO cache_data
+                (key, data, metadata, created_time, expire_time, access_count, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                cache_key, data_bytes, metadata_str,
+                metadata['created_time'], metadata['expire_time'],
+                0, datetime.now()
+            ))
+            conn.commit()
+
     def _datetime_parser(self, dct: Dict) -> Dict:
         """JSON日期时间解析器"""
         for key, value in dct.items():
@@ -541,11 +1757,17 @@ class SmartCacheManager:
         """清理缓存
         
         Args:
-            cache_type: 缓存类型 ('memory', 'disk', 'compressed', 'sqlite', None为全部)
+            cache_type: 缓存类型 ('memory', 'shared', 'disk', 'compressed', 'sqlite', None为全部)
             tags: 标签过滤
         """
         logger.info(f"🧹 开始清理缓存 (类型: {cache_type or '全部'})")
         
+        # 丢弃尚未落盘的写入
+        self._clear_pending_writes(cache_type, tags)
+        
+        if (cache_type is None or cache_type == 'shared') and self.shared_arena is not None:
+            self._clear_shared_cache(tags)
+        
         if cache_type is None or cache_type == 'memory':
             self._clear_memory_cache(tags)
         
@@ -560,6 +1782,17 @@ class SmartCacheManager:
         
         logger.info("✅ 缓存清理完成")
     
+    def _clear_pending_writes(self,
+                              cache_type: Optional[str] = None,
+                              tags: Optional[List[str]] = None):
+        """清理待写入数据"""
+        with self._pending_lock:
+            for key, entry in list(self._pending_writes.items()):
+                if cache_type is not None and entry['tier'] != cache_type:
+                    continue
+                if tags is None or any(tag in entry['metadata'].get('tags', []) for tag in tags):
+                    self._pop_pending(key)
+    
     def _clear_memory_cache(self, tags: Optional[List[str]] = None):
         """清理内存缓存"""
         with self._cache_lock:
@@ -577,84 +1810,52 @@ class SmartCacheManager:
                 
                 for key in keys_to_remove:
                     item = self._memory_cache.pop(key)
-                    self._memory_usage -= item['metadata'].get('size_bytes', 0)
+                    self._memory_usage -= item['size']
+    
+    def _clear_shared_cache(self, tags: Optional[List[str]] = None):
+        """清理共享内存层(已被映射的读取方不受影响)"""
+        try:
+            if tags is None:
+                self.shared_arena.clear()
+            else:
+                self.shared_arena.remove_many([key for key, _ in self._index_query(tags=tags)])
+        except Exception as e:
+            logger.error(f"❌ 清理shared缓存失败: {str(e)}")
+    
+    def _clear_tier(self, tier: str, tags: Optional[List[str]] = None):
+        """清理一个持久化层: 按标签清理时通过索引定位条目"""
+        try:
+            if tags is not None:
+                self._delete_entries(self._index_query(tier=tier, tags=tags))
+                return
+            
+            if tier == 'sqlite':
+                with self._connect() as conn:
+                    conn.execute('DELETE FROM cache_data')
+                    conn.execute("DELETE FROM cache_index WHERE tier = 'sqlite'")
+                    conn.commit()
+            else:
+                cache_dir = self.disk_cache_dir if tier == 'disk' else self.compressed_cache_dir
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute('DELETE FROM cache_index WHERE tier = ?', (tier,))
+                    conn.commit()
+        
+        except Exception as e:
+            logger.error(f"❌ 清理{tier}缓存失败: {str(e)}")
     
     def _clear_disk_cache(self, tags: Optional[List[str]] = None):
         """清理磁盘缓存"""
-        if tags is None:
-            # 清理全部磁盘缓存
-            shutil.rmtree(self.disk_cache_dir, ignore_errors=True)
-            self.disk_cache_dir.mkdir(parents=True, exist_ok=True)
-        else:
-            # 按标签清理
-            for meta_file in self.disk_cache_dir.glob("*.meta"):
-                try:
-                    with open(meta_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f, object_hook=self._datetime_parser)
-                    
-                    item_tags = metadata.get('tags', [])
-                    if any(tag in item_tags for tag in tags):
-                        # 删除数据文件和元数据文件
-                        cache_key = meta_file.stem
-                        cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-                        cache_file.unlink(missing_ok=True)
-                        meta_file.unlink(missing_ok=True)
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ 清理磁盘缓存失败: {str(e)}")
+        self._clear_tier('disk', tags)
     
     def _clear_compressed_cache(self, tags: Optional[List[str]] = None):
         """清理压缩缓存"""
-        if tags is None:
-            # 清理全部压缩缓存
-            shutil.rmtree(self.compressed_cache_dir, ignore_errors=True)
-            self.compressed_cache_dir.mkdir(parents=True, exist_ok=True)
-        else:
-            # 按标签清理
-            for meta_file in self.compressed_cache_dir.glob("*.meta"):
-                try:
-                    with open(meta_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f, object_hook=self._datetime_parser)
-                    
-                    item_tags = metadata.get('tags', [])
-                    if any(tag in item_tags for tag in tags):
-                        # 删除数据文件和元数据文件
-                        cache_key = meta_file.stem
-                        cache_file = self.compressed_cache_dir / f"{cache_key}.pkl.gz"
-                        cache_file.unlink(missing_ok=True)
-                        meta_file.unlink(missing_ok=True)
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ 清理压缩缓存失败: {str(e)}")
+        self._clear_tier('compressed', tags)
     
     def _clear_sqlite_cache(self, tags: Optional[List[str]] = None):
         """清理SQLite缓存"""
-        try:
-            with sqlite3.connect(str(self.db_path)) as conn:
-                if tags is None:
-                    # 清理全部SQLite缓存
-                    conn.execute('DELETE FROM cache_data')
-                else:
-                    # 按标签清理（需要解析metadata JSON）
-                    cursor = conn.execute('SELECT key, metadata FROM cache_data')
-                    keys_to_delete = []
-                    
-                    for key, metadata_str in cursor.fetchall():
-                        try:
-                            metadata = json.loads(metadata_str)
-                            item_tags = metadata.get('tags', [])
-                            if any(tag in item_tags for tag in tags):
-                                keys_to_delete.append(key)
-                        except:
-                            continue
-                    
-                    for key in keys_to_delete:
-                        conn.execute('DELETE FROM cache_data WHERE key = ?', (key,))
-                
-                conn.commit()
-                
-        except Exception as e:
-            logger.error(f"❌ 清理SQLite缓存失败: {str(e)}")
+        self._clear_tier('sqlite', tags)
     
     def cleanup_expired(self):
         """清理过期缓存"""
@@ -671,57 +1872,37 @@ class SmartCacheManager:
             
             for key in expired_keys:
                 item = self._memory_cache.pop(key)
-                self._memory_usage -= item['metadata'].get('size_bytes', 0)
+                self._memory_usage -= item['size']
         
-        # 清理磁盘过期数据
-        for meta_file in self.disk_cache_dir.glob("*.meta"):
-            try:
-                with open(meta_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f, object_hook=self._datetime_parser)
-                
-                if current_time > metadata['expire_time']:
-                    cache_key = meta_file.stem
-                    cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-                    cache_file.unlink(missing_ok=True)
-                    meta_file.unlink(missing_ok=True)
-                    
-            except Exception:
-                # 如果元数据文件损坏，删除对应的缓存文件
-                cache_key = meta_file.stem
-                cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-                cache_file.unlink(missing_ok=True)
-                meta_file.unlink(missing_ok=True)
-        
-        # 清理压缩过期数据
-        for meta_file in self.compressed_cache_dir.glob("*.meta"):
-            try:
-                with open(meta_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f, object_hook=self._datetime_parser)
-                
-                if current_time > metadata['expire_time']:
-                    cache_key = meta_file.stem
-                    cache_file = self.compressed_cache_dir / f"{cache_key}.pkl.gz"
-                    cache_file.unlink(missing_ok=True)
-                    meta_file.unlink(missing_ok=True)
-                    
-            except Exception:
-                # 如果元数据文件损坏，删除对应的缓存文件
-                cache_key = meta_file.stem
-                cache_file = self.compressed_cache_dir / f"{cache_key}.pkl.gz"
-                cache_file.unlink(missing_ok=True)
-                meta_file.unlink(missing_ok=True)
+        # 写回访问统计, 降级判断使用最新的最后访问时间
+        self._flush_access_stats()
         
-        # 清理SQLite过期数据
+        # 清理持久化层过期数据(索引查询)
         try:
-            with sqlite3.connect(str(self.db_path)) as conn:
+            expired = self._index_query(expired_before=current_time)
+            self._delete_entries(expired)
+            for cache_key, _ in expired:
+                self._count(self._namespace_of(cache_key), 'evictions')
+            with self._connect() as conn:
+                # 未登记索引的残留行
                 conn.execute('DELETE FROM cache_data WHERE expire_time < ?', (current_time,))
+                # 过旧的访问日志
+                conn.execute('DELETE FROM access_log WHERE ts < ?',
+                             ((current_time - timedelta(days=self.access_log_days)).timestamp(),))
                 conn.commit()
-                
-                # 优化数据库
-                conn.execute('VACUUM')
-                
+            if expired:
+                logger.info(f"🗑️ 清理过期缓存 {len(expired)} 条")
         except Exception as e:
-            logger.error(f"❌ 清理SQLite过期数据失败: {str(e)}")
+            logger.error(f"❌ 清理过期缓存失败: {str(e)}")
+        
+        # 共享内存层的过期段(只在被映射时检查会一直占用 /dev/shm)
+        if self.shared_arena is not None:
+            removed = self.shared_arena.sweep_expired()
+            if removed:
+                logger.info(f"🗑️ 清理共享内存层过期段 {removed} 个")
+        
+        # 冷数据降级
+        self._demote_cold_entries()
         
         logger.info("✅ 过期缓存清理完成")
     
@@ -731,11 +1912,12 @@ class SmartCacheManager:
             return
         
         def cleanup_worker():
-            import time
             while True:
                 try:
                     time.sleep(self.cleanup_interval_hours * 3600)  # 转换为秒
                     self.cleanup_expired()
+                    if self.prometheus_file:
+                        self.export_prometheus(self.prometheus_file)
                 except Exception as e:
                     logger.error(f"❌ 清理线程异常: {str(e)}")
         
@@ -746,18 +1928,19 @@ class SmartCacheManager:
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
-        # 计算缓存大小
-        def get_dir_size(path: Path) -> int:
-            return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+        # 各层条目数与字节数(索引增量维护, 不遍历目录)
+        totals = {tier: (0, 0) for tier in PERSISTENT_TIERS}
+        try:
+            with self._connect() as conn:
+                for tier, items, size in conn.execute('SELECT tier, items, bytes FROM cache_totals'):
+                    totals[tier] = (items, size)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 读取缓存统计失败: {str(e)}")
         
         memory_items = len(self._memory_cache)
-        disk_size = get_dir_size(self.disk_cache_dir)
-        compressed_size = get_dir_size(self.compressed_cache_dir)
         
-        # SQLite大小
-        sqlite_size = 0
-        if self.db_path.exists():
-            sqlite_size = self.db_path.stat().st_size
+        # SQLite数据库文件大小
+        db_file_size = self.db_path.stat().st_size if self.db_path.exists() else 0
         
         hit_rate = 0
         if self.stats['hits'] + self.stats['misses'] > 0:
@@ -771,17 +1954,24 @@ class SmartCacheManager:
                 'max_size_mb': self.max_memory_size / 1024 / 1024
             },
             'disk_cache': {
-                'size_bytes': disk_size,
-                'size_mb': disk_size / 1024 / 1024
+                'items': totals['disk'][0],
+                'size_bytes': totals['disk'][1],
+                'size_mb': totals['disk'][1] / 1024 / 1024
             },
             'compressed_cache': {
-                'size_bytes': compressed_size,
-                'size_mb': compressed_size / 1024 / 1024
+                'items': totals['compressed'][0],
+                'size_bytes': totals['compressed'][1],
+                'size_mb': totals['compressed'][1] / 1024 / 1024
             },
             'sqlite_cache': {
-                'size_bytes': sqlite_size,
-                'size_mb': sqlite_size / 1024 / 1024
+                'items': totals['sqlite'][0],
+                'size_bytes': totals['sqlite'][1],
+                'size_mb': totals['sqlite'][1] / 1024 / 1024,
+                'db_file_bytes': db_file_size
             },
+            'shared_cache': self.shared_arena.usage() if self.shared_arena is not None else None,
+            'pending_writes': len(self._pending_writes),
+            'pending_bytes': self._pending_bytes,
             'statistics': {
                 'total_hits': self.stats['hits'],
                 'total_misses': self.stats['misses'],
@@ -789,11 +1979,30 @@ class SmartCacheManager:
                 'memory_hits': self.stats['memory_hits'],
                 'disk_hits': self.stats['disk_hits'],
                 'compressed_hits': self.stats['compressed_hits'],
-                'sqlite_hits': self.stats['sqlite_hits']
-            }
+                'sqlite_hits': self.stats['sqlite_hits'],
+                'pending_hits': self.stats['pending_hits'],
+                'shared_hits': self.stats['shared_hits'],
+                'memory_rejections': self.stats['memory_rejections'],
+                'stale_invalidations': self.stats['stale_invalidations']
+            },
+            'metrics': self.get_metrics_snapshot()
         }
     
     def __del__(self):
         """析构函数"""
+        if hasattr(self, '_writer'):
+            self._writer.shutdown(wait=True)
         if hasattr(self, '_cleanup_thread') and self._cleanup_thread:
-            self._cleanup_thread.join(timeout=1.0)
\ No newline at end of file
+            self._cleanup_thread.join(timeout=1.0)
+
+_default_manager: Optional[SmartCacheManager] = None
+_default_manager_lock = threading.Lock()
+
+
+def get_cache_manager(config: Optional[Dict] = None) -> SmartCacheManager:
+    """获取全局缓存管理器(首次调用时按config创建)"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = SmartCacheManager(config)
+        return _default_manager
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存预热器
+=========
+
+根据 SmartCacheManager 的访问日志, 在开盘前把当天即将用到的数据提前加载:
+
+- 统计最近若干交易日在指定时段(如 09:15-10:30)被访问的键, 出现天数越多越优先
+- 参数中的日期(start_date/end_date 等)整体按 (目标日 - 访问日) 平移, "最近N日行情" 类请求同样可以预热;
+  提供交易日历时按交易日偏移平移, 否则按自然日
+- 依赖缓存管理器的访问日志(access_log=True, 默认关闭)
+- 小数据在内存预算内加载到内存层, 大数据保证在磁盘层(免解压)
+- 缓存中没有的数据调用按 data_type 注册的加载函数(加载函数负责取数并写入缓存)
+- 预热任务并行执行, 可在后台线程中按交易日定时运行
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Any, Callable, Sequence, Tuple
+
+from .cache_manager import SmartCacheManager
+
+logger = logging.getLogger(__name__)
+
+# 参数中可按当天滚动的日期格式
+ROLLING_DATE_FORMATS = ('%Y-%m-%d', '%Y%m%d')
+
+DEFAULT_WINDOW = ('09:15', '10:30')
+
+
+def _minute_of_day(value: str) -> int:
+    """'HH:MM' -> 当天第几分钟"""
+    hour, minute = value.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def _parse_date(value: str) -> Optional[Tuple[date, str]]:
+    """识别参数中的日期字符串, 返回 (日期, 格式)"""
+    for fmt in ROLLING_DATE_FORMATS:
+        if len(value) != len(date(2000, 1, 1).strftime(fmt)):
+            continue
+        try:
+            return datetime.strptime(value, fmt).date(), fmt
+        except ValueError:
+            continue
+    return None
+
+
+def _shift_date(day: date, access_day: date, target_day: date,
+                trading_days: Optional[Sequence[date]] = None) -> date:
+    """把 day 按访问日到目标日的偏移平移(有交易日历且日期都在日历范围内时按交易日计)"""
+    if trading_days:
+        access_pos = bisect.bisect_left(trading_days, access_day)
+        target_pos = bisect.bisect_left(trading_days, target_day)
+        pos = bisect.bisect_left(trading_days, day)
+        new_pos = pos + (target_pos - access_pos)
+        if pos < len(trading_days) and trading_days[pos] == day and 0 <= new_pos < len(trading_days):
+            return trading_days[new_pos]
+    return day + (target_day - access_day)
+
+
+def _roll_dates(value: Any, access_day: date, target_day: date,
+                trading_days: Optional[Sequence[date]] = None) -> Any:
+    """把参数中的所有日期按 (目标日 - 访问日) 平移(保持原格式)
+
+    只替换等于访问日的日期时, 窗口起点(如 start_date)不随之移动, 每天的请求会被当作不同的键。
+    """
+    if isinstance(value, str):
+        parsed = _parse_date(value)
+        if parsed is None:
+            return value
+        day, fmt = parsed
+        return _shift_date(day, access_day, target_day, trading_days).strftime(fmt)
+    if isinstance(value, list):
+        return [_roll_dates(item, access_day, target_day, trading_days) for item in value]
+    if isinstance(value, dict):
+        return {key: _roll_dates(item, access_day, target_day, trading_days)
+                for key, item in value.items()}
+    return value
+
+
+class CacheWarmer:
+    """缓存预热器
+
+    负责：
+    - 从访问日志统计各时段的热点键
+    - 在内存预算内生成预热计划
+    - 并行预热(已缓存的加载到内存/磁盘层, 未缓存的调用加载函数)
+    - 交易日开盘前定时执行
+    """
+
+    def __init__(self,
+                 cache_manager: SmartCacheManager,
+                 loaders: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None,
+                 memory_budget_bytes: Optional[int] = None,
+                 max_workers: int = 4,
+                 lookback_days: int = 10,
+                 min_days: int = 2,
+                 trading_days: Optional[Sequence[date]] = None):
+        """初始化预热器
+
+        Args:
+            cache_manager: 缓存管理器
+            loaders: {data_type: 加载函数(params)}, 加载函数取数并写入缓存
+            memory_budget_bytes: 预热到内存层的字节数上限, 默认为内存缓存容量的一半
+            max_workers: 并行预热线程数
+            lookback_days: 统计最近多少天的访问日志
+            min_days: 至少在多少天内出现过的键才预热
+            trading_days: 交易日历(升序日期), 提供时参数日期按交易日偏移滚动
+        """
+        self.cache_manager = cache_manager
+        self.loaders: Dict[str, Callable[[Dict[str, Any]], Any]] = dict(loaders or {})
+        self.memory_budget_bytes = memory_budget_bytes or cache_manager.max_memory_size // 2
+        self.max_workers = max_workers
+        self.lookback_days = lookback_days
+        self.min_days = min_days
+        self.trading_days: Optional[List[date]] = sorted(trading_days) if trading_days else None
+        self._schedule_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def register_loader(self, data_type: str, loader: Callable[[Dict[str, Any]], Any]):
+        """登记 data_type 的加载函数"""
+        self.loaders[data_type] = loader
+
+    # ---------- 计划 ----------
+
+    def plan(self,
+             window: Tuple[str, str] = DEFAULT_WINDOW,
+             budget_bytes: Optional[int] = None,
+             target_day: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        生成预热计划
+
+        Args:
+            window: 统计时段 ('HH:MM', 'HH:MM')
+            budget_bytes: 内存预算, 默认 memory_budget_bytes
+            target_day: 预热的目标交易日, 默认今天
+
+        Returns:
+            按优先级排序的 [{'data_type', 'params', 'days', 'accesses', 'size_bytes', 'tier'}]
+        """
+        budget_bytes = self.memory_budget_bytes if budget_bytes is None else budget_bytes
+        target_day = target_day or date.today()
+        since = datetime.combine(target_day - timedelta(days=self.lookback_days), datetime.min.time())
+        if not self.cache_manager.access_log_enabled:
+            logger.warning("⚠️ 缓存管理器未开启访问日志(access_log=True), 预热计划只能基于已有日志")
+
+        # 刷新缓冲区中的访问日志
+        self.cache_manager._flush_access_stats()
+        with self.cache_manager._connect() as conn:
+            rows = conn.execute('''
+                SELECT data_type, params, day, COUNT(*), MAX(size_bytes)
+                FROM access_log
+                WHERE ts >= ? AND minute BETWEEN ? AND ? AND day < ?
+                GROUP BY key, day
+            ''', (since.timestamp(), _minute_of_day(window[0]), _minute_of_day(window[1]),
+                  target_day.isoformat())).fetchall()
+
+        # 按滚动日期后的参数合并: 每天日期不同的同一类请求视为同一个键
+        candidates: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for data_type, params_json, day, accesses, size_bytes in rows:
+            params = _roll_dates(json.loads(params_json), date.fromisoformat(day), target_day,
+                                 self.trading_days)
+            group_key = (data_type, json.dumps(params, sort_keys=True, default=str))
+            entry = candidates.setdefault(group_key, {
+                'data_type': data_type, 'params': params,
+                'days': set(), 'accesses': 0, 'size_bytes': 0
+            })
+            entry['days'].add(day)
+            entry['accesses'] += accesses
+            entry['size_bytes'] = max(entry['size_bytes'], size_bytes or 0)
+
+        ranked = sorted(
+            (entry for entry in candidates.values() if len(entry['days']) >= self.min_days),
+            key=lambda e: (len(e['days']), e['accesses']),
+            reverse=True
+        )
+
+        plan, used = [], 0
+        for entry in ranked:
+            entry['days'] = len(entry['days'])
+            size = entry['size_bytes']
+            if size >= self.cache_manager.memory_item_max_size:
+                entry['tier'] = 'disk'
+            elif used + size <= budget_bytes:
+                entry['tier'] = 'memory'
+                used += size
+            else:
+                # 超出内存预算, 只保证数据已在磁盘层
+                entry['tier'] = 'disk'
+            plan.append(entry)
+
+        logger.info(f"📋 预热计划: {len(plan)} 项, 内存预算占用 {used / 1024 / 1024:.1f}MB")
+        return plan
+
+    # ---------- 预热 ----------
+
+    def _warm_one(self, entry: Dict[str, Any]) -> str:
+        """预热一项, 返回结果类别"""
+        if self.cache_manager.prefetch(entry['data_type'], entry['params'], entry['tier']):
+            return entry['tier']
+
+        loader = self.loaders.get(entry['data_type'])
+        if loader is None:
+            return 'missing'
+        loader(dict(entry['params']))
+        if entry['tier'] == 'memory':
+            self.cache_manager.prefetch(entry['data_type'], entry['params'], 'memory')
+        return 'loaded'
+
+    def warm(self,
+             plan: Optional[List[Dict[str, Any]]] = None,
+             window: Tuple[str, str] = DEFAULT_WINDOW,
+             budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行预热
+
+        Args:
+            plan: 预热计划, 默认按 window/budget_bytes 生成
+            window: 统计时段
+            budget_bytes: 内存预算
+
+        Returns:
+            预热统计: planned/memory/disk/loaded/missing/failed/elapsed
+        """
+        start_time = time.time()
+        if plan is None:
+            plan = self.plan(window, budget_bytes)
+
+        results = {'planned': len(plan), 'memory': 0, 'disk': 0, 'loaded': 0, 'missing': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='cache-warmer') as executor:
+            futures = {executor.submit(self._warm_one, entry): entry for entry in plan}
+            for future in as_completed(futures):
+                try:
+                    results[future.result()] += 1
+                except Exception as e:
+                    results['failed'] += 1
+                    logger.warning(f"⚠️ 预热失败 {futures[future]['data_type']}: {str(e)}")
+
+        results['elapsed'] = time.time() - start_time
+        logger.info(f"🔥 缓存预热完成: 内存 {results['memory']}, 磁盘 {results['disk']}, "
+                    f"加载 {results['loaded']}, 缺失 {results['missing']}, 失败 {results['failed']}, "
+                    f"耗时 {results['elapsed']:.1f}秒")
+        return results
+
+    # ---------- 定时 ----------
+
+    def schedule(self,
+                 at: str = '09:00',
+                 window: Tuple[str, str] = DEFAULT_WINDOW,
+                 budget_bytes: Optional[int] = None,
+                 weekdays_only: bool = True) -> threading.Thread:
+        """
+        在后台线程中每天定时预热
+
+        Args:
+            at: 执行时间 'HH:MM'(开盘前)
+            window: 统计时段
+            budget_bytes: 内存预算
+            weekdays_only: 只在工作日执行
+
+        Returns:
+            后台线程
+        """
+        if self._schedule_thread is not None and self._schedule_thread.is_alive():
+            return self._schedule_thread
+
+        hour, minute = (int(part) for part in at.split(':'))
+        self._stop_event.clear()
+
+        def worker():
+            while not self._stop_event.is_set():
+                now = datetime.now()
+                next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if next_run <= now:
+                    next_run += timedelta(days=1)
+                while weekdays_only and next_run.weekday() >= 5:
+                    next_run += timedelta(days=1)
+                if self._stop_event.wait((next_run - now).total_seconds()):
+                    break
+                try:
+                    self.warm(window=window, budget_bytes=budget_bytes)
+                except Exception as e:
+                    logger.error(f"❌ 定时预热异常: {str(e)}")
+
+        self._schedule_thread = threading.Thread(target=worker, name='cache-warmer-schedule', daemon=True)
+        self._schedule_thread.start()
+        logger.info(f"⏰ 缓存预热已定时: 每{'个工作日' if weekdays_only else '天'} {at}")
+        return self._schedule_thread
+
+    def stop(self):
+        """停止定时预热"""
+        self._stop_event.set()
@@ -49,6 +49,12 @@ except ImportError:
         ENABLE_CACHE = True
         CACHE_EXPIRE_HOURS = 24
 
+# 列类型注册表(紧凑数据类型)
+try:
+    from .storage.schema_registry import get_schema_registry
+except ImportError:
+    get_schema_registry = None
+
 warnings.filterwarnings('ignore')
 
 
@@ -106,6 +112,18 @@ class DataLoader:
             print(f"❌ 优矿API连接失败: {str(e)}")
             self.client = None
     
+    def _apply_schema(self, df: pd.DataFrame, api: str) -> pd.DataFrame:
+        """按注册表将API返回结果转换为紧凑类型"""
+        if get_schema_registry is None or df is None or df.empty:
+            return df
+        return get_schema_registry().coerce(df, api)
+    
+    def _concat_batches(self, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """合并分批结果, 保持分类类型"""
+        if get_schema_registry is None:
+            return pd.concat(frames, ignore_index=True)
+        return get_schema_registry().concat(frames)
+    
     def _generate_cache_key(self, *args) -> str:
         """生成缓存文件的键值"""
         key_str = '_'.join(str(arg) for arg in args)
@@ -240,12 +258,12 @@ class DataLoader:
                 )
                 
                 if not result.empty:
-                    all_info.append(result)
+                    all_info.append(self._apply_schema(result, 'EquGet'))
                 
                 time.sleep(0.1)  # 避免API限制
             
             if all_info:
-                stock_info = pd.concat(all_info, ignore_index=True)
+                stock_info = self._concat_batches(all_info)
                 print(f"✅ 获取到 {len(stock_info)} 只股票基础信息")
                 
                 # 保存缓存
@@ -315,15 +333,17 @@ class DataLoader:
                 )
                 
                 if not result.empty:
-                    all_data.append(result)
+                    # 每批先转换为紧凑类型再合并, 降低峰值内存
+                    all_data.append(self._apply_schema(result, 'MktEqudGet'))
                 
                 time.sleep(0.2)  # 增加延迟避免API限制
             
             if all_data:
-                price_data = pd.concat(all_data, ignore_index=True)
+                price_data = self._concat_batches(all_data)
                 
                 # 数据预处理
-                price_data['tradeDate'] = pd.to_datetime(price_data['tradeDate'])
+                if not pd.api.types.is_datetime64_any_dtype(price_data['tradeDate']):
+                    price_data['tradeDate'] = pd.to_datetime(price_data['tradeDate'])
                 price_data = price_data.sort_values(['ticker', 'tradeDate'])
                 
                 print(f"✅ 获取价格数据: {price_data.shape}")
@@ -372,6 +392,7 @@ class DataLoader:
             )
             
             if not result.empty:
+                result = self._apply_schema(result, 'FdmtEfGet')
                 print(f"✅ 获取财务数据: {result.shape}")
                 return result
             else:
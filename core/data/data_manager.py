@@ -46,6 +46,13 @@ except ImportError:
         print("⚠️ 无法导入数据组件，将使用模拟模式")
         COMPONENTS_AVAILABLE = False
 
+# 数据集版本(数据依赖失效)
+try:
+    from .storage.data_catalog import DataCatalog, file_version
+except ImportError:
+    DataCatalog = None
+    file_version = None
+
 # 导入配置
 try:
     from config.settings import Config
@@ -94,6 +101,7 @@ class DataManager:
         # 管理器状态
         self.pipeline_cache = {}
         self.execution_history = []
+        self._catalog = None  # 数据依赖版本解析用的数据目录(按需创建)
         
         # 统计信息
         self.stats = {
@@ -121,6 +129,8 @@ class DataManager:
             'quality_threshold': 0.7,
             'auto_retry': True,
             'max_retries': 3,
+            'data_dependencies': [],
+            'catalog_db': None,
         }
     
     def _init_components(self):
@@ -159,19 +169,51 @@ class DataManager:
         config_str = json.dumps(kwargs, sort_keys=True, default=str)
         return hashlib.md5(config_str.encode()).hexdigest()
     
-    def _load_pipeline_cache(self, cache_key: str):
-        """加载流水线缓存"""
+    def _resolve_data_versions(self, depends_on: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        解析流水线输入数据集的当前版本
+        
+        依赖为数据目录中的 "<category>/<api>" 或数据文件路径, 来自配置 data_dependencies 与调用参数;
+        配置了 catalog_db 时由数据目录定位数据集目录并按其中文件的当前状态计算版本,
+        否则按文件 size + mtime 计算。
+        """
+        dependencies = list(dict.fromkeys(list(self.config.get('data_dependencies') or []) +
+                                          list(depends_on or [])))
+        if not dependencies:
+            return {}
+        if self.config.get('catalog_db') and DataCatalog is not None:
+            if self._catalog is None:
+                self._catalog = DataCatalog(self.config['catalog_db'])
+            return self._catalog.resolve_versions(dependencies)
+        return {name: file_version(name) if file_version else None for name in dependencies}
+    
+    def _load_pipeline_cache(self, cache_key: str, versions: Optional[Dict[str, Optional[str]]] = None):
+        """加载流水线缓存
+        
+        声明了数据依赖(且版本均可解析)时按版本校验, 版本一致即有效, 不再按过期时间失效;
+        否则沿用 cache_expire_hours。
+        """
         if not self.config['enable_cache']:
             return None
         
         cache_path = os.path.join(self.cache_dir, f"pipeline_{cache_key}.pkl")
+        versions_path = os.path.join(self.cache_dir, f"pipeline_{cache_key}.versions.json")
         
         try:
             if os.path.exists(cache_path):
-                file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
-                expire_time = datetime.now() - timedelta(hours=self.config['cache_expire_hours'])
+                if versions and all(v is not None for v in versions.values()):
+                    valid = False
+                    if os.path.exists(versions_path):
+                        with open(versions_path, 'r', encoding='utf-8') as f:
+                            valid = json.load(f) == versions
+                    if not valid:
+                        print("🔄 输入数据已变化, 流水线缓存失效")
+                else:
+                    file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
+                    expire_time = datetime.now() - timedelta(hours=self.config['cache_expire_hours'])
+                    valid = file_time > expire_time
                 
-                if file_time > expire_time:
+                if valid:
                     with open(cache_path, 'rb') as f:
                         self.stats['cache_usage']['hits'] += 1
                         return pickle.load(f)
@@ -181,16 +223,22 @@ class DataManager:
         self.stats['cache_usage']['misses'] += 1
         return None
     
-    def _save_pipeline_cache(self, data, cache_key: str):
-        """保存流水线缓存"""
+    def _save_pipeline_cache(self, data, cache_key: str, versions: Optional[Dict[str, Optional[str]]] = None):
+        """保存流水线缓存(及其输入数据版本)"""
         if not self.config['enable_cache']:
             return
         
         cache_path = os.path.join(self.cache_dir, f"pipeline_{cache_key}.pkl")
+        versions_path = os.path.join(self.cache_dir, f"pipeline_{cache_key}.versions.json")
         
         try:
             with open(cache_path, 'wb') as f:
                 pickle.dump(data, f)
+            if versions:
+                with open(versions_path, 'w', encoding='utf-8') as f:
+                    json.dump(versions, f, ensure_ascii=False)
+            elif os.path.exists(versions_path):
+                os.remove(versions_path)
         except Exception as e:
             logger.warning(f"流水线缓存保存失败: {e}")
     
@@ -327,7 +375,8 @@ class DataManager:
                              data_config: Optional[Dict] = None,
                              processing_config: Optional[Dict] = None,
                              feature_config: Optional[Dict] = None,
-                             force_refresh: bool = False) -> Dict[str, Any]:
+                             force_refresh: bool = False,
+                             depends_on: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         运行完整的数据管道
         
@@ -336,6 +385,7 @@ class DataManager:
             processing_config: 数据预处理配置
             feature_config: 特征工程配置
             force_refresh: 是否强制刷新所有缓存
+            depends_on: 额外的输入数据集("<category>/<api>" 或文件路径), 数据变化时缓存失效
             
         Returns:
             包含所有输出的结果字典
@@ -362,9 +412,12 @@ class DataManager:
             feature_config=feature_config
         )
         
+        # 输入数据版本在读取数据前解析, 运行期间数据变化会在下次加载时失效
+        data_versions = self._resolve_data_versions(depends_on)
+        
         # 尝试从缓存加载
         if not force_refresh:
-            cached_results = self._load_pipeline_cache(cache_key)
+            cached_results = self._load_pipeline_cache(cache_key, data_versions)
             if cached_results is not None:
                 print("📥 从缓存加载完整流水线结果")
                 return cached_results
@@ -449,7 +502,7 @@ class DataManager:
             print(f"   🎯 质量评分: {quality_metrics.get('overall_score', 0):.3f}")
             
             # 保存到缓存
-            self._save_pipeline_cache(results, cache_key)
+            self._save_pipeline_cache(results, cache_key, data_versions)
             
             return results
             
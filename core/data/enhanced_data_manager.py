@@ -17,6 +17,7 @@ from pathlib import Path
 from .adapters.data_source_manager import DataSourceManager
 from .quality_checker import DataQualityChecker
 from .cache_manager import SmartCacheManager
+from .cache_warmer import CacheWarmer
 
 # 导入下载器
 from .downloaders.a_shares_downloader import ASharesDownloader
@@ -59,10 +60,27 @@ class EnhancedDataManager:
         data_source_config = self.config.get('data_sources', {})
         self.data_source_manager = DataSourceManager(data_source_config)
         
-        # 缓存管理器
+        # 缓存管理器(开启预热时默认记录访问日志)
         cache_config = self.config.get('cache', {})
+        warmup_config = self.config.get('warmup', {})
+        if warmup_config.get('enabled', False):
+            cache_config = {'access_log': True, **cache_config}
         self.cache_manager = SmartCacheManager(cache_config)
         
+        # 缓存预热器: 缓存中没有的热点数据通过对应的获取方法加载
+        self.cache_warmer = CacheWarmer(
+            self.cache_manager,
+            loaders={
+                'stock_list': lambda params: self.get_stock_list(**params),
+                'price_data': lambda params: self.get_price_data(quality_check=False, **params),
+                'financial_data': lambda params: self.get_financial_data(**params),
+            },
+            memory_budget_bytes=warmup_config.get('memory_budget_bytes'),
+            max_workers=warmup_config.get('max_workers', 4),
+            lookback_days=warmup_config.get('lookback_days', 10),
+            min_days=warmup_config.get('min_days', 2)
+        )
+        
         # 数据质量检查器
         quality_config = self.config.get('quality', {})
         self.quality_checker = DataQualityChecker(quality_config)
@@ -463,6 +481,33 @@ class EnhancedDataManager:
         logger.info("🧹 清理过期缓存")
         self.cache_manager.cleanup_expired()
     
+    def warm_up_cache(self,
+                      window: Tuple[str, str] = ('09:15', '10:30'),
+                      budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """按访问日志预热指定时段的热点数据
+        
+        Args:
+            window: 统计时段 ('HH:MM', 'HH:MM')
+            budget_bytes: 内存预算
+            
+        Returns:
+            Dict[str, Any]: 预热统计
+        """
+        return self.cache_warmer.warm(window=window, budget_bytes=budget_bytes)
+    
+    def schedule_cache_warmup(self,
+                              at: str = '09:00',
+                              window: Tuple[str, str] = ('09:15', '10:30'),
+                              budget_bytes: Optional[int] = None):
+        """每个交易日开盘前定时预热
+        
+        Args:
+            at: 执行时间 'HH:MM'
+            window: 统计时段
+            budget_bytes: 内存预算
+        """
+        return self.cache_warmer.schedule(at=at, window=window, budget_bytes=budget_bytes)
+    
     def validate_data_pipeline(self) -> Dict[str, Any]:
         """验证数据流水线状态
         
@@ -605,6 +650,8 @@ class EnhancedDataManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """上下文管理器出口"""
         # 清理资源
+        if hasattr(self, 'cache_warmer'):
+            self.cache_warmer.stop()
         if hasattr(self, 'data_source_manager'):
             self.data_source_manager.cleanup()
         
@@ -23,7 +23,7 @@ import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Union, Any, Callable
+from typing import Dict, List, Tuple, Optional, Union, Any, Callable, Iterable
 from pathlib import Path
 import hashlib
 import pickle
@@ -53,6 +53,101 @@ logger = logging.getLogger(__name__)
 print("🔬 特征工程器模块加载中...")
 
 
+# 相关性分析时排除的基础列
+CORRELATION_EXCLUDE_COLS = ['ticker', 'tradeDate', 'openPrice', 'highestPrice',
+                            'lowestPrice', 'closePrice', 'turnoverVol']
+
+
+class StreamingCorrelation:
+    """
+    流式相关系数估计器
+    
+    按块累积成对(pairwise-complete)充分统计量，结果与 DataFrame.corr()
+    一致，但内存只与特征数的平方及单块大小相关，而与总行数无关。
+    """
+    
+    def __init__(self, columns: List[str], dtype: Union[str, np.dtype] = 'float32'):
+        """
+        初始化估计器
+        
+        Args:
+            columns: 特征列名
+            dtype: 块内矩阵乘法使用的精度，累加器始终为float64
+        """
+        self.columns = list(columns)
+        self.dtype = np.dtype(dtype)
+        k = len(self.columns)
+        self.n_rows = 0
+        self._shift = None
+        self._count = np.zeros((k, k), dtype=np.float64)
+        self._sum = np.zeros((k, k), dtype=np.float64)
+        self._sum_sq = np.zeros((k, k), dtype=np.float64)
+        self._cross = np.zeros((k, k), dtype=np.float64)
+    
+    def update(self, chunk: Union[pd.DataFrame, np.ndarray]) -> 'StreamingCorrelation':
+        """累积一个数据块的统计量"""
+        if isinstance(chunk, pd.DataFrame):
+            values = np.array(chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            values = np.array(chunk, dtype=np.float64)
+        if values.shape[0] == 0:
+            return self
+        
+        values[~np.isfinite(values)] = np.nan
+        mask = ~np.isnan(values)
+        
+        # 以首块均值作为平移量，降低大数相减带来的精度损失
+        if self._shift is None:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self._shift = np.nan_to_num(np.nanmean(values, axis=0))
+        
+        x = np.where(mask, values - self._shift, 0.0).astype(self.dtype, copy=False)
+        m = mask.astype(self.dtype)
+        
+        self._count += m.T @ m
+        self._sum += x.T @ m
+        self._sum_sq += (x * x).T @ m
+        self._cross += x.T @ x
+        self.n_rows += values.shape[0]
+        return self
+    
+    def correlation(self) -> pd.DataFrame:
+        """根据累积统计量计算相关系数矩阵"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n = np.where(self._count > 1, self._count, np.nan)
+            cov = self._cross - self._sum * self._sum.T / n
+            var_x = self._sum_sq - self._sum ** 2 / n
+            var_y = var_x.T
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def greedy_correlation_prune(corr: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    贪心相关性剪枝
+    
+    按列顺序依次保留特征，每个被保留的特征一次性剔除其后所有与之
+    高度相关的特征，已剔除的特征不再参与比较。
+    
+    Args:
+        corr: 相关系数矩阵
+        threshold: 绝对相关系数阈值
+        
+    Returns:
+        布尔数组，True表示该特征应被移除
+    """
+    high = np.nan_to_num(np.abs(np.asarray(corr, dtype=np.float64))) > threshold
+    high = np.triu(high, k=1)
+    dropped = np.zeros(high.shape[0], dtype=bool)
+    for i in np.flatnonzero(high.any(axis=1)):
+        if not dropped[i]:
+            dropped |= high[i]
+    return dropped
+
+
 class FeatureEngineer:
     """
     完整特征工程器 - 集成60+技术指标和因子特征
@@ -101,6 +196,9 @@ class FeatureEngineer:
             'n_jobs': 1,
             'feature_selection': True,
             'correlation_threshold': 0.95,
+            'correlation_chunk_size': 100000,
+            'correlation_sample_rows': None,
+            'correlation_dtype': 'float32',
         }
     
     def _get_default_indicator_params(self) -> Dict:
@@ -618,24 +716,13 @@ class FeatureEngineer:
         """移除高相关性特征"""
         numeric_cols = features.select_dtypes(include=[np.number]).columns
         # 排除基础列
-        exclude_cols = ['ticker', 'tradeDate', 'openPrice', 'highestPrice', 'lowestPrice', 'closePrice', 'turnoverVol']
-        feature_cols = [col for col in numeric_cols if col not in exclude_cols]
+        feature_cols = [col for col in numeric_cols if col not in CORRELATION_EXCLUDE_COLS]
         
         if len(feature_cols) < 2:
             return features
         
         try:
-            # 计算相关系数矩阵
-            corr_matrix = features[feature_cols].corr().abs()
-            
-            # 找到高相关性特征对
-            upper_triangle = corr_matrix.where(
-                np.triu(np.ones(corr_matrix.shape), k=1).astype(bool)
-            )
-            
-            # 找到需要删除的特征
-            to_drop = [column for column in upper_triangle.columns 
-                      if any(upper_triangle[column] > self.config['correlation_threshold'])]
+            to_drop = self.find_correlated_features(features, feature_cols)
             
             if to_drop:
                 print(f"   🗑️ 移除高相关特征: {len(to_drop)} 个")
@@ -646,6 +733,72 @@ class FeatureEngineer:
         
         return features
     
+    def find_correlated_features(self, source: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                                 feature_cols: Optional[List[str]] = None,
+                                 threshold: Optional[float] = None) -> List[str]:
+        """
+        流式计算相关系数并贪心选出需要移除的高相关特征
+        
+        Args:
+            source: 特征DataFrame，或逐块产出DataFrame的可迭代对象
+                    (如 pd.read_csv(chunksize=...))，用于超出内存的数据集；
+                    配置了 correlation_sample_rows 时对全部块做蓄水池抽样，而不是只取前几块
+            feature_cols: 参与分析的特征列，默认取首块的数值列
+            threshold: 相关系数阈值，默认使用配置 correlation_threshold
+            
+        Returns:
+            需要移除的特征列表
+        """
+        threshold = threshold if threshold is not None else self.config['correlation_threshold']
+        chunk_size = self.config.get('correlation_chunk_size', 100000)
+        sample_rows = self.config.get('correlation_sample_rows')
+        dtype = self.config.get('correlation_dtype', 'float32')
+        
+        estimator = None
+        reservoir, seen = None, 0
+        rng = np.random.default_rng(42)
+        if isinstance(source, pd.DataFrame):
+            if sample_rows and len(source) > sample_rows:
+                source = source.sample(n=sample_rows, random_state=42)
+            chunks = (source.iloc[i:i + chunk_size] for i in range(0, len(source), chunk_size))
+        else:
+            chunks = iter(source)
+        
+        for chunk in chunks:
+            if estimator is None:
+                if feature_cols is None:
+                    numeric_cols = chunk.select_dtypes(include=[np.number]).columns
+                    feature_cols = [col for col in numeric_cols
+                                    if col not in CORRELATION_EXCLUDE_COLS]
+                if len(feature_cols) < 2:
+                    return []
+                estimator = StreamingCorrelation(feature_cols, dtype=dtype)
+            if not sample_rows or isinstance(source, pd.DataFrame):
+                estimator.update(chunk)
+                continue
+            
+            # 蓄水池抽样(Algorithm R): 每行以 sample_rows/已见行数 的概率进入样本，样本覆盖全部块
+            values = chunk[feature_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            if reservoir is None:
+                reservoir = np.empty((sample_rows, len(feature_cols)), dtype=np.float64)
+            fill = min(max(sample_rows - seen, 0), len(values))
+            reservoir[seen:seen + fill] = values[:fill]
+            rest = values[fill:]
+            if len(rest):
+                slots = rng.integers(0, np.arange(seen + fill, seen + len(values)) + 1)
+                keep = slots < sample_rows
+                # 重复的槽位按行顺序赋值，后出现的行覆盖先出现的，与逐行抽样一致
+                reservoir[slots[keep]] = rest[keep]
+            seen += len(values)
+        
+        if estimator is None:
+            return []
+        if reservoir is not None:
+            estimator.update(reservoir[:min(seen, sample_rows)])
+        
+        drop_mask = greedy_correlation_prune(estimator.correlation().values, threshold)
+        return [col for col, drop in zip(feature_cols, drop_mask) if drop]
+    
     def calculate_feature_importance(self, features: pd.DataFrame, 
                                    target_col: str = None) -> Dict[str, float]:
         """
@@ -726,6 +879,8 @@ def create_feature_engineer(price_data: pd.DataFrame = None,
 # 模块导出
 __all__ = [
     'FeatureEngineer',
+    'StreamingCorrelation',
+    'greedy_correlation_prune',
     'create_feature_engineer'
 ]
 
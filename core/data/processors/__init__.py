@@ -10,6 +10,8 @@
 - 缺失值处理
 - 异常值处理
 - 数据合并和聚合
+- 全市场周线/月线聚合
+- 前复权/后复权计算
 
 Author: QuantTrader Team
 """
@@ -17,11 +19,17 @@ Author: QuantTrader Team
 from .data_processor import DataProcessor
 from .data_cleaner import DataCleaner
 from .data_transformer import DataTransformer
+from .bar_aggregator import BarAggregator, aggregate_periods, load_trading_days
+from .price_adjuster import PriceAdjuster
 
 __all__ = [
     'DataProcessor',
     'DataCleaner',
-    'DataTransformer'
+    'DataTransformer',
+    'BarAggregator',
+    'aggregate_periods',
+    'load_trading_days',
+    'PriceAdjuster'
 ]
 
 __version__ = '2.0.0'
\ No newline at end of file
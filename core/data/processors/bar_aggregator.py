@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+周线/月线聚合器
+=============
+
+一次性把全市场日线聚合为周线、月线(及复权)K线:
+
+- 周期内的最后一个交易日作为 endDate; 提供交易日历时取自日历, 否则取自数据本身的日期
+  (数据不完整时, 如增量窗口或停牌, 会得到错误的 endDate)
+- 按 (股票, 周期) 排序后, 用 reduceat 在连续数组段上做 first/last/max/min/sum
+- 结果持久化, 新的周/月收盘后只重算最后一个周期之后的数据
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import logging
+
+try:
+    import pandas as pd
+    import numpy as np
+except ImportError:
+    pd = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 日线列 -> 聚合方式, 同时覆盖优矿原始列名与标准化列名
+BAR_AGG_RULES = {
+    'openPrice': 'first',
+    'highestPrice': 'max',
+    'lowestPrice': 'min',
+    'closePrice': 'last',
+    'highPrice': 'max',
+    'lowPrice': 'min',
+    'turnoverVol': 'sum',
+    'turnoverValue': 'sum',
+    'dealAmount': 'sum',
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'amount': 'sum',
+    'accumAdjFactor': 'last',
+    'marketValue': 'last',
+    'negMarketValue': 'last',
+}
+
+SUPPORTED_FREQS = ('W', 'M')
+
+
+def period_start(dates: pd.Series, freq: str) -> pd.Series:
+    """日期所属自然周期的起点(周一 / 月初), 作为跨批次稳定的周期标签"""
+    dates = pd.to_datetime(dates).dt.normalize()
+    if freq == 'W':
+        return dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')
+    if freq == 'M':
+        return dates - pd.to_timedelta(dates.dt.day - 1, unit='D')
+    raise ValueError(f"不支持的周期: {freq}, 可选 {SUPPORTED_FREQS}")
+
+
+def period_end_calendar(trading_days: Sequence, freq: str) -> pd.Series:
+    """交易日历 -> {周期起点: 周期内最后一个交易日}"""
+    days = pd.Series(pd.to_datetime(pd.Index(trading_days)).normalize().unique())
+    return days.groupby(period_start(days, freq).to_numpy()).max()
+
+
+def load_trading_days(calendar_file: Union[str, Path], exchange: Optional[str] = 'XSHG') -> pd.DatetimeIndex:
+    """
+    读取交易日历文件(TradeCalGet: calendarDate, exchangeCD, isOpen)中的开市日
+
+    Args:
+        calendar_file: 交易日历CSV
+        exchange: 交易所代码, 为None或文件无 exchangeCD 列时不过滤
+
+    Returns:
+        升序的开市日
+    """
+    calendar = pd.read_csv(calendar_file, dtype={'exchangeCD': str})
+    if exchange and 'exchangeCD' in calendar.columns:
+        calendar = calendar[calendar['exchangeCD'] == exchange]
+    if 'isOpen' in calendar.columns:
+        calendar = calendar[calendar['isOpen'] == 1]
+    days = pd.to_datetime(calendar['calendarDate'], errors='coerce').dropna()
+    return pd.DatetimeIndex(days.unique()).sort_values()
+
+
+def aggregate_periods(daily: pd.DataFrame, freq: str = 'W',
+                      ticker_col: Optional[str] = 'ticker',
+                      date_col: str = 'tradeDate',
+                      agg_rules: Optional[Dict[str, str]] = None,
+                      trading_days: Optional[Sequence] = None) -> pd.DataFrame:
+    """
+    按交易日历周期聚合(全市场一次完成)
+
+    Args:
+        daily: 日线长表, 每行一个 (股票, 交易日)
+        freq: 'W' 周线 或 'M' 月线
+        ticker_col: 股票代码列, 为None时视为单只股票
+        date_col: 交易日期列
+        agg_rules: 列 -> first/last/max/min/sum/mean, 默认按 BAR_AGG_RULES 匹配已有列
+        trading_days: 交易日历; 提供时 endDate 取日历中周期的最后一个交易日,
+                      否则取数据中出现的最后一个日期
+
+    Returns:
+        每行一个 (股票, 周期) 的K线, 含 periodStart、endDate(周期内最后一个交易日)、tradeDays
+    """
+    if agg_rules is None:
+        agg_rules = {col: how for col, how in BAR_AGG_RULES.items() if col in daily.columns}
+    group_cols = [ticker_col] if ticker_col else []
+
+    frame = daily[group_cols + [date_col] + list(agg_rules)].copy()
+    frame[date_col] = pd.to_datetime(frame[date_col])
+    frame = frame.dropna(subset=[date_col])
+    if frame.empty:
+        return pd.DataFrame(columns=group_cols + ['periodStart', 'endDate', 'tradeDays'] + list(agg_rules))
+
+    frame['periodStart'] = period_start(frame[date_col], freq)
+
+    # 每个周期的最后一个交易日; 日历中没有的周期(日历范围之外)退回数据本身的日期
+    calendar = frame.groupby('periodStart')[date_col].max()
+    if trading_days is not None:
+        calendar = period_end_calendar(trading_days, freq).reindex(calendar.index).fillna(calendar)
+
+    # 排序后 (股票, 周期) 相同的行连续排列, 段起点即分组边界
+    frame = frame.sort_values(group_cols + [date_col], kind='mergesort')
+    period_codes = frame['periodStart'].to_numpy()
+    boundary = np.empty(len(frame), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = period_codes[1:] != period_codes[:-1]
+    if ticker_col:
+        ticker_codes = pd.factorize(frame[ticker_col])[0]
+        boundary[1:] |= ticker_codes[1:] != ticker_codes[:-1]
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], len(frame))
+
+    result = {}
+    for col in group_cols + ['periodStart']:
+        result[col] = frame[col].to_numpy()[starts]
+    result['tradeDays'] = ends - starts
+
+    for col, how in agg_rules.items():
+        values = frame[col].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        if how == 'first':
+            # 周期内第一个非空值: 有效位置的前向索引
+            idx = np.where(valid, np.arange(len(values)), len(values))
+            first_idx = np.minimum.reduceat(idx, starts)
+            result[col] = np.where(first_idx < ends, values[np.minimum(first_idx, len(values) - 1)], np.nan)
+        elif how == 'last':
+            idx = np.where(valid, np.arange(len(values)), -1)
+            last_idx = np.maximum.reduceat(idx, starts)
+            result[col] = np.where(last_idx >= starts, values[np.maximum(last_idx, 0)], np.nan)
+        elif how == 'max':
+            result[col] = np.fmax.reduceat(values, starts)
+        elif how == 'min':
+            result[col] = np.fmin.reduceat(values, starts)
+        elif how in ('sum', 'mean'):
+            sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            counts = np.add.reduceat(valid.astype(np.int64), starts)
+            if how == 'sum':
+                result[col] = np.where(counts > 0, sums, np.nan)
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    result[col] = sums / counts
+        else:
+            raise ValueError(f"不支持的聚合方式: {how}")
+
+    bars = pd.DataFrame(result)
+    bars.insert(len(group_cols) + 1, 'endDate', bars['periodStart'].map(calendar).to_numpy())
+    return bars
+
+
+class BarAggregator:
+    """周线/月线聚合器
+
+    负责：
+    - 从日线长表一次性构建全市场周线、月线
+    - 将结果持久化到 <root>/<name>_<freq>.parquet
+    - 增量更新: 只重算已保存的最后一个周期及之后的数据
+    """
+
+    def __init__(self, root: Union[str, Path] = 'data/bars',
+                 ticker_col: str = 'ticker', date_col: str = 'tradeDate',
+                 trading_days: Optional[Sequence] = None):
+        """初始化聚合器
+
+        Args:
+            root: 结果存储目录
+            ticker_col: 股票代码列
+            date_col: 交易日期列
+            trading_days: 交易日历(如 TradeCalGet 的开市日), 用于确定周期的最后一个交易日
+        """
+        self.root = Path(root)
+        self.ticker_col = ticker_col
+        self.date_col = date_col
+        self.trading_days = trading_days
+        try:
+            import pyarrow  # noqa: F401
+            self.file_format = 'parquet'
+        except ImportError:
+            self.file_format = 'csv'
+
+    def bar_path(self, freq: str, name: str = 'daily') -> Path:
+        """结果文件路径; name 区分不复权('daily')与复权('daily_adj')等数据源"""
+        return self.root / f"{name}_{freq}.{self.file_format}"
+
+    def build(self, daily: pd.DataFrame, freqs: tuple = SUPPORTED_FREQS,
+              name: str = 'daily', save: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        全量构建
+
+        Args:
+            daily: 日线长表
+            freqs: 需要的周期
+            name: 数据源名称
+            save: 是否持久化
+
+        Returns:
+            {周期: K线}
+        """
+        bars = {}
+        for freq in freqs:
+            bars[freq] = aggregate_periods(daily, freq, self.ticker_col, self.date_col,
+                                           trading_days=self.trading_days)
+            if save:
+                self.save(bars[freq], freq, name)
+            logger.info(f"{name} {freq} 聚合完成: {len(daily)} 行日线 -> {len(bars[freq])} 根K线")
+        return bars
+
+    def update(self, daily: pd.DataFrame, freqs: tuple = SUPPORTED_FREQS,
+               name: str = 'daily') -> Dict[str, pd.DataFrame]:
+        """
+        增量更新
+
+        daily 至少需要包含已保存的最后一个周期起点之后的全部日线;
+        已保存的最后一个周期(可能尚未收盘)会被重新计算。
+        """
+        bars = {}
+        for freq in freqs:
+            existing = self.load(freq, name)
+            if existing is None or existing.empty:
+                bars[freq] = self.build(daily, (freq,), name)[freq]
+                continue
+
+            cutoff = existing['periodStart'].max()
+            recent = daily[pd.to_datetime(daily[self.date_col]) >= cutoff]
+            fresh = aggregate_periods(recent, freq, self.ticker_col, self.date_col,
+                                      trading_days=self.trading_days)
+
+            kept = existing[existing['periodStart'] < cutoff]
+            combined = pd.concat([kept, fresh], ignore_index=True)
+            combined = combined.sort_values([self.ticker_col, 'periodStart'], kind='mergesort')
+            bars[freq] = combined.reset_index(drop=True)
+            self.save(bars[freq], freq, name)
+            logger.info(f"{name} {freq} 增量更新: 重算 {len(fresh)} 根K线 (自 {cutoff.date()})")
+        return bars
+
+    def save(self, bars: pd.DataFrame, freq: str, name: str = 'daily'):
+        """持久化K线"""
+        path = self.bar_path(freq, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if self.file_format == 'parquet':
+            bars.to_parquet(tmp_path, index=False)
+        else:
+            bars.to_csv(tmp_path, index=False)
+        tmp_path.replace(path)
+
+    def load(self, freq: str, name: str = 'daily',
+             tickers: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """读取已保存的K线"""
+        path = self.bar_path(freq, name)
+        if not path.exists():
+            return None
+        if self.file_format == 'parquet':
+            filters = [(self.ticker_col, 'in', list(tickers))] if tickers else None
+            return pd.read_parquet(path, filters=filters)
+        bars = pd.read_csv(path, dtype={self.ticker_col: str}, parse_dates=['periodStart', 'endDate'])
+        if tickers:
+            bars = bars[bars[self.ticker_col].isin(tickers)]
+        return bars
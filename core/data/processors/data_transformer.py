@@ -20,6 +20,8 @@ except ImportError:
     pd = None
     np = None
 
+from .bar_aggregator import aggregate_periods
+
 logger = logging.getLogger(__name__)
 
 class DataTransformer:
@@ -268,7 +270,8 @@ class DataTransformer:
                      data: pd.DataFrame,
                      freq: str,
                      date_column: str = 'date',
-                     agg_methods: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+                     agg_methods: Optional[Dict[str, str]] = None,
+                     group_column: Optional[str] = None) -> pd.DataFrame:
         """数据重采样
         
         Args:
@@ -276,6 +279,8 @@ class DataTransformer:
             freq: 重采样频率 ('D', 'W', 'M', 'Q', 'Y')
             date_column: 日期列名
             agg_methods: 聚合方法字典
+            group_column: 分组列(如 symbol); 指定时多只股票一次完成,
+                周线/月线按交易日历聚合, 日期为周期内最后一个交易日
             
         Returns:
             重采样后的数据
@@ -290,13 +295,14 @@ class DataTransformer:
             if not pd.api.types.is_datetime64_any_dtype(result[date_column]):
                 result[date_column] = pd.to_datetime(result[date_column])
             
-            # 设置日期列为索引
-            result = result.set_index(date_column)
-            
             # 默认聚合方法
             if agg_methods is None:
                 agg_methods = {}
-                for col in result.columns:
+                value_cols = [col for col in result.columns if col not in (date_column, group_column)]
+                if group_column:
+                    value_cols = [col for col in value_cols
+                                  if pd.api.types.is_numeric_dtype(result[col])]
+                for col in value_cols:
                     if col.lower() in ['open']:
                         agg_methods[col] = 'first'
                     elif col.lower() in ['high']:
@@ -310,11 +316,21 @@ class DataTransformer:
                     else:
                         agg_methods[col] = 'mean'
             
-            # 执行重采样
-            result = result.resample(freq).agg(agg_methods)
-            
-            # 重置索引
-            result = result.reset_index()
+            if group_column and freq in ('W', 'M'):
+                # 全部分组一次聚合
+                result = aggregate_periods(result, freq, ticker_col=group_column,
+                                           date_col=date_column, agg_rules=agg_methods)
+                result = result.drop(columns=['periodStart', 'tradeDays'])
+                result = result.rename(columns={'endDate': date_column})
+            elif group_column:
+                result = (result.set_index(date_column).groupby(group_column)
+                          .resample(freq).agg(agg_methods).reset_index())
+            else:
+                # 执行重采样
+                result = result.set_index(date_column).resample(freq).agg(agg_methods)
+                
+                # 重置索引
+                result = result.reset_index()
             
             logger.debug(f"数据重采样完成: {freq}, 行数: {len(data)} -> {len(result)}")
         
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复权计算服务
+==========
+
+只保存一份不复权行情(OHLCVPanel)与 MktAdjfGet 复权因子, 按需计算前复权/后复权价格:
+
+- 每个除权除息事件的单次因子 f (除权日前一交易日价格需乘以 f)
+- 事件按交易日历落到面板行上, 沿日期轴累乘得到 F(t) = 截至t的全部因子之积
+- 前复权(基准日T): 价格 × F(T) / F(t);  后复权: 价格 / F(t)
+- 因子矩阵按 (基准日, 复权方式) 缓存, 新增除权事件时只重算受影响股票的列
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Iterable, Tuple
+
+try:
+    import pandas as pd
+    import numpy as np
+except ImportError:
+    pd = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ADJUST_METHODS = ('forward', 'backward')
+
+# 需要复权的价格字段(面板字段名); 成交量/成交额不复权
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'pre_close')
+
+# 长表中需要复权的价格列(优矿原始列名与标准化列名)
+PRICE_COLUMNS = ('preClosePrice', 'actPreClosePrice', 'openPrice', 'highestPrice', 'lowestPrice',
+                 'closePrice', 'highPrice', 'lowPrice', 'vwap', 'open', 'high', 'low', 'close')
+
+
+def normalize_adj_factors(factors: pd.DataFrame) -> pd.DataFrame:
+    """
+    规整 MktAdjfGet 数据为单次事件因子表 [ticker, exDivDate, adjFactor]
+
+    优先使用单次因子 adjFactor(部分下载脚本字段名为 adjfactor);
+    只有累积因子 accumAdjFactor 时, 按 accum_k = f_k × accum_{k+1} 反推单次因子。
+    """
+    df = factors.rename(columns={'adjfactor': 'adjFactor'})
+    if 'ticker' not in df.columns and 'secID' in df.columns:
+        df = df.assign(ticker=df['secID'].astype(str).str.split('.').str[0])
+    df = df.assign(ticker=df['ticker'].astype(str).str.zfill(6),
+                   exDivDate=pd.to_datetime(df['exDivDate'], errors='coerce'))
+    df = df.dropna(subset=['exDivDate'])
+
+    if 'adjFactor' in df.columns:
+        df = df.assign(adjFactor=pd.to_numeric(df['adjFactor'], errors='coerce'))
+    elif 'accumAdjFactor' in df.columns:
+        df = df.sort_values(['ticker', 'exDivDate'], kind='mergesort')
+        accum = pd.to_numeric(df['accumAdjFactor'], errors='coerce')
+        next_accum = accum.groupby(df['ticker']).shift(-1).fillna(1.0)
+        df = df.assign(adjFactor=accum / next_accum)
+    else:
+        raise ValueError("复权因子数据缺少 adjFactor/accumAdjFactor 列")
+
+    df = df.dropna(subset=['adjFactor'])
+    df = df[df['adjFactor'] > 0]
+    # 同一股票同一除权日只保留最后一条
+    df = df.drop_duplicates(subset=['ticker', 'exDivDate'], keep='last')
+    return df[['ticker', 'exDivDate', 'adjFactor']].sort_values(
+        ['ticker', 'exDivDate'], kind='mergesort').reset_index(drop=True)
+
+
+class PriceAdjuster:
+    """复权计算服务
+
+    负责：
+    - 管理复权因子(单次事件因子), 支持增量追加除权事件
+    - 基于不复权面板向量化计算全市场前复权/后复权价格
+    - 按 (基准日, 复权方式) 缓存因子矩阵及复权后的字段
+    - 对任意不复权长表做同样的复权
+    """
+
+    def __init__(self, panel: Optional[Any] = None,
+                 factors: Optional[pd.DataFrame] = None,
+                 max_cached: int = 4):
+        """初始化复权服务
+
+        Args:
+            panel: OHLCVPanel 或面板目录(不复权日线)
+            factors: MktAdjfGet 复权因子数据
+            max_cached: 最多缓存的 (基准日, 复权方式) 组合数
+        """
+        if panel is not None and not hasattr(panel, 'array'):
+            from ..storage.ohlcv_panel import OHLCVPanel
+            panel = OHLCVPanel(panel)
+        self.panel = panel
+        self.max_cached = max_cached
+        self.factors = pd.DataFrame(columns=['ticker', 'exDivDate', 'adjFactor'])
+        # (基准日, 复权方式) -> {'factor': 日期×股票因子矩阵, 字段: 复权后数组}
+        self._cache: Dict[Tuple[Any, str], Dict[str, 'np.ndarray']] = OrderedDict()
+        if factors is not None:
+            self.set_factors(factors)
+
+    @classmethod
+    def from_files(cls, panel: Optional[Any], factor_files: Iterable[Union[str, Path]],
+                   **kwargs) -> 'PriceAdjuster':
+        """从面板与复权因子文件创建"""
+        frames = []
+        for path in factor_files:
+            path = Path(path)
+            if path.suffix.lower() == '.parquet':
+                frames.append(pd.read_parquet(path))
+            else:
+                frames.append(pd.read_csv(path, dtype={'ticker': str, 'secID': str}))
+        factors = pd.concat(frames, ignore_index=True) if frames else None
+        return cls(panel, factors, **kwargs)
+
+    # ---------- 因子管理 ----------
+
+    def set_factors(self, factors: pd.DataFrame):
+        """替换全部复权因子并清空缓存"""
+        self.factors = normalize_adj_factors(factors)
+        self._cache.clear()
+        logger.info(f"复权因子加载完成: {self.factors['ticker'].nunique()} 只股票, {len(self.factors)} 个除权事件")
+
+    def add_events(self, events: pd.DataFrame) -> List[str]:
+        """
+        追加除权除息事件, 只重算受影响股票在缓存中的列
+
+        Args:
+            events: 新的 MktAdjfGet 记录
+
+        Returns:
+            受影响的股票代码
+        """
+        events = normalize_adj_factors(events)
+        if events.empty:
+            return []
+        combined = pd.concat([self.factors, events], ignore_index=True)
+        self.factors = combined.drop_duplicates(subset=['ticker', 'exDivDate'], keep='last').sort_values(
+            ['ticker', 'exDivDate'], kind='mergesort').reset_index(drop=True)
+
+        affected = sorted(events['ticker'].unique())
+        if self.panel is not None and self._cache:
+            cols = self.panel.tickers.get_indexer(affected)
+            cols = cols[cols >= 0]
+            for (as_of, method), entry in self._cache.items():
+                entry['factor'][:, cols] = self._factor_matrix(method, as_of, cols)
+                for field, values in entry.items():
+                    if field != 'factor':
+                        values[:, cols] = self.panel.array(field)[:, cols] * entry['factor'][:, cols]
+        logger.info(f"新增 {len(events)} 个除权事件, 重算 {len(affected)} 只股票")
+        return affected
+
+    # ---------- 面板复权 ----------
+
+    def _resolve_as_of(self, as_of) -> pd.Timestamp:
+        if as_of is None:
+            return self.panel.dates[-1]
+        return pd.Timestamp(as_of)
+
+    def _factor_matrix(self, method: str, as_of: pd.Timestamp,
+                       cols: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        计算 日期 × 股票 复权因子矩阵
+
+        Args:
+            method: 'forward' 或 'backward'
+            as_of: 前复权基准日
+            cols: 只计算这些股票列, 为None时计算全部
+        """
+        if method not in ADJUST_METHODS:
+            raise ValueError(f"不支持的复权方式: {method}, 可选 {ADJUST_METHODS}")
+
+        dates = self.panel.dates
+        tickers = self.panel.tickers if cols is None else self.panel.tickers[cols]
+
+        # 除权日落在首个 >= 除权日的交易日; 之前的行不受该事件影响
+        events = self.factors[self.factors['ticker'].isin(tickers)]
+        rows = dates.searchsorted(events['exDivDate'].to_numpy())
+        col_idx = pd.Index(tickers).get_indexer(events['ticker'])
+        keep = (rows < len(dates)) & (col_idx >= 0)
+
+        step = np.ones((len(dates), len(tickers)), dtype=np.float64)
+        np.multiply.at(step, (rows[keep], col_idx[keep]), events['adjFactor'].to_numpy()[keep])
+        cumulative = np.cumprod(step, axis=0)
+
+        if method == 'backward':
+            factor = 1.0 / cumulative
+        else:
+            as_of_row = max(dates.searchsorted(as_of, side='right') - 1, 0)
+            factor = cumulative[as_of_row] / cumulative
+        return factor.astype(self.panel.header['dtype'])
+
+    def factor_matrix(self, method: str = 'forward', as_of=None) -> np.ndarray:
+        """(缓存的) 日期 × 股票 复权因子矩阵"""
+        if self.panel is None:
+            raise ValueError("未设置行情面板")
+        as_of = self._resolve_as_of(as_of)
+        key = (as_of, method)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]['factor']
+
+        self._cache[key] = {'factor': self._factor_matrix(method, as_of)}
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return self._cache[key]['factor']
+
+    def adjusted_array(self, field: str, method: str = 'forward', as_of=None) -> np.ndarray:
+        """(缓存的) 复权后的 日期 × 股票 字段数组"""
+        if field not in PRICE_FIELDS:
+            return self.panel.array(field)
+        factor = self.factor_matrix(method, as_of)
+        entry = self._cache[(self._resolve_as_of(as_of), method)]
+        if field not in entry:
+            entry[field] = self.panel.array(field) * factor
+        return entry[field]
+
+    def adjusted_frame(self, field: str, method: str = 'forward', as_of=None,
+                       start_date=None, end_date=None) -> pd.DataFrame:
+        """复权后的 日期 × 股票 宽表"""
+        rows = self.panel._date_slice(start_date, end_date)
+        values = self.adjusted_array(field, method, as_of)
+        return pd.DataFrame(values[rows], index=self.panel.dates[rows],
+                            columns=self.panel.tickers, copy=False)
+
+    def adjusted_ticker(self, ticker: str, fields: Optional[List[str]] = None,
+                        method: str = 'forward', as_of=None,
+                        start_date=None, end_date=None, dropna: bool = True) -> pd.DataFrame:
+        """单只股票的复权时间序列"""
+        col = self.panel.tickers.get_loc(str(ticker))
+        rows = self.panel._date_slice(start_date, end_date)
+        fields = fields or self.panel.fields
+        frame = pd.DataFrame({field: self.adjusted_array(field, method, as_of)[rows, col]
+                              for field in fields}, index=self.panel.dates[rows])
+        return frame.dropna(how='all') if dropna else frame
+
+    def clear_cache(self):
+        """清空复权缓存"""
+        self._cache.clear()
+
+    # ---------- 长表复权 ----------
+
+    def adjust_frame(self, df: pd.DataFrame, method: str = 'forward', as_of=None,
+                     ticker_col: str = 'ticker', date_col: str = 'tradeDate',
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        对不复权长表(多股票)做复权
+
+        Args:
+            df: 不复权行情, 每行一个 (股票, 交易日)
+            method: 'forward' 或 'backward'
+            as_of: 前复权基准日, 默认为数据中的最后日期
+            ticker_col: 股票代码列
+            date_col: 交易日期列
+            columns: 需要复权的列, 默认 PRICE_COLUMNS 中存在的列
+
+        Returns:
+            复权后的副本, 行顺序与输入一致
+        """
+        if method not in ADJUST_METHODS:
+            raise ValueError(f"不支持的复权方式: {method}, 可选 {ADJUST_METHODS}")
+        columns = columns or [col for col in PRICE_COLUMNS if col in df.columns]
+        result = df.copy()
+        if result.empty or not columns:
+            return result
+
+        dates = pd.to_datetime(result[date_col])
+        tickers = result[ticker_col].astype(str).str.zfill(6)
+        as_of = pd.Timestamp(as_of) if as_of is not None else dates.max()
+
+        events = self.factors.assign(cumulative=self.factors.groupby('ticker')['adjFactor'].cumprod())
+        events = events.sort_values('exDivDate', kind='mergesort')
+
+        # F(t): 每行截至当日的累积因子
+        lookup = pd.DataFrame({'ticker': tickers.to_numpy(), 'date': dates.to_numpy(),
+                               'row': np.arange(len(result))}).sort_values('date', kind='mergesort')
+        merged = pd.merge_asof(lookup, events[['ticker', 'exDivDate', 'cumulative']],
+                               left_on='date', right_on='exDivDate', by='ticker', direction='backward')
+        cumulative = np.ones(len(result))
+        cumulative[merged['row'].to_numpy()] = merged['cumulative'].fillna(1.0).to_numpy()
+
+        if method == 'backward':
+            factor = 1.0 / cumulative
+        else:
+            base = events[events['exDivDate'] <= as_of].groupby('ticker')['cumulative'].last()
+            factor = tickers.map(base).fillna(1.0).to_numpy() / cumulative
+
+        for col in columns:
+            result[col] = pd.to_numeric(result[col], errors='coerce') * factor
+        return result
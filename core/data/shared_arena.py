@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存缓存区
+============
+
+多个工作进程共享同一份大型DataFrame, 而不是每个进程各存一份:
+
+- 数据以 Arrow IPC 文件存放在 /dev/shm(tmpfs, 即 multiprocessing.shared_memory 的底层)
+  下的缓存区目录, 无 /dev/shm 时退化为缓存目录下的普通文件(经页缓存共享)
+- 任意本机进程内存映射读取, 数值列零拷贝引用共享页, 不额外占用进程私有内存
+- 引用计数: 每个读取方在返回的DataFrame存活期间持有段文件的共享锁(flock),
+  进程退出时内核自动释放, 异常退出不会留下悬挂引用
+- 全局字节预算(不超过共享区所在文件系统的可用空间): 写入时先清除过期段, 再按最近访问时间淘汰未被引用的段
+- 生命周期: 每个打开共享区的进程持有成员共享锁; 最后一个成员关闭(或新进程发现没有存活成员)时
+  清空遗留的段, /dev/shm 中的数据不会在所有进程退出后继续占用内存
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Callable
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    PYARROW_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SHM_ROOT = Path('/dev/shm')
+SEGMENT_SUFFIX = '.arrow'
+META_SUFFIX = '.meta'
+MEMBERS_FILE = '.members'
+
+
+def default_arena_dir(cache_dir: Union[str, Path]) -> Path:
+    """缓存目录对应的共享区目录(同一缓存目录的所有进程使用同一共享区)"""
+    cache_dir = Path(cache_dir).resolve()
+    if SHM_ROOT.is_dir() and os.access(SHM_ROOT, os.W_OK):
+        digest = hashlib.md5(str(cache_dir).encode()).hexdigest()[:12]
+        return SHM_ROOT / f"quant_cache_{digest}"
+    return cache_dir / 'shared'
+
+
+class SharedArena:
+    """共享内存缓存区
+
+    负责：
+    - 存放 Arrow IPC 段文件及其元数据
+    - 以共享锁为引用计数, 向读取方提供零拷贝的内存映射表
+    - 维护全局字节预算, 清除过期段并淘汰最久未访问且未被引用的段
+    - 跟踪使用共享区的进程, 最后一个进程退出时清空共享区
+    """
+
+    def __init__(self,
+                 root: Union[str, Path],
+                 max_bytes: int = 2 * 1024 * 1024 * 1024,
+                 metadata_hook: Optional[Callable[[Dict], Any]] = None,
+                 is_expired: Optional[Callable[[Dict], bool]] = None):
+        """初始化共享区
+
+        Args:
+            root: 共享区目录
+            max_bytes: 所有进程合计的字节预算(不超过文件系统可用空间)
+            metadata_hook: 读取元数据JSON时的 object_hook(如还原datetime)
+            is_expired: 按元数据判断段是否过期, 过期段在腾空间和 sweep_expired 时清除
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.metadata_hook = metadata_hook
+        self.is_expired = is_expired
+        self._lock_file = self.root / '.arena.lock'
+        self._thread_lock = threading.Lock()
+        self._member_handle = None
+        if self.available:
+            self._join()
+        
+        # tmpfs 写满时写入失败, 内存映射读取可能触发SIGBUS; 预算以当前可用空间为上限
+        usable = shutil.disk_usage(self.root).free + self._used_bytes()
+        if max_bytes > usable:
+            logger.warning(f"⚠️ 共享区预算 {max_bytes} 超过可用空间, 调整为 {usable} bytes")
+        self.max_bytes = min(max_bytes, usable)
+
+    @property
+    def available(self) -> bool:
+        """是否可用(需要pyarrow; 引用计数需要fcntl)"""
+        return PYARROW_AVAILABLE and fcntl is not None
+
+    def _segment_path(self, key: str) -> Path:
+        return self.root / f"{key}{SEGMENT_SUFFIX}"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / f"{key}{META_SUFFIX}"
+
+    def _used_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.root)
+                   if entry.name.endswith(SEGMENT_SUFFIX))
+
+    # ---------- 生命周期 ----------
+
+    def _join(self):
+        """登记为共享区成员; 没有其他存活成员时, 现有的段都是已退出进程的遗留"""
+        with self._arena_lock():
+            handle = open(self.root / MEMBERS_FILE, 'a+')
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._clear_unreferenced()
+            except OSError:
+                pass
+            # 独占锁降级为共享锁(其他进程的独占尝试会失败)
+            fcntl.flock(handle.fileno(), fcntl.LOCK_SH)
+            self._member_handle = handle
+
+    def close(self):
+        """退出共享区; 没有其他成员时清空共享区, 释放 /dev/shm 占用"""
+        if self._member_handle is None:
+            return
+        with self._arena_lock():
+            handle, self._member_handle = self._member_handle, None
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # 仍有其他进程在使用
+                handle.close()
+                return
+            try:
+                removed = self._clear_unreferenced()
+                if removed:
+                    logger.info(f"🧹 共享区已清空: {self.root} ({removed} 段)")
+            finally:
+                handle.close()
+
+    def _clear_unreferenced(self) -> int:
+        """删除未被引用的段(调用方持有共享区锁)"""
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(SEGMENT_SUFFIX) and self._try_evict(entry.name[:-len(SEGMENT_SUFFIX)]):
+                removed += 1
+            elif entry.name.endswith('.tmp'):
+                Path(entry.path).unlink(missing_ok=True)
+        return removed
+
+    def _expired(self, key: str) -> bool:
+        if self.is_expired is None:
+            return False
+        try:
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                return self.is_expired(json.load(f, object_hook=self.metadata_hook))
+        except FileNotFoundError:
+            return False
+        except Exception:
+            # 元数据损坏的段视为过期
+            return True
+
+    def sweep_expired(self) -> int:
+        """删除所有过期且未被引用的段, 返回删除数量"""
+        removed = 0
+        with self._arena_lock():
+            for entry in os.scandir(self.root):
+                if not entry.name.endswith(SEGMENT_SUFFIX):
+                    continue
+                key = entry.name[:-len(SEGMENT_SUFFIX)]
+                if self._expired(key) and self._try_evict(key):
+                    removed += 1
+        return removed
+
+    # ---------- 写入 ----------
+
+    def put(self, key: str, payload, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        写入一个段
+
+        Args:
+            key: 缓存键
+            payload: Arrow IPC 文件字节(bytes 或 pyarrow.Buffer)
+            metadata: 元数据(过期时间、数据依赖等), 读取时原样返回
+
+        Returns:
+            bool: 是否写入(超过总预算或无法腾出空间时不写入)
+        """
+        size = len(payload)
+        if size > self.max_bytes:
+            return False
+
+        with self._arena_lock():
+            if not self._make_room(size, exclude=key) or shutil.disk_usage(self.root).free < size:
+                logger.debug(f"共享区空间不足, 跳过: {key} ({size} bytes)")
+                return False
+
+            suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            segment_path, meta_path = self._segment_path(key), self._meta_path(key)
+            tmp_segment = segment_path.with_name(segment_path.name + suffix)
+            tmp_meta = meta_path.with_name(meta_path.name + suffix)
+            try:
+                with open(tmp_segment, 'wb') as f:
+                    f.write(payload)
+                with open(tmp_meta, 'w', encoding='utf-8') as f:
+                    json.dump(metadata or {}, f, default=str)
+                # 已被映射的旧段在替换后仍对其读取方有效, 最后一个引用释放时由内核回收
+                os.replace(tmp_meta, meta_path)
+                os.replace(tmp_segment, segment_path)
+            except OSError as e:
+                tmp_segment.unlink(missing_ok=True)
+                tmp_meta.unlink(missing_ok=True)
+                logger.warning(f"⚠️ 写入共享区失败 {key}: {e}")
+                return False
+        return True
+
+    def _make_room(self, size: int, exclude: Optional[str] = None) -> bool:
+        """清除过期段, 再按最近访问时间淘汰未被引用的段, 直到能容纳 size 字节(调用方持有共享区锁)"""
+        segments = []
+        used = 0
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(SEGMENT_SUFFIX):
+                continue
+            stat = entry.stat()
+            key = entry.name[:-len(SEGMENT_SUFFIX)]
+            if key == exclude or (self._expired(key) and self._try_evict(key)):
+                continue
+            used += stat.st_size
+            segments.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, seg_size in sorted(segments):
+            if used + size <= self.max_bytes:
+                break
+            if self._try_evict(key):
+                used -= seg_size
+        return used + size <= self.max_bytes
+
+    def _try_evict(self, key: str) -> bool:
+        """段未被任何进程引用时删除"""
+        segment_path = self._segment_path(key)
+        try:
+            fd = os.open(segment_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        try:
+            segment_path.unlink(missing_ok=True)
+            self._meta_path(key).unlink(missing_ok=True)
+            logger.debug(f"🗑️ 共享区淘汰: {key}")
+            return True
+        finally:
+            os.close(fd)
+
+    # ---------- 读取 ----------
+
+    def attach(self, key: str):
+        """
+        映射一个段
+
+        Returns:
+            (pyarrow.Table, 元数据, 引用句柄) 或 None;
+            调用方在数据存活期间保持引用句柄, 句柄关闭即释放引用
+        """
+        segment_path = self._segment_path(key)
+        try:
+            fd = os.open(segment_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                metadata = json.load(f, object_hook=self.metadata_hook)
+            # 通过已加锁的fd映射, 保证映射的就是加锁的段(即使路径随后被替换)
+            fd_path = f"/proc/self/fd/{fd}"
+            source = fd_path if os.path.exists(fd_path) else str(segment_path)
+            table = pa.ipc.open_file(pa.memory_map(source, 'r')).read_all()
+            os.utime(segment_path)
+        except Exception as e:
+            os.close(fd)
+            if not isinstance(e, FileNotFoundError):
+                logger.debug(f"映射共享段失败 {key}: {e}")
+            return None
+        return table, metadata, fd
+
+    @staticmethod
+    def hold(obj: Any, handle: int):
+        """在 obj 存活期间持有引用句柄"""
+        weakref.finalize(obj, os.close, handle)
+
+    # ---------- 管理 ----------
+
+    def remove(self, key: str):
+        """删除段(已被映射的读取方不受影响)"""
+        self._segment_path(key).unlink(missing_ok=True)
+        self._meta_path(key).unlink(missing_ok=True)
+
+    def remove_many(self, keys: List[str]):
+        """批量删除段"""
+        for key in keys:
+            self.remove(key)
+
+    def clear(self):
+        """删除全部段"""
+        for entry in os.scandir(self.root):
+            if entry.name.endswith((SEGMENT_SUFFIX, META_SUFFIX)):
+                Path(entry.path).unlink(missing_ok=True)
+
+    def usage(self) -> Dict[str, Any]:
+        """共享区占用"""
+        items, used, in_use = 0, 0, 0
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(SEGMENT_SUFFIX):
+                continue
+            items += 1
+            used += entry.stat().st_size
+            fd = os.open(entry.path, os.O_RDONLY)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            except OSError:
+                in_use += 1
+            finally:
+                os.close(fd)
+        return {'root': str(self.root), 'items': items, 'bytes': used,
+                'max_bytes': self.max_bytes, 'referenced_items': in_use}
+
+    @contextmanager
+    def _arena_lock(self):
+        """共享区写入/淘汰的跨进程互斥"""
+        with self._thread_lock:
+            with open(self._lock_file, 'a+') as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据存储模块
+===========
+
+面向大规模本地数据的存储后端：
+- 按年份/股票分桶分区的Parquet数据湖
+- 列裁剪与日期/股票谓词下推
+- SQLite数据目录索引(增量刷新)
+- 全市场日线内存映射面板(零拷贝加载)
+- 追加写分段存储(增量写入与后台合并)
+- 按API登记的紧凑数据类型(解析时生效)
+
+Author: QuantTrader Team
+"""
+
+from .parquet_store import ParquetDataLake
+from .data_catalog import DataCatalog, file_version
+from .ohlcv_panel import OHLCVPanel, build_ohlcv_panel
+from .segment_store import SegmentStore
+from .schema_registry import SchemaRegistry, get_schema_registry
+
+__all__ = [
+    'ParquetDataLake',
+    'DataCatalog',
+    'file_version',
+    'OHLCVPanel',
+    'build_ohlcv_panel',
+    'SegmentStore',
+    'SchemaRegistry',
+    'get_schema_registry'
+]
+
+__version__ = '2.0.0'
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据目录索引
+===========
+
+用SQLite持久化记录数据树中每个数据文件的元信息:
+类别、API、来源、大小、行数、日期范围、字段结构和修改时间。
+
+刷新时按 (大小, mtime) 增量更新, 只有变化的文件才会重新解析;
+目录浏览与数据源定位变为索引查询, 不再反复 iterdir/glob/stat 整个数据树。
+来源/类别/API 目录的 mtime 签名变化(新增或删除文件)时目录即视为过期, 无需等待刷新周期。
+
+数据集版本(按当前文件的 size + mtime, 可选内容哈希)供缓存记录依赖, 数据变化后缓存自动失效。
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Iterable, Mapping
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from .parquet_store import detect_date_column
+
+logger = logging.getLogger(__name__)
+
+# 目录收录的数据文件格式
+CATALOG_FILE_SUFFIXES = {'.csv': 'csv', '.parquet': 'parquet'}
+
+
+def file_version(path: Union[str, Path], content_hash: bool = False,
+                 chunk_size: int = 8 * 1024 * 1024) -> Optional[str]:
+    """
+    单个文件的版本标识
+
+    Args:
+        path: 文件路径
+        content_hash: 为True时使用内容哈希(blake2b), 否则使用 size + mtime
+        chunk_size: 计算哈希时的读取块大小
+
+    Returns:
+        版本字符串, 文件不存在时返回None
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not content_hash:
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DataCatalog:
+    """数据目录索引
+
+    负责：
+    - 扫描 <source>/<category>/<api>/*.csv|*.parquet 并记录文件元信息
+    - 按 (size, mtime) 增量刷新, 删除已消失的文件
+    - 提供类别/API/文件/最佳数据源等索引查询
+    """
+
+    def __init__(self, db_path: Union[str, Path] = 'data/catalog.db',
+                 profile_chunk_size: int = 500000, signature_check_seconds: float = 1.0):
+        """初始化数据目录
+
+        Args:
+            db_path: SQLite数据库路径
+            profile_chunk_size: 统计行数/日期范围时的分块行数
+            signature_check_seconds: is_stale 检查的最小间隔(秒): 间隔内复用上次读取的
+                刷新记录与目录签名, 避免每次查询都扫描目录和查询数据库
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.profile_chunk_size = profile_chunk_size
+        self.signature_check_seconds = signature_check_seconds
+        self._signature_cache: Dict[str, tuple] = {}
+        self._meta_cache: Optional[tuple] = None
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建连接"""
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """连接上下文: 正常退出时提交(异常时回滚), 并关闭连接"""
+        with closing(self._connect()) as conn, conn:
+            yield conn
+
+    def _init_db(self):
+        """初始化数据库结构"""
+        with self._connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    api TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    row_count INTEGER,
+                    date_col TEXT,
+                    min_date TEXT,
+                    max_date TEXT,
+                    columns TEXT,
+                    profiled INTEGER NOT NULL DEFAULT 0,
+                    scanned_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_files_api ON files(category, api, priority, filename)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_files_source ON files(source, category, api)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS catalog_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+    # ==========================================
+    # 刷新
+    # ==========================================
+
+    def refresh(self, data_sources: Dict[str, Dict[str, Any]], profile: bool = False) -> Dict[str, int]:
+        """
+        增量刷新目录
+
+        Args:
+            data_sources: {来源名: {"path": Path, "priority": int}}
+            profile: 是否对新增/变化的文件统计行数与日期范围(需完整读取文件)
+
+        Returns:
+            刷新统计: scanned/added/updated/removed
+        """
+        stats = {'scanned': 0, 'added': 0, 'updated': 0, 'removed': 0}
+        now = time.time()
+
+        with self._connection() as conn:
+            # 只对本次刷新的来源做增删, 其他来源的记录保持不变
+            # 先记录目录签名, 扫描期间新增的文件会让下一次检查判定为过期
+            signatures = {name: self.directory_signature(Path(info['path']))
+                          for name, info in data_sources.items()}
+            placeholders = ','.join('?' * len(data_sources))
+            known = {
+                row['path']: (row['size_bytes'], row['mtime'], row['profiled'])
+                for row in conn.execute(
+                    f'SELECT path, size_bytes, mtime, profiled FROM files WHERE source IN ({placeholders})',
+                    tuple(data_sources)
+                )
+            }
+            seen = set()
+
+            for source_name, source_info in data_sources.items():
+                for entry, category, api in self._walk_source(Path(source_info['path'])):
+                    stats['scanned'] += 1
+                    path = entry.path
+                    seen.add(path)
+                    stat = entry.stat()
+
+                    previous = known.get(path)
+                    unchanged = previous is not None and previous[0] == stat.st_size \
+                        and previous[1] == stat.st_mtime
+                    if unchanged and (previous[2] or not profile):
+                        continue
+
+                    file_format = CATALOG_FILE_SUFFIXES[Path(entry.name).suffix.lower()]
+                    info = self._inspect_file(path, file_format, profile)
+                    conn.execute('''
+                        INSERT OR REPLACE INTO files
+                        (path, source, priority, category, api, filename, format, size_bytes,
+                         mtime, row_count, date_col, min_date, max_date, columns, profiled, scanned_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        path, source_name, source_info.get('priority', 99), category, api,
+                        entry.name, file_format, stat.st_size, stat.st_mtime,
+                        info.get('row_count'), info.get('date_col'), info.get('min_date'),
+                        info.get('max_date'), json.dumps(info.get('columns', []), ensure_ascii=False),
+                        int(info.get('profiled', False)), now
+                    ))
+                    stats['added' if previous is None else 'updated'] += 1
+
+            removed = [path for path in known if path not in seen]
+            conn.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in removed])
+            stats['removed'] = len(removed)
+
+            conn.executemany('INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)',
+                             [('last_refresh', str(now))] +
+                             [(f'last_refresh:{name}', str(now)) for name in data_sources] +
+                             [(f'dir_signature:{name}', signature) for name, signature in signatures.items()])
+
+        self._meta_cache = None
+        checked_at = time.monotonic()
+        for name, info in data_sources.items():
+            self._signature_cache[str(Path(info['path']))] = (checked_at, signatures[name])
+
+        logger.info(f"数据目录刷新: 扫描{stats['scanned']}, 新增{stats['added']}, "
+                    f"更新{stats['updated']}, 删除{stats['removed']}")
+        return stats
+
+    @staticmethod
+    def directory_signature(source_path: Path) -> str:
+        """来源目录及其类别/API子目录的 mtime 签名
+
+        目录中新增、删除或重命名文件会更新该目录的 mtime; 只扫描两层目录, 不stat数据文件。
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            digest.update(f"{source_path}|{os.stat(source_path).st_mtime_ns}\n".encode())
+        except OSError:
+            return 'missing'
+        for category_entry in sorted(os.scandir(source_path), key=lambda entry: entry.name):
+            if not category_entry.is_dir():
+                continue
+            digest.update(f"{category_entry.name}|{category_entry.stat().st_mtime_ns}\n".encode())
+            for api_entry in sorted(os.scandir(category_entry.path), key=lambda entry: entry.name):
+                if api_entry.is_dir():
+                    digest.update(f"{category_entry.name}/{api_entry.name}|"
+                                  f"{api_entry.stat().st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _walk_source(source_path: Path):
+        """遍历 <source>/<category>/<api>/ 下的数据文件(os.scandir, 不额外stat目录)"""
+        if not source_path.exists():
+            return
+        for category_entry in os.scandir(source_path):
+            if not category_entry.is_dir():
+                continue
+            for api_entry in os.scandir(category_entry.path):
+                if not api_entry.is_dir():
+                    continue
+                for file_entry in os.scandir(api_entry.path):
+                    suffix = os.path.splitext(file_entry.name)[1].lower()
+                    if suffix in CATALOG_FILE_SUFFIXES and file_entry.is_file():
+                        yield file_entry, category_entry.name, api_entry.name
+
+    def _inspect_file(self, path: str, file_format: str, profile: bool) -> Dict[str, Any]:
+        """读取字段结构, profile时统计行数与日期范围"""
+        info: Dict[str, Any] = {}
+        try:
+            if file_format == 'parquet' and PYARROW_AVAILABLE:
+                metadata = pq.ParquetFile(path).metadata
+                info['columns'] = metadata.schema.to_arrow_schema().names
+                info['row_count'] = metadata.num_rows
+                info['date_col'] = detect_date_column(info['columns'])
+                info['profiled'] = True
+                return info
+
+            columns = list(pd.read_csv(path, nrows=0).columns)
+            info['columns'] = columns
+            info['date_col'] = detect_date_column(columns)
+            if not profile:
+                return info
+
+            # 只解析日期列(无日期列时解析首列)以统计行数与日期范围
+            usecol = info['date_col'] or (columns[0] if columns else None)
+            row_count = 0
+            min_date, max_date = None, None
+            if usecol is not None:
+                for chunk in pd.read_csv(path, usecols=[usecol], dtype=str,
+                                         chunksize=self.profile_chunk_size):
+                    row_count += len(chunk)
+                    if info['date_col']:
+                        values = chunk[usecol].dropna()
+                        if not values.empty:
+                            chunk_min, chunk_max = values.min(), values.max()
+                            min_date = chunk_min if min_date is None else min(min_date, chunk_min)
+                            max_date = chunk_max if max_date is None else max(max_date, chunk_max)
+            info.update({'row_count': row_count, 'min_date': min_date,
+                         'max_date': max_date, 'profiled': True})
+        except Exception as e:
+            logger.warning(f"数据文件解析失败 {path}: {e}")
+        return info
+
+    def last_refresh(self, source: Optional[str] = None) -> Optional[float]:
+        """上次刷新的时间戳(指定source时为该来源的刷新时间)"""
+        key = f'last_refresh:{source}' if source else 'last_refresh'
+        with self._connection() as conn:
+            row = conn.execute('SELECT value FROM catalog_meta WHERE key = ?', (key,)).fetchone()
+        return float(row['value']) if row else None
+
+    def _meta(self) -> Dict[str, str]:
+        """catalog_meta 全部记录(signature_check_seconds 内复用上次读取结果)"""
+        now = time.monotonic()
+        if self._meta_cache is not None and now - self._meta_cache[0] <= self.signature_check_seconds:
+            return self._meta_cache[1]
+        with self._connection() as conn:
+            meta = {row['key']: row['value'] for row in conn.execute('SELECT key, value FROM catalog_meta')}
+        self._meta_cache = (now, meta)
+        return meta
+
+    def _current_signature(self, source_path: Path) -> str:
+        """来源目录的当前签名(signature_check_seconds 内复用上次计算结果)"""
+        now = time.monotonic()
+        cached = self._signature_cache.get(str(source_path))
+        if cached is not None and now - cached[0] <= self.signature_check_seconds:
+            return cached[1]
+        signature = self.directory_signature(source_path)
+        self._signature_cache[str(source_path)] = (now, signature)
+        return signature
+
+    def is_stale(self, max_age_seconds: float,
+                 sources: Optional[Union[Iterable[str], Mapping[str, Dict[str, Any]]]] = None) -> bool:
+        """
+        目录(或指定来源)是否需要刷新
+
+        传入 {来源名: {"path": ...}} 时, 任一来源的目录签名与上次刷新不同即过期(新写入的文件立即可见);
+        max_age_seconds 作为兜底, 覆盖原地改写文件等不改变目录 mtime 的情况。
+        刷新记录与目录签名在 signature_check_seconds 内复用上次读取结果。
+        """
+        now = time.time()
+        meta = self._meta()
+        for source in (list(sources) if sources else [None]):
+            last = meta.get(f'last_refresh:{source}' if source else 'last_refresh')
+            if last is None or now - float(last) > max_age_seconds:
+                return True
+        if isinstance(sources, Mapping):
+            for name, info in sources.items():
+                if meta.get(f'dir_signature:{name}') != self._current_signature(Path(info['path'])):
+                    return True
+        return False
+
+    # ==========================================
+    # 查询
+    # ==========================================
+
+    def get_categories(self, source: Optional[str] = None) -> List[str]:
+        """所有数据类别"""
+        sql = 'SELECT DISTINCT category FROM files'
+        params: tuple = ()
+        if source:
+            sql += ' WHERE source = ?'
+            params = (source,)
+        with self._connection() as conn:
+            return [row['category'] for row in conn.execute(sql + ' ORDER BY category', params)]
+
+    def get_apis(self, category: str, source: Optional[str] = None) -> List[str]:
+        """指定类别下的所有API"""
+        sql = 'SELECT DISTINCT api FROM files WHERE category = ?'
+        params: tuple = (category,)
+        if source:
+            sql += ' AND source = ?'
+            params += (source,)
+        with self._connection() as conn:
+            return [row['api'] for row in conn.execute(sql + ' ORDER BY api', params)]
+
+    def get_files(self, category: str, api: str, source: Optional[str] = None,
+                  file_format: Optional[str] = 'csv') -> List[Dict[str, Any]]:
+        """指定API下的文件, 按来源优先级和文件名排序"""
+        sql = 'SELECT * FROM files WHERE category = ? AND api = ?'
+        params: tuple = (category, api)
+        if source:
+            sql += ' AND source = ?'
+            params += (source,)
+        if file_format:
+            sql += ' AND format = ?'
+            params += (file_format,)
+        with self._connection() as conn:
+            rows = conn.execute(sql + ' ORDER BY priority, filename', params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def find_file(self, category: str, api: str, filename: Optional[str] = None,
+                  source: Optional[str] = None) -> Optional[Path]:
+        """定位最佳数据文件: 最高优先级来源, 指定文件名时精确匹配"""
+        sql = "SELECT path FROM files WHERE category = ? AND api = ? AND format = 'csv'"
+        params: tuple = (category, api)
+        if source:
+            sql += ' AND source = ?'
+            params += (source,)
+        if filename:
+            if not Path(filename).suffix:
+                filename = f'{filename}.csv'
+            sql += ' AND filename = ?'
+            params += (filename,)
+        with self._connection() as conn:
+            row = conn.execute(sql + ' ORDER BY priority, filename LIMIT 1', params).fetchone()
+        return Path(row['path']) if row else None
+
+    def get_file_info(self, path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """单个文件的目录记录"""
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM files WHERE path = ?', (str(path),)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def record_row_count(self, path: Union[str, Path], row_count: int):
+        """记录完整读取文件时得到的行数, 之后无需重新解析即可获得"""
+        with self._connection() as conn:
+            conn.execute('UPDATE files SET row_count = ? WHERE path = ?', (int(row_count), str(path)))
+
+    def dataset_version(self, category: str, api: str, source: Optional[str] = None) -> Optional[str]:
+        """
+        数据集(某个API下全部文件)的版本标识
+
+        目录只用于定位数据集所在的目录; 版本由这些目录下文件的当前 (名称, 大小, mtime) 计算,
+        文件被改写、新增或删除后即使目录尚未刷新也会变化。目录中没有该数据集时返回None。
+        """
+        sql = 'SELECT DISTINCT path FROM files WHERE category = ? AND api = ?'
+        params: tuple = (category, api)
+        if source:
+            sql += ' AND source = ?'
+            params += (source,)
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        if not rows:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        for directory in sorted({os.path.dirname(row['path']) for row in rows}):
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError:
+                # 数据集目录已被删除
+                digest.update(f"{directory}|missing\n".encode())
+                continue
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() not in CATALOG_FILE_SUFFIXES:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                digest.update(f"{entry.path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    def resolve_versions(self, dependencies: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        解析一组依赖的当前版本
+
+        Args:
+            dependencies: 数据集名 "<category>/<api>" 或数据文件路径
+
+        Returns:
+            {依赖: 版本}, 无法解析的依赖版本为None
+        """
+        versions = {}
+        for dependency in dependencies:
+            parts = dependency.split('/')
+            if len(parts) == 2 and not os.path.exists(dependency):
+                versions[dependency] = self.dataset_version(*parts)
+            else:
+                # 单个文件直接stat, 不依赖上次刷新
+                versions[dependency] = file_version(dependency)
+        return versions
+
+    def summarize(self, file_format: Optional[str] = 'csv') -> List[Dict[str, Any]]:
+        """按 (类别, API, 来源) 汇总文件数、大小、行数与日期范围(格式过滤与 get_files 一致)"""
+        where, params = ('WHERE format = ?', (file_format,)) if file_format else ('', ())
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT category, api, source, MIN(priority) AS priority,
+                       COUNT(*) AS total_files, SUM(size_bytes) AS size_bytes,
+                       SUM(row_count) AS row_count, MIN(min_date) AS min_date,
+                       MAX(max_date) AS max_date
+                FROM files
+                {where}
+                GROUP BY category, api, source
+                ORDER BY category, api, priority
+            ''', params).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        """记录转换为字典"""
+        record = dict(row)
+        record['columns'] = json.loads(record['columns']) if record.get('columns') else []
+        record['size_mb'] = record['size_bytes'] / 1024 / 1024
+        return record
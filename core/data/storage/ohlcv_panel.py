@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存映射行情面板
+==============
+
+把全市场日线(及复权日线)编译为定长二进制数组:
+
+    <root>/<name>/header.json        # 形状、字段、各字段数据类型
+    <root>/<name>/dates.npy          # 共享日期轴 (datetime64[D])
+    <root>/<name>/tickers.npy        # 共享股票轴
+    <root>/<name>/<field>.f32        # 每个字段一个 日期 × 股票 的数组(行主序);
+                                     # 价格为float32, 成交量/成交额为float64(.f64)
+
+加载时通过 np.memmap 直接映射文件, 返回NumPy/pandas视图而不复制数据;
+打开整个市场只需读取几KB头信息, 多个进程共享操作系统页缓存。
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Iterable
+
+try:
+    import pandas as pd
+    import numpy as np
+except ImportError:
+    pd = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PANEL_FORMAT_VERSION = 2
+PANEL_DTYPE = 'float32'
+
+# 成交量/成交额可达1e11, float32(24位尾数)误差达万元级, 使用float64保持整数精度
+PANEL_FIELD_DTYPES = {
+    'volume': 'float64',
+    'amount': 'float64',
+}
+
+# 面板字段 -> 候选源列名(MktEqudGet/MktEqudAdjGet及本地样本数据)
+DEFAULT_PANEL_FIELDS = {
+    'open': ['openPrice'],
+    'high': ['highestPrice', 'highPrice'],
+    'low': ['lowestPrice', 'lowPrice'],
+    'close': ['closePrice'],
+    'pre_close': ['preClosePrice'],
+    'volume': ['turnoverVol', 'volume'],
+    'amount': ['turnoverValue'],
+}
+
+
+def _read_frame(path: Union[str, Path], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """读取CSV/Parquet文件的指定列"""
+    path = Path(path)
+    if path.suffix.lower() == '.parquet':
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, dtype={'ticker': str})
+
+
+def _field_file(panel_dir: Path, field: str, dtype: str) -> Path:
+    """字段数组文件路径, 后缀标明数据类型"""
+    return panel_dir / f"{field}.f{np.dtype(dtype).itemsize * 8}"
+
+
+def _read_header(path: Union[str, Path]) -> List[str]:
+    """读取文件列名"""
+    path = Path(path)
+    if path.suffix.lower() == '.parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def build_ohlcv_panel(files: Iterable[Union[str, Path]],
+                      output_dir: Union[str, Path],
+                      fields: Optional[Dict[str, List[str]]] = None,
+                      ticker_col: str = 'ticker',
+                      date_col: str = 'tradeDate') -> Dict[str, Any]:
+    """
+    将日线文件编译为内存映射面板
+
+    两遍扫描: 第一遍只读股票/日期列确定坐标轴, 第二遍逐文件把字段写入memmap,
+    任何时刻内存中只有一个文件的数据。文件可以是单股票文件或多股票批次文件。
+
+    Args:
+        files: CSV/Parquet文件路径
+        output_dir: 面板输出目录(如 data/panel/daily)
+        fields: 面板字段 -> 候选源列名, 默认 DEFAULT_PANEL_FIELDS
+        ticker_col: 股票代码列
+        date_col: 交易日期列
+
+    Returns:
+        面板头信息
+    """
+    files = [Path(f) for f in files]
+    fields = fields or DEFAULT_PANEL_FIELDS
+    output_dir = Path(output_dir)
+
+    # 第一遍: 坐标轴与可用字段
+    dates, tickers = set(), set()
+    available_fields = set()
+    for path in files:
+        header = _read_header(path)
+        if ticker_col not in header or date_col not in header:
+            logger.warning(f"跳过缺少 {ticker_col}/{date_col} 的文件: {path}")
+            continue
+        for field, candidates in fields.items():
+            if any(col in header for col in candidates):
+                available_fields.add(field)
+        keys = _read_frame(path, [ticker_col, date_col])
+        tickers.update(keys[ticker_col].astype(str).unique())
+        dates.update(pd.to_datetime(keys[date_col], errors='coerce').dropna().unique())
+
+    date_axis = pd.DatetimeIndex(sorted(dates)).values.astype('datetime64[D]')
+    ticker_axis = np.array(sorted(tickers), dtype=str)
+    field_names = [field for field in fields if field in available_fields]
+    field_dtypes = {field: PANEL_FIELD_DTYPES.get(field, PANEL_DTYPE) for field in field_names}
+    shape = (len(date_axis), len(ticker_axis))
+
+    # 写入临时目录, 完成后整体替换, 读者不会看到半成品
+    tmp_dir = output_dir.with_name(output_dir.name + '.building')
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / 'dates.npy', date_axis)
+    np.save(tmp_dir / 'tickers.npy', ticker_axis)
+
+    arrays = {}
+    for field in field_names:
+        arrays[field] = np.memmap(_field_file(tmp_dir, field, field_dtypes[field]),
+                                  dtype=field_dtypes[field], mode='w+', shape=shape)
+        arrays[field][:] = np.nan
+
+    # 第二遍: 填充字段
+    date_index = pd.DatetimeIndex(date_axis)
+    ticker_index = pd.Index(ticker_axis)
+    for path in files:
+        header = _read_header(path)
+        if ticker_col not in header or date_col not in header:
+            continue
+        source_cols = {
+            field: next(col for col in fields[field] if col in header)
+            for field in field_names if any(col in header for col in fields[field])
+        }
+        frame = _read_frame(path, [ticker_col, date_col] + list(set(source_cols.values())))
+        rows = date_index.get_indexer(pd.to_datetime(frame[date_col], errors='coerce'))
+        cols = ticker_index.get_indexer(frame[ticker_col].astype(str))
+        valid = (rows >= 0) & (cols >= 0)
+        for field, source_col in source_cols.items():
+            values = pd.to_numeric(frame[source_col], errors='coerce').to_numpy(dtype=field_dtypes[field])
+            arrays[field][rows[valid], cols[valid]] = values[valid]
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    header = {
+        'version': PANEL_FORMAT_VERSION,
+        'dtype': PANEL_DTYPE,
+        'dtypes': field_dtypes,
+        'shape': list(shape),
+        'fields': field_names,
+        'start_date': str(date_axis[0]) if len(date_axis) else None,
+        'end_date': str(date_axis[-1]) if len(date_axis) else None,
+        'source_files': len(files),
+    }
+    with open(tmp_dir / 'header.json', 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False, indent=2)
+
+    # 旧面板先改名让位, 新面板随即换入后再删除旧目录: 任何时刻目录下都有完整面板
+    # (已打开旧面板的读者继续使用已映射的文件)
+    retired = output_dir.with_name(output_dir.name + '.old')
+    if retired.exists():
+        shutil.rmtree(retired)
+    if output_dir.exists():
+        os.rename(output_dir, retired)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(retired, ignore_errors=True)
+
+    logger.info(f"行情面板构建完成: {output_dir} {shape[0]}日 × {shape[1]}股, 字段{field_names}")
+    return header
+
+
+class OHLCVPanel:
+    """内存映射行情面板
+
+    负责：
+    - 只读映射面板字段文件, 按需打开
+    - 返回不复制数据的NumPy数组与pandas宽表视图
+    - 按股票/日期区间切片
+    """
+
+    def __init__(self, panel_dir: Union[str, Path]):
+        """打开面板
+
+        Args:
+            panel_dir: build_ohlcv_panel 的输出目录
+        """
+        self.panel_dir = Path(panel_dir)
+        with open(self.panel_dir / 'header.json', 'r', encoding='utf-8') as f:
+            self.header = json.load(f)
+        if self.header.get('version') not in (1, PANEL_FORMAT_VERSION):
+            raise ValueError(f"不支持的面板格式版本: {self.header.get('version')}")
+
+        self.shape = tuple(self.header['shape'])
+        self.fields = list(self.header['fields'])
+        # 版本1的面板所有字段同一类型
+        self.dtypes = self.header.get('dtypes') or {field: self.header['dtype'] for field in self.fields}
+        self.dates = pd.DatetimeIndex(np.load(self.panel_dir / 'dates.npy', mmap_mode='r'))
+        self.tickers = pd.Index(np.load(self.panel_dir / 'tickers.npy'))
+        self._arrays: Dict[str, np.memmap] = {}
+
+    @classmethod
+    def exists(cls, panel_dir: Union[str, Path]) -> bool:
+        """面板是否已构建"""
+        return (Path(panel_dir) / 'header.json').exists()
+
+    def array(self, field: str) -> np.memmap:
+        """字段的 日期 × 股票 只读memmap数组"""
+        if field not in self.fields:
+            raise KeyError(f"面板中没有字段: {field}")
+        if field not in self._arrays:
+            dtype = self.dtypes[field]
+            self._arrays[field] = np.memmap(_field_file(self.panel_dir, field, dtype), dtype=dtype,
+                                            mode='r', shape=self.shape)
+        return self._arrays[field]
+
+    def _date_slice(self, start_date=None, end_date=None) -> slice:
+        """日期区间对应的行切片"""
+        start = self.dates.searchsorted(pd.Timestamp(start_date)) if start_date is not None else 0
+        end = self.dates.searchsorted(pd.Timestamp(end_date), side='right') if end_date is not None \
+            else len(self.dates)
+        return slice(start, end)
+
+    def frame(self, field: str, start_date=None, end_date=None) -> pd.DataFrame:
+        """字段的 日期 × 股票 宽表(基于memmap视图, 不复制)"""
+        rows = self._date_slice(start_date, end_date)
+        return pd.DataFrame(self.array(field)[rows], index=self.dates[rows],
+                            columns=self.tickers, copy=False)
+
+    def ticker_frame(self, ticker: str, fields: Optional[List[str]] = None,
+                     start_date=None, end_date=None, dropna: bool = True) -> pd.DataFrame:
+        """单只股票的多字段时间序列"""
+        col = self.tickers.get_loc(str(ticker))
+        rows = self._date_slice(start_date, end_date)
+        fields = fields or self.fields
+        frame = pd.DataFrame({field: self.array(field)[rows, col] for field in fields},
+                             index=self.dates[rows])
+        return frame.dropna(how='all') if dropna else frame
+
+    def cross_section(self, date, fields: Optional[List[str]] = None) -> pd.DataFrame:
+        """某个交易日的全市场截面"""
+        row = self.dates.get_loc(pd.Timestamp(date))
+        fields = fields or self.fields
+        return pd.DataFrame({field: self.array(field)[row] for field in fields}, index=self.tickers)
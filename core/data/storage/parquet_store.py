@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet数据湖
+============
+
+将每个API数据集(mktequd、mktequflow、fdmt*等)保存为hive分区的Parquet数据集:
+
+    <root>/<category>/<api>/year=2024/bucket=07/part-xxxx.parquet
+
+读取时把列裁剪和日期/股票过滤下推到分区目录与row group统计信息,
+单只股票或单月查询只读取极少量数据, 而不必解析整份CSV。
+
+数据集的Arrow schema记录在 _dataset.json 中: 后续批次按其转换列类型,
+类型可兼容放宽时(int→float, 全空→string)更新schema, 已有文件读取时按新schema转换。
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import base64
+import json
+import logging
+import os
+import shutil
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Iterable, Iterator
+
+try:
+    import pandas as pd
+    import numpy as np
+except ImportError:
+    pd = None
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 常见日期列, 按优先级排列
+DATE_COLUMN_CANDIDATES = ['tradeDate', 'endDate', 'publishDate', 'calendarDate',
+                          'exDivDate', 'beginDate']
+
+# 数据集元信息文件
+DATASET_META_FILE = '_dataset.json'
+
+
+def detect_date_column(columns: Iterable[str]) -> Optional[str]:
+    """识别日期列: 优先常见列名, 其次第一个含date的列"""
+    columns = list(columns)
+    for candidate in DATE_COLUMN_CANDIDATES:
+        if candidate in columns:
+            return candidate
+    for col in columns:
+        if 'date' in col.lower():
+            return col
+    return None
+
+
+def _encode_schema(schema: 'pa.Schema') -> str:
+    """schema -> 可写入JSON的字符串"""
+    return base64.b64encode(schema.serialize().to_pybytes()).decode('ascii')
+
+
+def _decode_schema(encoded: str) -> 'pa.Schema':
+    """_encode_schema 的逆操作"""
+    return pa.ipc.read_schema(pa.py_buffer(base64.b64decode(encoded)))
+
+
+def _merge_field_type(current: 'pa.DataType', incoming: 'pa.DataType') -> Optional['pa.DataType']:
+    """合并同一列的类型: 返回可同时容纳两者的类型, 不兼容(如 float 与 string)时返回None"""
+    if current == incoming or pa.types.is_null(incoming):
+        return current
+    if pa.types.is_null(current):
+        return incoming
+    try:
+        merged = pa.unify_schemas([pa.schema([('f', current)]), pa.schema([('f', incoming)])],
+                                  promote_options='permissive')
+        return merged.field('f').type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # 不兼容, 或旧版pyarrow不支持类型放宽
+        return None
+
+
+def _coerce_column(column: 'pa.ChunkedArray', target: 'pa.DataType') -> 'pa.ChunkedArray':
+    """把一列转换为目标类型, 无法转换的值置空"""
+    if column.type == target:
+        return column
+    try:
+        return column.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        pass
+    values = column.to_pandas()
+    if pa.types.is_integer(target) or pa.types.is_floating(target):
+        values = pd.to_numeric(values, errors='coerce')
+    elif pa.types.is_timestamp(target):
+        values = pd.to_datetime(values, errors='coerce')
+    elif pa.types.is_string(target) or pa.types.is_large_string(target):
+        values = values.where(values.isna(), values.astype(str))
+    else:
+        return pa.chunked_array([pa.nulls(len(column), target)])
+    return pa.chunked_array([pa.array(values, type=target, from_pandas=True, safe=False)])
+
+
+def ticker_bucket(tickers: Union[pd.Series, Iterable[str]], n_buckets: int) -> np.ndarray:
+    """稳定的股票分桶(crc32取模, 跨进程/版本一致); 每个不同代码只哈希一次"""
+    codes, uniques = pd.factorize(pd.Series(tickers, dtype=object).astype(str))
+    buckets = np.fromiter((zlib.crc32(t.encode('utf-8')) % n_buckets for t in uniques),
+                          dtype=np.int16, count=len(uniques))
+    return buckets[codes]
+
+
+class ParquetDataLake:
+    """Parquet数据湖
+    
+    负责：
+    - CSV/DataFrame 按 年份 × 股票分桶 写入hive分区数据集
+    - 列裁剪、日期范围与股票列表的谓词下推读取
+    - 数据集元信息(日期列、股票列、分桶数)管理
+    """
+    
+    def __init__(self, root: Union[str, Path] = 'data/parquet_lake',
+                 n_buckets: int = 32,
+                 row_group_size: int = 64 * 1024,
+                 compression: str = 'zstd'):
+        """初始化数据湖
+        
+        Args:
+            root: 数据湖根目录
+            n_buckets: 新建数据集的股票分桶数
+            row_group_size: 每个row group的最大行数
+            compression: Parquet压缩算法
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Parquet数据湖需要pyarrow，请安装: pip install pyarrow")
+        
+        self.root = Path(root)
+        self.n_buckets = n_buckets
+        self.row_group_size = row_group_size
+        self.compression = compression
+    
+    # ==========================================
+    # 元信息
+    # ==========================================
+    
+    def dataset_path(self, category: str, api: str) -> Path:
+        """数据集目录"""
+        return self.root / category / api
+    
+    def has_dataset(self, category: str, api: str) -> bool:
+        """数据集是否存在"""
+        return (self.dataset_path(category, api) / DATASET_META_FILE).exists()
+    
+    def get_dataset_meta(self, category: str, api: str) -> Optional[Dict[str, Any]]:
+        """读取数据集元信息"""
+        return self._read_meta(self.dataset_path(category, api))
+    
+    @staticmethod
+    def _read_meta(path: Path) -> Optional[Dict[str, Any]]:
+        """读取指定目录的数据集元信息"""
+        meta_path = path / DATASET_META_FILE
+        if not meta_path.exists():
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_meta(path: Path, meta: Dict[str, Any]):
+        """原子保存数据集元信息"""
+        path.mkdir(parents=True, exist_ok=True)
+        tmp_file = path / (DATASET_META_FILE + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, path / DATASET_META_FILE)
+    
+    # ==========================================
+    # 写入
+    # ==========================================
+    
+    def write(self, category: str, api: str, df: pd.DataFrame,
+              date_col: Optional[str] = None, ticker_col: str = 'ticker') -> int:
+        """
+        追加写入一批数据到分区数据集
+        
+        Args:
+            category: 数据类别
+            api: API名称
+            df: 数据
+            date_col: 日期列, 默认自动识别
+            ticker_col: 股票代码列, 不存在时只按年份分区
+            
+        Returns:
+            写入行数
+        """
+        return self._write_to(self.dataset_path(category, api), df, date_col, ticker_col)
+    
+    def _write_to(self, path: Path, df: pd.DataFrame,
+                  date_col: Optional[str] = None, ticker_col: str = 'ticker') -> int:
+        """追加写入一批数据到指定目录的分区数据集"""
+        if df is None or df.empty:
+            return 0
+        
+        meta = self._read_meta(path)
+        if meta is None:
+            meta = {
+                'date_col': date_col or detect_date_column(df.columns),
+                'ticker_col': ticker_col if ticker_col in df.columns else None,
+                'n_buckets': self.n_buckets,
+            }
+        
+        table = self._to_partitioned_table(df, meta)
+        table, schema = self._conform_table(table, meta.get('schema'))
+        encoded = _encode_schema(schema)
+        if meta.get('schema') != encoded:
+            meta['schema'] = encoded
+            self._write_meta(path, meta)
+        
+        partition_cols = [name for name in ('year', 'bucket') if name in table.column_names]
+        ds.write_dataset(
+            table,
+            base_dir=str(path),
+            format='parquet',
+            partitioning=ds.partitioning(
+                pa.schema([(name, table.schema.field(name).type) for name in partition_cols]),
+                flavor='hive'
+            ) if partition_cols else None,
+            basename_template=f'part-{uuid.uuid4().hex[:12]}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            max_rows_per_group=self.row_group_size,
+            file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+        )
+        
+        return len(df)
+    
+    @staticmethod
+    def _conform_table(table: 'pa.Table', encoded_schema: Optional[str]):
+        """
+        按数据集schema转换一批数据
+        
+        Returns:
+            (转换后的表, 合并后的数据集schema); 新增列追加到schema末尾, 缺失列补空值
+        """
+        if not encoded_schema:
+            return table, table.schema
+        
+        schema = _decode_schema(encoded_schema)
+        fields, incompatible = [], []
+        for field in schema:
+            if field.name in table.column_names:
+                merged = _merge_field_type(field.type, table.schema.field(field.name).type)
+                if merged is None:
+                    incompatible.append(field.name)
+                else:
+                    field = field.with_type(merged)
+            fields.append(field)
+        fields.extend(field for field in table.schema if field.name not in schema.names)
+        schema = pa.schema(fields, metadata=schema.metadata)
+        if incompatible:
+            logger.warning(f"列类型与数据集不一致, 按数据集类型转换(无法转换的值置空): {incompatible}")
+        
+        columns = [
+            _coerce_column(table.column(field.name), field.type) if field.name in table.column_names
+            else pa.chunked_array([pa.nulls(len(table), field.type)])
+            for field in schema
+        ]
+        return pa.Table.from_arrays(columns, schema=schema), schema
+    
+    def _to_partitioned_table(self, df: pd.DataFrame, meta: Dict[str, Any]) -> 'pa.Table':
+        """补充分区列并排序, 使row group的min/max统计具备选择性"""
+        df = df.copy()
+        date_col = meta.get('date_col')
+        ticker_col = meta.get('ticker_col')
+        sort_cols = []
+        
+        if ticker_col and ticker_col in df.columns:
+            df[ticker_col] = df[ticker_col].astype(str)
+            df['bucket'] = ticker_bucket(df[ticker_col], meta['n_buckets'])
+            sort_cols.append(ticker_col)
+        
+        if date_col and date_col in df.columns:
+            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+            df['year'] = df[date_col].dt.year.fillna(0).astype(np.int16)
+            sort_cols.append(date_col)
+        
+        if sort_cols:
+            df = df.sort_values(sort_cols, kind='mergesort')
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # 本批全空的列记为null类型, 由后续批次决定实际类型
+        for i, field in enumerate(table.schema):
+            if len(table) and table.column(i).null_count == len(table) and not pa.types.is_null(field.type):
+                table = table.set_column(i, pa.field(field.name, pa.null()), pa.nulls(len(table)))
+        return table
+    
+    def import_csv(self, category: str, api: str,
+                   csv_files: Iterable[Union[str, Path]],
+                   chunk_size: int = 500000,
+                   date_col: Optional[str] = None,
+                   ticker_col: str = 'ticker') -> int:
+        """
+        将CSV文件流式导入数据湖(每次只持有一个块)
+        
+        导入写入临时目录并合并小文件, 完成后替换原数据集; 重复导入不会产生重复记录,
+        导入失败时原数据集保持不变。
+        
+        Returns:
+            导入总行数
+        """
+        target = self.dataset_path(category, api)
+        staging = target.with_name(f'.{target.name}.importing-{uuid.uuid4().hex[:8]}')
+        total_rows = 0
+        try:
+            for csv_file in csv_files:
+                logger.info(f"导入Parquet数据湖: {csv_file}")
+                for chunk in pd.read_csv(csv_file, chunksize=chunk_size, low_memory=False,
+                                         dtype={ticker_col: str}):
+                    total_rows += self._write_to(staging, chunk, date_col, ticker_col)
+            if total_rows:
+                self._compact_path(staging)
+                self._swap_in(staging, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return total_rows
+    
+    @staticmethod
+    def _swap_in(staging: Path, target: Path):
+        """用新写入的数据集目录替换原目录"""
+        retired = target.with_name(f'.{target.name}.old-{uuid.uuid4().hex[:8]}')
+        if target.exists():
+            target.rename(retired)
+        try:
+            staging.rename(target)
+        except OSError:
+            if retired.exists():
+                retired.rename(target)
+            raise
+        shutil.rmtree(retired, ignore_errors=True)
+    
+    def compact(self, category: str, api: str) -> int:
+        """
+        合并数据集中每个分区的小文件(追加写入多次后使用)
+        
+        Returns:
+            合并的分区数
+        """
+        path = self.dataset_path(category, api)
+        if self._read_meta(path) is None:
+            return 0
+        return self._compact_path(path)
+    
+    def _compact_path(self, path: Path) -> int:
+        """把每个分区目录下的多个文件合并为一个(按股票/日期排序, 保持row group选择性)"""
+        meta = self._read_meta(path)
+        schema = _decode_schema(meta['schema']) if meta and meta.get('schema') else None
+        sort_keys = [(col, 'ascending') for col in ((meta or {}).get('ticker_col'), (meta or {}).get('date_col'))
+                     if col]
+        
+        partitions: Dict[Path, List[Path]] = {}
+        for part_file in path.rglob('*.parquet'):
+            partitions.setdefault(part_file.parent, []).append(part_file)
+        
+        compacted = 0
+        for directory, files in partitions.items():
+            if len(files) < 2:
+                continue
+            tables = [pq.read_table(f, partitioning=None) for f in files]
+            if schema is not None:
+                file_schema = pa.schema([field for field in schema if field.name not in ('year', 'bucket')])
+                tables = [pa.Table.from_arrays(
+                    [_coerce_column(t.column(field.name), field.type) if field.name in t.column_names
+                     else pa.chunked_array([pa.nulls(len(t), field.type)]) for field in file_schema],
+                    schema=file_schema) for t in tables]
+            table = pa.concat_tables(tables)
+            present_keys = [key for key in sort_keys if key[0] in table.column_names]
+            if present_keys:
+                table = table.sort_by(present_keys)
+            
+            tmp_file = directory / f'.compact-{uuid.uuid4().hex[:12]}.parquet.tmp'
+            pq.write_table(table, tmp_file, row_group_size=self.row_group_size,
+                           compression=self.compression)
+            tmp_file.rename(directory / f'part-{uuid.uuid4().hex[:12]}-0.parquet')
+            for f in files:
+                f.unlink(missing_ok=True)
+            compacted += 1
+        return compacted
+    
+    # ==========================================
+    # 读取
+    # ==========================================
+    
+    def build_filter(self, meta: Dict[str, Any],
+                     date_range: Optional[tuple] = None,
+                     tickers: Optional[List[str]] = None,
+                     schema: Optional['pa.Schema'] = None) -> Optional['ds.Expression']:
+        """构造分区裁剪 + row group过滤表达式"""
+        expression = None
+        
+        def _and(left, right):
+            return right if left is None else left & right
+        
+        date_col = meta.get('date_col')
+        if date_range and date_col:
+            date_type = pa.timestamp('ns')
+            if schema is not None and date_col in schema.names:
+                date_type = schema.field(date_col).type
+            start, end = (pd.Timestamp(d) if d is not None else None for d in date_range)
+            if start is not None:
+                expression = _and(expression, ds.field('year') >= start.year)
+                expression = _and(expression, ds.field(date_col) >=
+                                  pa.scalar(start.to_pydatetime(), date_type))
+            if end is not None:
+                expression = _and(expression, ds.field('year') <= end.year)
+                expression = _and(expression, ds.field(date_col) <=
+                                  pa.scalar(end.to_pydatetime(), date_type))
+        
+        ticker_col = meta.get('ticker_col')
+        if tickers and ticker_col:
+            tickers = [str(t) for t in tickers]
+            buckets = sorted(set(ticker_bucket(tickers, meta['n_buckets']).tolist()))
+            expression = _and(expression, ds.field('bucket').isin(buckets))
+            expression = _and(expression, ds.field(ticker_col).isin(tickers))
+        
+        return expression
+    
+    def read(self, category: str, api: str,
+             columns: Optional[List[str]] = None,
+             date_range: Optional[tuple] = None,
+             tickers: Optional[List[str]] = None,
+             max_rows: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        带谓词下推的读取
+        
+        Args:
+            category: 数据类别
+            api: API名称
+            columns: 需要的列(不存在的列自动忽略)
+            date_range: (开始日期, 结束日期), 任一端可为None
+            tickers: 股票代码列表
+            max_rows: 最大返回行数
+            
+        Returns:
+            DataFrame, 数据集不存在时返回None
+        """
+        scanner = self._scanner(category, api, columns, date_range, tickers)
+        if scanner is None:
+            return None
+        
+        table = scanner.head(max_rows) if max_rows else scanner.to_table()
+        
+        return table.to_pandas()
+    
+    def iter_batches(self, category: str, api: str,
+                     columns: Optional[List[str]] = None,
+                     date_range: Optional[tuple] = None,
+                     tickers: Optional[List[str]] = None,
+                     batch_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        带谓词下推的流式读取, 每次产出不超过 batch_rows 行的DataFrame
+        
+        参数同 read; 数据集不存在时不产出任何批次。
+        """
+        scanner = self._scanner(category, api, columns, date_range, tickers, batch_rows)
+        if scanner is None:
+            return
+        
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+    
+    def _scanner(self, category: str, api: str,
+                 columns: Optional[List[str]] = None,
+                 date_range: Optional[tuple] = None,
+                 tickers: Optional[List[str]] = None,
+                 batch_rows: Optional[int] = None) -> Optional['ds.Scanner']:
+        """构建带列裁剪与过滤条件的扫描器"""
+        meta = self.get_dataset_meta(category, api)
+        if meta is None:
+            return None
+        
+        dataset = self.open_dataset(category, api)
+        partition_cols = {'year', 'bucket'}
+        available = [name for name in dataset.schema.names if name not in partition_cols]
+        if columns:
+            selected = [col for col in columns if col in available] or available
+        else:
+            selected = available
+        
+        kwargs = {'batch_size': batch_rows} if batch_rows else {}
+        return dataset.scanner(columns=selected,
+                               filter=self.build_filter(meta, date_range, tickers, dataset.schema),
+                               **kwargs)
+    
+    def open_dataset(self, category: str, api: str) -> 'ds.Dataset':
+        """打开分区数据集(按记录的schema读取, 类型放宽前写入的文件自动转换)"""
+        meta = self.get_dataset_meta(category, api) or {}
+        schema = _decode_schema(meta['schema']) if meta.get('schema') else None
+        return ds.dataset(str(self.dataset_path(category, api)), format='parquet',
+                          schema=schema, partitioning='hive', exclude_invalid_files=True,
+                          ignore_prefixes=['_', '.'])
+    
+    def list_datasets(self) -> List[Dict[str, str]]:
+        """列出数据湖中的所有数据集"""
+        return [
+            {'category': meta_file.parent.parent.name, 'api': meta_file.parent.name}
+            for meta_file in sorted(self.root.glob(f'*/*/{DATASET_META_FILE}'))
+        ]
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据表结构注册表
+==============
+
+为每个API登记列类型、分类词表和日期解析规则, 在解析CSV时直接生成紧凑类型:
+
+- 证券代码/交易所等低基数字符串 -> category(词表固定编码顺序)
+- 价格、比率 -> float32; 成交量/成交额/市值 -> float64(保留整数精度)
+- 日期列 -> datetime64
+
+分类、字符串与浮点类型在 read_csv 解析阶段生效; 文件中的数值列含 '--' 等非法值导致解析失败时,
+该文件(分块读取时为剩余分块)退回按默认规则解析后转换为登记类型, 非法值置为NaN。
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Iterable, Iterator
+
+try:
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+except ImportError:
+    pd = None
+    union_categoricals = None
+
+logger = logging.getLogger(__name__)
+
+# 交易所代码词表
+EXCHANGE_VOCAB = ['XSHG', 'XSHE', 'XBEI', 'XHKG', 'CCFX', 'XSGE', 'XDCE', 'XZCE', 'XINE']
+
+# 通用列规则: 各API同名列含义一致
+COMMON_COLUMN_DTYPES = {
+    # 标识列
+    'secID': 'category',
+    'ticker': 'category',
+    'symbol': 'category',
+    'exchangeCD': 'category',
+    'secShortName': 'category',
+    'shortName': 'category',
+    'industry': 'category',
+    'listStatusCD': 'category',
+    'equTypeCD': 'category',
+    'currencyCD': 'category',
+    # 价格
+    'preClosePrice': 'float32',
+    'actPreClosePrice': 'float32',
+    'openPrice': 'float32',
+    'highestPrice': 'float32',
+    'lowestPrice': 'float32',
+    'closePrice': 'float32',
+    'highPrice': 'float32',
+    'lowPrice': 'float32',
+    'vwap': 'float32',
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'close': 'float32',
+    # 比率
+    'chgPct': 'float32',
+    'turnoverRate': 'float32',
+    'PE': 'float32',
+    'PE1': 'float32',
+    'PB': 'float32',
+    # 成交量/金额/市值(数值大, 使用float64以保留整数精度)
+    'turnoverVol': 'float64',
+    'turnoverValue': 'float64',
+    'dealAmount': 'float64',
+    'marketValue': 'float64',
+    'negMarketValue': 'float64',
+    'volume': 'float64',
+    'amount': 'float64',
+    'isOpen': 'float32',
+    # 累积复权因子为多次除权因子的连乘, float32 的相对误差会随复权传导到全部历史价格
+    'accumAdjFactor': 'float64',
+}
+
+# 列名后缀规则(未在通用列/API列中登记时使用)
+SUFFIX_DTYPES = {
+    'Price': 'float32',
+    'Pct': 'float32',
+}
+
+COMMON_CATEGORIES = {
+    'exchangeCD': EXCHANGE_VOCAB,
+    'listStatusCD': ['L', 'S', 'DE', 'UN', 'O'],
+}
+
+# 各API的专属规则, 键为小写API名(与数据目录中的目录名一致)
+API_SCHEMAS = {
+    'mktequdget': {
+        'date_columns': ['tradeDate'],
+    },
+    'mktequdadjget': {
+        'date_columns': ['tradeDate'],
+    },
+    'mktequwget': {
+        'date_columns': ['endDate', 'tradeDate'],
+    },
+    'mktequmget': {
+        'date_columns': ['endDate', 'tradeDate'],
+    },
+    'mktidxdget': {
+        'columns': {'indexID': 'category'},
+        'date_columns': ['tradeDate'],
+    },
+    'mktadjfget': {
+        'columns': {'adjFactor': 'float64'},
+        'date_columns': ['exDivDate', 'endDate'],
+    },
+    'equget': {
+        'date_columns': ['listDate', 'delistDate'],
+    },
+    'fdmtefget': {
+        'date_columns': ['publishDate', 'endDate'],
+    },
+    # 适配器标准化后的输出
+    'price': {
+        'date_columns': ['date'],
+    },
+    'stock_list': {
+        'date_columns': ['list_date', 'delist_date'],
+    },
+    'financial': {
+        'date_columns': ['end_date', 'ann_date', 'publishDate'],
+    },
+}
+
+
+class SchemaRegistry:
+    """数据表结构注册表
+
+    负责：
+    - 合并通用列规则与API专属规则
+    - 生成 read_csv 的 dtype/parse_dates 参数, 在解析阶段应用紧凑类型
+    - 对API返回的DataFrame做同样的类型规整
+    - 合并分块/分批结果时保持分类类型
+    """
+
+    def __init__(self, schema_file: Optional[Union[str, Path]] = None):
+        """初始化注册表
+
+        Args:
+            schema_file: 可选的JSON结构文件, 格式同 API_SCHEMAS
+        """
+        self.schemas: Dict[str, Dict[str, Any]] = {
+            api: {
+                'columns': dict(schema.get('columns', {})),
+                'categories': dict(schema.get('categories', {})),
+                'date_columns': list(schema.get('date_columns', [])),
+            }
+            for api, schema in API_SCHEMAS.items()
+        }
+        if schema_file is not None and Path(schema_file).exists():
+            self.load(schema_file)
+
+    def register(self, api: str, columns: Optional[Dict[str, str]] = None,
+                 categories: Optional[Dict[str, List[str]]] = None,
+                 date_columns: Optional[List[str]] = None):
+        """登记或扩展API结构"""
+        schema = self.schemas.setdefault(api.lower(), {'columns': {}, 'categories': {}, 'date_columns': []})
+        schema['columns'].update(columns or {})
+        schema['categories'].update(categories or {})
+        for col in date_columns or []:
+            if col not in schema['date_columns']:
+                schema['date_columns'].append(col)
+
+    def load(self, schema_file: Union[str, Path]):
+        """从JSON文件加载API结构"""
+        with open(schema_file, 'r', encoding='utf-8') as f:
+            for api, schema in json.load(f).items():
+                self.register(api, schema.get('columns'), schema.get('categories'),
+                              schema.get('date_columns'))
+
+    def _api_schema(self, api: Optional[str]) -> Dict[str, Any]:
+        return self.schemas.get((api or '').lower(), {'columns': {}, 'categories': {}, 'date_columns': []})
+
+    def resolve(self, api: Optional[str], columns: Iterable[str]) -> Dict[str, Any]:
+        """
+        解析给定列的类型规则
+
+        Args:
+            api: API名称(大小写不敏感), 未登记时只使用通用规则
+            columns: 实际存在的列
+
+        Returns:
+            {'dtype': {列: 类型}, 'parse_dates': [日期列], 'categories': {列: 词表}}
+        """
+        schema = self._api_schema(api)
+        dtypes, parse_dates = {}, []
+
+        for col in columns:
+            if col in schema['date_columns'] or (not schema['date_columns'] and col.endswith('Date')):
+                parse_dates.append(col)
+                continue
+            dtype = schema['columns'].get(col) or COMMON_COLUMN_DTYPES.get(col)
+            if dtype is None:
+                dtype = next((d for suffix, d in SUFFIX_DTYPES.items() if col.endswith(suffix)), None)
+            if dtype is not None:
+                dtypes[col] = dtype
+
+        categories = {col: vocab for col, vocab in {**COMMON_CATEGORIES, **schema['categories']}.items()
+                      if dtypes.get(col) == 'category'}
+        return {'dtype': dtypes, 'parse_dates': parse_dates, 'categories': categories}
+
+    def read_csv_kwargs(self, api: Optional[str], columns: Iterable[str]) -> Dict[str, Any]:
+        """生成 pd.read_csv 的 dtype / parse_dates 参数"""
+        rules = self.resolve(api, columns)
+        return {'dtype': rules['dtype'], 'parse_dates': rules['parse_dates']}
+
+    def read_csv(self, path: Union[str, Path], api: Optional[str] = None,
+                 usecols: Optional[List[str]] = None, **kwargs) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        按注册结构读取CSV
+
+        Args:
+            path: 文件路径
+            api: API名称
+            usecols: 需要的列, 不存在的列自动忽略
+            **kwargs: 透传给 pd.read_csv (如 chunksize, nrows)
+
+        Returns:
+            DataFrame; 指定 chunksize 时返回分块迭代器
+        """
+        header = list(pd.read_csv(path, nrows=0).columns)
+        if usecols:
+            selected = [col for col in usecols if col in header]
+            usecols = selected or None
+        columns = usecols or header
+        rules = self.resolve(api, columns)
+        numeric = {col: dtype for col, dtype in rules['dtype'].items() if self._is_numeric(dtype)}
+        parse_dtypes = {col: dtype for col, dtype in rules['dtype'].items() if col not in numeric}
+        # 浮点类型直接交给解析器; 整数类型无法表示缺失值, 解析后再转换
+        float_dtypes = {col: dtype for col, dtype in numeric.items()
+                        if pd.api.types.is_float_dtype(pd.api.types.pandas_dtype(dtype))}
+
+        def read(dtypes):
+            return pd.read_csv(path, usecols=usecols, dtype=dtypes,
+                               parse_dates=rules['parse_dates'], low_memory=False, **kwargs)
+
+        if kwargs.get('chunksize') or kwargs.get('iterator'):
+            return self._read_chunks(read, parse_dtypes, float_dtypes, numeric, rules['categories'])
+        try:
+            frame = read({**parse_dtypes, **float_dtypes})
+        except ValueError as e:
+            # 数值列含非法值(如'--'): 按默认规则解析, 由 _finalize 转换并置NaN
+            logger.debug(f"{path} 数值列含非法值, 退回逐列转换: {e}")
+            frame = read(parse_dtypes)
+        return self._finalize(frame, numeric, rules['categories'])
+
+    def _read_chunks(self, read, parse_dtypes: Dict[str, str], float_dtypes: Dict[str, str],
+                     numeric: Dict[str, str], categories: Dict[str, List[str]]) -> Iterator[pd.DataFrame]:
+        """分块读取; 某块数值解析失败时, 从该块起改为按默认规则解析后转换"""
+        reader = iter(read({**parse_dtypes, **float_dtypes}))
+        done = 0
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except ValueError as e:
+                logger.debug(f"第 {done + 1} 块数值列含非法值, 退回逐列转换: {e}")
+                break
+            yield self._finalize(chunk, numeric, categories)
+            done += 1
+        for i, chunk in enumerate(read(parse_dtypes)):
+            if i >= done:
+                yield self._finalize(chunk, numeric, categories)
+
+    @staticmethod
+    def _is_numeric(dtype: str) -> bool:
+        try:
+            return pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+        except TypeError:
+            return False
+
+    def _finalize(self, df: pd.DataFrame, numeric: Dict[str, str],
+                  categories: Dict[str, List[str]]) -> pd.DataFrame:
+        """数值列转换为登记类型(非法值置NaN), 并固定分类顺序"""
+        for col, dtype in numeric.items():
+            if col in df.columns and str(df[col].dtype) != dtype:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        return self._apply_categories(df, categories)
+
+    def coerce(self, df: pd.DataFrame, api: Optional[str] = None) -> pd.DataFrame:
+        """对已构建的DataFrame(如API返回结果)应用注册结构"""
+        if df is None or df.empty:
+            return df
+        rules = self.resolve(api, df.columns)
+        for col in rules['parse_dates']:
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        for col, dtype in rules['dtype'].items():
+            if str(df[col].dtype) == dtype:
+                continue
+            try:
+                if dtype == 'category':
+                    df[col] = df[col].astype(str).where(df[col].notna()).astype('category')
+                else:
+                    df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+            except (TypeError, ValueError) as e:
+                logger.debug(f"列 {col} 转换为 {dtype} 失败: {e}")
+        return self._apply_categories(df, rules['categories'])
+
+    @staticmethod
+    def _apply_categories(df: pd.DataFrame, categories: Dict[str, List[str]]) -> pd.DataFrame:
+        """按词表固定分类顺序, 词表外的值追加在末尾而不是置空"""
+        for col, vocab in categories.items():
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                extras = [c for c in df[col].cat.categories if c not in vocab]
+                df[col] = df[col].cat.set_categories(list(vocab) + extras)
+        return df
+
+    @staticmethod
+    def concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """合并分块, 分类不一致的列取并集而不是退化为object"""
+        frames = [f for f in frames if f is not None]
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+
+        # 浅拷贝后再统一分类, 不修改调用方的DataFrame
+        frames = [f.copy(deep=False) for f in frames]
+        for col in frames[0].columns:
+            dtypes = [f[col].dtype for f in frames if col in f.columns]
+            if len(dtypes) == len(frames) and all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+                unified = union_categoricals([f[col] for f in frames], sort_categories=True).categories
+                for f in frames:
+                    f[col] = f[col].cat.set_categories(unified)
+        return pd.concat(frames, ignore_index=True)
+
+
+_default_registry: Optional[SchemaRegistry] = None
+
+
+def get_schema_registry() -> SchemaRegistry:
+    """获取全局注册表(首次调用时创建)"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = SchemaRegistry()
+    return _default_registry
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加写分段存储
+============
+
+增量下载只写入新增数据, 不再读取并重写整个文件:
+
+    <root>/<dataset>/_manifest.json          # 分段清单(行数、日期范围)
+    <root>/<dataset>/seg_000001.parquet      # 不可变分段, 按写入顺序编号
+
+读取时按写入顺序合并分段, 以键列(如 ticker + tradeDate)去重(默认保留最新写入);
+分段数或分段总大小达到阈值时, 后台合并任务把分段(可连同原有的基础CSV文件)压缩为一个文件,
+未达到阈值前读取方通过 read() 看到基础文件与分段合并后的数据。
+
+Author: QuantTrader Team
+Date: 2025-09-03
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union, Any, Callable, Sequence
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = '_manifest.json'
+MANIFEST_VERSION = 1
+
+# 证券代码列按字符串读取, 避免合并回CSV时丢失前导零
+IDENTIFIER_DTYPES = {'ticker': str, 'secID': str}
+
+
+class SegmentStore:
+    """追加写分段存储
+
+    负责：
+    - 以不可变分段文件追加新数据, 写入量只与新增行数相关
+    - 维护分段清单(行数、日期范围), 无需读数据即可得到最新日期
+    - 读取时按键列去重合并
+    - 将分段压缩合并为单一分段或基础文件
+    """
+
+    def __init__(self, root: Union[str, Path],
+                 key_cols: Sequence[str] = ('ticker', 'tradeDate'),
+                 date_col: Optional[str] = 'tradeDate',
+                 segment_format: Optional[str] = None,
+                 keep: str = 'last',
+                 compact_min_segments: int = 16,
+                 compact_min_bytes: int = 64 * 1024 * 1024):
+        """初始化分段存储
+
+        Args:
+            root: 存储根目录
+            key_cols: 去重键列
+            date_col: 日期列, 用于清单中的日期范围与读取时的类型统一
+            segment_format: 分段格式 'parquet' 或 'csv', 默认有pyarrow时使用parquet
+            keep: 键重复时保留 'last'(最新写入) 或 'first'(基础文件/最早写入)
+            compact_min_segments: 分段数达到该值时合并
+            compact_min_bytes: 分段总字节数达到该值时合并
+        """
+        self.root = Path(root)
+        self.key_cols = list(key_cols)
+        self.date_col = date_col
+        self.segment_format = segment_format or ('parquet' if PYARROW_AVAILABLE else 'csv')
+        self.keep = keep
+        self.compact_min_segments = compact_min_segments
+        self.compact_min_bytes = compact_min_bytes
+
+        self._locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    # ---------- 清单 ----------
+
+    def dataset_path(self, dataset: str) -> Path:
+        """数据集目录"""
+        return self.root / dataset
+
+    def _lock(self, dataset: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[dataset]
+
+    def get_manifest(self, dataset: str) -> Dict[str, Any]:
+        """读取分段清单, 不存在时返回空清单"""
+        manifest_file = self.dataset_path(dataset) / MANIFEST_FILE
+        if manifest_file.exists():
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {
+            'version': MANIFEST_VERSION,
+            'key_cols': self.key_cols,
+            'date_col': self.date_col,
+            'next_seq': 1,
+            'segments': [],
+            'base_max_date': None,
+        }
+
+    def _save_manifest(self, dataset: str, manifest: Dict[str, Any]):
+        """原子写入清单"""
+        dataset_dir = self.dataset_path(dataset)
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = dataset_dir / (MANIFEST_FILE + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, dataset_dir / MANIFEST_FILE)
+
+    def has_segments(self, dataset: str) -> bool:
+        """数据集是否有未合并的分段"""
+        return bool(self.get_manifest(dataset)['segments'])
+
+    def list_datasets(self) -> List[str]:
+        """列出所有数据集"""
+        if not self.root.exists():
+            return []
+        return sorted(str(p.parent.relative_to(self.root)) for p in self.root.rglob(MANIFEST_FILE))
+
+    def row_count(self, dataset: str) -> int:
+        """分段总行数(去重前)"""
+        return sum(seg['rows'] for seg in self.get_manifest(dataset)['segments'])
+
+    def segment_bytes(self, dataset: str) -> int:
+        """分段文件总字节数"""
+        total = 0
+        for seg in self.get_manifest(dataset)['segments']:
+            try:
+                total += (self.dataset_path(dataset) / seg['file']).stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def needs_compaction(self, dataset: str,
+                         min_segments: Optional[int] = None,
+                         min_bytes: Optional[int] = None) -> bool:
+        """分段数或分段总字节数是否达到合并阈值(未指定时使用实例默认阈值)"""
+        min_segments = self.compact_min_segments if min_segments is None else min_segments
+        min_bytes = self.compact_min_bytes if min_bytes is None else min_bytes
+        segments = self.get_manifest(dataset)['segments']
+        if not segments:
+            return False
+        return len(segments) >= min_segments or self.segment_bytes(dataset) >= min_bytes
+
+    def max_date(self, dataset: str, base_file: Optional[Union[str, Path]] = None) -> Optional[pd.Timestamp]:
+        """
+        数据集最新日期
+
+        优先使用清单记录; 基础文件首次出现时只读取日期列并记入清单。
+        """
+        with self._lock(dataset):
+            manifest = self.get_manifest(dataset)
+            dates = [seg['max_date'] for seg in manifest['segments'] if seg.get('max_date')]
+
+            if base_file is not None and Path(base_file).exists():
+                if manifest.get('base_max_date') is None and self.date_col:
+                    base_dates = pd.to_datetime(
+                        self._read_file(Path(base_file), [self.date_col])[self.date_col], errors='coerce'
+                    )
+                    if base_dates.notna().any():
+                        manifest['base_max_date'] = str(base_dates.max().date())
+                        self._save_manifest(dataset, manifest)
+                if manifest.get('base_max_date'):
+                    dates.append(manifest['base_max_date'])
+
+        return pd.Timestamp(max(dates)) if dates else None
+
+    # ---------- 写入 ----------
+
+    def append(self, dataset: str, df: pd.DataFrame) -> Optional[Path]:
+        """
+        追加一个不可变分段
+
+        Args:
+            dataset: 数据集名称, 可包含子目录(如 year_2024/batch_001)
+            df: 新增数据
+
+        Returns:
+            分段文件路径, 数据为空时返回None
+        """
+        if df is None or df.empty:
+            return None
+
+        with self._lock(dataset):
+            manifest = self.get_manifest(dataset)
+            seq = manifest['next_seq']
+            segment_file = self.dataset_path(dataset) / f"seg_{seq:06d}.{self.segment_format}"
+            segment_file.parent.mkdir(parents=True, exist_ok=True)
+
+            self._write_file(df, segment_file)
+
+            entry = {
+                'file': segment_file.name,
+                'rows': int(len(df)),
+                'created': datetime.now().isoformat(),
+                'min_date': None,
+                'max_date': None,
+            }
+            if self.date_col and self.date_col in df.columns:
+                dates = pd.to_datetime(df[self.date_col], errors='coerce')
+                if dates.notna().any():
+                    entry['min_date'] = str(dates.min().date())
+                    entry['max_date'] = str(dates.max().date())
+
+            manifest['segments'].append(entry)
+            manifest['next_seq'] = seq + 1
+            self._save_manifest(dataset, manifest)
+
+        logger.debug(f"追加分段 {dataset}/{segment_file.name}: {len(df)} 行")
+        return segment_file
+
+    # ---------- 读取 ----------
+
+    def read(self, dataset: str, base_file: Optional[Union[str, Path]] = None,
+             columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        读取数据集: 基础文件 + 全部分段, 按键列去重(按 keep 保留最新或最早写入)
+
+        Args:
+            dataset: 数据集名称
+            base_file: 分段之前的基础文件(如已有的批次CSV)
+            columns: 需要的列, 键列总会读取
+
+        Returns:
+            合并后的DataFrame, 无数据时返回None
+        """
+        manifest = self.get_manifest(dataset)
+        read_cols = None
+        if columns:
+            read_cols = list(dict.fromkeys(list(columns) + self.key_cols))
+
+        pieces = []
+        if base_file is not None and Path(base_file).exists():
+            pieces.append(self._read_file(Path(base_file), read_cols))
+        for seg in manifest['segments']:
+            pieces.append(self._read_file(self.dataset_path(dataset) / seg['file'], read_cols))
+
+        if not pieces:
+            return None
+
+        combined = pd.concat(pieces, ignore_index=True)
+        if self.date_col and self.date_col in combined.columns:
+            combined[self.date_col] = pd.to_datetime(combined[self.date_col], errors='coerce')
+
+        keys = [col for col in self.key_cols if col in combined.columns]
+        if keys:
+            combined = combined.drop_duplicates(subset=keys, keep=self.keep).sort_values(keys)
+        return combined.reset_index(drop=True)
+
+    # ---------- 合并 ----------
+
+    def compact(self, dataset: str, base_file: Optional[Union[str, Path]] = None) -> int:
+        """
+        合并分段
+
+        指定 base_file 时把分段并入基础文件(原子替换)并清空分段;
+        否则把所有分段合并为一个新分段。
+
+        Returns:
+            合并的分段数
+        """
+        with self._lock(dataset):
+            manifest = self.get_manifest(dataset)
+            segments = manifest['segments']
+            if not segments or (base_file is None and len(segments) == 1):
+                return 0
+
+            merged = self.read(dataset, base_file=base_file)
+            if self.date_col and self.date_col in merged.columns:
+                merged[self.date_col] = merged[self.date_col].dt.strftime('%Y-%m-%d')
+
+            if base_file is not None:
+                base_file = Path(base_file)
+                tmp_file = base_file.with_name(base_file.name + '.compacting')
+                self._write_file(merged, tmp_file, file_format=base_file.suffix.lstrip('.') or 'csv')
+                os.replace(tmp_file, base_file)
+                manifest['base_max_date'] = max(
+                    [seg['max_date'] for seg in segments if seg.get('max_date')] +
+                    ([manifest['base_max_date']] if manifest.get('base_max_date') else []),
+                    default=None
+                )
+                manifest['segments'] = []
+            else:
+                seq = manifest['next_seq']
+                segment_file = self.dataset_path(dataset) / f"seg_{seq:06d}.{self.segment_format}"
+                self._write_file(merged, segment_file)
+                manifest['segments'] = [{
+                    'file': segment_file.name,
+                    'rows': int(len(merged)),
+                    'created': datetime.now().isoformat(),
+                    'min_date': min((s['min_date'] for s in segments if s.get('min_date')), default=None),
+                    'max_date': max((s['max_date'] for s in segments if s.get('max_date')), default=None),
+                }]
+                manifest['next_seq'] = seq + 1
+
+            self._save_manifest(dataset, manifest)
+
+            # 清单更新后再删除旧分段, 中途失败不会丢数据
+            for seg in segments:
+                (self.dataset_path(dataset) / seg['file']).unlink(missing_ok=True)
+
+        logger.info(f"分段合并完成 {dataset}: {len(segments)} 个分段")
+        return len(segments)
+
+    def compact_all(self, base_resolver: Optional[Callable[[str], Optional[Path]]] = None,
+                    min_segments: Optional[int] = None,
+                    min_bytes: Optional[int] = None) -> Dict[str, int]:
+        """
+        合并所有达到阈值的数据集
+
+        Args:
+            base_resolver: 数据集名称 -> 基础文件路径, 为None时合并为单一分段
+            min_segments: 分段数达到该值才合并, 默认 compact_min_segments(传1则有分段即合并)
+            min_bytes: 分段总字节数达到该值才合并, 默认 compact_min_bytes
+
+        Returns:
+            {数据集: 合并的分段数}
+        """
+        results = {}
+        for dataset in self.list_datasets():
+            if not self.needs_compaction(dataset, min_segments, min_bytes):
+                continue
+            try:
+                base_file = base_resolver(dataset) if base_resolver else None
+                results[dataset] = self.compact(dataset, base_file=base_file)
+            except Exception as e:
+                logger.error(f"分段合并失败 {dataset}: {e}")
+        return results
+
+    def start_background_compaction(self, base_resolver: Optional[Callable[[str], Optional[Path]]] = None,
+                                    min_segments: Optional[int] = None,
+                                    min_bytes: Optional[int] = None) -> threading.Thread:
+        """在后台线程中执行 compact_all, 返回线程对象供调用方等待"""
+        thread = threading.Thread(
+            target=self.compact_all,
+            kwargs={'base_resolver': base_resolver, 'min_segments': min_segments, 'min_bytes': min_bytes},
+            name='segment-compaction',
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    # ---------- 文件读写 ----------
+
+    def _write_file(self, df: pd.DataFrame, path: Path, file_format: Optional[str] = None):
+        file_format = file_format or self.segment_format
+        if file_format == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False, encoding='utf-8')
+
+    def _read_file(self, path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if path.suffix == '.parquet':
+            if columns:
+                import pyarrow.parquet as pq
+                columns = [col for col in columns if col in pq.read_schema(path).names]
+            return pd.read_parquet(path, columns=columns)
+        if columns:
+            header = pd.read_csv(path, nrows=0).columns
+            columns = [col for col in columns if col in header]
+        return pd.read_csv(path, usecols=columns, dtype=IDENTIFIER_DTYPES, low_memory=False)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+周线/月线聚合器测试
+=================
+
+- aggregate_periods 与逐只股票 resample 的结果一致(OHLCV)
+- 提供交易日历时, 停牌股票的 endDate 仍为周期内最后一个交易日
+- 增量更新与全量构建一致; MA交叉策略读取持久化周线与由日线聚合的信号一致
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.processors.bar_aggregator import BarAggregator, aggregate_periods, load_trading_days
+
+
+def _make_daily(tickers=('000001', '600000'), start='2023-01-02', end='2024-06-28', seed=3):
+    """合成全市场日线长表"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, end)
+    frames = []
+    for ticker in tickers:
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+        frames.append(pd.DataFrame({
+            'ticker': ticker,
+            'tradeDate': days,
+            'openPrice': close * rng.uniform(0.98, 1.02, len(days)),
+            'highestPrice': close * 1.03,
+            'lowestPrice': close * 0.97,
+            'closePrice': close,
+            'turnoverVol': rng.integers(1_000, 10_000, len(days)).astype(float),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_matches_resample():
+    """测试与resample结果一致"""
+    print("🧪 测试周线/月线与resample一致...")
+
+    daily = _make_daily()
+    for freq, rule in (('W', 'W'), ('M', 'ME')):
+        bars = aggregate_periods(daily, freq)
+        for ticker, group in daily.groupby('ticker'):
+            frame = group.set_index('tradeDate')
+            reference = frame.resample(rule).agg({
+                'openPrice': 'first', 'highestPrice': 'max', 'lowestPrice': 'min',
+                'closePrice': 'last', 'turnoverVol': 'sum'}).dropna()
+            reference['endDate'] = frame['closePrice'].resample(rule).apply(
+                lambda s: s.index.max()).dropna().to_numpy()
+
+            actual = bars[bars['ticker'] == ticker].reset_index(drop=True)
+            assert len(actual) == len(reference)
+            for col in ('openPrice', 'highestPrice', 'lowestPrice', 'closePrice', 'turnoverVol'):
+                np.testing.assert_allclose(actual[col].to_numpy(), reference[col].to_numpy())
+            assert (pd.to_datetime(actual['endDate']).to_numpy() == reference['endDate'].to_numpy()).all()
+
+    print("✅ 与resample一致测试通过")
+
+
+def test_calendar_end_dates():
+    """测试交易日历决定周期结束日"""
+    print("\n🧪 测试交易日历...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calendar_file = Path(tmp) / 'trading_calendar.csv'
+        dates = pd.date_range('2025-09-01', '2025-09-14')
+        pd.DataFrame({
+            'calendarDate': np.repeat(dates.strftime('%Y-%m-%d'), 2),
+            'exchangeCD': ['XSHG', 'XSHE'] * len(dates),
+            'isOpen': np.repeat((dates.dayofweek < 5).astype(int), 2),
+        }).to_csv(calendar_file, index=False)
+        trading_days = load_trading_days(calendar_file)
+        assert len(trading_days) == 10
+
+    # 000001 周五停牌; 第二周只有周一的数据
+    daily = pd.DataFrame({
+        'ticker': ['000001'] * 5,
+        'tradeDate': ['2025-09-01', '2025-09-02', '2025-09-03', '2025-09-04', '2025-09-08'],
+        'closePrice': [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    without = aggregate_periods(daily, 'W')
+    assert pd.to_datetime(without['endDate']).dt.strftime('%Y-%m-%d').tolist() == ['2025-09-04', '2025-09-08']
+
+    with_calendar = aggregate_periods(daily, 'W', trading_days=trading_days)
+    assert pd.to_datetime(with_calendar['endDate']).dt.strftime('%Y-%m-%d').tolist() == ['2025-09-05', '2025-09-12']
+    assert with_calendar['closePrice'].tolist() == [4.0, 5.0]
+    assert with_calendar['tradeDays'].tolist() == [4, 1]
+
+    print("✅ 交易日历测试通过")
+
+
+def test_incremental_update():
+    """测试增量更新与全量构建一致"""
+    print("\n🧪 测试增量更新...")
+
+    daily = _make_daily()
+    with tempfile.TemporaryDirectory() as tmp:
+        full = BarAggregator(Path(tmp) / 'full').build(daily)
+
+        aggregator = BarAggregator(Path(tmp) / 'incremental')
+        aggregator.build(daily[daily['tradeDate'] < '2024-03-13'])
+        updated = aggregator.update(daily[daily['tradeDate'] >= '2024-01-01'])
+
+        for freq in ('W', 'M'):
+            expected = full[freq].sort_values(['ticker', 'periodStart']).reset_index(drop=True)
+            pd.testing.assert_frame_equal(updated[freq], expected, check_dtype=False)
+            assert len(aggregator.load(freq, tickers=['600000'])) == (expected['ticker'] == '600000').sum()
+
+    print("✅ 增量更新测试通过")
+
+
+def test_ma_strategy_uses_persisted_bars():
+    """测试MA交叉策略读取持久化周线"""
+    print("\n🧪 测试MA交叉策略使用持久化周线...")
+
+    from strategies.ma_crossover_strategy import MACrossoverStrategy
+
+    daily = _make_daily(tickers=('000001',), start='2020-01-01', end='2024-12-31')
+    with tempfile.TemporaryDirectory() as tmp:
+        aggregator = BarAggregator(tmp)
+        aggregator.build(daily, ('W',))
+
+        from_daily = MACrossoverStrategy(10, 50).generate_signals(daily)
+        from_bars = MACrossoverStrategy(10, 50, bar_aggregator=aggregator).generate_signals(daily, '000001')
+        pd.testing.assert_series_equal(from_bars['crossover'], from_daily['crossover'], check_names=False)
+        assert from_daily['buy'].sum() > 0
+
+    print("✅ MA交叉策略使用持久化周线测试通过")
+
+
+def run_bar_tests():
+    """运行所有聚合器测试"""
+    print("🚀 开始运行周线/月线聚合器测试...")
+    print("=" * 60)
+
+    tests = [
+        ("与resample一致", test_matches_resample),
+        ("交易日历", test_calendar_end_dates),
+        ("增量更新", test_incremental_update),
+        ("MA交叉策略使用持久化周线", test_ma_strategy_uses_persisted_bars),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_bar_tests()
+    sys.exit(0 if success else 1)
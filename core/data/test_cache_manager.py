@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存管理器测试
+=============
+
+覆盖 SmartCacheManager 的分层存取、单飞加载与数据依赖失效:
+- 各类数据往返一致, 并落在预期的持久化层
+- 按标签清理与过期清理通过索引定位条目, 分层统计随之更新, 重建索引后一致
+- 按数据类型的命中率/字节计数、延迟直方图与 Prometheus 导出
+- 并发 get_or_compute 同一键只计算一次, 且只记一次未命中
+- 依赖的数据文件或数据目录中的数据集变化后, 缓存条目失效
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.cache_manager import LatencyHistogram, SmartCacheManager
+from core.data.storage import DataCatalog
+
+
+def _make_manager(cache_dir, **config):
+    return SmartCacheManager({'cache_dir': str(cache_dir), 'write_behind': False, **config})
+
+
+def _tier_of(manager, data_type, params):
+    indexed = manager._index_lookup(manager._generate_cache_key(data_type, params))
+    return indexed['tier'] if indexed else None
+
+
+def test_round_trip_and_tiers():
+    """测试各层数据往返"""
+    print("🧪 测试缓存往返与分层...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp, disk_item_max_size=64 * 1024)
+        small_df = pd.DataFrame({'ticker': ['000001', '000002'], 'close': [10.5, 11.0]})
+        large_df = pd.DataFrame({'value': np.arange(200000, dtype=np.float64)})
+        records = {'a': 1, 'b': [1, 2, 3]}
+
+        manager.put('price', {'id': 'small'}, small_df)
+        manager.put('price', {'id': 'large'}, large_df)
+        manager.put('meta', {'id': 'dict'}, records)
+        manager.flush()
+
+        assert _tier_of(manager, 'price', {'id': 'small'}) == 'disk'
+        assert _tier_of(manager, 'price', {'id': 'large'}) == 'compressed'
+        assert _tier_of(manager, 'meta', {'id': 'dict'}) == 'sqlite'
+
+        # 新实例没有内存副本, 从持久化层读取
+        manager.close()
+        reopened = _make_manager(tmp, disk_item_max_size=64 * 1024)
+        pd.testing.assert_frame_equal(reopened.get('price', {'id': 'small'}), small_df)
+        pd.testing.assert_frame_equal(reopened.get('price', {'id': 'large'}), large_df)
+        assert reopened.get('meta', {'id': 'dict'}) == records
+        assert reopened.get('price', {'id': 'missing'}) is None
+        assert reopened.stats['misses'] == 1
+        reopened.close()
+
+    print("✅ 缓存往返与分层测试通过")
+
+
+def test_single_flight():
+    """测试并发计算同一键只执行一次"""
+    print("\n🧪 测试单飞加载...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return pd.DataFrame({'x': [1, 2, 3]})
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            manager.get_or_compute('factor', {'n': 1}, compute))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert len(results) == 8 and all(r is not None and len(r) == 3 for r in results)
+        # 锁内复查不计入统计: 每个调用方各记一次首次查找
+        assert manager.stats['misses'] + manager.stats['hits'] == 8
+        assert manager.stats['computes'] == 1
+        assert not manager._inflight
+        manager.close()
+
+    print("✅ 单飞加载测试通过")
+
+
+def test_dependency_invalidation():
+    """测试依赖的数据文件或数据集变化后缓存失效"""
+    print("\n🧪 测试数据依赖失效...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'prices.csv'
+        source.write_text("ticker,close\n000001,10\n")
+        manager = _make_manager(Path(tmp) / 'cache', dependency_check_seconds=0)
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return pd.read_csv(source)
+
+        first = manager.get_or_compute('derived', {'v': 1}, compute, depends_on=[str(source)])
+        assert manager.get_or_compute('derived', {'v': 1}, compute, depends_on=[str(source)]) is not None
+        assert len(calls) == 1
+
+        # 改写文件(大小变化, mtime也变化)
+        time.sleep(0.01)
+        source.write_text("ticker,close\n000001,10\n000002,20\n")
+        assert manager.get('derived', {'v': 1}) is None
+        assert manager.stats['stale_invalidations'] == 1
+
+        second = manager.get_or_compute('derived', {'v': 1}, compute, depends_on=[str(source)])
+        assert len(calls) == 2
+        assert len(first) == 1 and len(second) == 2
+        manager.close()
+
+    # 依赖数据目录中的数据集: 数据集目录新增文件后失效
+    with tempfile.TemporaryDirectory() as tmp:
+        api_dir = Path(tmp) / 'csv' / 'market' / 'daily'
+        api_dir.mkdir(parents=True)
+        (api_dir / 'batch_001.csv').write_text("ticker,tradeDate\n000001,2024-01-02\n")
+        catalog = DataCatalog(Path(tmp) / 'catalog.db')
+        catalog.refresh({'csv': {'path': Path(tmp) / 'csv', 'priority': 1}})
+        manager = _make_manager(Path(tmp) / 'cache', catalog=catalog, dependency_check_seconds=0)
+
+        manager.get_or_compute('derived', {'v': 2}, lambda: pd.DataFrame({'x': [1]}),
+                               depends_on=['market/daily'])
+        assert manager.get('derived', {'v': 2}) is not None
+
+        (api_dir / 'batch_002.csv').write_text("ticker,tradeDate\n000001,2024-01-03\n")
+        assert manager.get('derived', {'v': 2}) is None
+        manager.close()
+
+    print("✅ 数据依赖失效测试通过")
+
+
+def test_expiry_and_tag_invalidation():
+    """测试过期与按标签清理"""
+    print("\n🧪 测试过期与标签清理...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        frame = pd.DataFrame({'close': [1.0, 2.0]})
+        manager.put('price', {'id': 'x'}, frame, tags=['x'])
+        manager.put('price', {'id': 'y'}, frame, tags=['y'])
+        manager.put('price', {'id': 'short'}, frame, expire_hours=1e-6)
+        manager.flush()
+        assert manager.get_cache_stats()['disk_cache']['items'] == 3
+
+        manager.clear_cache(tags=['x'])
+        assert manager.get('price', {'id': 'x'}) is None
+        assert manager.get('price', {'id': 'y'}) is not None
+        assert _tier_of(manager, 'price', {'id': 'x'}) is None
+        assert manager.get_cache_stats()['disk_cache']['items'] == 2
+
+        time.sleep(0.05)
+        manager.cleanup_expired()
+        assert manager.get('price', {'id': 'short'}) is None
+        assert _tier_of(manager, 'price', {'id': 'short'}) is None
+        assert manager.get_cache_stats()['disk_cache']['items'] == 1
+
+        # 重建索引与增量维护的结果一致
+        manager.close()
+        reopened = _make_manager(tmp)
+        reopened.rebuild_index()
+        assert reopened.get_cache_stats()['disk_cache']['items'] == 1
+        pd.testing.assert_frame_equal(reopened.get('price', {'id': 'y'}), frame)
+        reopened.close()
+
+    print("✅ 过期与标签清理测试通过")
+
+
+def test_metrics():
+    """测试细分指标"""
+    print("\n🧪 测试缓存指标...")
+
+    histogram = LatencyHistogram(buckets_ms=(1, 10, 100))
+    for elapsed in (0.5, 0.5, 5, 50, 500):
+        histogram.observe(elapsed)
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {'1': 2, '10': 3, '100': 4, '+Inf': 5}
+    assert (snapshot['p50_ms'], snapshot['p99_ms']) == (10, float('inf'))
+    assert snapshot['sum_ms'] == 556.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _make_manager(tmp)
+        manager.put('price', {'id': 1}, pd.DataFrame({'close': [1.0]}))
+        manager.flush()
+        assert manager.get('price', {'id': 1}) is not None
+        assert manager.get('price', {'id': 1}) is not None
+        assert manager.get('fund', {'id': 1}) is None
+
+        metrics = manager.get_metrics_snapshot()
+        price, fund = metrics['namespaces']['price'], metrics['namespaces']['fund']
+        assert (price['puts'], price['hits'], price['misses'], price['hit_rate']) == (1, 2, 0, 1.0)
+        assert price['bytes_written'] > 0
+        assert (fund['hits'], fund['misses'], fund['hit_rate']) == (0, 1, 0)
+        assert metrics['latency']['put']['disk']['count'] == 1
+        assert metrics['tiers']['disk']['items'] == 1
+
+        prom_file = Path(tmp) / 'metrics' / 'cache.prom'
+        text = manager.export_prometheus(prom_file)
+        assert prom_file.read_text(encoding='utf-8') == text
+        assert 'quant_cache_hits_total{data_type="price"} 2' in text
+        assert 'quant_cache_tier_items{tier="disk"} 1' in text
+        assert 'quant_cache_latency_seconds_bucket{op="put",tier="disk",le="+Inf"} 1' in text
+        manager.close()
+
+    print("✅ 缓存指标测试通过")
+
+
+def run_cache_tests():
+    """运行所有缓存测试"""
+    print("🚀 开始运行缓存管理器测试...")
+    print("=" * 60)
+
+    tests = [
+        ("缓存往返与分层", test_round_trip_and_tiers),
+        ("单飞加载", test_single_flight),
+        ("数据依赖失效", test_dependency_invalidation),
+        ("过期与标签清理", test_expiry_and_tag_invalidation),
+        ("缓存指标", test_metrics),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_cache_tests()
+    sys.exit(0 if success else 1)
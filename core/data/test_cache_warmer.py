@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存预热器测试
+=============
+
+- 参数中的全部日期按访问日到目标日的偏移平移(自然日/交易日), 非日期参数不变
+- 预热计划按平移后的参数合并多日访问, 过滤时段外与出现天数不足的键
+- 执行预热时缓存缺失的数据调用加载函数, 之后可从缓存读取
+"""
+
+import json
+import sys
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.cache_manager import SmartCacheManager
+from core.data.cache_warmer import CacheWarmer, _roll_dates
+
+TRADING_DAYS = [d.date() for d in pd.bdate_range('2023-12-01', '2024-01-31')]
+
+
+def test_roll_dates():
+    """测试参数日期平移"""
+    print("🧪 测试参数日期平移...")
+
+    params = {'start_date': '2024-01-02', 'end_date': '20240105', 'ticker': '000001',
+              'fields': ['close'], 'dates': ['2024-01-04'], 'window': 20}
+    access_day, target_day = date(2024, 1, 5), date(2024, 1, 8)
+
+    calendar_days = _roll_dates(params, access_day, target_day)
+    assert calendar_days == {'start_date': '2024-01-05', 'end_date': '20240108', 'ticker': '000001',
+                             'fields': ['close'], 'dates': ['2024-01-07'], 'window': 20}
+
+    # 周五 -> 周一只差一个交易日
+    trading = _roll_dates(params, access_day, target_day, TRADING_DAYS)
+    assert trading == {'start_date': '2024-01-03', 'end_date': '20240108', 'ticker': '000001',
+                       'fields': ['close'], 'dates': ['2024-01-05'], 'window': 20}
+
+    print("✅ 参数日期平移测试通过")
+
+
+def test_plan_and_warm():
+    """测试预热计划与执行"""
+    print("\n🧪 测试预热计划与执行...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SmartCacheManager({'cache_dir': tmp, 'write_behind': False, 'access_log': True})
+
+        def access(day, hhmm, data_type, params, size=1024):
+            moment = datetime.strptime(f"{day} {hhmm}", '%Y-%m-%d %H:%M')
+            return (moment.timestamp(), day, moment.hour * 60 + moment.minute, f"{data_type}:{day}",
+                    data_type, json.dumps(params), size, 0)
+
+        rows = [
+            # 两个交易日都在开盘时段请求"最近3日行情"
+            access('2024-01-04', '09:31', 'price', {'start_date': '2024-01-02', 'end_date': '2024-01-04'}),
+            access('2024-01-04', '09:40', 'price', {'start_date': '2024-01-02', 'end_date': '2024-01-04'}),
+            access('2024-01-05', '09:35', 'price', {'start_date': '2024-01-03', 'end_date': '2024-01-05'}),
+            # 只出现一天
+            access('2024-01-05', '09:50', 'fund', {'date': '2024-01-05'}),
+            # 时段外
+            access('2024-01-04', '14:00', 'index', {'date': '2024-01-04'}),
+            access('2024-01-05', '14:00', 'index', {'date': '2024-01-05'}),
+        ]
+        with manager._connect() as conn:
+            conn.executemany('INSERT INTO access_log (ts, day, minute, key, data_type, params, size_bytes, hit) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.commit()
+
+        loaded = []
+
+        def load_price(params):
+            loaded.append(params)
+            manager.put('price', params, pd.DataFrame({'close': [1.0, 2.0, 3.0]}))
+
+        warmer = CacheWarmer(manager, loaders={'price': load_price}, trading_days=TRADING_DAYS)
+        plan = warmer.plan(target_day=date(2024, 1, 8))
+        assert len(plan) == 1
+        assert plan[0]['params'] == {'start_date': '2024-01-04', 'end_date': '2024-01-08'}
+        assert (plan[0]['days'], plan[0]['accesses'], plan[0]['tier']) == (2, 3, 'memory')
+
+        results = warmer.warm(plan)
+        assert (results['planned'], results['loaded'], results['failed']) == (1, 1, 0)
+        assert loaded == [plan[0]['params']]
+        assert manager.get('price', plan[0]['params']) is not None
+
+        # 再次预热直接命中缓存, 不调用加载函数
+        assert warmer.warm(plan)['memory'] == 1 and len(loaded) == 1
+        manager.close()
+
+    print("✅ 预热计划与执行测试通过")
+
+
+def run_warmer_tests():
+    """运行所有预热测试"""
+    print("🚀 开始运行缓存预热测试...")
+    print("=" * 60)
+
+    tests = [
+        ("参数日期平移", test_roll_dates),
+        ("预热计划与执行", test_plan_and_warm),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_warmer_tests()
+    sys.exit(0 if success else 1)
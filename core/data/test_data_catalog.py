@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据目录索引测试
+==============
+
+- 增量刷新: 未变化的文件不重新解析, 改写/删除的文件被更新/移除
+- 新增文件改变目录签名, is_stale 判定过期; 签名在检查间隔内复用
+- 查询与汇总结果与数据树一致
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.storage import DataCatalog
+
+
+def _write(path, dates):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({'ticker': '000001', 'tradeDate': dates, 'closePrice': 1.0}).to_csv(path, index=False)
+
+
+def test_incremental_refresh():
+    """测试增量刷新与查询"""
+    print("🧪 测试数据目录增量刷新...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        api_dir = Path(tmp) / 'csv' / 'market' / 'daily'
+        _write(api_dir / '2023.csv', ['2023-01-03', '2023-12-29'])
+        _write(api_dir / '2024.csv', ['2024-01-02'])
+        sources = {'csv': {'path': Path(tmp) / 'csv', 'priority': 1}}
+
+        catalog = DataCatalog(Path(tmp) / 'catalog.db')
+        assert catalog.refresh(sources, profile=True) == {'scanned': 2, 'added': 2, 'updated': 0, 'removed': 0}
+        assert catalog.refresh(sources, profile=True) == {'scanned': 2, 'added': 0, 'updated': 0, 'removed': 0}
+
+        assert catalog.get_categories() == ['market']
+        assert catalog.get_apis('market') == ['daily']
+        assert catalog.find_file('market', 'daily', '2024') == api_dir / '2024.csv'
+        info = catalog.get_file_info(api_dir / '2023.csv')
+        assert info['row_count'] == 2 and info['date_col'] == 'tradeDate'
+        assert (info['min_date'], info['max_date']) == ('2023-01-03', '2023-12-29')
+
+        _write(api_dir / '2024.csv', ['2024-01-02', '2024-01-03'])
+        os.utime(api_dir / '2024.csv', (1, 1))
+        (api_dir / '2023.csv').unlink()
+        stats = catalog.refresh(sources, profile=True)
+        assert (stats['updated'], stats['removed']) == (1, 1)
+
+        summary = catalog.summarize()
+        assert len(summary) == 1
+        assert (summary[0]['total_files'], summary[0]['row_count']) == (1, 2)
+
+    print("✅ 数据目录增量刷新测试通过")
+
+
+def test_stale_on_new_file():
+    """测试新增文件使目录过期"""
+    print("\n🧪 测试目录过期判定...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        api_dir = Path(tmp) / 'csv' / 'market' / 'daily'
+        _write(api_dir / '2023.csv', ['2023-01-03'])
+        sources = {'csv': {'path': Path(tmp) / 'csv', 'priority': 1}}
+
+        catalog = DataCatalog(Path(tmp) / 'catalog.db', signature_check_seconds=0)
+        assert catalog.is_stale(3600, sources)
+        catalog.refresh(sources)
+        assert not catalog.is_stale(3600, sources)
+
+        _write(api_dir / '2024.csv', ['2024-01-02'])
+        assert catalog.is_stale(3600, sources)
+
+        # 检查间隔内复用上次的签名, 间隔过后才看到新文件
+        cached = DataCatalog(Path(tmp) / 'catalog.db', signature_check_seconds=3600)
+        cached.refresh(sources)
+        _write(api_dir / '2025.csv', ['2025-01-02'])
+        assert not cached.is_stale(3600, sources)
+        cached.signature_check_seconds = 0
+        assert cached.is_stale(3600, sources)
+
+    print("✅ 目录过期判定测试通过")
+
+
+def run_catalog_tests():
+    """运行所有数据目录测试"""
+    print("🚀 开始运行数据目录测试...")
+    print("=" * 60)
+
+    tests = [
+        ("增量刷新", test_incremental_refresh),
+        ("目录过期判定", test_stale_on_new_file),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_catalog_tests()
+    sys.exit(0 if success else 1)
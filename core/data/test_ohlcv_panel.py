@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存映射行情面板测试
+==================
+
+- 多文件编译为 日期 × 股票 面板, 单股票/截面读取与源数据一致
+- 成交量/成交额以float64保存, 大额整数不丢精度
+- 重建时新面板原子换入, 已打开的旧面板仍可读取, 不残留临时目录
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.storage import OHLCVPanel, build_ohlcv_panel
+
+
+def _write_daily(path, tickers, dates, close_base):
+    rows = [{'ticker': t, 'tradeDate': d, 'closePrice': close_base + i,
+             'turnoverVol': 123456789 + i, 'turnoverValue': 123456789012 + i}
+            for i, (t, d) in enumerate((t, d) for t in tickers for d in dates)]
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def test_build_and_read():
+    """测试面板构建与读取"""
+    print("🧪 测试行情面板构建与读取...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_daily(Path(tmp) / 'a.csv', ['000001'], ['2024-01-02', '2024-01-03'], 10.0)
+        _write_daily(Path(tmp) / 'b.csv', ['600000'], ['2024-01-03', '2024-01-04'], 20.0)
+        panel_dir = Path(tmp) / 'panel' / 'daily'
+        header = build_ohlcv_panel([Path(tmp) / 'a.csv', Path(tmp) / 'b.csv'], panel_dir)
+
+        assert header['shape'] == [3, 2]
+        assert header['fields'] == ['close', 'volume', 'amount']
+        assert header['dtypes'] == {'close': 'float32', 'volume': 'float64', 'amount': 'float64'}
+
+        panel = OHLCVPanel(panel_dir)
+        series = panel.ticker_frame('000001')
+        assert series.index.strftime('%Y-%m-%d').tolist() == ['2024-01-02', '2024-01-03']
+        assert series['close'].tolist() == [10.0, 11.0]
+        # float32 会把 123456789012 舍入到 123456790528
+        assert series['amount'].tolist() == [123456789012.0, 123456789013.0]
+        assert panel.array('amount').dtype == np.float64 and panel.array('close').dtype == np.float32
+
+        section = panel.cross_section('2024-01-03')
+        assert section['close'].tolist() == [11.0, 20.0]
+        assert np.isnan(panel.frame('close').loc['2024-01-04', '000001'])
+
+    print("✅ 行情面板构建与读取测试通过")
+
+
+def test_rebuild_swaps_in_place():
+    """测试重建时原子换入"""
+    print("\n🧪 测试面板重建...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'a.csv'
+        panel_dir = Path(tmp) / 'panel' / 'daily'
+        _write_daily(source, ['000001'], ['2024-01-02'], 10.0)
+        build_ohlcv_panel([source], panel_dir)
+        old_panel = OHLCVPanel(panel_dir)
+        old_close = old_panel.array('close')
+
+        _write_daily(source, ['000001'], ['2024-01-02', '2024-01-03'], 30.0)
+        build_ohlcv_panel([source], panel_dir)
+
+        assert old_close.tolist() == [[10.0]]
+        assert OHLCVPanel(panel_dir).ticker_frame('000001')['close'].tolist() == [30.0, 31.0]
+        assert sorted(p.name for p in panel_dir.parent.iterdir()) == ['daily']
+
+    print("✅ 面板重建测试通过")
+
+
+def run_panel_tests():
+    """运行所有面板测试"""
+    print("🚀 开始运行行情面板测试...")
+    print("=" * 60)
+
+    tests = [
+        ("面板构建与读取", test_build_and_read),
+        ("面板重建", test_rebuild_swaps_in_place),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_panel_tests()
+    sys.exit(0 if success else 1)
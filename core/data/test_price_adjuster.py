@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复权计算服务测试
+==============
+
+- 前复权/后复权因子: 除权日之前/之后的价格按单次因子缩放, 未除权股票不变
+- 只有累积因子时反推的单次因子与原因子一致
+- 长表复权与面板复权结果一致; 追加除权事件后缓存与重新计算一致
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.processors.price_adjuster import PriceAdjuster, normalize_adj_factors
+from core.data.storage import build_ohlcv_panel
+
+DATES = pd.bdate_range('2024-01-02', periods=10)
+
+
+def _make_daily():
+    """两只股票10个交易日的不复权行情, 收盘价恒为10/20"""
+    return pd.DataFrame({
+        'ticker': np.repeat(['000001', '600000'], len(DATES)),
+        'tradeDate': np.tile(DATES.strftime('%Y-%m-%d'), 2),
+        'openPrice': np.repeat([10.0, 20.0], len(DATES)),
+        'closePrice': np.repeat([10.0, 20.0], len(DATES)),
+        'turnoverVol': 1000.0,
+    })
+
+
+def test_forward_backward_factors():
+    """测试前复权/后复权因子"""
+    print("🧪 测试前复权/后复权因子...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _make_daily().to_csv(Path(tmp) / 'daily.csv', index=False)
+        build_ohlcv_panel([Path(tmp) / 'daily.csv'], Path(tmp) / 'panel')
+        # 000001 在第6个交易日(周末除权, 落到下一交易日)除权, 单次因子0.5
+        factors = pd.DataFrame({'secID': ['000001.XSHE'], 'exDivDate': ['2024-01-06'], 'adjFactor': [0.5]})
+        adjuster = PriceAdjuster(Path(tmp) / 'panel', factors)
+
+        forward = adjuster.adjusted_frame('close', 'forward')
+        assert forward['000001'].tolist() == [5.0] * 4 + [10.0] * 6
+        assert forward['600000'].tolist() == [20.0] * 10
+        backward = adjuster.adjusted_frame('close', 'backward')
+        assert backward['000001'].tolist() == [10.0] * 4 + [20.0] * 6
+
+        # 基准日在除权日之前时, 前复权不改变基准日及之前的价格
+        before = adjuster.adjusted_frame('close', 'forward', as_of='2024-01-04')
+        assert before['000001'].tolist() == [10.0] * 4 + [20.0] * 6
+        # 成交量不复权
+        assert (adjuster.adjusted_array('volume') == 1000.0).all()
+
+    print("✅ 前复权/后复权因子测试通过")
+
+
+def test_accum_factor_and_long_frame():
+    """测试累积因子反推与长表复权"""
+    print("\n🧪 测试累积因子与长表复权...")
+
+    single = pd.DataFrame({'ticker': ['000001', '000001', '600000'],
+                           'exDivDate': ['2024-01-04', '2024-01-09', '2024-01-08'],
+                           'adjFactor': [0.8, 0.5, 0.9]})
+    # 累积因子: accum_k = f_k × accum_{k+1}, 最后一次事件的累积因子等于其单次因子
+    accum = single.assign(accumAdjFactor=[0.4, 0.5, 0.9]).drop(columns='adjFactor')
+    pd.testing.assert_frame_equal(normalize_adj_factors(accum), normalize_adj_factors(single))
+
+    daily = _make_daily()
+    with tempfile.TemporaryDirectory() as tmp:
+        daily.to_csv(Path(tmp) / 'daily.csv', index=False)
+        build_ohlcv_panel([Path(tmp) / 'daily.csv'], Path(tmp) / 'panel')
+        adjuster = PriceAdjuster(Path(tmp) / 'panel', single.iloc[:1])
+
+        # 先缓存, 再追加事件: 受影响列被重算
+        adjuster.adjusted_array('close', 'forward')
+        assert adjuster.add_events(single.iloc[1:]) == ['000001', '600000']
+        cached = adjuster.adjusted_frame('close', 'forward')
+        adjuster.clear_cache()
+        pd.testing.assert_frame_equal(cached, adjuster.adjusted_frame('close', 'forward'))
+
+        shuffled = daily.sample(frac=1.0, random_state=1)
+        for method in ('forward', 'backward'):
+            long_result = adjuster.adjust_frame(shuffled, method)
+            panel_result = adjuster.adjusted_frame('close', method)
+            for _, row in long_result.iterrows():
+                expected = panel_result.loc[pd.Timestamp(row['tradeDate']), row['ticker']]
+                assert np.isclose(row['closePrice'], expected, rtol=1e-6), (method, row.to_dict())
+        assert long_result.index.equals(shuffled.index)
+
+    print("✅ 累积因子与长表复权测试通过")
+
+
+def run_adjuster_tests():
+    """运行所有复权测试"""
+    print("🚀 开始运行复权计算测试...")
+    print("=" * 60)
+
+    tests = [
+        ("前复权/后复权因子", test_forward_backward_factors),
+        ("累积因子与长表复权", test_accum_factor_and_long_frame),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_adjuster_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据表结构注册表测试
+==================
+
+- 解析时直接生成紧凑类型(分类/float32), 累积复权因子为float64
+- 数值列含 '--' 等非法值时置为NaN(整表与分块读取)
+- concat 统一分类词表且不修改传入的DataFrame
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.storage.schema_registry import SchemaRegistry
+
+
+def test_compact_dtypes():
+    """测试解析生成紧凑类型"""
+    print("🧪 测试紧凑类型解析...")
+
+    registry = SchemaRegistry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'daily.csv'
+        pd.DataFrame({
+            'secID': ['000001.XSHE', '600000.XSHG'],
+            'tradeDate': ['2024-01-02', '2024-01-02'],
+            'closePrice': [10.5, 7.25],
+            'turnoverVol': [123456789012, 5],
+            'accumAdjFactor': [1.0000001, 0.987654321],
+        }).to_csv(path, index=False)
+
+        frame = registry.read_csv(path, 'mktequdget')
+        assert isinstance(frame['secID'].dtype, pd.CategoricalDtype)
+        assert frame['closePrice'].dtype == np.float32
+        assert frame['turnoverVol'].tolist() == [123456789012.0, 5.0]
+        assert frame['accumAdjFactor'].dtype == np.float64
+        assert frame['accumAdjFactor'].tolist() == [1.0000001, 0.987654321]
+        assert pd.api.types.is_datetime64_any_dtype(frame['tradeDate'])
+
+    print("✅ 紧凑类型解析测试通过")
+
+
+def test_invalid_numeric_tokens():
+    """测试数值列非法值置为NaN"""
+    print("\n🧪 测试数值列非法值...")
+
+    registry = SchemaRegistry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'daily.csv'
+        closes = [str(float(i)) for i in range(10)]
+        closes[7] = '--'
+        pd.DataFrame({'secID': ['000001.XSHE'] * 10, 'closePrice': closes}).to_csv(path, index=False)
+
+        frame = registry.read_csv(path, 'mktequdget')
+        assert frame['closePrice'].dtype == np.float32
+        assert np.isnan(frame['closePrice'].iloc[7])
+        assert frame['closePrice'].iloc[6] == 6.0
+
+        # 非法值出现在第4块: 前3块按登记类型解析, 其余分块退回转换, 不重复不遗漏
+        chunks = list(registry.read_csv(path, 'mktequdget', chunksize=2))
+        assert [len(c) for c in chunks] == [2, 2, 2, 2, 2]
+        merged = pd.concat(chunks, ignore_index=True)
+        pd.testing.assert_series_equal(merged['closePrice'], frame['closePrice'])
+
+    print("✅ 数值列非法值测试通过")
+
+
+def test_concat_keeps_inputs():
+    """测试concat统一分类且不修改输入"""
+    print("\n🧪 测试concat...")
+
+    registry = SchemaRegistry()
+    left = pd.DataFrame({'ticker': pd.Categorical(['000001']), 'close': [1.0]})
+    right = pd.DataFrame({'ticker': pd.Categorical(['600000']), 'close': [2.0]})
+
+    merged = registry.concat([left, right])
+    assert isinstance(merged['ticker'].dtype, pd.CategoricalDtype)
+    assert merged['ticker'].tolist() == ['000001', '600000']
+    assert list(left['ticker'].cat.categories) == ['000001']
+    assert list(right['ticker'].cat.categories) == ['600000']
+
+    print("✅ concat测试通过")
+
+
+def run_schema_tests():
+    """运行所有结构注册表测试"""
+    print("🚀 开始运行数据表结构注册表测试...")
+    print("=" * 60)
+
+    tests = [
+        ("紧凑类型解析", test_compact_dtypes),
+        ("数值列非法值", test_invalid_numeric_tokens),
+        ("concat", test_concat_keeps_inputs),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_schema_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存缓存区测试
+================
+
+- 段写入后可映射读取; 被引用的段不会被淘汰, 引用释放后才可删除
+- sweep_expired 只删除过期且未被引用的段; 超出字节预算时淘汰最久未访问的段
+- 最后一个成员关闭时清空共享区, 仍有其他成员时保留
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.shared_arena import SharedArena
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _payload(rows=1000):
+    """Arrow IPC 文件字节"""
+    table = pa.table({'value': list(range(rows))})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def test_attach_and_sweep():
+    """测试映射读取、引用保护与过期清理"""
+    print("🧪 测试共享区映射与过期清理...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        expired = set()
+        arena = SharedArena(tmp, is_expired=lambda meta: meta['name'] in expired)
+        if not arena.available:
+            print("⚠️ 共享区不可用(需要pyarrow与fcntl), 跳过")
+            return
+        for key in ('live', 'old', 'old_held'):
+            assert arena.put(key, _payload(), {'name': key})
+
+        table, metadata, handle = arena.attach('old_held')
+        assert table.column('value').to_pylist()[:3] == [0, 1, 2] and metadata == {'name': 'old_held'}
+        arena.hold(table, handle)
+        assert arena.usage()['referenced_items'] == 1
+
+        expired.update({'old', 'old_held'})
+        # 被引用的过期段保留, 引用释放后才删除
+        assert arena.sweep_expired() == 1
+        assert arena.attach('old') is None
+        assert arena.usage()['items'] == 2
+        del table
+        gc.collect()
+        assert arena.sweep_expired() == 1
+        assert arena.usage()['items'] == 1 and arena.attach('live') is not None
+        arena.close()
+
+    print("✅ 共享区映射与过期清理测试通过")
+
+
+def test_budget_and_lifecycle():
+    """测试字节预算淘汰与成员生命周期"""
+    print("\n🧪 测试共享区预算与生命周期...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = _payload()
+        first = SharedArena(tmp, max_bytes=len(payload) * 2)
+        if not first.available:
+            print("⚠️ 共享区不可用(需要pyarrow与fcntl), 跳过")
+            return
+        second = SharedArena(tmp)
+
+        assert first.put('a', payload) and first.put('b', payload)
+        os.utime(Path(tmp) / 'a.arrow', (time.time() - 60, time.time() - 60))
+        # 预算只容纳两段: 淘汰最久未访问的 a
+        assert first.put('c', payload)
+        assert first.attach('a') is None
+        assert first.usage()['items'] == 2
+
+        # 仍有其他成员时关闭不清空; 最后一个成员关闭时清空
+        first.close()
+        assert second.usage()['items'] == 2
+        second.close()
+        assert not list(Path(tmp).glob('*.arrow'))
+
+    print("✅ 共享区预算与生命周期测试通过")
+
+
+def run_arena_tests():
+    """运行所有共享区测试"""
+    print("🚀 开始运行共享内存缓存区测试...")
+    print("=" * 60)
+
+    tests = [
+        ("映射与过期清理", test_attach_and_sweep),
+        ("预算与生命周期", test_budget_and_lifecycle),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_arena_tests()
+    sys.exit(0 if success else 1)
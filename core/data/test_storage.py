@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储后端测试
+===========
+
+覆盖 Parquet数据湖 与 追加写分段存储:
+- CSV分块间列类型漂移(int->float, 全空->字符串)时导入与读取正确, 重复导入不产生重复记录
+- 分段按阈值触发合并, 合并前后读取结果一致, keep='first'/'last' 去重语义正确
+"""
+
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.storage import ParquetDataLake, SegmentStore
+from core.data.storage.parquet_store import ticker_bucket
+
+
+def test_lake_schema_drift():
+    """测试数据湖分块类型漂移"""
+    print("🧪 测试数据湖类型漂移...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = Path(tmp) / 'daily.csv'
+        # 前两行(第一块): volume为整数, note全空; 后两行(第二块): volume为小数, note为字符串
+        csv_file.write_text(
+            "ticker,tradeDate,volume,note\n"
+            "000001,2024-01-02,100,\n"
+            "000002,2024-01-02,200,\n"
+            "000001,2024-01-03,150.5,halt\n"
+            "000002,2024-01-03,250.25,ok\n"
+        )
+
+        lake = ParquetDataLake(Path(tmp) / 'lake', n_buckets=4)
+        assert lake.import_csv('market', 'daily', [csv_file], chunk_size=2) == 4
+
+        data = lake.read('market', 'daily').sort_values(['tradeDate', 'ticker']).reset_index(drop=True)
+        assert len(data) == 4
+        assert data['volume'].tolist() == [100.0, 200.0, 150.5, 250.25]
+        assert data['note'].isna().tolist() == [True, True, False, False]
+        assert data['note'].iloc[2:].tolist() == ['halt', 'ok']
+        assert data['ticker'].tolist() == ['000001', '000002', '000001', '000002']
+
+        # 重复导入替换原数据集
+        lake.import_csv('market', 'daily', [csv_file], chunk_size=2)
+        assert len(lake.read('market', 'daily')) == 4
+
+        filtered = lake.read('market', 'daily', tickers=['000001'], date_range=('2024-01-03', None))
+        assert len(filtered) == 1 and filtered['volume'].iloc[0] == 150.5
+
+        # 元信息原子写入, 不残留临时文件
+        assert not list(lake.dataset_path('market', 'daily').glob('*.tmp'))
+
+    # 分桶与逐个crc32一致(跨版本稳定)
+    tickers = ['000001', '600000', '000001', 'A']
+    expected = [zlib.crc32(t.encode('utf-8')) % 32 for t in tickers]
+    assert ticker_bucket(pd.Series(tickers), 32).tolist() == expected
+
+    print("✅ 数据湖类型漂移测试通过")
+
+
+def _daily(tickers, date, close):
+    return pd.DataFrame({'ticker': tickers, 'tradeDate': date, 'close': close})
+
+
+def test_segment_compaction():
+    """测试分段合并"""
+    print("\n🧪 测试分段合并...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(tmp, segment_format='csv', compact_min_segments=3,
+                             compact_min_bytes=1 << 30)
+
+        store.append('daily', _daily(['000001', '000002'], '2024-01-02', [10.0, 20.0]))
+        store.append('daily', _daily(['000001'], '2024-01-03', [11.0]))
+        assert not store.needs_compaction('daily')
+
+        # 重写已有键, 保留最新写入
+        store.append('daily', _daily(['000001'], '2024-01-03', [11.5]))
+        assert store.needs_compaction('daily')
+
+        before = store.read('daily')
+        assert len(before) == 3
+        assert before.loc[before['tradeDate'] == '2024-01-03', 'close'].item() == 11.5
+
+        assert store.compact('daily') == 3
+        assert len(store.get_manifest('daily')['segments']) == 1
+        assert not store.needs_compaction('daily')
+        pd.testing.assert_frame_equal(store.read('daily'), before)
+
+        # 并入基础文件后分段清空
+        base_file = Path(tmp) / 'base.csv'
+        _daily(['000003'], '2024-01-01', [5.0]).to_csv(base_file, index=False)
+        store.compact('daily', base_file=base_file)
+        assert store.get_manifest('daily')['segments'] == []
+        assert len(store.read('daily', base_file=base_file)) == 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SegmentStore(tmp, segment_format='csv', keep='first')
+        store.append('daily', _daily(['000001'], '2024-01-02', [10.0]))
+        store.append('daily', _daily(['000001'], '2024-01-02', [99.0]))
+        assert store.read('daily')['close'].tolist() == [10.0]
+        store.compact('daily')
+        assert store.read('daily')['close'].tolist() == [10.0]
+
+    print("✅ 分段合并测试通过")
+
+
+def run_storage_tests():
+    """运行所有存储测试"""
+    print("🚀 开始运行存储后端测试...")
+    print("=" * 60)
+
+    tests = [
+        ("数据湖类型漂移", test_lake_schema_drift),
+        ("分段合并", test_segment_compaction),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_storage_tests()
+    sys.exit(0 if success else 1)
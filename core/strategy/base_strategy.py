@@ -5,6 +5,7 @@ import pandas as pd
 import numpy as np
 from typing import Optional, Dict, Any, Union, Tuple, List, Callable
 from datetime import datetime, timedelta
+from pathlib import Path
 from abc import ABC, abstractmethod
 import logging
 import warnings
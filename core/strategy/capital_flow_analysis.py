@@ -179,4 +179,192 @@ class CapitalFlowAnalyzer:
             result['abnormal_outflow'] = z_score < -threshold
             result['abnormal_flow'] = result['abnormal_inflow'] | result['abnormal_outflow']
         
-        return result
\ No newline at end of file
+        return result
+
+
+class CapitalFlowPanelAnalyzer:
+    """
+    全市场资金流面板分析器 - 日期 × 股票 宽表上的向量化连续天数与异常检测
+    
+    只在内存中保留最近 window 个交易日的资金流, 每日增量 update 后
+    即可查询当日异常流入排名, 适用于盘前选股。
+    """
+    
+    def __init__(self, window: int = 60, threshold: float = 3,
+                 min_periods: int = 20,
+                 value_col: str = 'mainNetFlow',
+                 ticker_col: str = 'ticker',
+                 date_col: str = 'tradeDate'):
+        """
+        初始化面板分析器
+        
+        Args:
+            window: 滚动Z-score窗口(交易日)
+            threshold: 异常Z-score阈值
+            min_periods: 计算Z-score所需最少历史天数
+            value_col: 主力净流入列名(MktEquFlowGet为mainNetFlow)
+            ticker_col: 股票代码列名
+            date_col: 交易日期列名
+        """
+        self.window = window
+        self.threshold = threshold
+        self.min_periods = min_periods
+        self.value_col = value_col
+        self.ticker_col = ticker_col
+        self.date_col = date_col
+        
+        # 增量状态: 最近window+1日资金流, 以及截至最新日的连续天数
+        self.recent_flow = pd.DataFrame()
+        self.inflow_days = pd.Series(dtype=np.int64)
+        self.outflow_days = pd.Series(dtype=np.int64)
+    
+    def to_panel(self, flow_data: pd.DataFrame) -> pd.DataFrame:
+        """将长表资金流数据转换为 日期 × 股票 宽表"""
+        panel = flow_data.pivot_table(index=self.date_col, columns=self.ticker_col,
+                                      values=self.value_col, aggfunc='last')
+        panel.index = pd.to_datetime(panel.index)
+        return panel.sort_index()
+    
+    @staticmethod
+    def consecutive_days(panel: pd.DataFrame, positive: bool = True) -> pd.DataFrame:
+        """
+        计算每只股票连续流入/流出天数
+        
+        用累积最大值定位每段游程的起点, 整个面板一次完成。
+        """
+        values = panel.values
+        condition = values > 0 if positive else values < 0
+        
+        rows = np.arange(len(values))[:, None]
+        last_break = np.maximum.accumulate(np.where(condition, -1, rows), axis=0)
+        consecutive = np.where(condition, rows - last_break, 0)
+        
+        return pd.DataFrame(consecutive, index=panel.index, columns=panel.columns)
+    
+    def rolling_zscore(self, panel: pd.DataFrame) -> pd.DataFrame:
+        """相对前window日的滚动Z-score(不含当日, 避免异常值稀释自身)"""
+        history = panel.shift(1).rolling(self.window, min_periods=self.min_periods)
+        std = history.std()
+        return (panel - history.mean()) / std.where(std > 0)
+    
+    def detect_abnormal_flow(self, panel: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        全市场异常资金流检测
+        
+        Args:
+            panel: 日期 × 股票 主力净流入宽表
+            
+        Returns:
+            包含 z_score/abnormal_inflow/abnormal_outflow/abnormal_flow 宽表的字典
+        """
+        z_score = self.rolling_zscore(panel)
+        abnormal_inflow = z_score > self.threshold
+        abnormal_outflow = z_score < -self.threshold
+        
+        return {
+            'z_score': z_score,
+            'abnormal_inflow': abnormal_inflow,
+            'abnormal_outflow': abnormal_outflow,
+            'abnormal_flow': abnormal_inflow | abnormal_outflow,
+        }
+    
+    def fit(self, flow_data: pd.DataFrame) -> 'CapitalFlowPanelAnalyzer':
+        """
+        用历史数据初始化增量状态
+        
+        Args:
+            flow_data: 长表资金流数据或 日期 × 股票 宽表
+        """
+        if self.ticker_col in flow_data.columns:
+            panel = self.to_panel(flow_data)
+        else:
+            # 宽表的日期索引可能是字符串, 统一为Timestamp, 与 update 的日期比较一致
+            panel = flow_data.copy()
+            panel.index = pd.to_datetime(panel.index)
+            panel = panel.sort_index()
+        
+        self.inflow_days = self.consecutive_days(panel, positive=True).iloc[-1] \
+            if not panel.empty else pd.Series(dtype=np.int64)
+        self.outflow_days = self.consecutive_days(panel, positive=False).iloc[-1] \
+            if not panel.empty else pd.Series(dtype=np.int64)
+        self.recent_flow = panel.iloc[-(self.window + 1):]
+        
+        return self
+    
+    def update(self, day_flow: Union[pd.DataFrame, pd.Series],
+               trade_date: Optional[Union[str, datetime]] = None) -> 'CapitalFlowPanelAnalyzer':
+        """
+        追加一个交易日的全市场资金流
+        
+        Args:
+            day_flow: 当日长表数据, 或以股票代码为索引的净流入Series
+            trade_date: 交易日期, day_flow为长表时可省略
+            
+        Raises:
+            ValueError: 长表包含多个交易日, 或同一股票出现多次
+        """
+        if isinstance(day_flow, pd.DataFrame):
+            if self.date_col in day_flow.columns:
+                dates = pd.to_datetime(day_flow[self.date_col]).unique()
+                if len(dates) > 1:
+                    raise ValueError(f"update 只接受单个交易日的数据, 收到 {len(dates)} 个交易日")
+                if trade_date is None and len(dates) == 1:
+                    trade_date = dates[0]
+            day_flow = day_flow.set_index(self.ticker_col)[self.value_col]
+        if trade_date is None:
+            raise ValueError("无法确定交易日期: 请传入 trade_date")
+        duplicated = day_flow.index[day_flow.index.duplicated()].unique()
+        if len(duplicated) > 0:
+            raise ValueError(f"当日数据中股票代码重复: {list(duplicated[:5])}")
+        trade_date = pd.Timestamp(trade_date)
+        
+        if not self.recent_flow.empty and trade_date <= self.recent_flow.index[-1]:
+            return self
+        
+        tickers = self.recent_flow.columns.union(day_flow.index)
+        row = day_flow.reindex(tickers)
+        
+        # 连续天数递推: 条件成立则+1, 否则归零
+        previous_in = self.inflow_days.reindex(tickers, fill_value=0)
+        previous_out = self.outflow_days.reindex(tickers, fill_value=0)
+        self.inflow_days = ((previous_in + 1) * (row > 0)).astype(np.int64)
+        self.outflow_days = ((previous_out + 1) * (row < 0)).astype(np.int64)
+        
+        new_row = pd.DataFrame([row.values], index=[trade_date], columns=tickers)
+        self.recent_flow = pd.concat([self.recent_flow.reindex(columns=tickers), new_row])
+        self.recent_flow = self.recent_flow.iloc[-(self.window + 1):]
+        
+        return self
+    
+    def latest_zscore(self) -> pd.Series:
+        """最新交易日相对前window日的Z-score"""
+        if len(self.recent_flow) < 2:
+            return pd.Series(dtype=float)
+        
+        history = self.recent_flow.iloc[:-1]
+        latest = self.recent_flow.iloc[-1]
+        count = history.count()
+        std = history.std()
+        z_score = (latest - history.mean()) / std.where(std > 0)
+        
+        return z_score.where(count >= self.min_periods)
+    
+    def top_abnormal_inflow(self, n: int = 20) -> pd.DataFrame:
+        """
+        当日异常流入排名(盘前选股)
+        
+        Args:
+            n: 返回数量
+            
+        Returns:
+            按Z-score降序的DataFrame: ticker, net_flow, z_score, inflow_days
+        """
+        z_score = self.latest_zscore()
+        abnormal = z_score[z_score > self.threshold].nlargest(n)
+        
+        return pd.DataFrame({
+            self.ticker_col: abnormal.index,
+            'net_flow': self.recent_flow.iloc[-1].reindex(abnormal.index).values,
+            'z_score': abnormal.values,
+            'inflow_days': self.inflow_days.reindex(abnormal.index, fill_value=0).values,
+        })
@@ -15,6 +15,95 @@ import warnings
 
 warnings.filterwarnings('ignore')
 
+# 形态位掩码: 每种形态占一个比特, 顺序与 detect_all_patterns 一致
+PATTERN_BITS = {
+    'doji': 1 << 0,
+    'hammer': 1 << 1,
+    'shooting_star': 1 << 2,
+    'engulfing': 1 << 3,
+    'harami': 1 << 4,
+    'morning_star': 1 << 5,
+    'evening_star': 1 << 6,
+}
+
+# 三K线形态最多回看的K线数
+PATTERN_LOOKBACK = 3
+
+
+def _shift_rows(values: np.ndarray, periods: int) -> np.ndarray:
+    """沿日期轴(第0轴)下移, 空出的位置填NaN"""
+    shifted = np.full_like(values, np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def compute_pattern_mask(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                         close: np.ndarray, doji_threshold: float = 0.001) -> np.ndarray:
+    """
+    单次计算所有K线形态的位掩码
+    
+    实体、影线、振幅及前一/前两根K线的几何量只计算一次, 所有形态共享。
+    输入为同形状的数组: 一维(单只股票)或二维(日期 × 股票)。
+    
+    Args:
+        open_, high, low, close: OHLC数组
+        doji_threshold: 十字星实体/振幅阈值
+        
+    Returns:
+        uint8位掩码数组, 比特定义见 PATTERN_BITS
+    """
+    o = np.asarray(open_, dtype=np.float64)
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+    
+    with np.errstate(invalid='ignore'):
+        # 当根K线几何
+        body_signed = c - o
+        body = np.abs(body_signed)
+        body_top = np.maximum(o, c)
+        body_bottom = np.minimum(o, c)
+        upper_shadow = h - body_top
+        lower_shadow = body_bottom - l
+        high_low_range = h - l
+        
+        # 前一根、前两根K线
+        o1, c1 = _shift_rows(o, 1), _shift_rows(c, 1)
+        c2 = _shift_rows(c, 2)
+        body_signed1 = c1 - o1
+        body1 = np.abs(body_signed1)
+        body_signed2 = _shift_rows(body_signed, 2)
+        body2 = np.abs(body_signed2)
+        
+        long_body = body > c * 0.01
+        long_body2 = body2 > c2 * 0.01
+        second_small = body1 < body2 * 0.3
+        
+        patterns = {
+            'doji': body <= high_low_range * doji_threshold,
+            'hammer': (lower_shadow > 2 * body) & (upper_shadow < 0.3 * body),
+            'shooting_star': (upper_shadow > 2 * body) & (lower_shadow < 0.3 * body),
+            'engulfing': ((body_signed1 < 0) & (body_signed > 0) & (o < c1) & (c > o1)) |
+                         ((body_signed1 > 0) & (body_signed < 0) & (o > c1) & (c < o1)),
+            'harami': (body < body1) & (o > np.minimum(o1, c1)) & (c < np.maximum(o1, c1)),
+            'morning_star': (body_signed2 < 0) & long_body2 & second_small &
+                            (body_signed > 0) & long_body,
+            'evening_star': (body_signed2 > 0) & long_body2 & second_small &
+                            (body_signed < 0) & long_body,
+        }
+    
+    mask = np.zeros(c.shape, dtype=np.uint8)
+    for name, hit in patterns.items():
+        mask |= np.where(hit, PATTERN_BITS[name], 0).astype(np.uint8)
+    return mask
+
+
+def decode_pattern_mask(mask: int) -> List[str]:
+    """将位掩码解码为形态名称列表"""
+    return [name for name, bit in PATTERN_BITS.items() if int(mask) & bit]
+
+
 class PatternRecognizer:
     """
     K线形态识别器
@@ -35,22 +124,67 @@ class PatternRecognizer:
         Returns:
             形态识别结果字典
         """
+        # 单K线、双K线、三K线形态共享同一次几何计算
+        mask = compute_pattern_mask(
+            ohlc_data['open'].values, ohlc_data['high'].values,
+            ohlc_data['low'].values, ohlc_data['close'].values
+        )
+        
         results = {}
+        for name, bit in PATTERN_BITS.items():
+            results[name] = pd.Series((mask & bit) > 0, index=ohlc_data.index).astype(int)
+        
+        return results
+    
+    def scan_patterns(self, open_: pd.DataFrame, high: pd.DataFrame,
+                      low: pd.DataFrame, close: pd.DataFrame,
+                      doji_threshold: float = 0.001) -> pd.DataFrame:
+        """
+        全市场K线形态扫描
+        
+        Args:
+            open_, high, low, close: 日期 × 股票 的OHLC宽表(索引与列需一致)
+            doji_threshold: 十字星阈值
+            
+        Returns:
+            日期 × 股票 的uint8位掩码宽表, 比特定义见 PATTERN_BITS
+        """
+        mask = compute_pattern_mask(open_.values, high.values, low.values, close.values,
+                                    doji_threshold)
+        return pd.DataFrame(mask, index=close.index, columns=close.columns)
+    
+    def scan_latest_patterns(self, open_: pd.DataFrame, high: pd.DataFrame,
+                             low: pd.DataFrame, close: pd.DataFrame,
+                             patterns: Optional[List[str]] = None,
+                             doji_threshold: float = 0.001) -> pd.DataFrame:
+        """
+        扫描最新交易日出现的形态
         
-        # 单K线形态
-        results['doji'] = self.detect_doji(ohlc_data)
-        results['hammer'] = self.detect_hammer(ohlc_data)
-        results['shooting_star'] = self.detect_shooting_star(ohlc_data)
+        只取最后 PATTERN_LOOKBACK 根K线参与计算, 全市场查询为交互级速度。
         
-        # 双K线形态
-        results['engulfing'] = self.detect_engulfing(ohlc_data)
-        results['harami'] = self.detect_harami(ohlc_data)
+        Args:
+            open_, high, low, close: 日期 × 股票 的OHLC宽表
+            patterns: 只返回包含这些形态之一的股票, 默认返回出现任意形态的股票
+            doji_threshold: 十字星阈值
+            
+        Returns:
+            DataFrame, 列为 ticker, pattern_mask, patterns
+        """
+        tail = slice(-PATTERN_LOOKBACK, None)
+        latest = compute_pattern_mask(open_.values[tail], high.values[tail],
+                                      low.values[tail], close.values[tail],
+                                      doji_threshold)[-1]
         
-        # 三K线形态
-        results['morning_star'] = self.detect_morning_star(ohlc_data)
-        results['evening_star'] = self.detect_evening_star(ohlc_data)
+        wanted = sum(PATTERN_BITS[name] for name in patterns) if patterns else 0xFF
+        hits = np.flatnonzero(latest & wanted)
         
-        return results
+        result = pd.DataFrame({
+            'ticker': close.columns[hits],
+            'pattern_mask': latest[hits],
+        })
+        lookup = {code: decode_pattern_mask(code) for code in np.unique(latest[hits])}
+        result['patterns'] = result['pattern_mask'].map(lookup)
+        return result
     
     def detect_doji(self, ohlc_data: pd.DataFrame, threshold: float = 0.001) -> pd.Series:
         """
@@ -5,12 +5,23 @@ import pandas as pd
 import numpy as np
 from typing import Optional, Dict, Any, Union, Tuple, List, Callable
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 from abc import ABC, abstractmethod
 import logging
 import warnings
 
 warnings.filterwarnings('ignore')
 
+# 信号原因位掩码: 维度 -> (看涨位, 看跌位)
+REASON_ACTIVE = 1
+REASON_DIMENSIONS = {
+    'technical': (1 << 1, 1 << 2),
+    'capital': (1 << 3, 1 << 4),
+    'sentiment': (1 << 5, 1 << 6),
+    'pattern': (1 << 7, 1 << 8),
+}
+REASON_DIVERGENCE = 1 << 9
+
 class SignalGenerator:
     """
     高级信号生成器 - 整合多维度分析生成交易信号
@@ -64,7 +75,8 @@ class SignalGenerator:
                 'enabled': True,        # 是否启用信号衰减
                 'half_life': 5,        # 半衰期(天)
                 'min_strength': 0.3    # 最小强度
-            }
+            },
+            'decode_reasons': True      # 是否解码信号原因文本
         }
     
     def generate_signals(self,
@@ -88,14 +100,160 @@ class SignalGenerator:
         """
         self.logger.info("开始生成交易信号...")
         
-        # 初始化信号表
-        signals = pd.DataFrame(index=technical_data.index)
-        
         # 1. 计算各维度得分
         scores = self._calculate_dimensional_scores(
             technical_data, capital_data, sentiment_data, pattern_data
         )
         
+        # 2-11. 综合得分、确认、强度、置信度、背离、优先级、最终信号、原因、风险
+        signals = self._assemble_signals(technical_data, scores)
+        
+        # 更新统计
+        self._update_statistics(signals)
+        
+        # 保存历史
+        self.signal_history.append({
+            'timestamp': datetime.now(),
+            'signals': signals.copy()
+        })
+        
+        self.logger.info(f"信号生成完成: 买入{self.signal_stats['buy_signals']}, "
+                        f"卖出{self.signal_stats['sell_signals']}")
+        
+        return signals
+    
+    def generate_signals_batch(self,
+                               technical_data: pd.DataFrame,
+                               capital_data: Optional[pd.DataFrame] = None,
+                               sentiment_data: Optional[pd.DataFrame] = None,
+                               pattern_data: Optional[pd.DataFrame] = None,
+                               ticker_col: str = 'ticker',
+                               date_col: str = 'tradeDate',
+                               n_jobs: int = 1,
+                               tickers_per_chunk: int = 500) -> pd.DataFrame:
+        """
+        全市场批量生成交易信号
+        
+        所有股票在一次向量化计算中完成, 时间相关操作(shift/rolling/衰减)
+        按股票分组, 不会跨股票串位。
+        
+        Args:
+            technical_data: 技术指标数据, 支持三种形式:
+                            长表(含 ticker_col/date_col 列)、
+                            (ticker, date) MultiIndex 索引、
+                            面板(日期索引 × (字段, 股票) 两级列)
+            capital_data: 资金流数据, 形式同上
+            sentiment_data: 情绪数据, 形式同上
+            pattern_data: 形态数据, 形式同上
+            ticker_col: 股票代码列名
+            date_col: 日期列名
+            n_jobs: 工作进程数, 大于1时按股票分块多进程计算
+            tickers_per_chunk: 每个进程任务包含的股票数
+            
+        Returns:
+            整洁格式的信号DataFrame, 每行一个(股票, 日期)
+        """
+        self.logger.info("开始批量生成交易信号...")
+        
+        frames = {
+            name: self._to_long_frame(frame, ticker_col, date_col)
+            for name, frame in [('technical', technical_data), ('capital', capital_data),
+                                ('sentiment', sentiment_data), ('pattern', pattern_data)]
+            if frame is not None and not frame.empty
+        }
+        if 'technical' not in frames:
+            return pd.DataFrame()
+        
+        tickers = frames['technical'][ticker_col].unique()
+        if n_jobs > 1 and len(tickers) > tickers_per_chunk:
+            chunks = [tickers[i:i + tickers_per_chunk]
+                      for i in range(0, len(tickers), tickers_per_chunk)]
+            tasks = []
+            for chunk in chunks:
+                tasks.append({
+                    name: frame[frame[ticker_col].isin(chunk)]
+                    for name, frame in frames.items()
+                })
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    executor.submit(_generate_signal_chunk, self.config, task,
+                                    ticker_col, date_col)
+                    for task in tasks
+                ]
+                results = [future.result() for future in futures]
+            signals = pd.concat(results, ignore_index=True)
+            
+            # 子进程中的过滤计数不会回传, 在此补记
+            min_confidence = self.config['filters']['min_confidence'] * 100
+            self.signal_stats['filtered_out'] += int((signals['confidence'] < min_confidence).sum())
+        else:
+            signals = self._generate_batch_frame(frames, ticker_col, date_col)
+        
+        self._update_statistics(signals)
+        
+        self.logger.info(f"批量信号生成完成: {len(tickers)}只股票, "
+                        f"买入{self.signal_stats['buy_signals']}, "
+                        f"卖出{self.signal_stats['sell_signals']}")
+        
+        return signals
+    
+    def _generate_batch_frame(self, frames: Dict[str, pd.DataFrame],
+                              ticker_col: str, date_col: str) -> pd.DataFrame:
+        """对已规范化的长表一次性计算全部股票的信号"""
+        technical = frames['technical']
+        keys = pd.MultiIndex.from_frame(technical[[ticker_col, date_col]])
+        groups = pd.factorize(technical[ticker_col])[0]
+        
+        def _aligned(name: str) -> Optional[pd.DataFrame]:
+            frame = frames.get(name)
+            if frame is None:
+                return None
+            aligned = frame.set_index([ticker_col, date_col]).reindex(keys)
+            return aligned.set_index(technical.index)
+        
+        scores = self._calculate_dimensional_scores(
+            technical, _aligned('capital'), _aligned('sentiment'), _aligned('pattern'),
+            groups=groups
+        )
+        # 辅助数据缺失的(股票, 日期)按中性处理
+        for dim in ('capital', 'sentiment', 'pattern'):
+            scores[dim] = scores[dim].reindex(technical.index).fillna(50)
+        
+        signals = self._assemble_signals(technical, scores, groups=groups)
+        
+        for dim, score in scores.items():
+            signals[f'{dim}_score'] = score
+        signals.insert(0, date_col, technical[date_col].values)
+        signals.insert(0, ticker_col, technical[ticker_col].values)
+        
+        return signals.reset_index(drop=True)
+    
+    @staticmethod
+    def _to_long_frame(data: pd.DataFrame, ticker_col: str, date_col: str) -> pd.DataFrame:
+        """将长表/MultiIndex/面板统一转换为按(股票, 日期)排序的长表"""
+        if isinstance(data.columns, pd.MultiIndex):
+            # 面板: 日期索引 × (字段, 股票)
+            data = data.stack(level=-1, future_stack=True)
+            data.index = data.index.set_names([date_col, ticker_col])
+            data = data.reset_index()
+        elif isinstance(data.index, pd.MultiIndex):
+            names = [name or default for name, default
+                     in zip(data.index.names, [ticker_col, date_col])]
+            data = data.rename_axis(names).reset_index()
+        
+        missing = [col for col in (ticker_col, date_col) if col not in data.columns]
+        if missing:
+            raise ValueError(f"批量信号数据缺少列: {missing}")
+        
+        return data.sort_values([ticker_col, date_col], kind='mergesort').reset_index(drop=True)
+    
+    def _assemble_signals(self, technical_data: pd.DataFrame,
+                          scores: Dict[str, pd.Series],
+                          groups: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """由各维度得分生成信号表, groups 为按股票分组的编码(单股票时为None)"""
+        # 初始化信号表
+        signals = pd.DataFrame(index=technical_data.index)
+        
         # 2. 计算综合得分
         signals['composite_score'] = self._calculate_composite_score(scores)
         
@@ -106,7 +264,8 @@ class SignalGenerator:
         if self.config['filters']['require_confirmation']:
             signals['confirmed_signal'] = self._confirm_signals(
                 signals['raw_signal'], 
-                technical_data
+                technical_data,
+                groups
             )
         else:
             signals['confirmed_signal'] = signals['raw_signal']
@@ -114,15 +273,16 @@ class SignalGenerator:
         # 5. 计算信号强度
         signals['signal_strength'] = self._calculate_signal_strength(
             signals['composite_score'],
-            scores
+            scores,
+            groups
         )
         
         # 6. 计算置信度
-        signals['confidence'] = self._calculate_confidence(scores, technical_data)
+        signals['confidence'] = self._calculate_confidence(scores, technical_data, groups)
         
         # 7. 检测背离
         if self.config['filters']['enable_divergence_check']:
-            signals['divergence'] = self._detect_divergence(technical_data, signals)
+            signals['divergence'] = self._detect_divergence(technical_data, signals, groups)
         
         # 8. 信号优先级
         signals['priority'] = self._calculate_priority(signals)
@@ -130,36 +290,50 @@ class SignalGenerator:
         # 9. 最终信号
         signals['signal'] = self._finalize_signals(signals)
         
-        # 10. 信号原因
-        signals['reason'] = self._get_signal_reasons(signals, scores)
+        # 10. 信号原因(位掩码, 按需解码)
+        signals['reason_code'] = self._get_signal_reasons(signals, scores)
+        if self.config.get('decode_reasons', True):
+            signals['reason'] = self.decode_signal_reasons(signals['reason_code'])
         
         # 11. 风险评分
-        signals['risk_score'] = self._calculate_risk_score(technical_data, signals)
-        
-        # 更新统计
-        self._update_statistics(signals)
-        
-        # 保存历史
-        self.signal_history.append({
-            'timestamp': datetime.now(),
-            'signals': signals.copy()
-        })
-        
-        self.logger.info(f"信号生成完成: 买入{self.signal_stats['buy_signals']}, "
-                        f"卖出{self.signal_stats['sell_signals']}")
+        signals['risk_score'] = self._calculate_risk_score(technical_data, signals, groups)
         
         return signals
     
+    @staticmethod
+    def _shift(series: pd.Series, groups: Optional[np.ndarray], periods: int = 1) -> pd.Series:
+        """按股票分组的shift"""
+        if groups is None:
+            return series.shift(periods)
+        return series.groupby(groups, sort=False).shift(periods)
+    
+    @staticmethod
+    def _rolling(series: pd.Series, window: int, func: str,
+                 groups: Optional[np.ndarray]) -> pd.Series:
+        """按股票分组的滚动统计(func: sum/mean/max/min)"""
+        if groups is None:
+            return getattr(series.rolling(window), func)()
+        result = getattr(series.groupby(groups, sort=False).rolling(window), func)()
+        return result.reset_index(level=0, drop=True).reindex(series.index)
+    
+    @staticmethod
+    def _rank_pct(series: pd.Series, groups: Optional[np.ndarray]) -> pd.Series:
+        """按股票分组的百分位排名"""
+        if groups is None:
+            return series.rank(pct=True)
+        return series.groupby(groups, sort=False).rank(pct=True)
+    
     def _calculate_dimensional_scores(self,
                                      technical_data: pd.DataFrame,
                                      capital_data: Optional[pd.DataFrame],
                                      sentiment_data: Optional[pd.DataFrame],
-                                     pattern_data: Optional[pd.DataFrame]) -> Dict[str, pd.Series]:
+                                     pattern_data: Optional[pd.DataFrame],
+                                     groups: Optional[np.ndarray] = None) -> Dict[str, pd.Series]:
         """计算各维度得分"""
         scores = {}
         
         # 技术指标得分
-        scores['technical'] = self._calculate_technical_score(technical_data)
+        scores['technical'] = self._calculate_technical_score(technical_data, groups)
         
         # 资金流得分
         if capital_data is not None and not capital_data.empty:
@@ -181,7 +355,8 @@ class SignalGenerator:
         
         return scores
     
-    def _calculate_technical_score(self, data: pd.DataFrame) -> pd.Series:
+    def _calculate_technical_score(self, data: pd.DataFrame,
+                                   groups: Optional[np.ndarray] = None) -> pd.Series:
         """计算技术指标得分"""
         score = pd.Series(50, index=data.index)
         
@@ -196,16 +371,16 @@ class SignalGenerator:
         # MACD
         if 'macd' in data.columns and 'signal' in data.columns:
             macd_cross_up = (data['macd'] > data['signal']) & \
-                           (data['macd'].shift(1) <= data['signal'].shift(1))
+                           (self._shift(data['macd'], groups) <= self._shift(data['signal'], groups))
             macd_cross_down = (data['macd'] < data['signal']) & \
-                             (data['macd'].shift(1) >= data['signal'].shift(1))
+                             (self._shift(data['macd'], groups) >= self._shift(data['signal'], groups))
             
             score[macd_cross_up] += 20
             score[macd_cross_down] -= 20
             
             # MACD柱状图
             if 'histogram' in data.columns:
-                hist_growing = data['histogram'] > data['histogram'].shift(1)
+                hist_growing = data['histogram'] > self._shift(data['histogram'], groups)
                 score[hist_growing] += 5
                 score[~hist_growing] -= 5
         
@@ -223,9 +398,9 @@ class SignalGenerator:
         if all(col in data.columns for col in ['close', 'sma_20', 'sma_60']):
             # 金叉死叉
             golden_cross = (data['sma_20'] > data['sma_60']) & \
-                          (data['sma_20'].shift(1) <= data['sma_60'].shift(1))
+                          (self._shift(data['sma_20'], groups) <= self._shift(data['sma_60'], groups))
             death_cross = (data['sma_20'] < data['sma_60']) & \
-                         (data['sma_20'].shift(1) >= data['sma_60'].shift(1))
+                         (self._shift(data['sma_20'], groups) >= self._shift(data['sma_60'], groups))
             
             score[golden_cross] += 15
             score[death_cross] -= 15
@@ -237,8 +412,8 @@ class SignalGenerator:
         
         # KDJ
         if all(col in data.columns for col in ['k', 'd', 'j']):
-            kdj_golden = (data['k'] > data['d']) & (data['k'].shift(1) <= data['d'].shift(1))
-            kdj_death = (data['k'] < data['d']) & (data['k'].shift(1) >= data['d'].shift(1))
+            kdj_golden = (data['k'] > data['d']) & (self._shift(data['k'], groups) <= self._shift(data['d'], groups))
+            kdj_death = (data['k'] < data['d']) & (self._shift(data['k'], groups) >= self._shift(data['d'], groups))
             
             score[kdj_golden] += 10
             score[kdj_death] -= 10
@@ -320,31 +495,31 @@ class SignalGenerator:
         
         return signals
     
-    def _confirm_signals(self, raw_signals: pd.Series, data: pd.DataFrame) -> pd.Series:
+    def _confirm_signals(self, raw_signals: pd.Series, data: pd.DataFrame,
+                         groups: Optional[np.ndarray] = None) -> pd.Series:
         """确认信号(避免假信号)"""
         confirmed = raw_signals.copy()
         periods = self.config['filters']['confirmation_periods']
+        if periods <= 0:
+            return confirmed
         
-        # 需要连续N个周期的同向信号才确认
-        for i in range(periods, len(confirmed)):
-            # 检查之前的信号
-            prev_signals = raw_signals.iloc[i-periods:i]
-            
-            # 买入确认
-            if raw_signals.iloc[i] > 0:
-                if not all(prev_signals >= 0):
-                    confirmed.iloc[i] = 0
-            
-            # 卖出确认
-            elif raw_signals.iloc[i] < 0:
-                if not all(prev_signals <= 0):
-                    confirmed.iloc[i] = 0
+        # 需要之前N个周期均为同向(或中性)信号才确认: 滚动统计窗口内的反向信号数
+        prev_sells = self._shift(
+            self._rolling((raw_signals < 0).astype(int), periods, 'sum', groups), groups)
+        prev_buys = self._shift(
+            self._rolling((raw_signals > 0).astype(int), periods, 'sum', groups), groups)
+        
+        # 买入确认 / 卖出确认
+        rejected = ((raw_signals > 0) & (prev_sells > 0)) | \
+                   ((raw_signals < 0) & (prev_buys > 0))
+        confirmed[rejected] = 0
         
         return confirmed
     
     def _calculate_signal_strength(self, 
                                   composite_score: pd.Series,
-                                  scores: Dict[str, pd.Series]) -> pd.Series:
+                                  scores: Dict[str, pd.Series],
+                                  groups: Optional[np.ndarray] = None) -> pd.Series:
         """计算信号强度"""
         # 基础强度来自综合得分
         strength = abs(composite_score - 50) / 50
@@ -358,28 +533,41 @@ class SignalGenerator:
         
         # 信号衰减
         if self.config['signal_decay']['enabled']:
-            strength = self._apply_signal_decay(strength)
+            strength = self._apply_signal_decay(strength, groups)
         
         return (strength * consistency).clip(0, 1)
     
-    def _apply_signal_decay(self, strength: pd.Series) -> pd.Series:
+    def _apply_signal_decay(self, strength: pd.Series,
+                            groups: Optional[np.ndarray] = None) -> pd.Series:
         """应用信号衰减"""
         half_life = self.config['signal_decay']['half_life']
         min_strength = self.config['signal_decay']['min_strength']
         
-        # 简单的指数衰减模型
+        # 指数衰减模型: 信号持续k期后强度乘以 decay_factor**k
         decay_factor = 0.5 ** (1 / half_life)
-        decayed = strength.copy()
-        
-        for i in range(1, len(decayed)):
-            if decayed.iloc[i] == decayed.iloc[i-1]:
-                # 信号持续,强度衰减
-                decayed.iloc[i] = max(decayed.iloc[i] * decay_factor, min_strength)
+        values = strength.to_numpy(dtype=float)
+        if len(values) == 0:
+            return strength.copy()
+        
+        # 游程长度: 每个连续相同取值段内的位置序号
+        positions = np.arange(len(values))
+        run_start = np.ones(len(values), dtype=bool)
+        run_start[1:] = values[1:] != values[:-1]
+        if groups is not None:
+            run_start[1:] |= groups[1:] != groups[:-1]
+        run_offset = positions - np.maximum.accumulate(np.where(run_start, positions, 0))
+        
+        decayed = np.where(
+            run_offset > 0,
+            np.maximum(values * decay_factor ** run_offset, min_strength),
+            values
+        )
         
-        return decayed
+        return pd.Series(decayed, index=strength.index)
     
     def _calculate_confidence(self, scores: Dict[str, pd.Series], 
-                            data: pd.DataFrame) -> pd.Series:
+                            data: pd.DataFrame,
+                            groups: Optional[np.ndarray] = None) -> pd.Series:
         """计算置信度"""
         confidence = pd.Series(50, index=list(scores.values())[0].index)
         
@@ -392,24 +580,25 @@ class SignalGenerator:
         
         # 考虑成交量
         if 'volume' in data.columns:
-            volume_ratio = data['volume'] / data['volume'].rolling(20).mean()
+            volume_ratio = data['volume'] / self._rolling(data['volume'], 20, 'mean', groups)
             confidence *= np.where(volume_ratio > 1.5, 1.2, 1.0)
         
         return confidence.clip(0, 100)
     
-    def _detect_divergence(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.Series:
+    def _detect_divergence(self, data: pd.DataFrame, signals: pd.DataFrame,
+                           groups: Optional[np.ndarray] = None) -> pd.Series:
         """检测背离"""
         divergence = pd.Series(0, index=data.index)
         
         if 'close' in data.columns and 'rsi' in data.columns:
             # 价格创新高但RSI没有
-            price_high = data['close'] == data['close'].rolling(20).max()
-            rsi_not_high = data['rsi'] < data['rsi'].rolling(20).max()
+            price_high = data['close'] == self._rolling(data['close'], 20, 'max', groups)
+            rsi_not_high = data['rsi'] < self._rolling(data['rsi'], 20, 'max', groups)
             bearish_divergence = price_high & rsi_not_high
             
             # 价格创新低但RSI没有
-            price_low = data['close'] == data['close'].rolling(20).min()
-            rsi_not_low = data['rsi'] > data['rsi'].rolling(20).min()
+            price_low = data['close'] == self._rolling(data['close'], 20, 'min', groups)
+            rsi_not_low = data['rsi'] > self._rolling(data['rsi'], 20, 'min', groups)
             bullish_divergence = price_low & rsi_not_low
             
             divergence[bullish_divergence] = 1  # 看涨背离
@@ -457,41 +646,68 @@ class SignalGenerator:
     
     def _get_signal_reasons(self, signals: pd.DataFrame, 
                            scores: Dict[str, pd.Series]) -> pd.Series:
-        """获取信号原因"""
-        reasons = pd.Series("", index=signals.index)
-        
-        for i in signals.index:
-            if signals.loc[i, 'signal'] != 0:
-                reason_parts = []
-                
-                # 找出贡献最大的维度
-                for dim, score in scores.items():
-                    if abs(score.loc[i] - 50) > 20:
-                        if score.loc[i] > 70:
-                            reason_parts.append(f"{dim}:bullish")
-                        elif score.loc[i] < 30:
-                            reason_parts.append(f"{dim}:bearish")
-                
-                # 特殊情况
-                if 'divergence' in signals.columns and signals.loc[i, 'divergence'] != 0:
-                    reason_parts.append("divergence")
-                
-                reasons.loc[i] = "|".join(reason_parts) if reason_parts else "composite"
-        
-        return reasons
+        """获取信号原因编码(位掩码), 通过 decode_signal_reasons 解码"""
+        active = (signals['signal'] != 0).to_numpy()
+        codes = np.where(active, REASON_ACTIVE, 0).astype(np.int64)
+        
+        # 贡献显著的维度: 得分>70看涨, <30看跌
+        for dim, score in scores.items():
+            if dim not in REASON_DIMENSIONS:
+                continue
+            bullish_bit, bearish_bit = REASON_DIMENSIONS[dim]
+            values = score.reindex(signals.index).to_numpy(dtype=float)
+            codes |= np.where(active & (values > 70), bullish_bit, 0)
+            codes |= np.where(active & (values < 30), bearish_bit, 0)
+        
+        # 特殊情况
+        if 'divergence' in signals.columns:
+            has_divergence = (signals['divergence'] != 0).to_numpy()
+            codes |= np.where(active & has_divergence, REASON_DIVERGENCE, 0)
+        
+        return pd.Series(codes, index=signals.index)
     
-    def _calculate_risk_score(self, data: pd.DataFrame, signals: pd.DataFrame) -> pd.Series:
+    @staticmethod
+    def decode_signal_reasons(reason_codes: pd.Series) -> pd.Series:
+        """
+        将信号原因位掩码解码为可读文本
+        
+        只对出现过的唯一编码解码一次再映射回全表, 大面板上代价与行数无关。
+        
+        Args:
+            reason_codes: _get_signal_reasons 生成的编码序列
+            
+        Returns:
+            形如 "technical:bullish|divergence" 的原因序列, 无信号为空串
+        """
+        def _decode(code: int) -> str:
+            if not code & REASON_ACTIVE:
+                return ""
+            reason_parts = []
+            for dim, (bullish_bit, bearish_bit) in REASON_DIMENSIONS.items():
+                if code & bullish_bit:
+                    reason_parts.append(f"{dim}:bullish")
+                elif code & bearish_bit:
+                    reason_parts.append(f"{dim}:bearish")
+            if code & REASON_DIVERGENCE:
+                reason_parts.append("divergence")
+            return "|".join(reason_parts) if reason_parts else "composite"
+        
+        lookup = {code: _decode(int(code)) for code in pd.unique(reason_codes)}
+        return reason_codes.map(lookup)
+    
+    def _calculate_risk_score(self, data: pd.DataFrame, signals: pd.DataFrame,
+                              groups: Optional[np.ndarray] = None) -> pd.Series:
         """计算风险评分"""
         risk = pd.Series(50, index=signals.index)
         
         # 波动率风险
         if 'volatility' in data.columns:
-            vol_percentile = data['volatility'].rank(pct=True)
+            vol_percentile = self._rank_pct(data['volatility'], groups)
             risk += vol_percentile * 20
         
         # ATR风险
         if 'atr' in data.columns:
-            atr_percentile = data['atr'].rank(pct=True)
+            atr_percentile = self._rank_pct(data['atr'], groups)
             risk += atr_percentile * 20
         
         # 信号强度反向(强信号低风险)
@@ -510,4 +726,12 @@ class SignalGenerator:
         """设置日志"""
         logger = logging.getLogger("SignalGenerator")
         logger.setLevel(logging.INFO)
-        return logger
\ No newline at end of file
+        return logger
+
+
+def _generate_signal_chunk(config: Dict, frames: Dict[str, pd.DataFrame],
+                           ticker_col: str, date_col: str) -> pd.DataFrame:
+    """多进程批量信号的工作函数(模块级以便序列化)"""
+    generator = SignalGenerator(config)
+    frames = {name: frame.reset_index(drop=True) for name, frame in frames.items()}
+    return generator._generate_batch_frame(frames, ticker_col, date_col)
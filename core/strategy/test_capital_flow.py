@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市场资金流面板分析测试
+======================
+
+- 逐日 update 的连续天数与Z-score与整段面板一次计算一致
+- fit 接受字符串日期索引的宽表, 之后的 update 正常追加
+- update 拒绝多个交易日或重复股票代码的输入
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.strategy.capital_flow_analysis import CapitalFlowPanelAnalyzer
+
+
+def _make_flow(n_days=80, tickers=('000001', '000002', '600000'), seed=5):
+    """合成资金流长表"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=n_days)
+    return pd.DataFrame({
+        'ticker': np.tile(tickers, n_days),
+        'tradeDate': np.repeat(dates.strftime('%Y-%m-%d'), len(tickers)),
+        'mainNetFlow': rng.normal(0, 1e7, n_days * len(tickers)),
+    })
+
+
+def test_update_matches_panel():
+    """测试增量更新与整段计算一致"""
+    print("🧪 测试资金流增量更新...")
+
+    flow = _make_flow()
+    dates = sorted(flow['tradeDate'].unique())
+    analyzer = CapitalFlowPanelAnalyzer(window=20, min_periods=10).fit(flow[flow['tradeDate'] < dates[40]])
+    for date in dates[40:]:
+        analyzer.update(flow[flow['tradeDate'] == date])
+
+    reference = CapitalFlowPanelAnalyzer(window=20, min_periods=10)
+    panel = reference.to_panel(flow)
+    expected_in = reference.consecutive_days(panel, positive=True).iloc[-1]
+    expected_out = reference.consecutive_days(panel, positive=False).iloc[-1]
+    expected_z = reference.detect_abnormal_flow(panel)['z_score'].iloc[-1]
+
+    pd.testing.assert_series_equal(analyzer.inflow_days, expected_in, check_names=False)
+    pd.testing.assert_series_equal(analyzer.outflow_days, expected_out, check_names=False)
+    pd.testing.assert_series_equal(analyzer.latest_zscore(), expected_z, check_names=False)
+
+    print("✅ 资金流增量更新测试通过")
+
+
+def test_fit_string_index_and_validation():
+    """测试宽表字符串日期与输入校验"""
+    print("\n🧪 测试输入校验...")
+
+    flow = _make_flow(n_days=5)
+    panel = flow.pivot(index='tradeDate', columns='ticker', values='mainNetFlow')
+    analyzer = CapitalFlowPanelAnalyzer().fit(panel)
+    assert isinstance(analyzer.recent_flow.index, pd.DatetimeIndex)
+
+    # 已有日期不重复追加, 新日期正常追加
+    analyzer.update(flow[flow['tradeDate'] == panel.index[-1]])
+    assert len(analyzer.recent_flow) == 5
+    analyzer.update(pd.Series({'000001': 1.0, '600000': -1.0}), trade_date='2024-01-09')
+    assert len(analyzer.recent_flow) == 6
+
+    for bad in (flow.tail(6), pd.concat([flow.tail(1), flow.tail(1)])):
+        try:
+            analyzer.update(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("多交易日或重复股票的输入应抛出 ValueError")
+    assert len(analyzer.recent_flow) == 6
+
+    print("✅ 输入校验测试通过")
+
+
+def run_capital_flow_tests():
+    """运行所有资金流面板测试"""
+    print("🚀 开始运行资金流面板测试...")
+    print("=" * 60)
+
+    tests = [
+        ("资金流增量更新", test_update_matches_panel),
+        ("输入校验", test_fit_string_index_and_validation),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_capital_flow_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线形态识别测试
+==============
+
+- compute_pattern_mask 的每个比特与对应的 detect_* 单形态检测一致
+- 全市场宽表扫描与逐只股票检测一致, 最新交易日扫描与完整扫描的最后一行一致
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.strategy.pattern_recognition import PATTERN_BITS, PatternRecognizer, decode_pattern_mask
+
+
+def _make_ohlc(n_days=400, seed=13):
+    """合成OHLC, 混入十字星和大实体K线以覆盖各类形态"""
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+    body = close * rng.choice([0.0, 0.002, 0.03], n_days) * rng.choice([-1, 1], n_days)
+    open_ = close - body
+    high = np.maximum(open_, close) + close * rng.choice([0.0, 0.005, 0.04], n_days)
+    low = np.minimum(open_, close) - close * rng.choice([0.0, 0.005, 0.04], n_days)
+    index = pd.bdate_range('2023-01-02', periods=n_days)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close}, index=index)
+
+
+def test_mask_matches_detectors():
+    """测试位掩码与单形态检测一致"""
+    print("🧪 测试形态位掩码与单形态检测一致...")
+
+    recognizer = PatternRecognizer()
+    ohlc = _make_ohlc()
+    results = recognizer.detect_all_patterns(ohlc)
+    assert list(results) == list(PATTERN_BITS)
+
+    for name in PATTERN_BITS:
+        expected = getattr(recognizer, f'detect_{name}')(ohlc)
+        pd.testing.assert_series_equal(results[name], expected, check_names=False, check_dtype=False)
+        assert expected.sum() > 0, name
+
+    print("✅ 形态位掩码测试通过")
+
+
+def test_universe_scan():
+    """测试全市场扫描"""
+    print("\n🧪 测试全市场形态扫描...")
+
+    recognizer = PatternRecognizer()
+    frames = {ticker: _make_ohlc(seed=seed) for seed, ticker in enumerate(['000001', '000002', '600000'])}
+    wide = {field: pd.DataFrame({t: f[field] for t, f in frames.items()}) for field in ('open', 'high', 'low', 'close')}
+
+    mask = recognizer.scan_patterns(wide['open'], wide['high'], wide['low'], wide['close'])
+    for ticker, ohlc in frames.items():
+        for name, hits in recognizer.detect_all_patterns(ohlc).items():
+            assert (((mask[ticker] & PATTERN_BITS[name]) > 0).astype(int) == hits).all(), (ticker, name)
+
+    latest = recognizer.scan_latest_patterns(wide['open'], wide['high'], wide['low'], wide['close'])
+    last_row = mask.iloc[-1]
+    assert latest['ticker'].tolist() == last_row[last_row > 0].index.tolist()
+    for _, row in latest.iterrows():
+        assert row['patterns'] == decode_pattern_mask(last_row[row['ticker']])
+
+    print("✅ 全市场形态扫描测试通过")
+
+
+def run_pattern_tests():
+    """运行所有形态识别测试"""
+    print("🚀 开始运行K线形态识别测试...")
+    print("=" * 60)
+
+    tests = [
+        ("形态位掩码", test_mask_matches_detectors),
+        ("全市场形态扫描", test_universe_scan),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_pattern_tests()
+    sys.exit(0 if success else 1)
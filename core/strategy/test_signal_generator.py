@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+信号生成器测试
+=============
+
+- 批量(全市场一次计算)与逐只股票生成的信号必须逐行一致:
+  分组内的 shift/rolling/衰减 不得跨股票串位
+- 向量化的信号确认、强度衰减与原因编码与逐行循环的参考实现一致
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.strategy.signal_generator import SignalGenerator
+
+SIGNAL_COLUMNS = [
+    'composite_score', 'raw_signal', 'confirmed_signal', 'signal_strength', 'confidence',
+    'divergence', 'priority', 'signal', 'reason_code', 'reason', 'risk_score',
+]
+
+
+def _make_technical(tickers, n_days=120, seed=7):
+    """合成多只股票的技术指标长表(含情绪/形态得分列)"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=n_days)
+    frames = []
+    for i, ticker in enumerate(tickers):
+        close = pd.Series(10 * (i + 1) * np.exp(np.cumsum(rng.normal(0, 0.02, n_days))))
+        ema_fast = close.ewm(span=12, adjust=False).mean()
+        ema_slow = close.ewm(span=26, adjust=False).mean()
+        macd = ema_fast - ema_slow
+        signal = macd.ewm(span=9, adjust=False).mean()
+        diff = close.diff()
+        gain = diff.clip(lower=0).rolling(14, min_periods=1).mean()
+        loss = (-diff.clip(upper=0)).rolling(14, min_periods=1).mean()
+        mid = close.rolling(20, min_periods=1).mean()
+        std = close.rolling(20, min_periods=1).std().fillna(0)
+        frames.append(pd.DataFrame({
+            'ticker': ticker,
+            'tradeDate': dates,
+            'close': close,
+            'rsi': 100 - 100 / (1 + gain / loss.replace(0, np.nan)),
+            'macd': macd,
+            'signal': signal,
+            'histogram': macd - signal,
+            'bb_upper': mid + 2 * std,
+            'bb_lower': mid - 2 * std,
+            'volume': rng.integers(1_000_000, 5_000_000, n_days).astype(float),
+            'sentiment_momentum': rng.uniform(20, 100, n_days),
+            'pattern_strength': rng.uniform(20, 100, n_days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_batch_matches_per_ticker():
+    """测试批量信号与逐只股票信号一致"""
+    print("🧪 测试批量信号与逐只生成一致...")
+
+    tickers = ['000001', '000002', '600000']
+    technical = _make_technical(tickers)
+    # 打乱行序, 批量接口需自行按 (股票, 日期) 排序
+    shuffled = technical.sample(frac=1.0, random_state=0)
+
+    sentiment = shuffled[['ticker', 'tradeDate', 'sentiment_momentum']]
+    pattern = shuffled[['ticker', 'tradeDate', 'pattern_strength']]
+
+    batch = SignalGenerator().generate_signals_batch(shuffled, sentiment_data=sentiment,
+                                                     pattern_data=pattern)
+    assert len(batch) == len(technical)
+    assert (batch['signal'] > 0).any() and (batch['signal'] < 0).any()
+
+    for ticker in tickers:
+        single = technical[technical['ticker'] == ticker].set_index('tradeDate').drop(columns='ticker')
+        expected = SignalGenerator().generate_signals(
+            single, sentiment_data=single[['sentiment_momentum']],
+            pattern_data=single[['pattern_strength']])[SIGNAL_COLUMNS]
+
+        actual = batch[batch['ticker'] == ticker].set_index('tradeDate')[SIGNAL_COLUMNS]
+        actual.index.name = expected.index.name
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_freq=False)
+
+    print("✅ 批量信号一致性测试通过")
+
+
+def test_post_processing_matches_loops():
+    """测试向量化后处理与逐行循环一致"""
+    print("\n🧪 测试信号后处理与逐行循环一致...")
+
+    rng = np.random.default_rng(11)
+    n = 300
+    index = pd.bdate_range('2024-01-02', periods=n)
+    generator = SignalGenerator()
+
+    # 信号确认: 之前N期内有反向信号则不确认
+    raw = pd.Series(rng.choice([-1, 0, 1], n), index=index)
+    periods = generator.config['filters']['confirmation_periods']
+    expected = raw.copy()
+    for i in range(periods, n):
+        prev = raw.iloc[i - periods:i]
+        if (raw.iloc[i] > 0 and not all(prev >= 0)) or (raw.iloc[i] < 0 and not all(prev <= 0)):
+            expected.iloc[i] = 0
+    pd.testing.assert_series_equal(generator._confirm_signals(raw, pd.DataFrame(index=index)), expected)
+
+    # 强度衰减: 持续k期后乘以 decay_factor**k, 不低于 min_strength
+    strength = pd.Series(rng.choice([0.2, 0.6, 0.9], n), index=index)
+    decay = generator.config['signal_decay']
+    factor = 0.5 ** (1 / decay['half_life'])
+    expected = strength.copy()
+    run = 0
+    for i in range(1, n):
+        run = run + 1 if strength.iloc[i] == strength.iloc[i - 1] else 0
+        if run:
+            expected.iloc[i] = max(strength.iloc[i] * factor ** run, decay['min_strength'])
+    pd.testing.assert_series_equal(generator._apply_signal_decay(strength), expected)
+
+    # 原因编码解码后与逐行拼接的文本一致
+    scores = {dim: pd.Series(rng.uniform(0, 100, n), index=index)
+              for dim in ('technical', 'capital', 'sentiment', 'pattern')}
+    signals = pd.DataFrame({'signal': rng.choice([-1, 0, 1], n),
+                            'divergence': rng.choice([-1, 0, 0, 1], n)}, index=index)
+    expected = pd.Series("", index=index)
+    for i in index:
+        if signals.loc[i, 'signal'] != 0:
+            parts = [f"{dim}:{'bullish' if score.loc[i] > 70 else 'bearish'}"
+                     for dim, score in scores.items() if score.loc[i] > 70 or score.loc[i] < 30]
+            if signals.loc[i, 'divergence'] != 0:
+                parts.append("divergence")
+            expected.loc[i] = "|".join(parts) if parts else "composite"
+    codes = generator._get_signal_reasons(signals, scores)
+    pd.testing.assert_series_equal(generator.decode_signal_reasons(codes), expected)
+
+    print("✅ 信号后处理一致性测试通过")
+
+
+def run_signal_tests():
+    """运行所有信号生成测试"""
+    print("🚀 开始运行信号生成器测试...")
+    print("=" * 60)
+
+    tests = [
+        ("批量信号一致性", test_batch_matches_per_ticker),
+        ("信号后处理一致性", test_post_processing_matches_loops),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_signal_tests()
+    sys.exit(0 if success else 1)
@@ -98,7 +98,9 @@ try:
         log_execution,
         rate_limit,
         deprecated,
-        async_timeit
+        async_timeit,
+        memoize,
+        fingerprint
     )
     imported_components['decorators'] = {
         'timeit': timeit,
@@ -108,7 +110,9 @@ try:
         'log_execution': log_execution,
         'rate_limit': rate_limit,
         'deprecated': deprecated,
-        'async_timeit': async_timeit
+        'async_timeit': async_timeit,
+        'memoize': memoize,
+        'fingerprint': fingerprint
     }
     print("✅ 装饰器集合加载成功")
 except ImportError as e:
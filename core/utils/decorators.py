@@ -10,6 +10,7 @@
 - ⏱️ timeit: 测量函数执行时间
 - 🔄 retry: 自动重试失败的操作
 - 💾 cache_result: 缓存函数结果
+- 🧠 memoize: 按内容指纹缓存(支持DataFrame/ndarray参数), 按字节数限额, 可持久化
 - ✅ validate_input: 验证输入参数
 - 📝 log_execution: 记录函数执行
 - 🚦 rate_limit: 限制调用频率
@@ -45,6 +46,14 @@ from datetime import datetime, timedelta
 from collections import OrderedDict
 from threading import Lock, RLock
 import inspect
+import sys
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None
+    pd = None
 
 # 获取日志器
 logger = logging.getLogger(__name__)
@@ -327,11 +336,12 @@ def cache_result(maxsize: int = 128,
             if key_func:
                 cache_key = key_func(*args, **kwargs)
             else:
-                # 默认使用参数的哈希值
-                key_data = (args, tuple(sorted(kwargs.items())))
-                cache_key = hashlib.md5(
-                    pickle.dumps(key_data)
-                ).hexdigest()
+                # 默认使用参数的内容指纹(DataFrame/ndarray按数据缓冲区计算)
+                try:
+                    cache_key = fingerprint((args, tuple(sorted(kwargs.items()))))
+                except FingerprintError as e:
+                    logger.debug(f"{func.__name__} 参数无法计算指纹, 不缓存: {e}")
+                    return func(*args, **kwargs)
             
             # 尝试从缓存获取
             result = cache.get(cache_key)
@@ -354,6 +364,293 @@ def cache_result(maxsize: int = 128,
     
     return decorator
 
+# ==========================================
+# 内容指纹与记忆化
+# ==========================================
+
+# 显式开启抽样时(sample_threshold), 超过阈值的数组只对抽样块计算指纹
+FINGERPRINT_SAMPLE_BLOCKS = 256
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+
+class FingerprintError(TypeError):
+    """对象无法按内容计算指纹(不可pickle的自定义对象)"""
+
+
+def _hash_array(digest, values, sample_threshold: Optional[int]):
+    """把数组的dtype、形状与数据缓冲区写入哈希"""
+    if values.dtype.hasobject:
+        # 对象数组没有可直接哈希的缓冲区, 使用pandas的逐元素哈希;
+        # 混合类型元素会被转为字符串哈希(1 与 '1' 相同), 因此同时写入每个元素的类型名
+        digest.update(f"object{values.shape}".encode())
+        if pd is not None:
+            flat = values.ravel(order='K')
+            try:
+                hashed = pd.util.hash_array(flat)
+                type_names = np.array([type(item).__name__ for item in flat], dtype=object)
+                digest.update(hashed.tobytes())
+                digest.update(pd.util.hash_array(type_names).tobytes())
+                return
+            except TypeError:
+                # 元素为list/dict等不可哈希对象
+                pass
+        for item in values.ravel(order='K'):
+            _update_fingerprint(digest, item, sample_threshold)
+        return
+    digest.update(f"{values.dtype.str}{values.shape}".encode())
+    buffer = memoryview(np.ascontiguousarray(values)).cast('B')
+    if sample_threshold is None or buffer.nbytes <= sample_threshold:
+        digest.update(buffer)
+        return
+    # 大数组: 首尾块 + 均匀分布的抽样块
+    step = max((buffer.nbytes - FINGERPRINT_BLOCK_SIZE) // (FINGERPRINT_SAMPLE_BLOCKS - 1), 1)
+    for start in range(0, buffer.nbytes, step):
+        digest.update(buffer[start:start + FINGERPRINT_BLOCK_SIZE])
+    digest.update(buffer[-FINGERPRINT_BLOCK_SIZE:])
+
+
+def _update_fingerprint(digest, obj: Any, sample_threshold: Optional[int]):
+    """递归地把对象内容写入哈希"""
+    if pd is not None and isinstance(obj, pd.DataFrame):
+        digest.update(b'DataFrame')
+        _update_fingerprint(digest, obj.index, sample_threshold)
+        _update_fingerprint(digest, list(obj.columns), sample_threshold)
+        for _, column in obj.items():
+            _update_fingerprint(digest, column, sample_threshold)
+    elif pd is not None and isinstance(obj, (pd.Series, pd.Index)):
+        digest.update(type(obj).__name__.encode() + str(obj.dtype).encode() + repr(obj.name).encode())
+        if isinstance(obj, pd.Series):
+            _update_fingerprint(digest, obj.index, sample_threshold)
+        if isinstance(obj.dtype, pd.CategoricalDtype):
+            _update_fingerprint(digest, obj.cat.categories if isinstance(obj, pd.Series) else obj.categories,
+                                sample_threshold)
+            values = (obj.cat.codes if isinstance(obj, pd.Series) else obj.codes)
+            _hash_array(digest, np.asarray(values), sample_threshold)
+        elif isinstance(obj, pd.RangeIndex):
+            digest.update(f"{obj.start}:{obj.stop}:{obj.step}".encode())
+        else:
+            _hash_array(digest, obj.to_numpy(), sample_threshold)
+    elif np is not None and isinstance(obj, np.ndarray):
+        digest.update(b'ndarray')
+        _hash_array(digest, obj, sample_threshold)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(f"{type(obj).__name__}{len(obj)}(".encode())
+        for item in obj:
+            _update_fingerprint(digest, item, sample_threshold)
+        digest.update(b')')
+    elif isinstance(obj, dict):
+        digest.update(f"dict{len(obj)}(".encode())
+        for key in sorted(obj, key=repr):
+            _update_fingerprint(digest, key, sample_threshold)
+            _update_fingerprint(digest, obj[key], sample_threshold)
+        digest.update(b')')
+    elif obj is None or isinstance(obj, (str, bytes, int, float, bool, complex, datetime, timedelta)):
+        digest.update(f"{type(obj).__name__}:{obj!r}".encode())
+    else:
+        try:
+            digest.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            # 对象id在回收后会被复用, 不能作为内容标识
+            raise FingerprintError(f"无法计算 {type(obj).__qualname__} 对象的内容指纹: {e}") from e
+
+
+def fingerprint(obj: Any, sample_threshold: Optional[int] = None) -> str:
+    """
+    计算对象的内容指纹
+    
+    DataFrame/Series/Index/ndarray 按 dtype、形状、索引和数据缓冲区计算, 不经过 repr 或 pickle;
+    默认完整哈希; 指定 sample_threshold 时超过该字节数的数组只哈希首尾块与均匀抽样块,
+    抽样之外的数据变化不会改变指纹, 只适用于确知大数组不会局部修改的场景。
+    
+    Args:
+        obj: 任意对象, 容器类型递归处理
+        sample_threshold: 抽样阈值(字节), None为始终完整哈希
+    
+    Returns:
+        str: 32位十六进制指纹
+    
+    Raises:
+        FingerprintError: 对象(或其中的元素)无法按内容计算指纹
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _update_fingerprint(digest, obj, sample_threshold)
+    return digest.hexdigest()
+
+
+def estimate_size(obj: Any) -> int:
+    """估算对象占用的内存字节数"""
+    if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if np is not None and isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_size(item) for item in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+
+class ByteLRUCache:
+    """按字节数限额的LRU缓存"""
+    
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cache = OrderedDict()
+        self.lock = RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            value, size, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self.cache[key]
+                self.current_bytes -= size
+                self.misses += 1
+                return default
+            
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: str, value: Any, size: Optional[int] = None):
+        size = estimate_size(value) if size is None else size
+        with self.lock:
+            if key in self.cache:
+                self.current_bytes -= self.cache.pop(key)[1]
+            if size > self.max_bytes:
+                # 单个结果超过总限额, 不缓存
+                return
+            while self.cache and self.current_bytes + size > self.max_bytes:
+                _, (_, evicted_size, _) = self.cache.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+            self.cache[key] = (value, size, time.time())
+            self.current_bytes += size
+    
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.cache),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total > 0 else 0
+            }
+
+
+_MISSING = object()
+
+
+def memoize(max_bytes: int = 256 * 1024 * 1024,
+            ttl: Optional[int] = None,
+            persist: bool = False,
+            cache_manager: Any = None,
+            expire_hours: Optional[int] = None,
+            sample_threshold: Optional[int] = None,
+            key_func: Optional[Callable] = None) -> Callable:
+    """
+    按参数内容缓存纯函数结果
+    
+    参数按 fingerprint 计算缓存键(默认值参与计算, 位置/关键字传参等价);
+    内存层按结果字节数限额; persist=True 时结果另存到 SmartCacheManager,
+    跨进程/重启复用, 同一参数的并发未命中只计算一次。
+    
+    缓存直接返回同一结果对象, 调用方不应原地修改返回的DataFrame。
+    参数无法计算指纹(不可pickle的自定义对象)时直接调用函数, 不缓存。
+    
+    Args:
+        max_bytes: 内存层字节数限额
+        ttl: 内存层过期时间(秒)
+        persist: 是否持久化到 SmartCacheManager
+        cache_manager: 使用的缓存管理器, 默认创建一个共享实例
+        expire_hours: 持久化结果的过期小时数
+        sample_threshold: 大数组抽样指纹阈值(字节), 默认None为完整哈希(见 fingerprint)
+        key_func: 自定义缓存键生成函数
+    
+    Example:
+        @memoize(max_bytes=512 * 1024 * 1024, persist=True)
+        def compute_indicators(prices: pd.DataFrame, window: int = 20):
+            ...
+    """
+    cache = ByteLRUCache(max_bytes=max_bytes, ttl=ttl)
+    
+    def decorator(func):
+        signature = inspect.signature(func)
+        namespace = f"memo_{func.__module__}.{func.__qualname__}"
+        
+        def make_key(args, kwargs) -> str:
+            if key_func:
+                return key_func(*args, **kwargs)
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key_data = (bound.args, tuple(sorted(bound.kwargs.items())))
+            except TypeError:
+                key_data = (args, tuple(sorted(kwargs.items())))
+            return fingerprint((namespace, key_data), sample_threshold)
+        
+        def get_manager():
+            nonlocal cache_manager
+            if cache_manager is None:
+                from core.data.cache_manager import get_cache_manager
+                cache_manager = get_cache_manager()
+            return cache_manager
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                cache_key = make_key(args, kwargs)
+            except FingerprintError as e:
+                logger.debug(f"{func.__name__} 参数无法计算指纹, 不缓存: {e}")
+                return func(*args, **kwargs)
+            result = cache.get(cache_key, _MISSING)
+            if result is not _MISSING:
+                return result
+            
+            if persist:
+                result = get_manager().get_or_compute(
+                    namespace, {'fingerprint': cache_key},
+                    lambda: func(*args, **kwargs),
+                    expire_hours=expire_hours, tags=[namespace]
+                )
+            else:
+                result = func(*args, **kwargs)
+            cache.set(cache_key, result)
+            return result
+        
+        def cache_clear(persistent: bool = False):
+            cache.clear()
+            if persistent and persist:
+                get_manager().clear_cache(tags=[namespace])
+        
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_stats = cache.get_stats
+        wrapper.cache_key = lambda *args, **kwargs: make_key(args, kwargs)
+        return wrapper
+    
+    return decorator
+
 # ==========================================
 # 验证装饰器
 # ==========================================
@@ -596,11 +893,15 @@ __all__ = [
     'async_timeit',
     'retry',
     'cache_result',
+    'memoize',
+    'fingerprint',
+    'FingerprintError',
     'validate_input',
     'log_execution',
     'rate_limit',
     'deprecated',
     'singleton',
     'LRUCache',
+    'ByteLRUCache',
     'RateLimiter'
 ]
\ No newline at end of file
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容指纹与记忆化测试
+===================
+
+- 内容不同的参数指纹不同(混合类型对象列、嵌套对象列、数组中部修改、索引/列名)
+- 内容相同的参数指纹相同, memoize 命中; 无法计算指纹的参数不缓存
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.utils.decorators import FingerprintError, fingerprint, memoize
+
+
+def test_fingerprint_collisions():
+    """测试指纹不碰撞"""
+    print("🧪 测试内容指纹...")
+
+    distinct_pairs = [
+        (pd.Series([1, 'a']), pd.Series(['1', 'a'])),
+        (pd.Series([1.0, 'a']), pd.Series([1, 'a'])),
+        (pd.Series([[1, 2], [3]]), pd.Series([[1, 2], [4]])),
+        (pd.DataFrame({'a': [1, 2]}), pd.DataFrame({'b': [1, 2]})),
+        (pd.DataFrame({'a': [1, 2]}), pd.DataFrame({'a': [1, 2]}, index=[5, 6])),
+        (np.arange(10, dtype=np.int64), np.arange(10, dtype=np.int32)),
+        ((1, 2), [1, 2]),
+    ]
+    for left, right in distinct_pairs:
+        assert fingerprint(left) != fingerprint(right), (left, right)
+
+    # 大数组中部的修改也能识别(默认完整哈希)
+    big = np.zeros(4_000_000)
+    changed = big.copy()
+    changed[2_000_123] = 1.0
+    assert fingerprint(big) != fingerprint(changed)
+
+    frame = pd.DataFrame({'ticker': ['000001', '000002'], 'close': [10.0, 11.0]})
+    assert fingerprint(frame) == fingerprint(frame.copy())
+
+    try:
+        fingerprint(lambda x: x)
+    except FingerprintError:
+        pass
+    else:
+        raise AssertionError("不可pickle的对象应抛出 FingerprintError")
+
+    print("✅ 内容指纹测试通过")
+
+
+def test_memoize_hits():
+    """测试记忆化命中与不缓存的情况"""
+    print("\n🧪 测试memoize...")
+
+    calls = []
+
+    @memoize()
+    def total(values, scale=1):
+        calls.append(1)
+        return sum(values) * scale
+
+    assert total(pd.Series([1, 2])) == 3
+    assert total(pd.Series([1, 2]), scale=1) == 3
+    assert len(calls) == 1
+    assert total(pd.Series([1, 3])) == 4
+    assert len(calls) == 2
+
+    # 混合类型对象列不与字符串列共用结果
+    @memoize()
+    def first_type(values):
+        calls.append(1)
+        return type(values.iloc[0]).__name__
+
+    assert first_type(pd.Series([1, 'a'])) == 'int'
+    assert first_type(pd.Series(['1', 'a'])) == 'str'
+
+    # 参数无法计算指纹时每次都调用
+    @memoize()
+    def apply(func):
+        calls.append(1)
+        return func(2)
+
+    before = len(calls)
+    assert apply(lambda x: x * 2) == 4
+    assert apply(lambda x: x * 2) == 4
+    assert len(calls) == before + 2
+
+    print("✅ memoize测试通过")
+
+
+def run_decorator_tests():
+    """运行所有装饰器测试"""
+    print("🚀 开始运行装饰器测试...")
+    print("=" * 60)
+
+    tests = [
+        ("内容指纹", test_fingerprint_collisions),
+        ("memoize", test_memoize_hits),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_decorator_tests()
+    sys.exit(0 if success else 1)
@@ -10,13 +10,36 @@ import json
 from datetime import datetime
 import logging
 
+# 框架存储模块不可用时退化为目录扫描与普通CSV读取
+try:
+    from core.data.storage.data_catalog import DataCatalog
+    from core.data.storage.schema_registry import get_schema_registry
+except ImportError:
+    DataCatalog = None
+    get_schema_registry = None
+    from unified_data_access import DirectoryScanCatalog, PlainCSVReader
+
 class CSVDataReader:
     """CSV数据读取器"""
     
-    def __init__(self):
+    def __init__(self, catalog_path="data/catalog.db", catalog_max_age=600):
         # 主要数据源目录
         self.main_data_dir = Path("data/final_comprehensive_download")
         self.optimized_data_dir = Path("data/optimized_data")  
+        
+        # 数据目录索引, 来源名与UnifiedDataAccess保持一致以共享同一份目录
+        self.catalog_sources = {
+            "final_comprehensive_download": {"path": self.main_data_dir, "priority": 1},
+            "optimized_data": {"path": self.optimized_data_dir, "priority": 2}
+        }
+        if DataCatalog is not None:
+            self.catalog = DataCatalog(catalog_path)
+            self.schema_registry = get_schema_registry()
+        else:
+            logging.warning("⚠️ 无法导入数据目录索引, 使用目录扫描")
+            self.catalog = DirectoryScanCatalog(self.catalog_sources)
+            self.schema_registry = PlainCSVReader()
+        self.catalog_max_age = catalog_max_age
         self.setup_logging()
         
     def setup_logging(self):
@@ -33,19 +56,26 @@ class CSVDataReader:
         # 扫描主要数据源
         if self.main_data_dir.exists():
             datasets["comprehensive"] = self._scan_directory(
-                self.main_data_dir, "完整下载数据 (204GB)"
+                "final_comprehensive_download", "完整下载数据 (204GB)"
             )
         
         # 扫描优化数据源
         if self.optimized_data_dir.exists():
             datasets["optimized"] = self._scan_directory(
-                self.optimized_data_dir, "优化数据 (5.5GB)"
+                "optimized_data", "优化数据 (5.5GB)"
             )
         
         return datasets
     
-    def _scan_directory(self, directory, description):
-        """扫描目录获取数据集信息"""
+    def _ensure_catalog(self):
+        """目录过期(有新增/删除文件或超过catalog_max_age)时增量刷新"""
+        if self.catalog.is_stale(self.catalog_max_age, self.catalog_sources):
+            self.catalog.refresh(self.catalog_sources)
+    
+    def _scan_directory(self, source_name, description):
+        """从数据目录索引汇总数据集信息"""
+        self._ensure_catalog()
+        
         info = {
             "description": description,
             "categories": {},
@@ -53,38 +83,28 @@ class CSVDataReader:
             "total_size_gb": 0
         }
         
-        for category_dir in directory.iterdir():
-            if not category_dir.is_dir():
+        for row in self.catalog.summarize():
+            if row["source"] != source_name:
                 continue
-                
-            category_info = {
+            
+            category_info = info["categories"].setdefault(row["category"], {
                 "apis": {},
                 "file_count": 0,
                 "size_gb": 0
-            }
+            })
             
-            for api_dir in category_dir.iterdir():
-                if not api_dir.is_dir():
-                    continue
-                    
-                csv_files = list(api_dir.glob("*.csv"))
-                if not csv_files:
-                    continue
-                    
-                api_size = sum(f.stat().st_size for f in csv_files) / 1024 / 1024 / 1024
-                
-                category_info["apis"][api_dir.name] = {
-                    "files": len(csv_files),
-                    "size_gb": round(api_size, 2),
-                    "files_list": [f.name for f in csv_files[:5]]  # 只显示前5个
-                }
-                category_info["file_count"] += len(csv_files)
-                category_info["size_gb"] += api_size
+            api_size = row["size_bytes"] / 1024 / 1024 / 1024
+            files = self.catalog.get_files(row["category"], row["api"], source=source_name)
             
-            if category_info["file_count"] > 0:
-                info["categories"][category_dir.name] = category_info
-                info["total_files"] += category_info["file_count"]
-                info["total_size_gb"] += category_info["size_gb"]
+            category_info["apis"][row["api"]] = {
+                "files": row["total_files"],
+                "size_gb": round(api_size, 2),
+                "files_list": [f["filename"] for f in files[:5]]  # 只显示前5个
+            }
+            category_info["file_count"] += row["total_files"]
+            category_info["size_gb"] += api_size
+            info["total_files"] += row["total_files"]
+            info["total_size_gb"] += api_size
         
         return info
     
@@ -97,8 +117,10 @@ class CSVDataReader:
         # 确定数据目录
         if dataset == "comprehensive":
             base_dir = self.main_data_dir
+            source_name = "final_comprehensive_download"
         elif dataset == "optimized":
             base_dir = self.optimized_data_dir
+            source_name = "optimized_data"
         else:
             logging.error("❌ 无效的数据集名称，请使用 'comprehensive' 或 'optimized'")
             return None
@@ -124,9 +146,10 @@ class CSVDataReader:
                 file_path = file_path.with_suffix('.csv')
         else:
             # 列出API下的所有文件
-            csv_files = list(api_dir.glob("*.csv"))
+            self._ensure_catalog()
+            csv_files = self.catalog.get_files(category, api, source=source_name)
             if csv_files:
-                file_path = csv_files[0]  # 取第一个文件
+                file_path = Path(csv_files[0]["path"])  # 取第一个文件
                 logging.info(f"📁 找到 {len(csv_files)} 个文件，加载: {file_path.name}")
             else:
                 logging.error(f"❌ 未找到CSV文件: {api_dir}")
@@ -151,18 +174,21 @@ class CSVDataReader:
                 chunk_list = []
                 total_rows = 0
                 
-                for i, chunk in enumerate(pd.read_csv(file_path, chunksize=chunk_size, low_memory=False)):
+                for i, chunk in enumerate(self.schema_registry.read_csv(file_path, api, chunksize=chunk_size)):
                     chunk_list.append(chunk)
                     total_rows += len(chunk)
                     
                     if max_rows and total_rows >= max_rows:
-                        # 截取到指定行数
+                        # 截取到指定行数(总行数取自数据目录, 不重新解析文件)
                         if len(chunk_list) > 1:
-                            df = pd.concat(chunk_list, ignore_index=True)
+                            df = self.schema_registry.concat(chunk_list)
                         else:
                             df = chunk_list[0]
                         df = df.head(max_rows)
-                        logging.info(f"📋 已加载 {len(df):,} 行数据 (分块读取)")
+                        file_info = self.catalog.get_file_info(file_path)
+                        known_rows = file_info.get("row_count") if file_info else None
+                        logging.info(f"📋 已加载 {len(df):,} 行数据 (分块读取"
+                                     f"{f', 总计 {known_rows:,} 行' if known_rows else ''})")
                         break
                         
                     if i >= 10:  # 最多读取10个chunk
@@ -175,15 +201,16 @@ class CSVDataReader:
                 if len(chunk_list) == 1:
                     df = chunk_list[0]
                 else:
-                    df = pd.concat(chunk_list, ignore_index=True)
+                    df = self.schema_registry.concat(chunk_list)
                     
             else:
                 # 普通读取
-                df = pd.read_csv(file_path, low_memory=False)
+                df = self.schema_registry.read_csv(file_path, api)
                 
                 if max_rows and len(df) > max_rows:
+                    total_rows = len(df)
                     df = df.head(max_rows)
-                    logging.info(f"📋 已加载前 {max_rows:,} 行数据 (总计 {pd.read_csv(file_path, low_memory=False).shape[0]:,} 行)")
+                    logging.info(f"📋 已加载前 {max_rows:,} 行数据 (总计 {total_rows:,} 行)")
                 else:
                     logging.info(f"📋 已加载全部 {len(df):,} 行数据")
             
@@ -208,6 +235,28 @@ class CSVDataReader:
             logging.error(f"❌ 读取数据失败: {e}")
             return None
     
+    def iter_data(self, dataset="comprehensive", category=None, api=None,
+                  filename=None, columns=None, chunk_size=100000):
+        """逐块产出CSV数据(按注册类型解析), 内存只保留当前块"""
+        source_name = {"comprehensive": "final_comprehensive_download",
+                       "optimized": "optimized_data"}.get(dataset)
+        if source_name is None or not (category and api):
+            logging.error("❌ 请提供有效的dataset、category和api参数")
+            return
+        
+        self._ensure_catalog()
+        files = self.catalog.get_files(category, api, source=source_name)
+        if filename:
+            files = [f for f in files if f["filename"] in (filename, f"{filename}.csv")]
+        
+        for file_info in files:
+            total_rows = 0
+            for chunk in self.schema_registry.read_csv(file_info["path"], api, usecols=columns,
+                                                       chunksize=chunk_size):
+                total_rows += len(chunk)
+                yield chunk
+            self.catalog.record_row_count(file_info["path"], total_rows)
+    
     def list_categories(self, dataset="comprehensive"):
         """列出可用的数据类别"""
         datasets = self.get_available_datasets()
@@ -235,9 +284,9 @@ class CSVDataReader:
     def list_files(self, dataset="comprehensive", category=None, api=None):
         """列出指定API下的文件"""
         if dataset == "comprehensive":
-            base_dir = self.main_data_dir
+            source_name = "final_comprehensive_download"
         elif dataset == "optimized":
-            base_dir = self.optimized_data_dir
+            source_name = "optimized_data"
         else:
             logging.error("❌ 无效的数据集名称")
             return []
@@ -245,13 +294,9 @@ class CSVDataReader:
         if not (category and api):
             logging.error("❌ 请提供category和api参数")
             return []
-            
-        api_dir = base_dir / category / api
         
-        if not api_dir.exists():
-            return []
-            
-        return [f.name for f in api_dir.glob("*.csv")]
+        self._ensure_catalog()
+        return [f["filename"] for f in self.catalog.get_files(category, api, source=source_name)]
     
     def show_catalog(self):
         """显示数据目录"""
@@ -26,12 +26,16 @@ except ImportError:
 class MACrossoverStockScreener:
     """十周线上穿百周线股票筛选器"""
     
-    def __init__(self, data_path="sample_stock_data"):
+    def __init__(self, data_path="sample_stock_data", panel_path="data/panel/daily",
+                 adj_factor_path="data/panel/adj_factor.csv", adjust_prices=False):
         """
         初始化筛选器
         
         Args:
             data_path: 样本数据路径
+            panel_path: 内存映射行情面板路径, 存在时优先从面板加载
+            adj_factor_path: MktAdjfGet 复权因子文件
+            adjust_prices: 为True且复权因子文件存在时, 面板数据按前复权计算(默认使用未复权收盘价)
         """
         self.data_path = Path(data_path)
         self.results = []
@@ -39,6 +43,31 @@ class MACrossoverStockScreener:
         
         print(f"📁 数据路径: {self.data_path}")
         
+        # 行情面板(由 core.data.storage.build_ohlcv_panel 构建)
+        self.panel = None
+        self.adjuster = None
+        try:
+            from core.data.storage import OHLCVPanel
+            if OHLCVPanel.exists(panel_path):
+                self.panel = OHLCVPanel(panel_path)
+                print(f"⚡ 使用行情面板: {panel_path} ({self.panel.shape[0]}日 × {self.panel.shape[1]}股)")
+                if adjust_prices and Path(adj_factor_path).exists():
+                    from core.data.processors import PriceAdjuster
+                    self.adjuster = PriceAdjuster.from_files(self.panel, [adj_factor_path])
+                    print(f"⚡ 前复权因子: {adj_factor_path}")
+                elif adjust_prices:
+                    print(f"⚠️ 未找到复权因子文件: {adj_factor_path}")
+        except Exception as e:
+            print(f"⚠️ 行情面板不可用，使用CSV: {e}")
+        
+        if self.adjuster is not None:
+            self.price_basis = "面板前复权收盘价"
+        elif self.panel is not None:
+            self.price_basis = "面板未复权收盘价"
+        else:
+            self.price_basis = "CSV原始收盘价"
+        print(f"💰 价格口径: {self.price_basis}")
+        
         # 查找股票数据文件
         self.find_stock_files()
     
@@ -74,7 +103,16 @@ class MACrossoverStockScreener:
             DataFrame: 股票数据
         """
         try:
-            df = pd.read_csv(file_path)
+            ticker = Path(file_path).stem.split('_')[0]
+            if self.panel is not None and ticker in self.panel.tickers:
+                if self.adjuster is not None:
+                    df = self.adjuster.adjusted_ticker(ticker, fields=['close'], method='forward')
+                else:
+                    df = self.panel.ticker_frame(ticker, fields=['close'])
+                df = df.rename(columns={'close': 'closePrice'})
+                df = df.rename_axis('tradeDate').reset_index()
+            else:
+                df = pd.read_csv(file_path)
             
             # 转换日期列
             df['tradeDate'] = pd.to_datetime(df['tradeDate'])
@@ -381,7 +419,8 @@ class MACrossoverStockScreener:
                 'total_stocks': len(self.stock_files),
                 'analyzed_count': len(self.results),
                 'qualified_count': len(self.qualified_stocks),
-                'qualification_rate': f"{len(self.qualified_stocks)/len(self.stock_files)*100:.1f}%"
+                'qualification_rate': f"{len(self.qualified_stocks)/len(self.stock_files)*100:.1f}%",
+                'price_basis': self.price_basis
             },
             'qualified_stocks': [
                 {
@@ -11,10 +11,10 @@
 4. 建立合理的数据存储结构
 
 策略：
-- 扫描所有批次文件，收集每只股票的完整数据
+- 单次流式读取所有批次文件，按股票路由到内存缓冲区（超出内存预算时溢写磁盘）
 - 获取股票基本信息（上市时间、退市时间）
 - 按股票合并所有时间段的数据
-- 生成统一格式的个股文件
+- 一次性写出统一格式的个股文件
 
 """
 
@@ -24,6 +24,8 @@ from pathlib import Path
 from datetime import datetime
 import logging
 import json
+import pickle
+import shutil
 import time
 import warnings
 from collections import defaultdict
@@ -49,6 +51,12 @@ class IntelligentStockDataReorganizer:
         self.stock_info_cache = {}
         self.stock_data_cache = defaultdict(list)
         
+        # 单次路由状态: 内存缓冲 + 溢写文件
+        self.spill_path = self.output_path / "_spill"
+        self.buffer_bytes = 0
+        self.spilled_stocks = set()
+        self.routed = False
+        
         # 进度追踪
         self.progress_lock = threading.Lock()
         self.processed_files = 0
@@ -198,6 +206,144 @@ class IntelligentStockDataReorganizer:
         self.stock_info_cache = stock_info
         return stock_info
     
+    def route_batches_to_stocks(self, memory_budget_mb=1024, chunk_size=200000):
+        """
+        单次流式读取所有批次文件，将数据行路由到个股缓冲区
+        
+        每个批次文件只解析一次, 读完整个文件后才并入缓冲区(文件要么全部导入, 要么整体跳过);
+        缓冲区超过内存预算时, 把所有缓冲数据追加到各股票的溢写文件并清空缓冲区。
+        
+        Args:
+            memory_budget_mb: 缓冲区内存预算(MB)
+            chunk_size: 每次读取的行数
+            
+        Returns:
+            (股票列表, 年份统计)
+        """
+        print("🔀 单次流式读取批次文件，按股票路由数据...")
+        print("=" * 80)
+        
+        batch_files = sorted(self.batch_path.glob("*.csv"))
+        self.total_files = len(batch_files)
+        budget_bytes = memory_budget_mb * 1024 * 1024
+        
+        self._reset_routing()
+        
+        all_stocks = set()
+        year_stats = defaultdict(set)
+        total_rows = 0
+        spill_count = 0
+        
+        print(f"📊 发现批次文件: {len(batch_files)} 个 | 内存预算: {memory_budget_mb} MB")
+        
+        try:
+            for i, batch_file in enumerate(batch_files, 1):
+                try:
+                    if 'secID' not in pd.read_csv(batch_file, nrows=0).columns:
+                        continue
+                    
+                    # 先暂存本文件的全部分块, 整个文件读完后再并入缓冲区:
+                    # 中途解析失败时整个文件被跳过, 不会只导入前面的分块
+                    year = batch_file.stem.split('_')[0]
+                    file_pieces = defaultdict(list)
+                    file_bytes = 0
+                    file_rows = 0
+                    for chunk in pd.read_csv(batch_file, chunksize=chunk_size):
+                        file_bytes += chunk.memory_usage(deep=True).sum()
+                        file_rows += len(chunk)
+                        for stock_id, stock_rows in chunk.groupby('secID', sort=False):
+                            file_pieces[stock_id].append(stock_rows)
+                except Exception as e:
+                    self.logger.warning(f"跳过文件 {batch_file.name}: {str(e)}")
+                    continue
+                
+                for stock_id, pieces in file_pieces.items():
+                    self.stock_data_cache[stock_id].extend(pieces)
+                    all_stocks.add(stock_id)
+                    year_stats[year].add(stock_id)
+                self.buffer_bytes += file_bytes
+                total_rows += file_rows
+                del file_pieces
+                
+                if self.buffer_bytes > budget_bytes:
+                    # 溢写失败(如磁盘已满)不能按跳过单个文件处理, 否则已路由的数据不完整
+                    self._spill_buffers()
+                    spill_count += 1
+                    
+                if i % 50 == 0 or i <= 10:
+                    print(f"   处理进度: {i}/{len(batch_files)} | 累计股票: {len(all_stocks)} | 累计行数: {total_rows:,}")
+        except BaseException:
+            # 中断或溢写失败: 不留下不完整的溢写文件
+            self._reset_routing()
+            raise
+        
+        self.routed = True
+        all_stocks = sorted(all_stocks)
+        
+        print(f"✅ 路由完成: {total_rows:,} 行, 溢写 {spill_count} 次")
+        print(f"📈 发现股票总数: {len(all_stocks)}")
+        print(f"📅 年份分布: {len(year_stats)} 年")
+        
+        print("\n📊 各年份股票数量:")
+        for year in sorted(year_stats.keys()):
+            print(f"   {year}: {len(year_stats[year])} 只")
+        
+        return all_stocks, year_stats
+    
+    def _reset_routing(self):
+        """清空路由缓冲区并删除溢写目录"""
+        self.stock_data_cache.clear()
+        self.spilled_stocks.clear()
+        self.buffer_bytes = 0
+        self.routed = False
+        if self.spill_path.exists():
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+    
+    def _spill_file(self, stock_id):
+        """股票的溢写文件路径"""
+        return self.spill_path / f"{stock_id.replace('.', '_')}.pkl"
+    
+    def _spill_buffers(self):
+        """把内存缓冲区追加写入各股票的溢写文件"""
+        self.spill_path.mkdir(exist_ok=True)
+        for stock_id, pieces in self.stock_data_cache.items():
+            with open(self._spill_file(stock_id), 'ab') as f:
+                committed = f.tell()
+                try:
+                    pickle.dump(pd.concat(pieces, ignore_index=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+                    f.flush()
+                except BaseException:
+                    # 截掉写了一半的片段, 溢写文件中只保留完整的pickle记录
+                    f.truncate(committed)
+                    raise
+            self.spilled_stocks.add(stock_id)
+        self.stock_data_cache.clear()
+        self.buffer_bytes = 0
+    
+    def _collect_routed_stock_data(self, stock_id):
+        """合并股票的溢写片段与内存缓冲"""
+        pieces = []
+        if stock_id in self.spilled_stocks:
+            with open(self._spill_file(stock_id), 'rb') as f:
+                while True:
+                    try:
+                        pieces.append(pickle.load(f))
+                    except EOFError:
+                        break
+        pieces.extend(self.stock_data_cache.get(stock_id, []))
+        
+        if not pieces:
+            return None
+        return self._finalize_stock_data(pd.concat(pieces, ignore_index=True))
+    
+    def _finalize_stock_data(self, combined_data):
+        """去重并按交易日期排序"""
+        if 'tradeDate' in combined_data.columns:
+            combined_data['tradeDate'] = pd.to_datetime(combined_data['tradeDate'])
+            combined_data = combined_data.drop_duplicates(subset=['tradeDate']).sort_values('tradeDate')
+            combined_data['tradeDate'] = combined_data['tradeDate'].dt.strftime('%Y-%m-%d')
+        return combined_data
+    
     def collect_stock_data_from_batches(self, stock_id, max_workers=4):
         """从所有批次文件中收集单只股票的数据"""
         batch_files = list(self.batch_path.glob("*.csv"))
@@ -228,16 +374,8 @@ class IntelligentStockDataReorganizer:
         if not stock_data_pieces:
             return None
         
-        # 合并所有数据片段
-        combined_data = pd.concat(stock_data_pieces, ignore_index=True)
-        
-        # 去重并排序
-        if 'tradeDate' in combined_data.columns:
-            combined_data['tradeDate'] = pd.to_datetime(combined_data['tradeDate'])
-            combined_data = combined_data.drop_duplicates(subset=['tradeDate']).sort_values('tradeDate')
-            combined_data['tradeDate'] = combined_data['tradeDate'].dt.strftime('%Y-%m-%d')
-        
-        return combined_data
+        # 合并所有数据片段, 去重并排序
+        return self._finalize_stock_data(pd.concat(stock_data_pieces, ignore_index=True))
     
     def determine_stock_time_range(self, stock_id, stock_data):
         """确定股票的合理时间范围"""
@@ -272,8 +410,11 @@ class IntelligentStockDataReorganizer:
     def reorganize_single_stock(self, stock_id):
         """重组单只股票的数据"""
         try:
-            # 收集股票数据
-            stock_data = self.collect_stock_data_from_batches(stock_id)
+            # 收集股票数据: 已完成单次路由时直接取缓冲/溢写数据
+            if self.routed:
+                stock_data = self._collect_routed_stock_data(stock_id)
+            else:
+                stock_data = self.collect_stock_data_from_batches(stock_id)
             
             if stock_data is None or len(stock_data) == 0:
                 return {'status': 'no_data', 'stock_id': stock_id}
@@ -309,36 +450,40 @@ class IntelligentStockDataReorganizer:
             self.logger.error(f"处理股票 {stock_id} 失败: {str(e)}")
             return {'status': 'error', 'stock_id': stock_id, 'error': str(e)}
     
-    def reorganize_all_stocks(self, stock_list, max_workers=8, batch_size=100):
-        """重组所有股票数据"""
+    def reorganize_all_stocks(self, stock_list, max_workers=8, batch_size=100, memory_budget_mb=1024):
+        """
+        重组所有股票数据
+        
+        所有批次文件只读取一次（见 route_batches_to_stocks），之后按 batch_size
+        分批逐只股票合并缓冲与溢写片段并写出个股文件。
+        """
         print(f"\n🔄 开始重组 {len(stock_list)} 只股票的数据...")
         print("=" * 80)
         
+        if not self.routed:
+            self.route_batches_to_stocks(memory_budget_mb=memory_budget_mb)
+        
         self.target_stocks = stock_list
         results = []
         
-        # 分批处理
-        for i in range(0, len(stock_list), batch_size):
-            batch_stocks = stock_list[i:i+batch_size]
-            batch_num = i // batch_size + 1
+        try:
+            # 分批写出个股文件, 线程间互不依赖
             total_batches = (len(stock_list) + batch_size - 1) // batch_size
-            
-            print(f"\n📦 处理批次 {batch_num}/{total_batches}: {len(batch_stocks)} 只股票")
-            
-            # 多线程处理当前批次
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_stock = {executor.submit(self.reorganize_single_stock, stock): stock 
-                                 for stock in batch_stocks}
+            for i in range(0, len(stock_list), batch_size):
+                batch_stocks = stock_list[i:i+batch_size]
+                print(f"\n📦 处理批次 {i // batch_size + 1}/{total_batches}: {len(batch_stocks)} 只股票")
                 
-                batch_results = []
-                for future in as_completed(future_to_stock):
-                    result = future.result()
-                    batch_results.append(result)
-                    results.append(result)
-            
-            # 批次统计
-            success_count = sum(1 for r in batch_results if r['status'] == 'success')
-            print(f"   ✅ 批次完成: {success_count}/{len(batch_stocks)} 成功")
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    future_to_stock = {executor.submit(self.reorganize_single_stock, stock): stock
+                                       for stock in batch_stocks}
+                    batch_results = [future.result() for future in as_completed(future_to_stock)]
+                results.extend(batch_results)
+                
+                success_count = sum(1 for r in batch_results if r['status'] == 'success')
+                print(f"   ✅ 批次完成: {success_count}/{len(batch_stocks)} 成功")
+        finally:
+            # 清理缓冲与溢写文件(异常退出时同样清理)
+            self._reset_routing()
         
         return results
     
@@ -402,8 +547,8 @@ class IntelligentStockDataReorganizer:
         print("=" * 80)
         
         try:
-            # 1. 扫描批次文件，收集股票列表
-            all_stocks, year_stats = self.scan_all_batch_files()
+            # 1. 单次读取批次文件，收集股票列表并按股票路由数据
+            all_stocks, year_stats = self.route_batches_to_stocks()
             
             if not all_stocks:
                 print("❌ 未发现任何股票数据")
@@ -36,6 +36,7 @@ try:
     from core.strategy import BaseStrategy, TechnicalStrategy
     from core.data import create_data_manager_safe
     from core.utils import get_logger, validate_dataframe
+    from core.data.processors.bar_aggregator import BarAggregator, aggregate_periods, load_trading_days
     import talib
 except ImportError as e:
     print(f"⚠️ 导入模块失败: {e}")
@@ -46,13 +47,15 @@ warnings.filterwarnings('ignore')
 class MACrossoverStrategy(TechnicalStrategy):
     """十周线上穿百周线策略"""
     
-    def __init__(self, short_period=10, long_period=100, **kwargs):
+    def __init__(self, short_period=10, long_period=100, bar_aggregator=None, trading_days=None, **kwargs):
         """
         初始化策略
         
         Args:
             short_period: 短期移动平均线周期 (默认10周)
             long_period: 长期移动平均线周期 (默认100周) 
+            bar_aggregator: 已构建全市场周线的 BarAggregator, 提供时直接读取持久化周线
+            trading_days: 交易日历(开市日), 周线以每周最后一个交易日为日期
             **kwargs: 其他参数
         """
         super().__init__(name="ma_crossover_10_100", **kwargs)
@@ -60,6 +63,9 @@ class MACrossoverStrategy(TechnicalStrategy):
         # 策略参数
         self.short_period = short_period  # 10周
         self.long_period = long_period    # 100周
+        self.bar_aggregator = bar_aggregator
+        self.trading_days = trading_days if trading_days is not None else \
+            getattr(bar_aggregator, 'trading_days', None)
         
         # 策略状态
         self.indicators = {}
@@ -83,44 +89,74 @@ class MACrossoverStrategy(TechnicalStrategy):
         except:
             print(f"✅ 策略初始化: {self.name}")
     
-    def calculate_weekly_ma(self, daily_data, period):
+    @staticmethod
+    def _price_column(columns):
+        """价格列: 优矿列名优先"""
+        for col in ['closePrice', 'close', 'Close']:
+            if col in columns:
+                return col
+        return None
+    
+    def weekly_close(self, daily_data, stock_code=None):
+        """
+        周线收盘价, 以每周最后一个交易日为日期
+        
+        提供 bar_aggregator 与 stock_code 且持久化周线覆盖到日线的最后一天时直接读取,
+        否则由日线聚合(有交易日历时周期结束日取自日历)。
+        
+        Args:
+            daily_data: 日线价格数据
+            stock_code: 股票代码
+            
+        Returns:
+            pandas.Series: 周线收盘价
+        """
+        if isinstance(daily_data, pd.Series):
+            df = daily_data.to_frame('close')
+        else:
+            df = daily_data.copy()
+        
+        # 日期放到列中
+        if 'tradeDate' in df.columns:
+            df['tradeDate'] = pd.to_datetime(df['tradeDate'])
+        else:
+            df.index = pd.to_datetime(df.index)
+            df = df.rename_axis('tradeDate').reset_index()
+        
+        price_col = self._price_column(df.columns)
+        if price_col is None:
+            raise ValueError("找不到价格数据列")
+        
+        first_day, last_day = df['tradeDate'].min(), df['tradeDate'].max()
+        if self.bar_aggregator is not None and stock_code is not None:
+            bars = self.bar_aggregator.load('W', tickers=[str(stock_code)])
+            bar_col = self._price_column(bars.columns) if bars is not None else None
+            if bar_col is not None and not bars.empty:
+                bars = bars.assign(endDate=pd.to_datetime(bars['endDate']))
+                if bars['endDate'].max() >= last_day:
+                    bars = bars[(bars['endDate'] >= first_day) & (bars['endDate'] <= last_day)]
+                    return bars.set_index('endDate')[bar_col].sort_index().dropna()
+            self.logger.info(f"{stock_code} 持久化周线未覆盖到 {last_day.date()}, 由日线聚合")
+        
+        bars = aggregate_periods(df, 'W', ticker_col=None, date_col='tradeDate',
+                                 agg_rules={price_col: 'last'}, trading_days=self.trading_days)
+        return bars.set_index('endDate')[price_col].dropna()
+    
+    def calculate_weekly_ma(self, daily_data, period, weekly_close=None):
         """
         将日线数据转换为周线，并计算移动平均线
         
         Args:
             daily_data: 日线价格数据
             period: 移动平均线周期
+            weekly_close: 已计算的周线收盘价, 提供时不再由日线转换
             
         Returns:
             pandas.Series: 周线移动平均线
         """
         try:
-            # 确保数据是DataFrame且有必要的列
-            if isinstance(daily_data, pd.Series):
-                df = daily_data.to_frame('close')
-            else:
-                df = daily_data.copy()
-                
-            # 重新设置索引为日期（如果不是的话）
-            if not isinstance(df.index, pd.DatetimeIndex):
-                if 'tradeDate' in df.columns:
-                    df['tradeDate'] = pd.to_datetime(df['tradeDate'])
-                    df = df.set_index('tradeDate')
-                else:
-                    df.index = pd.to_datetime(df.index)
-            
-            # 确保有价格列
-            price_col = None
-            for col in ['closePrice', 'close', 'Close']:
-                if col in df.columns:
-                    price_col = col
-                    break
-            
-            if price_col is None:
-                raise ValueError("找不到价格数据列")
-            
             # 转换为周线数据 (每周最后一个交易日的收盘价)
-            weekly_data = df[price_col].resample('W').last().dropna()
+            weekly_data = weekly_close if weekly_close is not None else self.weekly_close(daily_data)
             
             # 计算移动平均线
             if len(weekly_data) >= period:
@@ -139,12 +175,13 @@ class MACrossoverStrategy(TechnicalStrategy):
             self.logger.error(f"计算周线移动平均线失败: {e}")
             return pd.Series(dtype=float)
     
-    def calculate_indicators(self, data):
+    def calculate_indicators(self, data, stock_code=None):
         """
         计算技术指标
         
         Args:
             data: 股票价格数据 (日线)
+            stock_code: 股票代码, 用于读取持久化周线
             
         Returns:
             dict: 包含各种技术指标的字典
@@ -152,12 +189,15 @@ class MACrossoverStrategy(TechnicalStrategy):
         try:
             self.indicators.clear()
             
+            # 周线只转换一次, 两条均线共用
+            weekly_close = self.weekly_close(data, stock_code)
+            
             # 计算10周移动平均线
-            ma10_weekly = self.calculate_weekly_ma(data, self.short_period)
+            ma10_weekly = self.calculate_weekly_ma(data, self.short_period, weekly_close)
             self.indicators['MA10_weekly'] = ma10_weekly
             
             # 计算100周移动平均线  
-            ma100_weekly = self.calculate_weekly_ma(data, self.long_period)
+            ma100_weekly = self.calculate_weekly_ma(data, self.long_period, weekly_close)
             self.indicators['MA100_weekly'] = ma100_weekly
             
             # 计算交叉信号
@@ -184,12 +224,13 @@ class MACrossoverStrategy(TechnicalStrategy):
             self.logger.error(f"计算技术指标失败: {e}")
             return {}
     
-    def generate_signals(self, data):
+    def generate_signals(self, data, stock_code=None):
         """
         生成交易信号
         
         Args:
             data: 股票价格数据
+            stock_code: 股票代码, 用于读取持久化周线
             
         Returns:
             dict: 包含交易信号的字典
@@ -198,7 +239,7 @@ class MACrossoverStrategy(TechnicalStrategy):
             self.signals.clear()
             
             # 先计算技术指标
-            self.calculate_indicators(data)
+            self.calculate_indicators(data, stock_code)
             
             if 'crossover' not in self.indicators:
                 self.logger.warning("无法生成信号：缺少交叉指标")
@@ -261,7 +302,7 @@ class MACrossoverStrategy(TechnicalStrategy):
                 return {'status': 'no_data', 'stock_code': stock_code}
             
             # 生成信号
-            signals = self.generate_signals(stock_data)
+            signals = self.generate_signals(stock_data, stock_code)
             
             if not signals:
                 return {'status': 'no_signals', 'stock_code': stock_code}
@@ -513,7 +554,14 @@ def run_ma_crossover_analysis():
     try:
         # 1. 创建策略实例
         print("📊 创建策略实例...")
-        strategy = MACrossoverStrategy(short_period=10, long_period=100)
+        # 已构建的全市场周线(BarAggregator.build)与交易日历, 存在时直接使用
+        bar_aggregator = BarAggregator(project_root / 'data' / 'bars')
+        if not bar_aggregator.bar_path('W').exists():
+            bar_aggregator = None
+        calendar_file = project_root / 'data' / 'calendar' / 'trading_calendar.csv'
+        trading_days = load_trading_days(calendar_file) if calendar_file.exists() else None
+        strategy = MACrossoverStrategy(short_period=10, long_period=100,
+                                       bar_aggregator=bar_aggregator, trading_days=trading_days)
         
         # 2. 显示策略信息
         strategy_info = strategy.get_strategy_info()
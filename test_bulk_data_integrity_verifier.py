@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据完整性验证器测试
+==================
+
+- 完整读取统计行数、日期范围与内容哈希(哈希与原始字节一致)
+- 末尾无换行但末行完整的文件不误报; 末行字段不全的文件标记为截断
+- 再次验证只重新扫描大小/修改时间变化的文件
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from bulk_data_integrity_verifier import BulkDataIntegrityVerifier, scan_data_file
+
+CONTENT = "ticker,tradeDate,closePrice\n" + "".join(
+    f"{i:06d},2024-01-{i % 28 + 1:02d},{i}.5\n" for i in range(500))
+
+
+def test_scan_and_truncation():
+    """测试完整扫描与截断检测"""
+    print("🧪 测试文件扫描与截断检测...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        complete = Path(tmp) / 'complete.csv'
+        complete.write_text(CONTENT)
+        result = scan_data_file(complete, '股票日线数据', chunk_size=64)
+        assert result['is_valid'] and not result['issues']
+        assert result['row_count'] == 500 and result['column_count'] == 3
+        assert result['date_range'] == {'start_date': '2024-01-01', 'end_date': '2024-01-28',
+                                        'date_column': 'tradeDate'}
+        assert result['content_hash'] == hashlib.blake2b(CONTENT.encode(), digest_size=20).hexdigest()
+
+        no_newline = Path(tmp) / 'no_newline.csv'
+        no_newline.write_text(CONTENT.rstrip('\n'))
+        result = scan_data_file(no_newline, '股票日线数据', chunk_size=64)
+        assert result['is_valid'] and not result['issues'], result['issues']
+
+        truncated = Path(tmp) / 'truncated.csv'
+        truncated.write_text(CONTENT + "000500,2024-01-")
+        result = scan_data_file(truncated, '股票日线数据', chunk_size=64)
+        assert not result['is_valid']
+        assert any('截断' in issue for issue in result['issues'])
+
+        # 日线数据结束过早
+        stale = Path(tmp) / 'stale.csv'
+        stale.write_text(CONTENT.replace('2024-', '2023-'))
+        assert not scan_data_file(stale, '股票日线数据')['is_valid']
+        assert scan_data_file(stale, '财务报表数据')['is_valid']
+
+    print("✅ 文件扫描与截断检测测试通过")
+
+
+def test_incremental_cache():
+    """测试增量验证缓存"""
+    print("\n🧪 测试增量验证缓存...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for name in ('a.csv', 'b.csv'):
+            path = Path(tmp) / 'data' / name
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(CONTENT)
+            files.append(path)
+        cache_file = Path(tmp) / 'cache.json'
+        tasks = [(path, '股票日线数据') for path in files]
+
+        verifier = BulkDataIntegrityVerifier(Path(tmp) / 'data', cache_file=cache_file, max_workers=2)
+        first = verifier.verify_files(tasks)
+        assert all(result['is_valid'] for result in first.values())
+        assert verifier.cache_hits == 0 and cache_file.exists()
+
+        files[1].write_text(CONTENT + "000500,2024-01-")
+        os.utime(files[1], ns=(1, 1))
+        verifier = BulkDataIntegrityVerifier(Path(tmp) / 'data', cache_file=cache_file, max_workers=2)
+        second = verifier.verify_files(tasks)
+        assert verifier.cache_hits == 1
+        assert second[str(files[0])] == first[str(files[0])]
+        assert not second[str(files[1])]['is_valid']
+
+    print("✅ 增量验证缓存测试通过")
+
+
+def run_verifier_tests():
+    """运行所有完整性验证测试"""
+    print("🚀 开始运行数据完整性验证测试...")
+    print("=" * 60)
+
+    tests = [
+        ("文件扫描与截断检测", test_scan_and_truncation),
+        ("增量验证缓存", test_incremental_cache),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_verifier_tests()
+    sys.exit(0 if success else 1)
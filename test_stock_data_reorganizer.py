@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+个股数据重组器测试
+=================
+
+- 单次路由: 解析失败的批次文件整体跳过, 不留下已路由的前几个分块
+- 超出内存预算时溢写, 分批写出的个股文件完整、去重、有序, 结束后清理溢写目录
+"""
+
+import sys
+import logging
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from intelligent_stock_data_reorganizer import IntelligentStockDataReorganizer
+
+
+def make_reorganizer(root):
+    """在临时目录上构造重组器(__init__ 使用固定数据路径)"""
+    reorganizer = IntelligentStockDataReorganizer.__new__(IntelligentStockDataReorganizer)
+    reorganizer.base_path = Path(root)
+    reorganizer.batch_path = reorganizer.base_path / "batches"
+    reorganizer.output_path = reorganizer.base_path / "reorganized_stocks"
+    reorganizer.batch_path.mkdir(parents=True, exist_ok=True)
+    reorganizer.output_path.mkdir(parents=True, exist_ok=True)
+    reorganizer.logger = logging.getLogger('test_reorganizer')
+    reorganizer.stock_info_cache = {}
+    reorganizer.stock_data_cache = defaultdict(list)
+    reorganizer.spill_path = reorganizer.output_path / "_spill"
+    reorganizer.buffer_bytes = 0
+    reorganizer.spilled_stocks = set()
+    reorganizer.routed = False
+    reorganizer.progress_lock = threading.Lock()
+    reorganizer.processed_files = 0
+    reorganizer.total_files = 0
+    return reorganizer
+
+
+def test_broken_file_skipped_whole():
+    """测试解析失败的文件整体跳过"""
+    print("🧪 测试损坏批次文件整体跳过...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reorganizer = make_reorganizer(tmp)
+        (reorganizer.batch_path / "2024_batch_001.csv").write_text(
+            "secID,tradeDate,closePrice\n"
+            "000001.XSHE,2024-01-02,10\n"
+            "000002.XSHE,2024-01-02,20\n"
+        )
+        # 前2000行正常, 末行引号未闭合: 前面的分块读出后才解析失败
+        (reorganizer.batch_path / "2024_batch_002.csv").write_text(
+            "secID,tradeDate,closePrice\n" +
+            "".join(f"{i:06d}.XSHG,2024-01-02,{i}\n" for i in range(2000)) +
+            '"600002.XSHG,2024-01-02,9\n'
+        )
+
+        stocks, year_stats = reorganizer.route_batches_to_stocks(chunk_size=500)
+        assert stocks == ['000001.XSHE', '000002.XSHE']
+        assert set(reorganizer.stock_data_cache) == {'000001.XSHE', '000002.XSHE'}
+        assert year_stats['2024'] == {'000001.XSHE', '000002.XSHE'}
+
+    print("✅ 损坏批次文件整体跳过测试通过")
+
+
+def test_spill_and_batched_write():
+    """测试溢写与分批写出"""
+    print("\n🧪 测试溢写与分批写出...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reorganizer = make_reorganizer(tmp)
+        frames = []
+        for n, dates in enumerate([['2024-01-03', '2024-01-02'], ['2024-01-04', '2024-01-03']], 1):
+            frame = pd.DataFrame({
+                'secID': ['000001.XSHE', '000002.XSHE'] * len(dates),
+                'tradeDate': [d for d in dates for _ in range(2)],
+                'closePrice': range(len(dates) * 2),
+            })
+            frame.to_csv(reorganizer.batch_path / f"2024_batch_{n:03d}.csv", index=False)
+            frames.append(frame)
+
+        # 预算为0: 每个文件读完后都溢写
+        stocks, _ = reorganizer.route_batches_to_stocks(memory_budget_mb=0, chunk_size=1)
+        assert reorganizer.spilled_stocks == set(stocks)
+
+        results = reorganizer.reorganize_all_stocks(stocks, max_workers=2, batch_size=1)
+        assert [r['status'] for r in results] == ['success', 'success']
+        assert not reorganizer.spill_path.exists()
+        assert not reorganizer.routed
+
+        expected = pd.concat(frames, ignore_index=True)
+        for stock_id in stocks:
+            written = pd.read_csv(reorganizer.output_path / f"{stock_id.replace('.', '_')}.csv")
+            assert written['tradeDate'].tolist() == ['2024-01-02', '2024-01-03', '2024-01-04']
+            # 重复日期保留先读到的批次
+            first = expected[expected['secID'] == stock_id].drop_duplicates('tradeDate')
+            assert written.set_index('tradeDate')['closePrice'].to_dict() == \
+                first.set_index('tradeDate')['closePrice'].to_dict()
+
+    print("✅ 溢写与分批写出测试通过")
+
+
+def run_reorganizer_tests():
+    """运行所有重组器测试"""
+    print("🚀 开始运行个股数据重组器测试...")
+    print("=" * 60)
+
+    tests = [
+        ("损坏批次文件整体跳过", test_broken_file_skipped_whole),
+        ("溢写与分批写出", test_spill_and_batched_write),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_reorganizer_tests()
+    sys.exit(0 if success else 1)
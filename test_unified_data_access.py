@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一数据访问流式读取测试
+======================
+
+- iter_data 按列裁剪、日期范围与股票过滤逐批产出, 合并结果与完整读取后过滤一致
+- 只读取最高优先级数据源; 完整读完文件后行数记入数据目录
+- 数据集已导入Parquet数据湖时走谓词下推扫描, 结果一致
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from unified_data_access import UnifiedDataAccess
+
+
+def make_access(root):
+    """在临时目录上构造数据访问对象(两个数据源, 同一API)"""
+    root = Path(root)
+    access = UnifiedDataAccess(lake_path=root / 'lake', catalog_path=root / 'catalog.db')
+    access.data_sources = {
+        'primary': {'path': root / 'primary', 'description': '主数据源', 'priority': 1},
+        'backup': {'path': root / 'backup', 'description': '备用数据源', 'priority': 2},
+    }
+    rng = np.random.default_rng(17)
+    frames = []
+    for year in (2023, 2024):
+        dates = pd.bdate_range(f'{year}-01-02', periods=50).strftime('%Y-%m-%d')
+        frame = pd.DataFrame({
+            'ticker': np.tile(['000001', '000002', '600000'], len(dates)),
+            'tradeDate': np.repeat(dates, 3),
+            'closePrice': rng.uniform(5, 20, len(dates) * 3).round(2),
+            'turnoverVol': rng.integers(1_000, 100_000, len(dates) * 3),
+        })
+        path = root / 'primary' / 'market' / 'mktequdget' / f'{year}.csv'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        frame.to_csv(path, index=False)
+        frames.append(frame)
+    # 低优先级来源的记录不应出现在结果中
+    backup = root / 'backup' / 'market' / 'mktequdget' / '2023.csv'
+    backup.parent.mkdir(parents=True, exist_ok=True)
+    frames[0].assign(closePrice=-1.0).to_csv(backup, index=False)
+    return access, pd.concat(frames, ignore_index=True)
+
+
+def _expected(full, columns, date_range, tickers):
+    dates = pd.to_datetime(full['tradeDate'])
+    mask = (dates >= date_range[0]) & (dates <= date_range[1]) & full['ticker'].isin(tickers)
+    return full.loc[mask, columns].reset_index(drop=True)
+
+
+def test_iter_csv_filtered():
+    """测试CSV流式读取与过滤"""
+    print("🧪 测试CSV流式读取...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        access, full = make_access(tmp)
+        date_range = ('2023-02-01', '2024-01-31')
+        batches = list(access.iter_data('market', 'mktequdget', columns=['ticker', 'closePrice'],
+                                        date_range=date_range, tickers=['000002', '600000'],
+                                        batch_rows=40))
+        assert len(batches) > 1 and all(len(b) <= 40 for b in batches)
+        result = pd.concat(batches, ignore_index=True)
+        assert list(result.columns) == ['ticker', 'closePrice']
+
+        expected = _expected(full, ['ticker', 'closePrice'], date_range, ['000002', '600000'])
+        assert result['ticker'].astype(str).tolist() == expected['ticker'].tolist()
+        np.testing.assert_allclose(result['closePrice'].to_numpy(), expected['closePrice'].to_numpy(), rtol=1e-6)
+
+        # 无过滤完整读取后行数记入目录
+        list(access.iter_data('market', 'mktequdget'))
+        path = Path(tmp) / 'primary' / 'market' / 'mktequdget' / '2024.csv'
+        assert access.catalog.get_file_info(path)['row_count'] == 150
+
+    print("✅ CSV流式读取测试通过")
+
+
+def test_iter_lake_matches_csv():
+    """测试数据湖扫描与CSV结果一致"""
+    print("\n🧪 测试数据湖流式读取...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        access, full = make_access(tmp)
+        if access.lake is None:
+            print("⚠️ 未安装pyarrow, 跳过数据湖测试")
+            return
+        files = sorted((Path(tmp) / 'primary' / 'market' / 'mktequdget').glob('*.csv'))
+        access.lake.import_csv('market', 'mktequdget', files)
+
+        date_range = ('2023-02-01', '2024-01-31')
+        result = pd.concat(access.iter_data('market', 'mktequdget', columns=['ticker', 'tradeDate', 'closePrice'],
+                                            date_range=date_range, tickers=['000001']),
+                           ignore_index=True)
+        result = result.sort_values('tradeDate').reset_index(drop=True)
+        expected = _expected(full, ['ticker', 'closePrice'], date_range, ['000001'])
+        assert result['ticker'].astype(str).tolist() == expected['ticker'].tolist()
+        np.testing.assert_allclose(result['closePrice'].to_numpy(), expected['closePrice'].to_numpy())
+
+    print("✅ 数据湖流式读取测试通过")
+
+
+def run_access_tests():
+    """运行所有统一数据访问测试"""
+    print("🚀 开始运行统一数据访问测试...")
+    print("=" * 60)
+
+    tests = [
+        ("CSV流式读取", test_iter_csv_filtered),
+        ("数据湖流式读取", test_iter_lake_matches_csv),
+    ]
+
+    failed = []
+    for test_name, test_func in tests:
+        try:
+            test_func()
+        except Exception as e:
+            print(f"❌ {test_name} 测试失败: {e!r}")
+            failed.append(test_name)
+
+    print(f"\n通过 {len(tests) - len(failed)}/{len(tests)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    success = run_access_tests()
+    sys.exit(0 if success else 1)
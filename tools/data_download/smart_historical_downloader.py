@@ -5,6 +5,7 @@
 只下载已上市股票，大幅减少空数据
 """
 
+import sys
 import uqer
 import pandas as pd
 from datetime import datetime
@@ -12,6 +13,12 @@ from pathlib import Path
 import time
 import logging
 
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from core.data.storage import SegmentStore
+
 UQER_TOKEN = "68b9922817ae6273137bda7acba81e293582ba347281dfcc056dcb245b23faf3"
 
 class SmartHistoricalDownloader:
@@ -22,6 +29,10 @@ class SmartHistoricalDownloader:
         self.data_dir = Path("data/smart_download")
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
+        # 增量数据以追加分段写入, 分段积累到阈值后才并入批次CSV
+        self.segment_store = SegmentStore(self.data_dir / "_segments",
+                                          key_cols=('secID', 'tradeDate'), date_col='tradeDate')
+        
         # 配置日志
         log_file = self.data_dir / "smart_download.log"
         logging.basicConfig(
@@ -118,35 +129,45 @@ class SmartHistoricalDownloader:
         
         logging.info(f"📦 {year} 年分为 {len(batches)} 批下载")
         
+        current_year = datetime.now().year
+        
         for batch_idx, batch_stocks in enumerate(batches):
             batch_file = year_dir / f"batch_{batch_idx+1:03d}.csv"
+            dataset = f"year_{year}/batch_{batch_idx+1:03d}"
+            batch_begin = start_date
             
-            # 跳过已存在文件
-            if batch_file.exists():
-                existing_data = pd.read_csv(batch_file)
-                total_records += len(existing_data)
-                success_count += 1
-                logging.info(f"📂 {year} 批次 {batch_idx+1} 已存在: {len(existing_data)} 条")
-                continue
+            # 已存在的批次: 往年数据完整直接跳过, 当年只补充最新日期之后的数据
+            if batch_file.exists() or self.segment_store.has_segments(dataset):
+                latest_date = self.segment_store.max_date(dataset, base_file=batch_file)
+                if year < current_year or latest_date is None or latest_date.strftime('%Y%m%d') >= end_date:
+                    existing_rows = self._count_rows(batch_file) + self.segment_store.row_count(dataset)
+                    total_records += existing_rows
+                    success_count += 1
+                    logging.info(f"📂 {year} 批次 {batch_idx+1} 已存在: {existing_rows} 条")
+                    continue
+                batch_begin = (latest_date + pd.Timedelta(days=1)).strftime('%Y%m%d')
             
             try:
                 # 构建ticker列表
                 tickers = ','.join(batch_stocks['ticker'].tolist())
                 
-                logging.info(f"📥 {year} 批次 {batch_idx+1}/{len(batches)}: {len(batch_stocks)} 只股票")
+                logging.info(f"📥 {year} 批次 {batch_idx+1}/{len(batches)}: {len(batch_stocks)} 只股票 ({batch_begin}-{end_date})")
                 
                 # 调用API
                 data = uqer.DataAPI.MktEqudGet(
                     secID='',
                     ticker=tickers,
-                    beginDate=start_date,
+                    beginDate=batch_begin,
                     endDate=end_date,
                     field='secID,ticker,tradeDate,preClosePrice,openPrice,highestPrice,lowestPrice,closePrice,turnoverVol,marketValue,dealAmount,turnoverRate'
                 )
                 
                 if data is not None and not data.empty:
-                    # 保存数据
-                    data.to_csv(batch_file, index=False)
+                    # 保存数据: 新批次直接写CSV, 已有批次只追加新增分段
+                    if batch_file.exists():
+                        self.segment_store.append(dataset, data)
+                    else:
+                        data.to_csv(batch_file, index=False)
                     total_records += len(data)
                     success_count += 1
                     
@@ -176,6 +197,29 @@ class SmartHistoricalDownloader:
         
         return total_records > 0
     
+    @staticmethod
+    def _count_rows(file_path):
+        """统计CSV数据行数(不解析字段)"""
+        if not file_path.exists():
+            return 0
+        with open(file_path, 'rb') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    
+    def compact_segments(self, wait=True, force=False):
+        """把达到合并阈值的追加分段并入各年份的批次CSV(force=True 时合并全部分段)"""
+        thread = self.segment_store.start_background_compaction(
+            base_resolver=lambda dataset: self.data_dir / f"{dataset}.csv",
+            min_segments=1 if force else None
+        )
+        if wait:
+            thread.join()
+        return thread
+    
+    def read_batch(self, year, batch_no):
+        """读取一个批次的完整数据(批次CSV + 未合并的增量分段)"""
+        dataset = f"year_{year}/batch_{batch_no:03d}"
+        return self.segment_store.read(dataset, base_file=self.data_dir / f"{dataset}.csv")
+    
     def continue_from_year(self, start_year=2003):
         """从指定年份开始继续下载"""
         logging.info(f"🚀 从 {start_year} 年开始智能下载...")
@@ -198,6 +242,9 @@ class SmartHistoricalDownloader:
             # 年度间隔
             time.sleep(1)
         
+        # 合并增量分段
+        self.compact_segments()
+        
         logging.info(f"\n🎉 智能下载完成!")
         return True
     
@@ -231,6 +278,7 @@ def main():
     elif choice == "2":
         year = int(input("输入年份 (2003-2024): "))
         downloader.download_year_smart(year)
+        downloader.compact_segments()
     elif choice == "3":
         downloader.compare_efficiency()
     else:
@@ -9,12 +9,129 @@ from pathlib import Path
 import json
 import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Union
+from typing import Optional, List, Dict, Union, Iterator
+
+# 框架存储模块(数据目录/列类型注册表/数据湖); 单独运行脚本且无法导入时退化为目录扫描与普通CSV读取
+try:
+    from core.data.storage.data_catalog import DataCatalog
+    from core.data.storage.schema_registry import get_schema_registry
+    from core.data.storage.parquet_store import detect_date_column
+except ImportError:
+    DataCatalog = None
+    get_schema_registry = None
+
+    def detect_date_column(columns) -> Optional[str]:
+        """识别日期列: 第一个含date的列"""
+        return next((col for col in columns if 'date' in col.lower()), None)
+
+try:
+    from core.data.storage.parquet_store import ParquetDataLake, PYARROW_AVAILABLE
+except ImportError:
+    ParquetDataLake = None
+    PYARROW_AVAILABLE = False
+
+
+class PlainCSVReader:
+    """无列类型注册表时的CSV读取(接口与 SchemaRegistry.read_csv/concat 一致)"""
+    
+    @staticmethod
+    def read_csv(path, api=None, usecols=None, **kwargs):
+        return pd.read_csv(path, usecols=usecols, **kwargs)
+    
+    @staticmethod
+    def concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        return pd.concat([f for f in frames if f is not None], ignore_index=True)
+
+
+class DirectoryScanCatalog:
+    """无数据目录索引时按目录扫描(接口与 DataCatalog 的查询方法一致, 每次查询都扫描)"""
+    
+    def __init__(self, data_sources: Dict[str, Dict]):
+        self.data_sources = data_sources
+    
+    def refresh(self, data_sources=None, profile: bool = False) -> Dict[str, int]:
+        return {}
+    
+    def is_stale(self, max_age_seconds=None, sources=None) -> bool:
+        return False
+    
+    def get_files(self, category: str, api: str, source: Optional[str] = None,
+                  file_format: Optional[str] = 'csv') -> List[Dict]:
+        files_info = []
+        for source_name, source_info in self.data_sources.items():
+            if source and source_name != source:
+                continue
+            api_path = Path(source_info["path"]) / category / api
+            if not api_path.is_dir():
+                continue
+            for csv_file in api_path.glob("*.csv"):
+                size_bytes = csv_file.stat().st_size
+                files_info.append({
+                    "filename": csv_file.name,
+                    "source": source_name,
+                    "path": str(csv_file),
+                    "size_bytes": size_bytes,
+                    "size_mb": size_bytes / 1024 / 1024,
+                    "priority": source_info.get("priority", 99),
+                    "row_count": None,
+                    "min_date": None,
+                    "max_date": None
+                })
+        files_info.sort(key=lambda x: (x["priority"], x["filename"]))
+        return files_info
+    
+    def _iter_apis(self):
+        for source_name, source_info in self.data_sources.items():
+            source_path = Path(source_info["path"])
+            if not source_path.is_dir():
+                continue
+            for category_dir in sorted(source_path.iterdir()):
+                if not category_dir.is_dir():
+                    continue
+                for api_dir in sorted(category_dir.iterdir()):
+                    if api_dir.is_dir():
+                        yield source_name, category_dir.name, api_dir.name
+    
+    def get_categories(self, source: Optional[str] = None) -> List[str]:
+        return sorted({category for name, category, _ in self._iter_apis() if not source or name == source})
+    
+    def get_apis(self, category: str, source: Optional[str] = None) -> List[str]:
+        return sorted({api for name, cat, api in self._iter_apis()
+                       if cat == category and (not source or name == source)})
+    
+    def find_file(self, category: str, api: str, filename: Optional[str] = None,
+                  source: Optional[str] = None) -> Optional[Path]:
+        if filename and not Path(filename).suffix:
+            filename = f'{filename}.csv'
+        for record in self.get_files(category, api, source=source):
+            if not filename or record["filename"] == filename:
+                return Path(record["path"])
+        return None
+    
+    def get_file_info(self, path) -> Optional[Dict]:
+        return None
+    
+    def record_row_count(self, path, row_count: int):
+        pass
+    
+    def summarize(self, file_format: Optional[str] = 'csv') -> List[Dict]:
+        rows = []
+        for source_name, category, api in self._iter_apis():
+            files = self.get_files(category, api, source=source_name)
+            if files:
+                rows.append({"category": category, "api": api, "source": source_name,
+                             "priority": files[0]["priority"], "total_files": len(files),
+                             "size_bytes": sum(f["size_bytes"] for f in files), "row_count": None})
+        rows.sort(key=lambda r: (r["category"], r["api"], r["priority"]))
+        return rows
+
 
 class UnifiedDataAccess:
     """统一数据访问接口"""
     
-    def __init__(self):
+    def __init__(self, lake_path: Union[str, Path] = "data/parquet_lake",
+                 catalog_path: Union[str, Path] = "data/catalog.db",
+                 catalog_max_age: int = 600):
         # 数据源优先级（数字越小优先级越高）
         self.data_sources = {
             "final_comprehensive_download": {
@@ -39,6 +156,20 @@ class UnifiedDataAccess:
             }
         }
         
+        # Parquet数据湖(已转换的数据集优先从此读取)
+        self.lake = ParquetDataLake(lake_path) if PYARROW_AVAILABLE else None
+        
+        # 数据目录索引(数据目录有新增/删除文件, 或超过catalog_max_age秒未刷新时自动增量刷新)
+        if DataCatalog is not None:
+            self.catalog = DataCatalog(catalog_path)
+        else:
+            logging.warning("⚠️ 无法导入数据目录索引, 使用目录扫描")
+            self.catalog = DirectoryScanCatalog(self.data_sources)
+        self.catalog_max_age = catalog_max_age
+        
+        # 列类型注册表(解析CSV时直接生成category/float32/datetime64)
+        self.schema_registry = get_schema_registry() if get_schema_registry is not None else PlainCSVReader()
+        
         # 从分析报告加载数据映射
         self.load_data_mapping()
         self.setup_logging()
@@ -78,95 +209,57 @@ class UnifiedDataAccess:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
     
+    def refresh_catalog(self, profile: bool = False) -> Dict[str, int]:
+        """增量刷新数据目录; profile=True 时统计新增/变化文件的行数与日期范围"""
+        return self.catalog.refresh(self.data_sources, profile=profile)
+    
+    def _ensure_catalog(self):
+        """目录过期(有新增/删除文件或超过catalog_max_age)时增量刷新"""
+        if self.catalog.is_stale(self.catalog_max_age, self.data_sources):
+            self.refresh_catalog()
+    
     def get_available_categories(self) -> List[str]:
         """获取所有可用的数据类别"""
-        categories = set()
-        
-        for source_info in self.data_sources.values():
-            source_path = source_info["path"]
-            if source_path.exists():
-                for category_dir in source_path.iterdir():
-                    if category_dir.is_dir():
-                        categories.add(category_dir.name)
-        
-        return sorted(list(categories))
+        self._ensure_catalog()
+        return self.catalog.get_categories()
     
     def get_available_apis(self, category: str) -> List[str]:
         """获取指定类别下的所有API"""
-        apis = set()
-        
-        for source_info in self.data_sources.values():
-            category_path = source_info["path"] / category
-            if category_path.exists():
-                for api_dir in category_path.iterdir():
-                    if api_dir.is_dir() and list(api_dir.glob("*.csv")):
-                        apis.add(api_dir.name)
-        
-        return sorted(list(apis))
+        self._ensure_catalog()
+        return self.catalog.get_apis(category)
     
     def get_available_files(self, category: str, api: str) -> List[Dict]:
         """获取指定API下的所有文件及其来源信息"""
-        files_info = []
-        
-        for source_name, source_info in self.data_sources.items():
-            api_path = source_info["path"] / category / api
-            if api_path.exists():
-                csv_files = list(api_path.glob("*.csv"))
-                for csv_file in csv_files:
-                    files_info.append({
-                        "filename": csv_file.name,
-                        "source": source_name,
-                        "path": str(csv_file),
-                        "size_mb": csv_file.stat().st_size / 1024 / 1024,
-                        "priority": source_info["priority"]
-                    })
+        self._ensure_catalog()
         
         # 按优先级和文件名排序
-        files_info.sort(key=lambda x: (x["priority"], x["filename"]))
-        
-        return files_info
+        return [
+            {
+                "filename": record["filename"],
+                "source": record["source"],
+                "path": record["path"],
+                "size_mb": record["size_mb"],
+                "priority": record["priority"],
+                "row_count": record["row_count"],
+                "min_date": record["min_date"],
+                "max_date": record["max_date"]
+            }
+            for record in self.catalog.get_files(category, api)
+        ]
     
     def find_best_data_source(self, category: str, api: str, filename: Optional[str] = None) -> Optional[Path]:
         """找到最佳的数据源路径"""
+        self._ensure_catalog()
         
         # 1. 如果有映射配置，优先使用
         if category in self.api_mapping and api in self.api_mapping[category]:
-            mapped_source = self.api_mapping[category][api]
-            source_path = mapped_source["source_path"]
-            
-            if filename:
-                file_path = source_path / filename
-                if not file_path.suffix:
-                    file_path = file_path.with_suffix('.csv')
-                if file_path.exists():
-                    return file_path
-            else:
-                # 返回目录下的第一个CSV文件
-                csv_files = list(source_path.glob("*.csv"))
-                if csv_files:
-                    return csv_files[0]
+            mapped_source = self.api_mapping[category][api]["source_name"]
+            file_path = self.catalog.find_file(category, api, filename, source=mapped_source)
+            if file_path:
+                return file_path
         
         # 2. 按优先级查找
-        for source_name, source_info in sorted(self.data_sources.items(), 
-                                               key=lambda x: x[1]["priority"]):
-            api_path = source_info["path"] / category / api
-            
-            if not api_path.exists():
-                continue
-            
-            if filename:
-                file_path = api_path / filename
-                if not file_path.suffix:
-                    file_path = file_path.with_suffix('.csv')
-                if file_path.exists():
-                    return file_path
-            else:
-                # 返回目录下的第一个CSV文件
-                csv_files = list(api_path.glob("*.csv"))
-                if csv_files:
-                    return csv_files[0]
-        
-        return None
+        return self.catalog.find_file(category, api, filename)
     
     def read_data(self, 
                   category: str, 
@@ -176,13 +269,28 @@ class UnifiedDataAccess:
                   columns: Optional[List[str]] = None,
                   date_range: Optional[tuple] = None,
                   use_chunks: bool = False,
-                  chunk_size: int = 10000) -> Optional[pd.DataFrame]:
+                  chunk_size: int = 10000,
+                  tickers: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """读取数据的主要接口"""
         
         logging.info(f"📊 读取数据: {category}/{api}")
         if filename:
             logging.info(f"   指定文件: {filename}")
         
+        # 已转换为Parquet的数据集: 列裁剪和日期/股票过滤下推到文件与row group
+        if not filename and self.lake is not None and self.lake.has_dataset(category, api):
+            logging.info("📋 使用Parquet数据湖(谓词下推)")
+            try:
+                df = self.lake.read(category, api, columns=columns, date_range=date_range,
+                                    tickers=tickers, max_rows=max_rows)
+                if df is not None and not df.empty:
+                    logging.info(f"✅ 成功读取: {df.shape[0]:,} 行, {df.shape[1]} 列")
+                    return df
+                logging.error("❌ 读取的数据为空")
+                return None
+            except Exception as e:
+                logging.warning(f"⚠️ Parquet读取失败: {e}，回退到CSV")
+        
         # 找到最佳数据源
         file_path = self.find_best_data_source(category, api, filename)
         
@@ -201,16 +309,13 @@ class UnifiedDataAccess:
             
             # 选择读取策略
             if use_chunks or file_size_mb > 100:  # 大于100MB使用分块
-                logging.info("📋 使用分块读取策略")
-                df = self._read_large_file(file_path, max_rows, columns, chunk_size)
+                logging.info("📋 使用分块读取策略(逐块过滤)")
+                df = self._read_large_file(file_path, max_rows, columns, chunk_size, api,
+                                           date_range=date_range, tickers=tickers)
+                date_range = tickers = None  # 已在分块中过滤
             else:
                 logging.info("📋 使用标准读取策略")
-                df = pd.read_csv(file_path, low_memory=False)
-                
-                if columns:
-                    available_cols = [col for col in columns if col in df.columns]
-                    if available_cols:
-                        df = df[available_cols]
+                df = self.schema_registry.read_csv(file_path, api, usecols=columns)
                 
                 if max_rows and len(df) > max_rows:
                     df = df.head(max_rows)
@@ -223,6 +328,10 @@ class UnifiedDataAccess:
             if date_range:
                 df = self._filter_by_date(df, date_range)
             
+            # 股票过滤
+            if tickers and 'ticker' in df.columns:
+                df = df[df['ticker'].astype(str).isin([str(t) for t in tickers])]
+            
             logging.info(f"✅ 成功读取: {df.shape[0]:,} 行, {df.shape[1]} 列")
             return df
             
@@ -231,18 +340,16 @@ class UnifiedDataAccess:
             return None
     
     def _read_large_file(self, file_path: Path, max_rows: Optional[int], 
-                        columns: Optional[List[str]], chunk_size: int) -> Optional[pd.DataFrame]:
-        """读取大文件的分块策略"""
+                        columns: Optional[List[str]], chunk_size: int,
+                        api: Optional[str] = None,
+                        date_range: Optional[tuple] = None,
+                        tickers: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """读取大文件的分块策略: 每块先过滤再保留, 内存只与结果大小相关"""
         chunk_list = []
         total_rows = 0
         
         try:
-            for chunk in pd.read_csv(file_path, chunksize=chunk_size, low_memory=False):
-                if columns:
-                    available_cols = [col for col in columns if col in chunk.columns]
-                    if available_cols:
-                        chunk = chunk[available_cols]
-                
+            for chunk in self._iter_csv_file(file_path, api, columns, date_range, tickers, chunk_size):
                 chunk_list.append(chunk)
                 total_rows += len(chunk)
                 
@@ -252,7 +359,7 @@ class UnifiedDataAccess:
             if not chunk_list:
                 return None
             
-            df = pd.concat(chunk_list, ignore_index=True)
+            df = self.schema_registry.concat(chunk_list)
             
             if max_rows and len(df) > max_rows:
                 df = df.head(max_rows)
@@ -263,6 +370,94 @@ class UnifiedDataAccess:
             logging.error(f"❌ 分块读取失败: {e}")
             return None
     
+    def iter_data(self,
+                  category: str,
+                  api: str,
+                  columns: Optional[List[str]] = None,
+                  date_range: Optional[tuple] = None,
+                  tickers: Optional[List[str]] = None,
+                  batch_rows: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        流式读取数据集, 逐批产出已过滤、已按注册类型解析的DataFrame
+        
+        已转换为Parquet的数据集使用谓词下推扫描; 否则依次读取最佳数据源下的
+        所有CSV文件, 每块读取后立即过滤。任何时刻内存中只有一个批次, 适合
+        在多GB数据上做聚合与筛选。
+        
+        Args:
+            category: 数据类别
+            api: API名称
+            columns: 需要的列(过滤所需的日期/股票列会自动读取, 产出前去掉)
+            date_range: (开始日期, 结束日期)
+            tickers: 股票代码列表
+            batch_rows: 每批读取的行数
+            
+        Yields:
+            非空的DataFrame批次
+        """
+        if self.lake is not None and self.lake.has_dataset(category, api):
+            yield from self.lake.iter_batches(category, api, columns=columns, date_range=date_range,
+                                              tickers=tickers, batch_rows=batch_rows)
+            return
+        
+        files_info = self.get_available_files(category, api)
+        if not files_info:
+            logging.error(f"❌ 未找到数据: {category}/{api}")
+            return
+        
+        # 只读取最高优先级数据源, 避免不同来源的重复记录
+        best_source = files_info[0]["source"]
+        for file_info in files_info:
+            if file_info["source"] != best_source:
+                continue
+            yield from self._iter_csv_file(Path(file_info["path"]), api, columns,
+                                           date_range, tickers, batch_rows)
+    
+    def _iter_csv_file(self, file_path: Path, api: Optional[str],
+                       columns: Optional[List[str]], date_range: Optional[tuple],
+                       tickers: Optional[List[str]], chunk_size: int) -> Iterator[pd.DataFrame]:
+        """逐块读取单个CSV文件并过滤; 完整无过滤读完时把行数记入数据目录"""
+        header = list(pd.read_csv(file_path, nrows=0).columns)
+        date_col = detect_date_column(header) if date_range else None
+        ticker_col = 'ticker' if tickers and 'ticker' in header else None
+        
+        usecols = None
+        if columns:
+            usecols = [col for col in columns if col in header] or None
+            if usecols:
+                usecols += [col for col in (date_col, ticker_col) if col and col not in usecols]
+        output_cols = [col for col in columns if col in header] if usecols else None
+        
+        if date_range:
+            start_date, end_date = (pd.Timestamp(d) if d is not None else None for d in date_range)
+        ticker_set = {str(t) for t in tickers} if ticker_col else None
+        
+        total_rows = 0
+        for chunk in self.schema_registry.read_csv(file_path, api, usecols=usecols, chunksize=chunk_size):
+            total_rows += len(chunk)
+            
+            if date_col:
+                dates = chunk[date_col]
+                if not pd.api.types.is_datetime64_any_dtype(dates):
+                    dates = pd.to_datetime(dates, errors='coerce')
+                mask = pd.Series(True, index=chunk.index)
+                if start_date is not None:
+                    mask &= dates >= start_date
+                if end_date is not None:
+                    mask &= dates <= end_date
+                chunk = chunk[mask]
+            
+            if ticker_set is not None:
+                chunk = chunk[chunk[ticker_col].astype(str).isin(ticker_set)]
+            
+            if output_cols:
+                chunk = chunk[output_cols]
+            
+            if not chunk.empty:
+                yield chunk
+        
+        self.catalog.record_row_count(file_path, total_rows)
+    
     def _filter_by_date(self, df: pd.DataFrame, date_range: tuple) -> pd.DataFrame:
         """按日期范围过滤数据"""
         try:
@@ -290,6 +485,27 @@ class UnifiedDataAccess:
             logging.warning(f"⚠️ 日期过滤失败: {e}，返回原始数据")
             return df
     
+    def convert_to_parquet(self, category: str, api: str, chunk_size: int = 500000) -> int:
+        """将最佳数据源下的CSV文件转换为Parquet数据集(按年份/股票分桶分区)"""
+        if self.lake is None:
+            logging.error("❌ 未安装pyarrow，无法转换Parquet")
+            return 0
+        
+        files_info = self.get_available_files(category, api)
+        if not files_info:
+            logging.error(f"❌ 未找到数据: {category}/{api}")
+            return 0
+        
+        # 只转换最高优先级数据源, 避免不同来源的重复记录
+        best_source = files_info[0]["source"]
+        csv_files = [f["path"] for f in files_info if f["source"] == best_source]
+        
+        logging.info(f"🔄 转换Parquet: {category}/{api} ({len(csv_files)} 个文件, 来源 {best_source})")
+        total_rows = self.lake.import_csv(category, api, csv_files, chunk_size=chunk_size)
+        logging.info(f"✅ 转换完成: {total_rows:,} 行")
+        
+        return total_rows
+    
     def get_data_info(self, category: str, api: str) -> Dict:
         """获取数据信息"""
         info = {
@@ -322,29 +538,32 @@ class UnifiedDataAccess:
         print("📚 **统一数据访问目录**")
         print("=" * 60)
         
-        categories = self.get_available_categories()
+        self._ensure_catalog()
+        
+        # 一次汇总查询: (类别, API, 来源) -> 文件数/大小
+        catalog = {}
+        for row in self.catalog.summarize():
+            catalog.setdefault(row["category"], {}).setdefault(row["api"], []).append(row)
         
         total_apis = 0
-        total_sources = 0
         
-        for category in categories:
-            apis = self.get_available_apis(category)
+        for category, apis in catalog.items():
             print(f"\n📂 **{category}** ({len(apis)} 个API)")
             
-            for api in apis[:5]:  # 显示前5个API
-                info = self.get_data_info(category, api)
-                sources_str = ", ".join(info["data_sources"])
-                print(f"  🔌 {api}: {info['total_files']} 文件, {info['total_size_mb']:.1f}MB")
+            for api, sources in list(apis.items())[:5]:  # 显示前5个API
+                total_files = sum(s["total_files"] for s in sources)
+                total_size_mb = sum(s["size_bytes"] for s in sources) / 1024 / 1024
+                sources_str = ", ".join(s["source"] for s in sources)
+                print(f"  🔌 {api}: {total_files} 文件, {total_size_mb:.1f}MB")
                 print(f"     📍 来源: {sources_str}")
-                print(f"     ⭐ 推荐: {info['recommended_source']}")
+                print(f"     ⭐ 推荐: {sources[0]['source']}")
             
             if len(apis) > 5:
                 print(f"  ... 还有 {len(apis) - 5} 个API")
             
             total_apis += len(apis)
-            total_sources += len(set(f["source"] for api in apis for f in self.get_available_files(category, api)))
         
-        print(f"\n🎯 **总计**: {len(categories)} 个类别, {total_apis} 个API")
+        print(f"\n🎯 **总计**: {len(catalog)} 个类别, {total_apis} 个API")
         print(f"📦 **数据源**: {len(self.data_sources)} 个目录")
 
 def main():
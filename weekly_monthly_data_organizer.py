@@ -19,6 +19,9 @@ import concurrent.futures
 from threading import Lock
 warnings.filterwarnings('ignore')
 
+from core.data.storage import SegmentStore
+from core.data.processors.bar_aggregator import aggregate_periods, load_trading_days
+
 try:
     import uqer
     print("✅ UQER API 可用")
@@ -78,6 +81,19 @@ class WeeklyMonthlyDataOrganizer:
         self.monthly_stocks_path = self.monthly_path / "stocks"
         self.monthly_stocks_path.mkdir(exist_ok=True)
         
+        # 补全数据以追加分段写入, 分段积累到阈值后后台合并回个股文件;
+        # 与原先的合并方式一致, 日期重复时保留个股文件中已有的记录
+        self.segment_stores = {
+            "weekly": SegmentStore(self.weekly_path / "_segments", key_cols=('endDate',),
+                                   date_col='endDate', keep='first'),
+            "monthly": SegmentStore(self.monthly_path / "_segments", key_cols=('endDate',),
+                                    date_col='endDate', keep='first')
+        }
+        
+        # 交易日历(TradeCalGet): 周期结束日取日历中的最后一个交易日, 不受个股停牌影响
+        calendar_file = Path("/Users/jackstudio/QuantTrade/data/calendar/trading_calendar.csv")
+        self.trading_days = load_trading_days(calendar_file) if calendar_file.exists() else None
+        
         print(f"📁 数据整理路径:")
         print(f"   📊 周线: {self.weekly_path}")
         print(f"   📅 月线: {self.monthly_path}")
@@ -199,6 +215,7 @@ class WeeklyMonthlyDataOrganizer:
         
         filled_count = 0
         save_path = self.weekly_stocks_path if data_type == "weekly" else self.monthly_stocks_path
+        segment_store = self.segment_stores[data_type]
         
         for i, gap_info in enumerate(gaps_info[:50], 1):  # 限制数量避免API超限
             stock_id = gap_info['stock_id']
@@ -233,18 +250,11 @@ class WeeklyMonthlyDataOrganizer:
                 converted_df = self.convert_to_period(daily_df, freq)
                 
                 if converted_df is not None and len(converted_df) > 0:
-                    # 读取现有数据并合并
+                    # 只追加新增数据, 合并由后台任务完成
                     file_path = save_path / f"{stock_id.replace('.', '_')}.csv"
                     
                     if file_path.exists():
-                        existing_df = pd.read_csv(file_path)
-                        existing_df['endDate'] = pd.to_datetime(existing_df['endDate'])
-                        
-                        # 合并数据
-                        combined_df = pd.concat([existing_df, converted_df], ignore_index=True)
-                        combined_df = combined_df.drop_duplicates(subset=['endDate']).sort_values('endDate')
-                        
-                        combined_df.to_csv(file_path, index=False, encoding='utf-8')
+                        segment_store.append(file_path.stem, converted_df)
                         filled_count += 1
                 
                 time.sleep(0.2)  # API限速
@@ -256,50 +266,50 @@ class WeeklyMonthlyDataOrganizer:
         print(f"   ✅ 补全完成: {filled_count} 只股票")
         return filled_count
     
+    def start_compaction(self, data_type="weekly", force=False):
+        """后台合并达到阈值的补全分段到个股文件(force=True 时合并全部分段)"""
+        save_path = self.weekly_stocks_path if data_type == "weekly" else self.monthly_stocks_path
+        return self.segment_stores[data_type].start_background_compaction(
+            base_resolver=lambda dataset: save_path / f"{dataset}.csv",
+            min_segments=1 if force else None
+        )
+    
+    def load_stock_data(self, stock_id, data_type="weekly"):
+        """读取个股的完整周线/月线数据(个股文件 + 未合并的补全分段)"""
+        save_path = self.weekly_stocks_path if data_type == "weekly" else self.monthly_stocks_path
+        dataset = stock_id.replace('.', '_')
+        return self.segment_stores[data_type].read(dataset, base_file=save_path / f"{dataset}.csv")
+    
     def convert_to_period(self, daily_df, freq='W'):
-        """将日线数据转换为周线或月线"""
+        """将日线数据转换为周线或月线(endDate为周期内最后一个交易日)"""
         try:
             if 'tradeDate' not in daily_df.columns:
                 return None
             
-            daily_df['tradeDate'] = pd.to_datetime(daily_df['tradeDate'])
-            daily_df = daily_df.set_index('tradeDate')
-            
-            # 重采样规则
-            agg_rules = {
+            # 聚合规则: 优矿列名与本地样本列名取实际存在的列
+            agg_rules = {col: how for col, how in {
                 'openPrice': 'first',
                 'highestPrice': 'max',
-                'lowestPrice': 'min', 
+                'lowestPrice': 'min',
+                'highPrice': 'max',
+                'lowPrice': 'min',
                 'closePrice': 'last',
                 'turnoverVol': 'sum',
-                'turnoverValue': 'sum'
-            }
-            
-            # 处理列名差异
-            if 'highPrice' in daily_df.columns:
-                agg_rules['highPrice'] = 'max'
-                agg_rules.pop('highestPrice')
-            if 'lowPrice' in daily_df.columns:
-                agg_rules['lowPrice'] = 'min'
-                agg_rules.pop('lowestPrice')
-            if 'volume' in daily_df.columns:
-                agg_rules['volume'] = 'sum'
-                agg_rules.pop('turnoverVol')
-            if 'amount' in daily_df.columns:
-                agg_rules['amount'] = 'sum'
-                agg_rules.pop('turnoverValue')
+                'turnoverValue': 'sum',
+                'volume': 'sum',
+                'amount': 'sum'
+            }.items() if col in daily_df.columns}
             
-            # 重采样
-            resampled = daily_df.resample(freq).agg(agg_rules).dropna()
-            
-            # 重置索引并重命名
-            resampled = resampled.reset_index()
-            resampled = resampled.rename(columns={'tradeDate': 'endDate'})
+            ticker_col = 'secID' if 'secID' in daily_df.columns else None
+            resampled = aggregate_periods(daily_df, freq[0], ticker_col=ticker_col,
+                                          date_col='tradeDate', agg_rules=agg_rules,
+                                          trading_days=self.trading_days)
+            resampled = resampled.drop(columns=['periodStart', 'tradeDays']).dropna()
             
             # 添加基础字段
-            if len(daily_df) > 0:
-                resampled['secID'] = daily_df['secID'].iloc[0] if 'secID' in daily_df.columns else ""
-                resampled['ticker'] = daily_df['ticker'].iloc[0] if 'ticker' in daily_df.columns else ""
+            if ticker_col is None:
+                resampled['secID'] = ""
+            resampled['ticker'] = daily_df['ticker'].iloc[0] if 'ticker' in daily_df.columns else ""
             
             return resampled
             
@@ -318,6 +328,8 @@ class WeeklyMonthlyDataOrganizer:
             print("❌ 未找到现有周线、月线数据")
             return
         
+        compaction_threads = []
+        
         # 整理周线数据
         if weekly_files:
             print("\n📊 处理周线数据:")
@@ -325,6 +337,7 @@ class WeeklyMonthlyDataOrganizer:
             weekly_saved = self.save_organized_data(weekly_data, "weekly")
             weekly_gaps = self.check_data_gaps(weekly_data, "weekly")
             weekly_filled = self.fill_data_gaps(weekly_gaps, "weekly")
+            compaction_threads.append(self.start_compaction("weekly"))
             
             self.stats['stocks_organized'] = max(self.stats['stocks_organized'], len(weekly_data))
             self.stats['weekly_gaps_filled'] = weekly_filled
@@ -336,10 +349,15 @@ class WeeklyMonthlyDataOrganizer:
             monthly_saved = self.save_organized_data(monthly_data, "monthly")
             monthly_gaps = self.check_data_gaps(monthly_data, "monthly")
             monthly_filled = self.fill_data_gaps(monthly_gaps, "monthly")
+            compaction_threads.append(self.start_compaction("monthly"))
             
             self.stats['stocks_organized'] = max(self.stats['stocks_organized'], len(monthly_data))
             self.stats['monthly_gaps_filled'] = monthly_filled
         
+        # 等待分段合并完成
+        for thread in compaction_threads:
+            thread.join()
+        
         # 创建总结报告
         self.create_summary()
     